@@ -12,6 +12,18 @@ from app.db import models  # noqa: F401
 
 settings = get_settings()
 target_metadata = Base.metadata
+SEARCH_FTS, SEARCH_TSV = "service_records_fts", "search_tsv"
+
+def include_name(name, type_, parent_names):
+    # tablas de app/db/online_migration.py (checkpoints, sombras y viejas): no son del modelo
+    if type_ == "table":
+        return not (name == "online_migrations" or name.startswith(("_new_", "_old_", SEARCH_FTS)))
+    # búsqueda de texto (app/services/search.py): la crea y mantiene install() al arrancar
+    if type_ == "column":
+        return name != SEARCH_TSV
+    if type_ == "index":
+        return name != f"ix_service_records_{SEARCH_TSV}"
+    return True
 
 def run_migrations_offline():
     url = settings.DATABASE_URL
@@ -20,6 +32,7 @@ def run_migrations_offline():
         target_metadata=target_metadata,
         literal_binds=True,
         compare_type=True,
+        include_name=include_name,
     )
     with context.begin_transaction():
         context.run_migrations()
@@ -40,6 +53,10 @@ def run_migrations_online():
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
+            include_name=include_name,
+            # una transacción por revisión: las que usan autocommit_block()
+            # (app/db/online_migration.py) confirman lo anterior al entrar
+            transaction_per_migration=True,
         )
         with context.begin_transaction():
             context.run_migrations()
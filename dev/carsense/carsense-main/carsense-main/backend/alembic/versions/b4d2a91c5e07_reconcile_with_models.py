@@ -0,0 +1,418 @@
+"""reconcile schema with models
+
+Revision ID: b4d2a91c5e07
+Revises: 7e61f3c9b2f1
+Create Date: 2026-10-19 10:12:48.531207
+
+Lleva a la forma de app.db.models tanto una BD creada por 7e61f3c9b2f1
+(vehicles.user_id/marca/modelo/anio/odometro, users.hashed_password,
+service_records.servicio/fecha/notas) como una creada con create_all() por
+versiones anteriores de la app (`alembic stamp 7e61f3c9b2f1` y luego
+`alembic upgrade head`). Decide por inspección, así que es retomable:
+
+  1. users, vehicles y service_records con columnas viejas se reescriben en
+     línea (app/db/online_migration.py): copia por lotes a `_new_*` con
+     triggers para las escrituras concurrentes y cambio en una transacción.
+     Las originales quedan como `_old_*`; se borran con
+     `python -m app.jobs.online_migration --drop-old` tras revisar. La app
+     vieja deja de funcionar en el cambio: desplegar la nueva a la par.
+  2. Tablas que faltan: se crean vacías.
+  3. Columnas que faltan (todas nulables o con default): ADD COLUMN.
+  4. Alertas pendientes duplicadas por (vehículo, servicio): se deja la más
+     nueva, por lotes, antes del índice único parcial.
+  5. FK con otro ON DELETE que el modelo (create_all viejo: service_records
+     sin CASCADE) y VARCHAR de otro largo (alerts.servicio/estado de
+     7e61f3c9b2f1): la tabla se reescribe en línea como en 1 y la copia vieja
+     se borra al terminar si no le falta ninguna fila. En Postgres, si sólo
+     difieren las FK, se rehacen sin reescribir (NOT VALID + VALIDATE).
+  6. Índices que faltan: CONCURRENTLY en Postgres.
+
+`services` (catálogo de 7e61f3c9b2f1, sin modelo: los intervalos viven en
+app/data/maintenance_rules.tsv) queda como `_old_services`.
+make_id/model_id quedan NULL: los llena `python -m app.jobs.normalize_vehicles`.
+El índice FTS de SQLite lo crea el arranque (app/services/search.py).
+
+    DATABASE_URL=sqlite:///./app.db MIGRATION_DUTY=0.5 alembic upgrade head
+"""
+from typing import Dict, List, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db import online_migration as om
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d2a91c5e07'
+down_revision: Union[str, None] = '7e61f3c9b2f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Definiciones congeladas (no importar los modelos: cambian después)
+md = sa.MetaData()
+
+users = sa.Table('users', md,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=255), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('tokens_valid_after', sa.DateTime(), nullable=True),
+    sa.Column('shard', sa.SmallInteger(), nullable=True),
+    sa.Column('shard_moving', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.Column('last_write_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_users_email', 'email', unique=True),
+    sa.Index('ix_users_id', 'id'),
+)
+vehicles = sa.Table('vehicles', md,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('make', sa.String(length=100), nullable=False),
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=True),
+    sa.Column('odometer_km', sa.Integer(), nullable=True),
+    sa.Column('vin', sa.String(length=17), nullable=True),
+    sa.Column('make_id', sa.SmallInteger(), nullable=True),
+    sa.Column('model_id', sa.Integer(), nullable=True),
+    sa.Column('usage_profile', sa.String(length=16), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_vehicles_id', 'id'),
+    sa.Index('ix_vehicles_owner_id', 'owner_id'),
+    sa.Index('ix_vehicles_vin', 'vin'),
+    sa.Index('ix_vehicles_make_id', 'make_id'),
+    sa.Index('ix_vehicles_model_id', 'model_id'),
+)
+service_records = sa.Table('service_records', md,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('service_type', sa.String(length=100), nullable=False),
+    sa.Column('date', sa.Date(), nullable=True),
+    sa.Column('km', sa.Integer(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('cost_cents', sa.Integer(), nullable=True),
+    sa.Column('currency', sa.String(length=3), server_default='MXN', nullable=False),
+    sa.Column('workshop', sa.String(length=120), nullable=True),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_service_records_id', 'id'),
+    sa.Index('ix_service_records_vehicle_id', 'vehicle_id'),
+)
+sa.Table('reminders', md,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('due_date', sa.Date(), nullable=True),
+    sa.Column('due_km', sa.Integer(), nullable=True),
+    sa.Column('notes', sa.String(length=255), nullable=True),
+    sa.Column('done', sa.Boolean(), nullable=False),
+    sa.Column('fired_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_reminders_id', 'id'),
+    sa.Index('ix_reminders_vehicle_id', 'vehicle_id'),
+)
+sa.Table('alerts', md,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('servicio', sa.String(length=50), nullable=False),
+    sa.Column('fecha_programada', sa.Date(), nullable=True),
+    sa.Column('estado', sa.String(length=16), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_alerts_vehicle_id', 'vehicle_id'),
+    sa.Index('uq_alerts_vehicle_servicio_pendiente', 'vehicle_id', 'servicio', unique=True,
+             sqlite_where=sa.text("estado = 'pendiente'"), postgresql_where=sa.text("estado = 'pendiente'")),
+)
+sa.Table('odometer_readings', md,
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('ts', sa.DateTime(), nullable=False),
+    sa.Column('km', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('vehicle_id', 'ts'),
+    sqlite_with_rowid=False,
+)
+sa.Table('vehicle_usage', md,
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('first_ts', sa.DateTime(), nullable=False),
+    sa.Column('first_km', sa.Integer(), nullable=False),
+    sa.Column('last_ts', sa.DateTime(), nullable=False),
+    sa.Column('last_km', sa.Integer(), nullable=False),
+    sa.Column('km_per_day', sa.Float(), nullable=True),
+    sa.Column('anchor_ts', sa.DateTime(), nullable=True),
+    sa.Column('anchor_km', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('vehicle_id'),
+)
+sa.Table('telemetry_samples', md,
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('pid', sa.SmallInteger(), nullable=False),
+    sa.Column('ts', sa.BigInteger(), nullable=False),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('vehicle_id', 'pid', 'ts'),
+    sa.Index('ix_telemetry_samples_ts', 'ts'),
+    sqlite_with_rowid=False,
+)
+sa.Table('telemetry_rollups', md,
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('pid', sa.SmallInteger(), nullable=False),
+    sa.Column('minute', sa.Integer(), nullable=False),
+    sa.Column('n', sa.Integer(), nullable=False),
+    sa.Column('vmin', sa.Float(), nullable=False),
+    sa.Column('vmax', sa.Float(), nullable=False),
+    sa.Column('vsum', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('vehicle_id', 'pid', 'minute'),
+    sqlite_with_rowid=False,
+)
+sa.Table('dtc_events', md,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('code', sa.String(length=8), nullable=False),
+    sa.Column('source', sa.String(length=16), nullable=False),
+    sa.Column('ts', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('vehicle_id', 'code', 'ts', name='uq_dtc_events_vehicle_code_ts'),
+)
+sa.Table('dtc_summary', md,
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('code', sa.String(length=8), nullable=False),
+    sa.Column('first_seen', sa.DateTime(), nullable=False),
+    sa.Column('last_seen', sa.DateTime(), nullable=False),
+    sa.Column('last_event_at', sa.DateTime(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('reports', sa.Integer(), nullable=False),
+    sa.Column('cleared_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('vehicle_id', 'code'),
+)
+sa.Table('dtc_code_stats', md,
+    sa.Column('code', sa.String(length=8), nullable=False),
+    sa.Column('occurrences', sa.Integer(), nullable=False),
+    sa.Column('vehicles', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('code'),
+)
+sa.Table('service_cost_monthly', md,
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('service_type', sa.String(length=100), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('n', sa.Integer(), nullable=False),
+    sa.Column('cost_cents', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('vehicle_id', 'month', 'service_type', 'currency'),
+    sqlite_with_rowid=False,
+)
+sa.Table('change_log', md,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=16), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=8), nullable=False),
+    sa.Column('ts', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.Index('ix_change_log_owner_id_id', 'owner_id', 'id'),
+    sqlite_autoincrement=True,
+)
+sa.Table('notification_outbox', md,
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('reminder_id', sa.Integer(), nullable=False),
+    sa.Column('channel', sa.String(length=16), nullable=False),
+    sa.Column('fired_at', sa.DateTime(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('status', sa.String(length=8), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('claimed_by', sa.String(length=36), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.ForeignKeyConstraint(['reminder_id'], ['reminders.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('reminder_id', 'channel', 'fired_at', name='uq_notification_outbox_reminder_channel'),
+    sa.Index('ix_notification_outbox_reminder_id', 'reminder_id'),
+    sa.Index('ix_notification_outbox_status_available_at', 'status', 'available_at'),
+)
+sa.Table('idempotency_keys', md,
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.LargeBinary(length=16), nullable=False),
+    sa.Column('request_hash', sa.LargeBinary(length=16), nullable=False),
+    sa.Column('status', sa.SmallInteger(), nullable=False),
+    sa.Column('body', sa.LargeBinary(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('owner_id', 'key'),
+    sa.Index('ix_idempotency_keys_expires_at', 'expires_at'),
+    sqlite_with_rowid=False,
+)
+sa.Table('revoked_tokens', md,
+    sa.Column('jti', sa.String(length=32), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('revoked_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('jti'),
+    sa.Index('ix_revoked_tokens_expires_at', 'expires_at'),
+    sa.Index('ix_revoked_tokens_revoked_at', 'revoked_at'),
+)
+sa.Table('scheduler_leases', md,
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('holder', sa.String(length=64), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name'),
+)
+
+# (tabla, columna que delata la forma de 7e61f3c9b2f1, reescritura), de padres a hijos
+REBUILDS = [
+    ('users', 'hashed_password', om.Rebuild(users, {
+        'id': '{r}.id',
+        'email': '{r}.email',
+        'password_hash': '{r}.hashed_password',
+    })),
+    ('vehicles', 'user_id', om.Rebuild(vehicles, {
+        'id': '{r}.id',
+        'owner_id': '{r}.user_id',
+        'make': '{r}.marca',
+        'model': '{r}.modelo',
+        'year': '{r}.anio',
+        'odometer_km': 'CAST(ROUND({r}.odometro) AS INTEGER)',
+        # sólo VINs con forma de VIN; el resto no pasaría app/services/vin.py
+        'vin': 'CASE WHEN length(trim({r}.vin)) = 17 THEN upper(trim({r}.vin)) END',
+    })),
+    ('service_records', 'servicio', om.Rebuild(service_records, {
+        'id': '{r}.id',
+        'vehicle_id': '{r}.vehicle_id',
+        'service_type': '{r}.servicio',
+        'date': '{r}.fecha',
+        'km': 'CAST(ROUND({r}.km) AS INTEGER)',
+        'notes': '{r}.notas',
+    })),
+]
+
+# índices de 7e61f3c9b2f1 que los modelos ya no tienen (en tablas que no se reescriben)
+OBSOLETE_INDEXES = {'alerts': ['ix_alerts_id', 'ix_alerts_servicio']}
+
+DEDUPE_ALERTS = """
+DELETE FROM alerts WHERE id > :lo AND id <= :hi AND estado = 'pendiente'
+AND EXISTS (SELECT 1 FROM alerts b WHERE b.vehicle_id = alerts.vehicle_id
+            AND b.servicio = alerts.servicio AND b.estado = 'pendiente' AND b.id > alerts.id)
+"""
+
+
+def _add_missing_columns(conn, table: sa.Table) -> None:
+    have = {c['name'] for c in sa.inspect(conn).get_columns(table.name)}
+    for c in table.columns:
+        if c.name in have:
+            continue
+        if not c.nullable and c.server_default is None:
+            raise RuntimeError(f"{table.name}.{c.name} falta y es NOT NULL sin default: agregarla a mano")
+        op.add_column(table.name, sa.Column(
+            c.name, c.type, nullable=c.nullable,
+            server_default=None if c.server_default is None else sa.DefaultClause(c.server_default.arg),
+        ))
+
+
+def _fk_drift(conn, table: sa.Table) -> List[sa.ForeignKeyConstraint]:
+    """FK de `table` cuyo ON DELETE en la BD no es el del modelo."""
+    ondelete = {(tuple(fk['constrained_columns']), fk['referred_table']): (fk.get('options') or {}).get('ondelete')
+                for fk in sa.inspect(conn).get_foreign_keys(table.name)}
+    out = []
+    for fk in table.foreign_key_constraints:
+        key = (tuple(c.name for c in fk.columns), fk.referred_table.name)
+        if key in ondelete and (ondelete[key] or '').upper() != (fk.ondelete or '').upper():
+            out.append(fk)
+    return out
+
+
+def _resized(conn, table: sa.Table) -> Dict[str, int]:
+    """Columnas VARCHAR cuyo largo en la BD no es el del modelo: {columna: largo del modelo}."""
+    have = {c['name']: c['type'] for c in sa.inspect(conn).get_columns(table.name)}
+    return {c.name: c.type.length for c in table.columns
+            if isinstance(c.type, sa.String) and c.type.length and c.name in have
+            and getattr(have[c.name], 'length', None) != c.type.length}
+
+
+def _as_is(table: sa.Table, resized: Dict[str, int]) -> om.Rebuild:
+    """Reescritura que copia cada columna tal cual (recortando las que se angostan)."""
+    if [c.name for c in table.primary_key.columns] != ['id']:
+        raise RuntimeError(f"{table.name}: sin llave `id` no se reescribe en línea; migrarla a mano")
+    return om.Rebuild(table, {
+        c.name: f'substr({{r}}.{c.name}, 1, {resized[c.name]})' if c.name in resized else f'{{r}}.{c.name}'
+        for c in table.columns
+    })
+
+
+def _drop_drift_copies(conn) -> None:
+    """
+    Las `_old_*` de las reescrituras tal cual (paso 5) no guardan nada que la
+    nueva no tenga, y sus FK sin CASCADE (SQLite no deja quitarlas) impedirían
+    borrar vehículos o cuentas: se borran si no falta ninguna fila.
+    """
+    for name in sa.inspect(conn).get_table_names():
+        if not name.startswith(om.OLD):
+            continue
+        live = name[len(om.OLD):]
+        cp = om.checkpoint(conn, f'{revision}:drift:{live}')
+        if cp is None or not cp.done:
+            continue
+        old, new = (conn.exec_driver_sql(f'SELECT count(*) FROM {t}').scalar() for t in (name, live))
+        if old == new:
+            om.drop_old(conn, [name])
+        else:
+            om.log.warning("%s: %s filas sin copiar (huérfanas); se deja para revisar y "
+                           "borrar con --drop-old", name, old - new)
+
+
+def upgrade() -> None:
+    ctx = op.get_context()
+    if ctx.as_sql:
+        raise RuntimeError("Esta revisión copia datos por lotes: no tiene modo --sql")
+    with ctx.autocommit_block():
+        conn = op.get_bind()
+        tables = set(sa.inspect(conn).get_table_names())
+        legacy = [spec for name, marker, spec in REBUILDS
+                  if name in tables and marker in {c['name'] for c in sa.inspect(conn).get_columns(name)}]
+        if legacy:
+            om.rebuild(conn, revision, legacy)
+
+        if 'services' in tables:
+            op.rename_table('services', om.old_name('services'))
+
+        missing = [t for t in md.sorted_tables if t.name not in tables]
+        md.create_all(conn, tables=missing)
+        for table in md.sorted_tables:
+            if table not in missing:
+                _add_missing_columns(conn, table)
+
+        indexes = {t: {ix['name'] for ix in sa.inspect(conn).get_indexes(t)} for t in md.tables}
+        if 'uq_alerts_vehicle_servicio_pendiente' not in indexes['alerts']:
+            om.backfill(conn, f'{revision}:alerts_dedupe', 'alerts', DEDUPE_ALERTS)
+
+        drifted = []
+        for table in md.sorted_tables:
+            fks, resized = _fk_drift(conn, table), _resized(conn, table)
+            if resized or (fks and conn.dialect.name == 'sqlite'):
+                drifted.append(_as_is(table, resized))
+            elif fks:
+                om.replace_foreign_keys(conn, table, fks)
+        if drifted:
+            om.rebuild(conn, f'{revision}:drift', drifted)
+        _drop_drift_copies(conn)
+
+        indexes = {t: {ix['name'] for ix in sa.inspect(conn).get_indexes(t)} for t in md.tables}
+        for table in md.sorted_tables:
+            for ix in table.indexes:
+                if ix.name not in indexes[table.name]:
+                    om.create_index(conn, ix)
+        for table, names in OBSOLETE_INDEXES.items():
+            for name in names:
+                if name in indexes[table]:
+                    concurrently = ' CONCURRENTLY' if conn.dialect.name == 'postgresql' else ''
+                    op.execute(f'DROP INDEX{concurrently} IF EXISTS {name}')
+
+
+def downgrade() -> None:
+    raise NotImplementedError(
+        "Sin downgrade: restaurar un respaldo. Mientras no se borren, los datos "
+        "originales de las tablas reescritas siguen en _old_users/_old_vehicles/_old_service_records."
+    )
@@ -1,6 +1,11 @@
 # app/api/debug.py
-from fastapi import APIRouter
-from app.db import ensure_db, Base, engine
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from app.db import ensure_db, Base, engine, replicas, shards
+from app.core import profiler, slow_queries
+from app.core.config import get_settings
 
 router = APIRouter(prefix="/__debug__", tags=["__debug__"])
 
@@ -16,3 +21,43 @@ def ensure_db_route():
 @router.get("/tables")
 def list_tables():
     return {"tables": list(Base.metadata.tables.keys())}
+
+@router.get("/slow-queries")
+def list_slow_queries(limit: Optional[int] = Query(None, ge=1)):
+    settings = get_settings()
+    return {
+        "enabled": settings.SLOW_QUERY_MS > 0,
+        "threshold_ms": settings.SLOW_QUERY_MS,
+        "queries": slow_queries.top(limit),
+    }
+
+@router.delete("/slow-queries")
+def reset_slow_queries():
+    slow_queries.reset()
+    return {"status": "ok"}
+
+@router.get("/shards")
+def list_shards():
+    if not shards.enabled():
+        return {"enabled": False, "shards": []}
+    return {"enabled": True, "dir": get_settings().SHARD_DIR, "shards": shards.stats()}
+
+@router.get("/replicas")
+def list_replicas():
+    pool = replicas.get_pool()
+    if pool is None:
+        return {"enabled": False, "replicas": []}
+    return {"enabled": True, "max_lag_s": pool.max_lag, "replicas": [r.status() for r in pool.replicas]}
+
+@router.get("/profiles")
+def list_profiles():
+    ring = profiler.default_ring()
+    return {"max_files": ring.max_files, "profiles": ring.index()}
+
+@router.get("/profiles/{name}")
+def get_profile(name: str):
+    path = profiler.default_ring().path_of(name)
+    if not path:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    # formato collapsed: se abre directo en speedscope.app o flamegraph.pl
+    return FileResponse(path, media_type="text/plain", filename=name)
@@ -1,18 +1,74 @@
 # app/api/deps.py
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.db import replicas, shards
+from app.db.session import SessionLocal, get_db
 from app.db.models import User
-from app.core.security import decode_token
+from app.core.security import decode_claims, issued_before
 
 oauth2 = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")  # requerido por FastAPI
+oauth2_optional = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login", auto_error=False)
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2)) -> User:
-    email = decode_token(token)
-    if not email:
+def get_current_claims(token: str = Depends(oauth2)) -> dict:
+    """Claims del Bearer (firma, vencimiento y lista de revocados; ésta sin BD)."""
+    claims = decode_claims(token)
+    if not claims or not claims.get("sub"):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
-    user = db.query(User).filter(User.email == email).first()
+    return claims
+
+def get_current_user(db: Session = Depends(get_db), claims: dict = Depends(get_current_claims)) -> User:
+    user = db.query(User).filter(User.email == claims["sub"]).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado")
+    if issued_before(claims, user.tokens_valid_after):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
+    route_to_user(db, user)
+    return user
+
+def get_optional_user(db: Session = Depends(get_db), token: Optional[str] = Depends(oauth2_optional)) -> Optional[User]:
+    """Como get_current_user pero sin exigir token (endpoints públicos con extras al autenticarse)."""
+    claims = decode_claims(token) if token else None
+    if not claims or not claims.get("sub"):
+        return None
+    user = db.query(User).filter(User.email == claims["sub"]).first()
+    if user is None or issued_before(claims, user.tokens_valid_after):
+        return None
+    route_to_user(db, user)
     return user
+
+def route_to_user(db: Session, user: User) -> None:
+    """
+    Con shards: la sesión sigue en el shard del usuario (503 mientras se muda).
+    Con réplicas: sus lecturas no ven datos anteriores a su última escritura.
+    """
+    replicas.pin(db, user)
+    if not shards.enabled():
+        return
+    if user.shard_moving:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Cuenta en mantenimiento, reintenta en unos segundos",
+                            headers={"Retry-After": "5"})
+    shards.route(db, user.shard)
+
+def user_id_from_token(token: Optional[str]) -> Optional[int]:
+    """Id del usuario del token, con sesión propia y corta (conexiones push de larga vida)."""
+    claims = decode_claims(token) if token else None
+    if not claims or not claims.get("sub"):
+        return None
+    with SessionLocal() as db:
+        row = db.execute(select(User.id, User.tokens_valid_after).where(User.email == claims["sub"])).first()
+    if row is None or issued_before(claims, row.tokens_valid_after):
+        return None
+    return row.id
+
+def idempotency_key(key: Optional[str] = Header(None, alias="Idempotency-Key")) -> Optional[str]:
+    """Cabecera Idempotency-Key opcional de las altas (1-255 caracteres visibles)."""
+    if key is None:
+        return None
+    if not 0 < len(key) <= 255 or not key.isprintable():
+        raise HTTPException(status_code=400, detail="Idempotency-Key inválida")
+    return key
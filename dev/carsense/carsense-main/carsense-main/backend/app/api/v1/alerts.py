@@ -1,23 +1,16 @@
 # backend/app/api/v1/alerts.py
-from datetime import date
 from typing import List, Dict, Any
 
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.core.security import get_db, get_current_user
+from app.api.deps import get_current_user
+from app.db.session import get_db
 from app.db.models import Alert, Vehicle, User
+from app.services import alerts as alerts_service
 
 router = APIRouter(prefix="/alerts", tags=["alerts"])
 
-# Reglas simplificadas (puedes ignorarlas aquí; el cálculo real lo tendrás en tu servicio)
-SERVICE_RULES = {
-    "aceite": {"km_interval": 10000, "months_interval": 6},
-    "freno": {"km_interval": 20000, "months_interval": 12},
-    "filtro_aire": {"km_interval": 15000, "months_interval": 12},
-    "rotacion_llantas": {"km_interval": 10000, "months_interval": 6},
-}
-
 @router.get("/", response_model=List[Dict[str, Any]])
 def list_alerts(
     db: Session = Depends(get_db),
@@ -26,7 +19,7 @@ def list_alerts(
     q = (
         db.query(Alert)
         .join(Vehicle, Alert.vehicle_id == Vehicle.id)
-        .filter(Vehicle.user_id == current_user.id)
+        .filter(Vehicle.owner_id == current_user.id)
         .order_by(Alert.created_at.desc())
     )
     rows = q.all()
@@ -49,37 +42,11 @@ def run_now(
     current_user: User = Depends(get_current_user),
 ):
     """
-    Genera/actualiza alertas pendientes (demo: crea una alerta por servicio si no existe).
+    Genera las alertas pendientes que falten para los vehículos del usuario
+    (el scheduler hace lo mismo para toda la flota).
     """
-    vehicles = db.query(Vehicle).filter(Vehicle.user_id == current_user.id).all()
-    today = date.today()
-    created_or_updated = False
-
-    for v in vehicles:
-        for servicio in SERVICE_RULES.keys():
-            exists = (
-                db.query(Alert)
-                .filter(
-                    Alert.vehicle_id == v.id,
-                    Alert.servicio == servicio,
-                    Alert.estado == "pendiente",
-                )
-                .first()
-            )
-            if not exists:
-                a = Alert(
-                    vehicle_id=v.id,
-                    servicio=servicio,
-                    fecha_programada=today,
-                    estado="pendiente",
-                )
-                db.add(a)
-                created_or_updated = True
-
-    if created_or_updated:
-        db.commit()
-
-    return {"status": "ok", "alerts_created_or_updated": created_or_updated}
+    n = alerts_service.generate(db, owner_id=current_user.id)
+    return {"status": "ok", "alerts_created_or_updated": n > 0, "created": n}
 
 
 @router.put("/{alert_id}", response_model=dict)
@@ -94,7 +61,7 @@ def acknowledge_alert(
     a = (
         db.query(Alert)
         .join(Vehicle, Alert.vehicle_id == Vehicle.id)
-        .filter(Alert.id == alert_id, Vehicle.user_id == current_user.id)
+        .filter(Alert.id == alert_id, Vehicle.owner_id == current_user.id)
         .first()
     )
     if not a:
@@ -0,0 +1,60 @@
+# backend/app/api/v1/analytics.py
+import re
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.db.session import get_db
+from app.db.models import User
+from app.api.deps import get_current_user
+from app.api.v1.vehicles import get_owned_vehicle_or_404
+from app.services import costs
+
+router = APIRouter(tags=["analytics"])
+
+_MONTH = re.compile(r"^(\d{4})-(\d{2})$")
+
+
+def _month(value: Optional[str], name: str) -> Optional[int]:
+    if value is None:
+        return None
+    m = _MONTH.match(value)
+    if not m or not 1 <= int(m[2]) <= 12:
+        raise HTTPException(status_code=400, detail=f"{name} debe tener formato AAAA-MM")
+    return int(m[1]) * 100 + int(m[2])
+
+
+# ---------- COSTO POR MES ----------
+@router.get("/analytics/costs/monthly")
+def cost_by_month(
+    vehicle_id: Optional[int] = Query(None),
+    since: Optional[str] = Query(None, description="AAAA-MM"),
+    until: Optional[str] = Query(None, description="AAAA-MM"),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    if vehicle_id is not None:
+        get_owned_vehicle_or_404(db, user.id, vehicle_id)
+    return costs.by_month(db, user.id, vehicle_id, _month(since, "since"), _month(until, "until"))
+
+
+# ---------- COSTO POR TIPO DE SERVICIO ----------
+@router.get("/analytics/costs/by-type")
+def cost_by_type(
+    vehicle_id: Optional[int] = Query(None),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    if vehicle_id is not None:
+        get_owned_vehicle_or_404(db, user.id, vehicle_id)
+    return costs.by_type(db, user.id, vehicle_id)
+
+
+# ---------- COSTO POR VEHÍCULO (y por km) ----------
+@router.get("/analytics/costs/by-vehicle")
+def cost_by_vehicle(
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    return costs.by_vehicle(db, user.id)
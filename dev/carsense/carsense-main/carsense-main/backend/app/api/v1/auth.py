@@ -1,10 +1,18 @@
 # app/api/v1/auth.py
+from datetime import datetime, timezone
+from typing import Iterable
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, EmailStr
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
+from app.db import delete_children, shards
 from app.db.session import get_db
-from app.db.models import User
+from app.db.models import UNLINKED_USER_TABLES, User
+from app.core import revocation
+from app.services import idempotency
 from app.core.security import hash_password, verify_password, create_access_token
+from app.api.deps import get_current_claims, get_current_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -16,6 +24,10 @@ class TokenResp(BaseModel):
     access_token: str
     token_type: str = "bearer"
 
+class PasswordReq(BaseModel):
+    current_password: str
+    new_password: str
+
 @router.post("/register", status_code=201)
 def register(req: AuthReq, db: Session = Depends(get_db)):
     exists = db.query(User).filter(User.email == req.email).first()
@@ -24,6 +36,7 @@ def register(req: AuthReq, db: Session = Depends(get_db)):
     user = User(email=req.email, password_hash=hash_password(req.password))
     db.add(user)
     db.commit()
+    shards.assign(db, user)  # con shards: elige el suyo y crea la fila sombra
     return {"ok": True}
 
 @router.post("/login", response_model=TokenResp)
@@ -33,3 +46,56 @@ def login(req: AuthReq, db: Session = Depends(get_db)):
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
     token = create_access_token(sub=user.email)
     return TokenResp(access_token=token)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(db: Session = Depends(get_db), claims: dict = Depends(get_current_claims)):
+    """Revoca el token actual (su jti) hasta que venza."""
+    if not claims.get("jti"):
+        # token anterior a los jti: no se puede revocar solo, vence por su cuenta
+        raise HTTPException(status_code=400, detail="Token sin jti; inicia sesión de nuevo")
+    # naive UTC en ms, como tokens_valid_after
+    exp = datetime.fromtimestamp(claims["exp"], timezone.utc).replace(tzinfo=None)
+    revocation.revoke(db, claims["jti"], exp.replace(microsecond=exp.microsecond // 1000 * 1000))
+
+@router.post("/password", response_model=TokenResp)
+def change_password(req: PasswordReq, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    """Cambia la contraseña e invalida todos los tokens anteriores; devuelve uno nuevo."""
+    if not verify_password(req.current_password, user.password_hash):
+        raise HTTPException(status_code=401, detail="Credenciales inválidas")
+    user.password_hash = hash_password(req.new_password)
+    now = datetime.utcnow()
+    user.tokens_valid_after = now.replace(microsecond=now.microsecond // 1000 * 1000)
+    db.commit()
+    return TokenResp(access_token=create_access_token(sub=user.email))
+
+def delete_accounts(db: Session, user_ids: Iterable[int], chunk: int = 500) -> int:
+    """
+    Borra cuentas en bloque (un DELETE por lote de ids). Vehículos, servicios y
+    recordatorios se eliminan en la BD por ON DELETE CASCADE, sin cargarlos (a
+    mano en una BD sin migrar, ver delete_children); change_log e
+    idempotency_keys (sin FK) con su propio DELETE.
+    """
+    ids = list(user_ids)
+    # datos en esta BD: sin shards, o usuarios que siguen en el directorio
+    bind = {"bind": shards.directory()} if shards.enabled() else None
+    deleted = 0
+    for i in range(0, len(ids), chunk):
+        # con shards, primero los datos (la sombra, en cascada): si algo falla la cuenta sigue y se reintenta
+        shards.delete_shadows(db, ids[i:i + chunk])
+        for t in UNLINKED_USER_TABLES:
+            db.execute(t.delete().where(t.c.owner_id.in_(ids[i:i + chunk])), bind_arguments=bind)
+        delete_children(db, User.__table__, User.__table__.c.id.in_(ids[i:i + chunk]))
+        res = db.execute(
+            delete(User)
+            .where(User.id.in_(ids[i:i + chunk]))
+            .execution_options(synchronize_session=False)
+        )
+        deleted += res.rowcount
+        db.commit()
+        idempotency.forget(ids[i:i + chunk])
+    return deleted
+
+@router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+def delete_me(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    delete_accounts(db, [user.id])
+    # 204 → sin body
@@ -0,0 +1,25 @@
+# backend/app/api/v1/catalog.py
+from typing import List, Optional
+
+from fastapi import APIRouter, Query, Request
+
+from app.core.responses import dumps, json_bytes
+from app.schemas.catalog import CatalogItemOut
+from app.services import catalog
+
+router = APIRouter(tags=["catalog"])
+
+
+# ---------- AUTOCOMPLETADO (una petición por tecla) ----------
+@router.get("/catalog/autocomplete", response_model=List[CatalogItemOut])
+def autocomplete(
+    request: Request,
+    q: str = Query("", max_length=64),
+    make_id: Optional[int] = Query(None, description="sólo modelos de esta marca"),
+    year: Optional[int] = Query(None, ge=1900, le=2100),
+    limit: int = Query(10, ge=1, le=50),
+):
+    # público y sin BD: el catálogo es el mismo para todos
+    resp = json_bytes(request, dumps(catalog.get_catalog().complete(q, make_id, year, limit)))
+    resp.headers["Cache-Control"] = "public, max-age=3600"
+    return resp
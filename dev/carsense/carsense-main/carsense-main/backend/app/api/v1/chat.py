@@ -4,6 +4,8 @@ from pydantic import BaseModel
 import re
 from typing import List, Dict, Optional
 
+from app.services import maintenance
+
 router = APIRouter(prefix="/api/v1/chat", tags=["chat"])
 
 # --------- Utilidades simples ----------
@@ -19,7 +21,7 @@ FAQ: Dict[str, Dict] = {
     "cambio_aceite": {
         "q": ["cuando cambio aceite", "cambio de aceite", "cada cuantos km aceite", "aceite cada"],
         "a": (
-            "Como regla general: **cada 8–12 mil km o 6–12 meses** (lo que ocurra primero). "
+            "Como regla general: **{aceite}**, lo que ocurra primero. "
             "Respeta la viscosidad del manual (p. ej. 5W-30) y **cambia el filtro siempre**. "
             "Si haces muchos trayectos cortos, adelántalo."
         ),
@@ -30,7 +32,7 @@ FAQ: Dict[str, Dict] = {
         "q": ["rotacion", "rotación", "llantas", "neumaticos"],
         "a": (
             "La **rotación de llantas** ayuda a un desgaste parejo. "
-            "Hazla **cada 10,000 km** aprox. y verifica presión en frío cada 2 semanas."
+            "Hazla **{rotacion_llantas}** aprox. y verifica presión en frío cada 2 semanas."
         ),
         "suggest": ["Cómo medir presión", "Próximo servicio sugerido"]
     },
@@ -38,7 +40,7 @@ FAQ: Dict[str, Dict] = {
         "q": ["frenos", "balatas", "pastillas"],
         "a": (
             "Revisa frenos si oyes chirrido/metal, pedal esponjoso o el auto se va de lado. "
-            "Cambio típico de **pastillas: 25–40 mil km**, pero depende del uso."
+            "Revisión de **balatas y discos {freno}**; el cambio depende del espesor y del uso."
         ),
         "suggest": ["Agendar revisión de frenos"]
     },
@@ -79,6 +81,15 @@ class ChatOut(BaseModel):
     suggestions: List[str] = []
     links: List[Dict[str, str]] = []
 
+class _Intervals(dict):
+    """'{aceite}' -> 'cada 10,000 km o 6 meses (uso severo: ...)' para el año dado."""
+    def __init__(self, year: Optional[int]):
+        super().__init__()
+        self.year = year
+
+    def __missing__(self, service: str) -> str:
+        return maintenance.advice(service, year=self.year)
+
 # --------- Motor muy simple ----------
 def intent_reply(data: ChatIn) -> ChatOut:
     msg = norm(data.message)
@@ -119,10 +130,13 @@ def intent_reply(data: ChatIn) -> ChatOut:
             blocks.append("• Revisar **correa/cadena** según tu motor.")
         if kms >= 100_000:
             blocks.append("• **Bujías** y limpieza de cuerpo de aceleración (si procede).")
+        year = data.vehicle_year
         if kms >= 80_000:
-            blocks.append("• **Líquido de frenos** (cada 2 años) y **refrigerante**.")
-        blocks.append("• **Aceite + filtro** cada 8–12 mil km o 6–12 meses.")
-        blocks.append("• **Rotación de llantas** cada ~10 mil km y presión cada 2 semanas.")
+            blocks.append(f"• **Líquido de frenos** ({maintenance.advice('liquido_frenos', year=year)}) "
+                          f"y **refrigerante** ({maintenance.advice('refrigerante', year=year)}).")
+        blocks.append(f"• **Aceite + filtro** {maintenance.advice('aceite', year=year)}.")
+        blocks.append(f"• **Rotación de llantas** {maintenance.advice('rotacion_llantas', year=year)} "
+                      "y presión cada 2 semanas.")
         reply = f"Tienes **{kms:,} km**. Te sugiero:\n" + "\n".join(blocks)
         return ChatOut(
             reply=reply,
@@ -148,10 +162,11 @@ def intent_reply(data: ChatIn) -> ChatOut:
             suggestions=["Checklist de viaje", "Programar inspección general"]
         )
 
-    # 3) FAQ por similitud
+    # 3) FAQ por similitud ({servicio} = intervalo del catálogo de mantenimiento)
     for key, item in FAQ.items():
         if any(kw in msg for kw in item["q"]):
-            return ChatOut(reply=item["a"], suggestions=item.get("suggest", []), links=item.get("links", []))
+            reply = item["a"].format_map(_Intervals(data.vehicle_year))
+            return ChatOut(reply=reply, suggestions=item.get("suggest", []), links=item.get("links", []))
 
     # 4) fallback
     return ChatOut(
@@ -1,9 +1,16 @@
 # backend/app/api/v1/chatbot.py
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
 from typing import Dict, List, Tuple, Optional
 import re, random
 
+from app.api.deps import get_optional_user
+from app.core.clock import utcnow
+from app.db.models import User, Vehicle
+from app.db.session import get_db
+from app.services import dtc, maintenance
+
 router = APIRouter()
 
 # ===================== Modelos =====================
@@ -13,6 +20,7 @@ class Message(BaseModel):
 
 class AskReq(BaseModel):
     messages: List[Message]
+    vehicle_id: Optional[int] = None  # con sesión: guarda los DTC preguntados y personaliza el calendario
 
 class AskRes(BaseModel):
     text: str
@@ -20,13 +28,7 @@ class AskRes(BaseModel):
     intent: Optional[str] = None
 
 # ===================== Base DTC =====================
-DTC_MAP: Dict[str, str] = {
-    "P0171": "Mezcla pobre (Bank 1). Revisa tomas de aire falsas, MAF sucio, presion de combustible y fugas de vacio.",
-    "P0420": "Eficiencia del catalizador por debajo del umbral. Revisa fugas en escape, sensores O2 y estado del catalizador.",
-    "P0300": "Fallo de encendido aleatorio. Revisa bujias, bobinas, cables, inyectores y compresion.",
-    "P0442": "Fuga pequena en sistema EVAP. Revisa tapa de combustible, mangueras EVAP y valvula de purga.",
-    "P0128": "Temperatura de refrigerante baja. Termostato abierto o sensor ECT defectuoso.",
-}
+DTC_MAP = dtc.DTC_MAP  # compartida con la bitácora de DTC
 
 # ===================== Deteccion de intencion =====================
 def detect_intent(text: str) -> Tuple[str, Dict[str, str]]:
@@ -127,16 +129,18 @@ def answer_dtc(code: str) -> str:
     )
 
 def answer_oil() -> str:
-    return ("Aceite: intervalo 8–12 mil km o 6–12 meses. Viscosidad y especificacion OEM. "
+    return (f"Aceite: {maintenance.advice('aceite')}, lo que ocurra primero. Viscosidad y especificacion OEM. "
             "Cambiar filtro siempre y revisar fugas en tapon/carter/filtro.")
 
 def answer_tires() -> str:
-    return ("Llantas: presion en frio 32–35 psi (confirma etiqueta). Rotacion 10–12 mil km. "
+    return ("Llantas: presion en frio 32–35 psi (confirma etiqueta). "
+            f"Rotacion {maintenance.advice('rotacion_llantas')}. "
             "Desgaste irregular sugiere alineacion/balanceo; revisa fecha (DOT) y daños.")
 
 def answer_brakes() -> str:
     return ("Frenos: rechinido por pastillas cristalizadas o polvo; vibracion por discos alabeados. "
-            "Inspecciona espesor, limpia guias y cambia/rectifica segun tolerancia. Liquido cada 24 meses.")
+            "Inspecciona espesor, limpia guias y cambia/rectifica segun tolerancia. "
+            f"Revision {maintenance.advice('freno')}; liquido {maintenance.advice('liquido_frenos')}.")
 
 def answer_battery() -> str:
     return ("Bateria: reposo ~12.6 V, arranque >9.6 V, carga 13.8–14.4 V. Limpia terminales y revisa masas. "
@@ -147,7 +151,7 @@ def answer_obd() -> str:
             "No borres codigos sin investigar la causa.")
 
 def answer_coolant() -> str:
-    return ("Refrigerante: intervalo 3–5 anios. No mezclar tipos sin confirmar. "
+    return (f"Refrigerante: {maintenance.advice('refrigerante')}. No mezclar tipos sin confirmar. "
             "Purgado tras cambio para evitar bolsas de aire. Temperatura normal ~90 C.")
 
 def answer_overheat() -> str:
@@ -155,24 +159,34 @@ def answer_overheat() -> str:
             "nivel y tapa de radiador, fugas y purgado. Si llega a zona roja, detente y apaga.")
 
 def answer_plugs() -> str:
-    return ("Bujias: 40–60 mil km (iridium hasta ~100k). Sintomas: tirones, ralenti inestable, consumo alto. "
+    return (f"Bujias: {maintenance.advice('bujias')}; "
+            f"en modelos 2004 y anteriores (cobre), {maintenance.advice('bujias', year=2004)}. Sintomas: tirones, ralenti inestable, consumo alto. "
             "Usa torque especificado por fabricante.")
 
 def answer_filters() -> str:
-    return ("Filtros: aire 12–15 mil km (antes si hay polvo); cabina anual o 15k km. "
+    return (f"Filtros: aire {maintenance.advice('filtro_aire')}; cabina segun el manual. "
             "Aire sucio aumenta consumo y reduce potencia.")
 
 def answer_economy() -> str:
     return ("Consumo: presion correcta de llantas, conduccion suave, filtros limpios y aceite adecuado. "
             "Evita peso extra y ralenti prolongado. Usa gasolina recomendada por el fabricante.")
 
-def answer_schedule() -> str:
-    return ("Calendario: 10–12k aceite/filtro; 20–25k rotacion e inspeccion de frenos; "
-            "40k liquido de frenos; 60k bujias (segun tipo). Ajusta por uso severo.")
+def answer_schedule(vehicle: Optional[Vehicle] = None) -> str:
+    # con vehículo: su plan (marca/modelo/año y perfil); si no, el genérico
+    if vehicle is not None:
+        plan = maintenance.plan(vehicle.make_id, vehicle.model_id, vehicle.year, vehicle.usage_profile)
+        name = " ".join(str(x) for x in (vehicle.make, vehicle.model, vehicle.year) if x)
+        severe = " (uso severo)" if vehicle.usage_profile == maintenance.SEVERE else ""
+        return f"Calendario para tu {name}{severe}: {maintenance.summary(plan)}. Lo que ocurra primero."
+    normal = maintenance.plan(None, None, None)
+    severe = maintenance.plan(None, None, None, maintenance.SEVERE)
+    return (f"Calendario: {maintenance.summary(normal)}. "
+            f"Uso severo (trafico, polvo, remolque): {maintenance.summary(severe, ('aceite', 'freno', 'filtro_aire'))}.")
 
 def answer_fluids() -> str:
     return ("Liquidos: aceite (varilla), frenos (entre MIN y MAX), refrigerante (deposito en frio), "
-            "direccion/ATF si aplica y lavaparabrisas. Cambia liquido de frenos cada ~24 meses y revisa fugas.")
+            "direccion/ATF si aplica y lavaparabrisas. "
+            f"Cambia liquido de frenos {maintenance.advice('liquido_frenos')} y revisa fugas.")
 
 def answer_suspension() -> str:
     return ("Suspension: golpeteo en baches suele ser bujes/terminales; rebote excesivo indica amortiguadores. "
@@ -194,7 +208,7 @@ def answer_general() -> str:
     closers = ["Si quieres, te doy un checklist.", "¿Agendamos un recordatorio por fecha o km?", "Puedo darte pasos concretos ahora."]
     return "Puedo ayudarte con mantenimiento, OBD-II y seguridad. Dime el sintoma o el codigo y te doy pasos accionables. " + random.choice(closers)
 
-def build_answer(intent: str, text: str, ctx: Dict[str, str]) -> str:
+def build_answer(intent: str, text: str, ctx: Dict) -> str:
     return {
         "dtc": lambda: answer_dtc(ctx.get("code","DTC")),
         "oil": answer_oil,
@@ -207,7 +221,7 @@ def build_answer(intent: str, text: str, ctx: Dict[str, str]) -> str:
         "plugs": answer_plugs,
         "filters": answer_filters,
         "economy": answer_economy,
-        "schedule": answer_schedule,
+        "schedule": lambda: answer_schedule(ctx.get("vehicle")),
         "fluids": answer_fluids,
         "suspension": answer_suspension,
         "lights": answer_lights,
@@ -216,15 +230,32 @@ def build_answer(intent: str, text: str, ctx: Dict[str, str]) -> str:
         "general": answer_general,
     }.get(intent, answer_general)()
 
+# ===================== Bitácora =====================
+def _log_dtc(db: Session, user: User, vehicle_id: int, code: str) -> None:
+    # sólo códigos válidos y vehículos del usuario; el chat nunca falla por esto
+    code = dtc.normalize(code)
+    owned = db.query(Vehicle.id).filter(Vehicle.id == vehicle_id, Vehicle.owner_id == user.id).first()
+    if code and owned:
+        dtc.record(db, vehicle_id, code, utcnow(), "chat")
+        db.commit()
+
 # ===================== Endpoint =====================
 @router.post("/chatbot/ask", response_model=AskRes)
-def chatbot_ask(req: AskReq) -> AskRes:
+def chatbot_ask(
+    req: AskReq,
+    db: Session = Depends(get_db),
+    user: Optional[User] = Depends(get_optional_user),
+) -> AskRes:
     last = ""
     for m in reversed(req.messages or []):
         if m.role == "user":
             last = (m.content or "").strip()
             break
     intent, ctx = detect_intent(last)
+    if intent == "dtc" and user is not None and req.vehicle_id is not None:
+        _log_dtc(db, user, req.vehicle_id, ctx["code"])
+    if intent == "schedule" and user is not None and req.vehicle_id is not None:
+        ctx["vehicle"] = db.query(Vehicle).filter(Vehicle.id == req.vehicle_id, Vehicle.owner_id == user.id).first()
     text = build_answer(intent, last, ctx)
     followups = pick_followups(intent, ctx.get("code"))
     return AskRes(text=text, followups=followups, intent=intent)
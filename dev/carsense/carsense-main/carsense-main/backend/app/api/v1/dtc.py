@@ -0,0 +1,80 @@
+# backend/app/api/v1/dtc.py
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.core.clock import naive_utc, utcnow
+from app.db.session import get_db
+from app.db.models import User
+from app.api.deps import get_current_user
+from app.api.v1.vehicles import get_owned_vehicle_or_404
+from app.schemas.dtc import DtcCodeOut, DtcEventOut, DtcFleetOut, DtcReportIn, DtcReportOut
+from app.services import dtc, push
+
+router = APIRouter(tags=["dtc"])
+
+
+# ---------- REPORTAR (escáner / OBD) ----------
+@router.post("/vehicles/{vehicle_id}/dtc", response_model=List[DtcReportOut], status_code=201)
+def report_codes(
+    vehicle_id: int,
+    payload: DtcReportIn,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    get_owned_vehicle_or_404(db, user.id, vehicle_id)
+    codes = [dtc.normalize(c) for c in payload.codes]
+    bad = [raw for raw, c in zip(payload.codes, codes) if c is None]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Códigos inválidos: {', '.join(bad)}")
+    out = dtc.record_many(db, vehicle_id, codes, naive_utc(payload.ts), payload.source)
+    push.dtc_alerts(db, user.id, vehicle_id, out)
+    db.commit()
+    return out
+
+
+# ---------- CÓDIGOS DEL VEHÍCULO (activos / recurrentes) ----------
+@router.get("/vehicles/{vehicle_id}/dtc", response_model=List[DtcCodeOut])
+def list_codes(
+    vehicle_id: int,
+    active: Optional[bool] = Query(None),
+    recurring: Optional[bool] = Query(None),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    get_owned_vehicle_or_404(db, user.id, vehicle_id)
+    return dtc.vehicle_codes(db, vehicle_id, utcnow(), active=active, recurring=recurring)
+
+
+@router.get("/vehicles/{vehicle_id}/dtc/events", response_model=List[DtcEventOut])
+def list_events(
+    vehicle_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    get_owned_vehicle_or_404(db, user.id, vehicle_id)
+    return dtc.events(db, vehicle_id, limit)
+
+
+@router.post("/vehicles/{vehicle_id}/dtc/clear")
+def clear_codes(
+    vehicle_id: int,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    get_owned_vehicle_or_404(db, user.id, vehicle_id)
+    n = dtc.clear(db, vehicle_id, utcnow())
+    db.commit()
+    return {"cleared": n}
+
+
+# ---------- TOP DE LA FLOTA ----------
+@router.get("/dtc/top", response_model=List[DtcFleetOut])
+def fleet_top(
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    return dtc.fleet_top(db, limit)
@@ -0,0 +1,77 @@
+# backend/app/api/v1/odometer.py
+from typing import List, Union
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.clock import naive_utc
+from app.db.session import get_db
+from app.db.models import Reminder, User, VehicleUsage
+from app.api.deps import get_current_user
+from app.api.v1.vehicles import get_owned_vehicle_or_404
+from app.schemas.odometer import OdometerReadingIn, OdometerReadingOut, ReminderProjection, UsageOut
+from app.services import changes, odometer
+
+router = APIRouter(tags=["odometer"])
+
+
+def _usage_out(db: Session, vehicle, usage) -> UsageOut:
+    # recordatorios por km pendientes: la proyección sale de la fila de uso
+    due = db.execute(
+        select(Reminder.id, Reminder.due_km)
+        .where(Reminder.vehicle_id == vehicle.id, Reminder.kind == "odometer",
+               Reminder.done.is_(False), Reminder.due_km.is_not(None))
+        .order_by(Reminder.due_km)
+    ).all()
+    current = vehicle.odometer_km or 0
+    return UsageOut(
+        vehicle_id=vehicle.id,
+        odometer_km=current,
+        km_per_day=round(usage.km_per_day, 2) if usage and usage.km_per_day is not None else None,
+        last_reading_at=usage.last_ts if usage else None,
+        reminders=[
+            ReminderProjection(reminder_id=rid, due_km=km, km_left=max(0, km - current),
+                               projected_at=odometer.projected_at(usage, km))
+            for rid, km in due
+        ],
+    )
+
+
+# ---------- REGISTRAR LECTURAS (una o lote) ----------
+@router.post("/vehicles/{vehicle_id}/odometer", response_model=UsageOut, status_code=201)
+def post_readings(
+    vehicle_id: int,
+    payload: Union[OdometerReadingIn, List[OdometerReadingIn]],
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    v = get_owned_vehicle_or_404(db, user.id, vehicle_id)
+    items = payload if isinstance(payload, list) else [payload]
+    usage = odometer.record_readings(db, v, [(naive_utc(r.ts), r.km) for r in items])
+    changes.record(db, user.id, changes.VEHICLE, v.id)  # cambia odometer_km
+    db.commit()
+    return _usage_out(db, v, usage)
+
+
+# ---------- HISTORIAL ----------
+@router.get("/vehicles/{vehicle_id}/odometer", response_model=List[OdometerReadingOut])
+def list_readings(
+    vehicle_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    get_owned_vehicle_or_404(db, user.id, vehicle_id)
+    return odometer.recent(db, vehicle_id, limit)
+
+
+# ---------- USO ACTUAL Y PROYECCIONES ----------
+@router.get("/vehicles/{vehicle_id}/usage", response_model=UsageOut)
+def get_usage(
+    vehicle_id: int,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    v = get_owned_vehicle_or_404(db, user.id, vehicle_id)
+    return _usage_out(db, v, db.get(VehicleUsage, v.id))
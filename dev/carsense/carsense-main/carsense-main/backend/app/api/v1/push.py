@@ -0,0 +1,147 @@
+# backend/app/api/v1/push.py
+"""
+Canal push por usuario: WebSocket (/push/ws) o SSE (/push/events) de respaldo,
+con los mismos prefijos que los routers ("", "/api", "/api/v1").
+
+Se atiende con un ASGI crudo (`PushGateway`) por fuera del stack de FastAPI:
+una conexión vive horas y cada capa (middlewares, manejo de excepciones,
+AsyncExitStack de dependencias) retendría sus frames todo ese tiempo. Así una
+conexión inactiva es el protocolo de uvicorn + una corrutina esperando su
+Subscriber + una tarea mínima que detecta el cierre. Tampoco entran en las
+métricas de latencia HTTP (distorsionarían los histogramas); se cuentan en
+`carsense_push_connections`.
+
+El token va en `?token=` (los navegadores no dejan poner cabeceras en
+WebSocket ni en EventSource) o en `Authorization: Bearer`. La BD sólo se
+toca al conectar.
+
+Eventos: `reminder.due`, `dtc.detected`, `alert.created` y `resync` (se perdieron mensajes:
+el cliente debe llamar a /sync).
+"""
+import asyncio
+from typing import Iterable, Optional
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool
+
+from app.api.deps import user_id_from_token
+from app.core import metrics, pubsub
+from app.core.responses import dumps
+
+PREFIXES = ("", "/api", "/api/v1")
+WS_POLICY_VIOLATION = 1008
+
+
+def _token(scope) -> Optional[str]:
+    qs = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    if qs.get("token"):
+        return qs["token"][0]
+    for k, v in scope.get("headers", ()):
+        if k == b"authorization" and v[:7].lower() == b"bearer ":
+            return v[7:].decode("latin-1")
+    return None
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for k, v in scope.get("headers", ()):
+        if k == name:
+            return v
+    return None
+
+
+async def _until_closed(receive, sub: pubsub.Subscriber) -> None:
+    # lo que mande el cliente se ignora; sólo importa el cierre
+    while True:
+        msg = await receive()
+        if msg["type"] in ("websocket.disconnect", "http.disconnect"):
+            sub.close()
+            return
+
+
+class PushGateway:
+    """Intercepta /push/events y /push/ws; el resto pasa a la app."""
+
+    def __init__(self, app, ping_s: float = 25.0, allow_origins: Iterable[str] = ()):
+        self.app = app
+        self.ping_s = ping_s
+        self.sse_paths = {p + "/push/events" for p in PREFIXES}
+        self.ws_paths = {p + "/push/ws" for p in PREFIXES}
+        self.origins = set(allow_origins)
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path")
+        if scope["type"] == "http" and path in self.sse_paths:
+            await self._sse(scope, receive, send)
+        elif scope["type"] == "websocket" and path in self.ws_paths:
+            await self._ws(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    # ---------- SSE ----------
+    def _cors(self, scope) -> list:
+        origin = _header(scope, b"origin")
+        if origin and ("*" in self.origins or origin.decode("latin-1") in self.origins):
+            return [(b"access-control-allow-origin", origin), (b"vary", b"Origin")]
+        return []
+
+    async def _reply(self, send, status: int, detail: str, extra: list) -> None:
+        body = dumps({"detail": detail})
+        await send({"type": "http.response.start", "status": status, "headers": [
+            (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())] + extra})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _sse(self, scope, receive, send) -> None:
+        cors = self._cors(scope)
+        if scope["method"] != "GET":
+            await self._reply(send, 405, "Método no permitido", cors)
+            return
+        uid = await run_in_threadpool(user_id_from_token, _token(scope))
+        if uid is None:
+            await self._reply(send, 401, "Token inválido", cors)
+            return
+        hub = pubsub.get_hub()
+        sub = hub.subscribe(uid)
+        watch = asyncio.ensure_future(_until_closed(receive, sub))
+        metrics.inc("carsense_push_connections", (("transport", "sse"),))
+        try:
+            await send({"type": "http.response.start", "status": 200, "headers": [
+                (b"content-type", b"text/event-stream; charset=utf-8"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),  # nginx: no acumular
+            ] + cors})
+            await send({"type": "http.response.body", "body": b"retry: 3000\n\n", "more_body": True})
+            while not sub.closed:
+                msg = await sub.get(self.ping_s)
+                chunk = b": ping\n\n" if msg is None else b"data: " + msg + b"\n\n"
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        finally:
+            watch.cancel()
+            hub.unsubscribe(sub)
+            metrics.inc("carsense_push_connections", (("transport", "sse"),), -1)
+
+    # ---------- WebSocket ----------
+    async def _ws(self, scope, receive, send) -> None:
+        if (await receive())["type"] != "websocket.connect":
+            return
+        uid = await run_in_threadpool(user_id_from_token, _token(scope))
+        if uid is None:
+            await send({"type": "websocket.close", "code": WS_POLICY_VIOLATION})
+            return
+        await send({"type": "websocket.accept"})
+        hub = pubsub.get_hub()
+        sub = hub.subscribe(uid)
+        watch = asyncio.ensure_future(_until_closed(receive, sub))
+        metrics.inc("carsense_push_connections", (("transport", "ws"),))
+        try:
+            # el keepalive lo hace uvicorn con pings de protocolo (--ws-ping-interval)
+            while True:
+                msg = await sub.get()
+                if msg is None:
+                    break
+                await send({"type": "websocket.send", "text": msg.decode()})
+        except OSError:
+            pass  # el cliente se fue a media escritura
+        finally:
+            watch.cancel()
+            hub.unsubscribe(sub)
+            metrics.inc("carsense_push_connections", (("transport", "ws"),), -1)
@@ -1,17 +1,31 @@
 # backend/app/api/v1/reminders.py
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import select, desc
 
+from app.core.responses import json_rows
 from app.db.session import get_db
 from app.db import models
-from app.api.deps import get_current_user  # ← requiere JWT y devuelve el usuario actual
+from app.api.deps import get_current_user, idempotency_key  # ← requiere JWT y devuelve el usuario actual
 from app.schemas.reminders import ReminderCreate, ReminderOut
+from app.services import changes, idempotency
 
 router = APIRouter(tags=["reminders"])
 
+# Columnas del listado rápido (mismos nombres que ReminderOut)
+LIST_COLUMNS = (
+    models.Reminder.vehicle_id,
+    models.Reminder.kind,
+    models.Reminder.due_date,
+    models.Reminder.due_km,
+    models.Reminder.notes,
+    models.Reminder.id,
+    models.Reminder.done,
+)
+LIST_KEYS = tuple(c.key for c in LIST_COLUMNS)
+
 
 # ---------- Helper: validar que el vehículo sea del usuario ----------
 def assert_vehicle_ownership(db: Session, user_id: int, vehicle_id: int) -> None:
@@ -28,6 +42,7 @@ def assert_vehicle_ownership(db: Session, user_id: int, vehicle_id: int) -> None
 # ---------- LISTAR ----------
 @router.get("/reminders", response_model=List[ReminderOut])
 def list_reminders(
+    request: Request,
     vehicle_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
     user = Depends(get_current_user),
@@ -36,20 +51,20 @@ def list_reminders(
         # valida que el vehículo sea del usuario y filtra por vehicle_id
         assert_vehicle_ownership(db, user.id, vehicle_id)
         rows = db.execute(
-            select(models.Reminder)
+            select(*LIST_COLUMNS)
             .where(models.Reminder.vehicle_id == vehicle_id)
             .order_by(desc(models.Reminder.id))
-        ).scalars().all()
-        return rows
+        )
+        return json_rows(request, LIST_KEYS, rows)
 
     # sin vehicle_id: une con Vehicle y filtra por owner_id
     rows = db.execute(
-        select(models.Reminder)
+        select(*LIST_COLUMNS)
         .join(models.Vehicle, models.Vehicle.id == models.Reminder.vehicle_id)
         .where(models.Vehicle.owner_id == user.id)
         .order_by(desc(models.Reminder.id))
-    ).scalars().all()
-    return rows
+    )
+    return json_rows(request, LIST_KEYS, rows)
 
 
 # ---------- CREAR ----------
@@ -58,7 +73,12 @@ def create_reminder(
     payload: ReminderCreate,
     db: Session = Depends(get_db),
     user = Depends(get_current_user),
+    idem_key: Optional[str] = Depends(idempotency_key),
 ):
+    claim = idempotency.claim(db, user.id, idem_key, "reminders", payload)
+    if claim and claim.replay:
+        return claim.replay
+
     # valida propiedad del vehículo
     assert_vehicle_ownership(db, user.id, payload.vehicle_id)
 
@@ -77,6 +97,10 @@ def create_reminder(
         done=False,
     )
     db.add(r)
+    db.flush()
+    changes.record(db, user.id, changes.REMINDER, r.id)
+    if claim:
+        return idempotency.respond(db, claim, ReminderOut.model_validate(r), status.HTTP_201_CREATED)
     db.commit()
     db.refresh(r)
     return r
@@ -99,7 +123,10 @@ def toggle_done(
     assert_vehicle_ownership(db, user.id, r.vehicle_id)
 
     r.done = not bool(r.done)
+    if not r.done:
+        r.fired_at = None  # reabierto: se vuelve a avisar cuando venza
     db.add(r)
+    changes.record(db, user.id, changes.REMINDER, r.id)
     db.commit()
     db.refresh(r)
     return r
@@ -121,6 +148,7 @@ def delete_reminder(
     # valida propiedad del vehículo asociado
     assert_vehicle_ownership(db, user.id, r.vehicle_id)
 
+    changes.record(db, user.id, changes.REMINDER, r.id, changes.DELETE)
     db.delete(r)
     db.commit()
     # 204 → sin body
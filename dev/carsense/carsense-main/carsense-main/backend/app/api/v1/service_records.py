@@ -1,17 +1,34 @@
 # backend/app/api/v1/service_records.py
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import select, desc
 
+from app.core.responses import json_rows
 from app.db.session import get_db
 from app.db import models
-from app.api.deps import get_current_user   # <- exige JWT y devuelve el usuario actual
-from app.schemas.service_records import ServiceOut, ServiceCreate  # ajusta si tu paquete es distinto
+from app.api.deps import get_current_user, idempotency_key   # <- exige JWT y devuelve el usuario actual
+from app.schemas.service_records import ServiceOut, ServiceCreate, ServiceSearchHit  # ajusta si tu paquete es distinto
+from app.services import changes, costs, idempotency
+from app.services import search as search_service
 
 router = APIRouter(tags=["services"])
 
+# Columnas del listado rápido (mismos nombres que ServiceOut)
+LIST_COLUMNS = (
+    models.ServiceRecord.vehicle_id,
+    models.ServiceRecord.service_type,
+    models.ServiceRecord.date,
+    models.ServiceRecord.km,
+    models.ServiceRecord.notes,
+    models.ServiceRecord.id,
+    (models.ServiceRecord.cost_cents / 100.0).label("cost"),
+    models.ServiceRecord.currency,
+    models.ServiceRecord.workshop,
+)
+LIST_KEYS = tuple(c.key for c in LIST_COLUMNS)
+
 
 # ---------- Helper: validar propiedad del vehículo ----------
 def assert_vehicle_ownership(db: Session, user_id: int, vehicle_id: int) -> None:
@@ -29,6 +46,7 @@ def assert_vehicle_ownership(db: Session, user_id: int, vehicle_id: int) -> None
 @router.get("/services", response_model=List[ServiceOut])
 @router.get("/service-records", response_model=List[ServiceOut])
 def list_service_records(
+    request: Request,
     vehicle_id: Optional[int] = Query(None),
     db: Session = Depends(get_db),
     user = Depends(get_current_user),
@@ -37,20 +55,20 @@ def list_service_records(
         # valida propiedad y filtra por vehicle_id
         assert_vehicle_ownership(db, user.id, vehicle_id)
         rows = db.execute(
-            select(models.ServiceRecord)
+            select(*LIST_COLUMNS)
             .where(models.ServiceRecord.vehicle_id == vehicle_id)
             .order_by(desc(models.ServiceRecord.id))
-        ).scalars().all()
-        return rows
+        )
+        return json_rows(request, LIST_KEYS, rows)
 
     # sin vehicle_id: une con Vehicle y filtra por dueño
     rows = db.execute(
-        select(models.ServiceRecord)
+        select(*LIST_COLUMNS)
         .join(models.Vehicle, models.Vehicle.id == models.ServiceRecord.vehicle_id)
         .where(models.Vehicle.owner_id == user.id)
         .order_by(desc(models.ServiceRecord.id))
-    ).scalars().all()
-    return rows
+    )
+    return json_rows(request, LIST_KEYS, rows)
 
 
 # ---------- CREAR ----------
@@ -60,7 +78,13 @@ def create_service_record(
     payload: ServiceCreate,
     db: Session = Depends(get_db),
     user = Depends(get_current_user),
+    idem_key: Optional[str] = Depends(idempotency_key),
 ):
+    # un reintento con la misma llave recibe la respuesta original
+    claim = idempotency.claim(db, user.id, idem_key, "services", payload)
+    if claim and claim.replay:
+        return claim.replay
+
     # Verifica que el vehicle_id pertenezca al usuario
     assert_vehicle_ownership(db, user.id, payload.vehicle_id)
 
@@ -70,13 +94,38 @@ def create_service_record(
         date=payload.date,
         km=payload.km,
         notes=payload.notes,
+        cost_cents=None if payload.cost is None else int(payload.cost * 100),
+        currency=payload.currency,
+        workshop=payload.workshop,
     )
     db.add(rec)
+    costs.on_created(db, rec)  # misma transacción que el alta
+    db.flush()
+    changes.record(db, user.id, changes.SERVICE, rec.id)
+    if claim:
+        return idempotency.respond(db, claim, ServiceOut.model_validate(rec), status.HTTP_201_CREATED)
     db.commit()
     db.refresh(rec)
     return rec
 
 
+# ---------- BUSCAR (texto completo, sólo del usuario) ----------
+# Declarada antes de /{service_id} para que "search" no se lea como id.
+@router.get("/services/search", response_model=List[ServiceSearchHit])
+@router.get("/service-records/search", response_model=List[ServiceSearchHit])
+def search_service_records(
+    q: str = Query(..., min_length=1, max_length=200),
+    vehicle_id: Optional[int] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    prefix: bool = Query(False, description="completar la última palabra (autocompletar)"),
+    db: Session = Depends(get_db),
+    user = Depends(get_current_user),
+):
+    if vehicle_id is not None:
+        assert_vehicle_ownership(db, user.id, vehicle_id)
+    return search_service.search(db, user.id, q, vehicle_id=vehicle_id, limit=limit, prefix=prefix)
+
+
 # ---------- DETALLE (propiedad) ----------
 @router.get("/services/{service_id}", response_model=ServiceOut)
 @router.get("/service-records/{service_id}", response_model=ServiceOut)
@@ -113,6 +162,8 @@ def delete_service_record(
     # valida propiedad del vehículo asociado
     assert_vehicle_ownership(db, user.id, rec.vehicle_id)
 
+    costs.on_deleted(db, rec)
+    changes.record(db, user.id, changes.SERVICE, rec.id, changes.DELETE)
     db.delete(rec)
     db.commit()
     # 204 → sin body
@@ -0,0 +1,34 @@
+# backend/app/api/v1/sync.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.orm import Session
+
+from app.core.responses import dumps, json_bytes
+from app.db.session import get_db
+from app.db.models import User
+from app.api.deps import get_current_user
+from app.services import changes
+
+router = APIRouter(tags=["sync"])
+
+
+# ---------- SINCRONIZACIÓN INCREMENTAL ----------
+@router.get("/sync")
+def sync(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0, description="cursor de la respuesta anterior; vacío = todo"),
+    limit: int = Query(5000, ge=1, le=20000),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Devuelve {cursor, reset, has_more, vehicles|services|reminders: {upserted, deleted}}.
+    Con reset=true el cliente reemplaza su copia local; con has_more vuelve a
+    pedir con el nuevo cursor.
+    """
+    if not since:
+        body = changes.full(db, user.id)
+    else:
+        body = changes.delta(db, user.id, since, limit)
+    return json_bytes(request, dumps(body))
@@ -0,0 +1,86 @@
+# backend/app/api/v1/telemetry.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.responses import json_rows
+from app.db import shards
+from app.db.session import get_db
+from app.db.models import TelemetryRollup, User
+from app.api.deps import get_current_user
+from app.api.v1.vehicles import get_owned_vehicle_or_404
+from app.services import telemetry
+
+router = APIRouter(tags=["telemetry"])
+
+MAX_BODY = 4 * 1024 * 1024  # ~300k muestras binarias por petición
+
+ROLLUP_COLUMNS = (
+    TelemetryRollup.pid,
+    TelemetryRollup.minute,
+    TelemetryRollup.n,
+    TelemetryRollup.vmin,
+    TelemetryRollup.vmax,
+    (TelemetryRollup.vsum / TelemetryRollup.n).label("avg"),
+)
+ROLLUP_KEYS = ("pid", "minute", "n", "min", "max", "avg")
+
+
+# ---------- INGESTA ----------
+@router.post("/vehicles/{vehicle_id}/telemetry", status_code=status.HTTP_202_ACCEPTED)
+async def ingest(
+    vehicle_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    # async por el cuerpo crudo; la consulta va al threadpool para no frenar el event loop
+    await run_in_threadpool(get_owned_vehicle_or_404, db, user.id, vehicle_id)
+    body = await request.body()
+    if len(body) > MAX_BODY:
+        raise HTTPException(status_code=413, detail="Lote demasiado grande")
+    ctype = request.headers.get("content-type", "application/octet-stream").split(";")[0].strip()
+    try:
+        if ctype in ("application/msgpack", "application/x-msgpack"):
+            samples = telemetry.decode_msgpack(body)
+        elif ctype == "application/octet-stream":
+            samples = telemetry.decode_binary(body)
+        else:
+            raise HTTPException(status_code=415, detail="Usa application/octet-stream o application/msgpack")
+    except telemetry.BadFrame as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if not samples:
+        return {"accepted": 0}
+    try:
+        n = telemetry.get_writer(shards.current(db)).submit(vehicle_id, samples)
+    except telemetry.QueueFull:
+        raise HTTPException(status_code=503, detail="Cola de telemetría llena, reintenta",
+                            headers={"Retry-After": "1"})
+    return {"accepted": n}
+
+
+# ---------- RESÚMENES POR MINUTO ----------
+@router.get("/vehicles/{vehicle_id}/telemetry")
+def list_rollups(
+    vehicle_id: int,
+    request: Request,
+    pid: Optional[int] = Query(None),
+    since: Optional[int] = Query(None, description="epoch ms"),
+    until: Optional[int] = Query(None, description="epoch ms"),
+    limit: int = Query(1440, ge=1, le=20000),
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    get_owned_vehicle_or_404(db, user.id, vehicle_id)
+    q = select(*ROLLUP_COLUMNS).where(TelemetryRollup.vehicle_id == vehicle_id)
+    if pid is not None:
+        q = q.where(TelemetryRollup.pid == pid)
+    if since is not None:
+        q = q.where(TelemetryRollup.minute >= since // 60000)
+    if until is not None:
+        q = q.where(TelemetryRollup.minute <= until // 60000)
+    rows = db.execute(q.order_by(TelemetryRollup.pid, TelemetryRollup.minute).limit(limit))
+    return json_rows(request, ROLLUP_KEYS, rows)
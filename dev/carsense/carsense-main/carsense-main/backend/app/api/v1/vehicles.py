@@ -1,17 +1,26 @@
 # backend/app/api/v1/vehicles.py
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
-from sqlalchemy import select, desc
+from sqlalchemy import select, desc, delete, and_
 
+from app.core.responses import json_rows
+from app.db import delete_children
 from app.db.session import get_db
 from app.db.models import Vehicle, User
-from app.api.deps import get_current_user  # <- exige token y devuelve el usuario actual
+from app.api.deps import get_current_user, idempotency_key  # <- exige token y devuelve el usuario actual
 from app.schemas import VehicleCreate, VehicleOut  # ajusta si tus esquemas están en otra ruta
+from app.core.clock import utcnow
+from app.services import catalog, changes, idempotency, odometer, vin as vin_service
 
 router = APIRouter(tags=["vehicles"])
 
+# Columnas del listado rápido (mismos nombres que VehicleOut)
+LIST_COLUMNS = (Vehicle.make, Vehicle.model, Vehicle.year, Vehicle.odometer_km, Vehicle.vin, Vehicle.id,
+                Vehicle.make_id, Vehicle.model_id, Vehicle.usage_profile)
+LIST_KEYS = tuple(c.key for c in LIST_COLUMNS)
+
 # --------- Helpers ---------
 def get_owned_vehicle_or_404(db: Session, user_id: int, vid: int) -> Vehicle:
     v = db.execute(
@@ -21,34 +30,66 @@ def get_owned_vehicle_or_404(db: Session, user_id: int, vid: int) -> Vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
     return v
 
+def vehicle_fields(payload: VehicleCreate) -> dict:
+    """
+    Marca/modelo/año del alta: lo capturado gana; lo que falte sale del VIN.
+    Marca y modelo se llevan al catálogo (nombre canónico + ids) si coinciden.
+    """
+    fields = {"make": payload.make, "model": payload.model, "year": payload.year, "vin": None,
+              "usage_profile": payload.usage_profile}
+    if payload.vin:
+        d = vin_service.decode(payload.vin)
+        if not d["valid"]:
+            raise HTTPException(status_code=422, detail=f"VIN inválido: {d['error']}")
+        fields["vin"] = d["vin"]
+        fields["make"] = fields["make"] or d["make"]
+        fields["model"] = fields["model"] or d["model"]
+        fields["year"] = fields["year"] or d["model_year"]
+    if not fields["make"] or not fields["model"]:
+        raise HTTPException(status_code=422, detail="Indica marca y modelo (o un VIN que los incluya)")
+    fields.update(catalog.normalize(fields["make"], fields["model"]))
+    return fields
+
 # --------- Endpoints ---------
 
 @router.get("/vehicles", response_model=List[VehicleOut])
 def list_vehicles(
+    request: Request,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
+    # Camino rápido: sólo columnas, sin ORM ni re-validación Pydantic
     rows = db.execute(
-        select(Vehicle)
+        select(*LIST_COLUMNS)
         .where(Vehicle.owner_id == user.id)
         .order_by(desc(Vehicle.id))
-    ).scalars().all()
-    return rows
+    )
+    return json_rows(request, LIST_KEYS, rows)
 
 @router.post("/vehicles", response_model=VehicleOut, status_code=status.HTTP_201_CREATED)
 def create_vehicle(
     payload: VehicleCreate,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
+    idem_key: Optional[str] = Depends(idempotency_key),
 ):
+    claim = idempotency.claim(db, user.id, idem_key, "vehicles", payload)
+    if claim and claim.replay:
+        return claim.replay
     v = Vehicle(
-        make=payload.make,
-        model=payload.model,
-        year=payload.year,
+        **vehicle_fields(payload),
         odometer_km=payload.odometer_km or 0,
         owner_id=user.id,  # <- clave: asignar dueño
     )
     db.add(v)
+    if v.odometer_km:
+        # primera lectura de la serie de odómetro
+        db.flush()
+        odometer.record_readings(db, v, [(utcnow(), v.odometer_km)])
+    db.flush()
+    changes.record(db, user.id, changes.VEHICLE, v.id)
+    if claim:
+        return idempotency.respond(db, claim, VehicleOut.model_validate(v), status.HTTP_201_CREATED)
     db.commit()
     db.refresh(v)
     return v
@@ -67,7 +108,18 @@ def delete_vehicle(
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    v = get_owned_vehicle_or_404(db, user.id, vehicle_id)
-    db.delete(v)
+    # Un solo DELETE: servicios y recordatorios caen por ON DELETE CASCADE en
+    # la BD (memoria constante, sin cargar el historial en el ORM). En una BD
+    # sin migrar, delete_children borra antes los hijos cuya FK no la tiene.
+    owned = and_(Vehicle.id == vehicle_id, Vehicle.owner_id == user.id)
+    delete_children(db, Vehicle.__table__, owned)
+    res = db.execute(
+        delete(Vehicle)
+        .where(owned)
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    changes.record(db, user.id, changes.VEHICLE, vehicle_id, changes.DELETE)
     db.commit()
     # 204 → sin body
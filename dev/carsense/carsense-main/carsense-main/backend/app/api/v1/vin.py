@@ -0,0 +1,32 @@
+# backend/app/api/v1/vin.py
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from app.api.deps import get_current_user
+from app.core.config import get_settings
+from app.core.responses import dumps, json_bytes
+from app.db.models import User
+from app.schemas.vin import VinBatchIn, VinDecodedOut
+from app.services import vin as vin_service
+
+router = APIRouter(tags=["vin"])
+
+
+@router.get("/vins/{vin}", response_model=VinDecodedOut)
+def decode_vin(vin: str, user: User = Depends(get_current_user)):
+    return vin_service.decode(vin)
+
+
+# ---------- LOTE (importación de flotillas) ----------
+@router.post("/vins/decode", response_model=List[VinDecodedOut])
+def decode_batch(
+    payload: VinBatchIn,
+    request: Request,
+    user: User = Depends(get_current_user),
+):
+    limit = get_settings().VIN_BATCH_MAX
+    if len(payload.vins) > limit:
+        raise HTTPException(status_code=413, detail=f"Máximo {limit} VINs por petición")
+    # mismo orden que la entrada; los inválidos van con valid=false y su error
+    return json_bytes(request, dumps(vin_service.decode_many(payload.vins)))
@@ -0,0 +1,17 @@
+# backend/app/core/clock.py
+# Las columnas DateTime guardan UTC sin zona horaria.
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def naive_utc(ts: Optional[datetime]) -> datetime:
+    """Normaliza un datetime de entrada (con o sin zona) a UTC sin zona; None = ahora."""
+    if ts is None:
+        return utcnow()
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
@@ -9,6 +9,131 @@ class Settings(BaseModel):
         "CORS_ORIGINS",
         '["http://localhost","http://127.0.0.1:5500","http://localhost:5173","*"]'
     )
+    # Observabilidad: /metrics + hooks del engine
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "1") == "1"
+    # Listados: comprimir cuerpos a partir de este tamaño (0 = nunca)
+    COMPRESS_MIN_BYTES: int = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+    # Log de consultas lentas (0 = apagado) y tamaño de la tabla top-N
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "0"))
+    SLOW_QUERY_TOP_N: int = int(os.getenv("SLOW_QUERY_TOP_N", "50"))
+    # Router /__debug__ (no exponer en producción)
+    DEBUG_ROUTES: bool = os.getenv("DEBUG_ROUTES", "0") == "1"
+    # Token de administración (cabeceras de diagnóstico); vacío = desactivado
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
+    # Profiler por petición: 1 de cada N (0 = sólo bajo demanda con ADMIN_TOKEN)
+    PROFILER_SAMPLE_RATE: int = int(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+    PROFILER_INTERVAL_MS: float = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+    PROFILER_DIR: str = os.getenv("PROFILER_DIR", "./profiles")
+    PROFILER_MAX_FILES: int = int(os.getenv("PROFILER_MAX_FILES", "50"))
+    # Telemetría OBD: cola en memoria (muestras), lote del escritor, retención
+    # de crudos y cada cuánto los purga el scheduler (0 = nunca)
+    TELEMETRY_QUEUE_MAX: int = int(os.getenv("TELEMETRY_QUEUE_MAX", "200000"))
+    TELEMETRY_BATCH: int = int(os.getenv("TELEMETRY_BATCH", "20000"))
+    TELEMETRY_FLUSH_MS: float = float(os.getenv("TELEMETRY_FLUSH_MS", "250"))
+    TELEMETRY_RAW_RETENTION_H: float = float(os.getenv("TELEMETRY_RAW_RETENTION_H", "48"))
+    TELEMETRY_PRUNE_EVERY_S: float = float(os.getenv("TELEMETRY_PRUNE_EVERY_S", "300"))
+    # DTC: reportes del mismo código dentro de la ventana cuentan una vez;
+    # un código está "activo" si se vio en los últimos N días y no se borró
+    DTC_DEDUP_MINUTES: float = float(os.getenv("DTC_DEDUP_MINUTES", "60"))
+    DTC_ACTIVE_DAYS: float = float(os.getenv("DTC_ACTIVE_DAYS", "14"))
+    # /sync: retención de la bitácora de cambios y espera antes de entregar
+    # entradas en BDs con commits concurrentes (Postgres)
+    SYNC_LOG_RETENTION_DAYS: float = float(os.getenv("SYNC_LOG_RETENTION_DAYS", "90"))
+    SYNC_SETTLE_MS: int = int(os.getenv("SYNC_SETTLE_MS", "2000"))
+    # Canal push (WS/SSE): broker entre workers ("local" | "unix"), mensajes
+    # pendientes por conexión antes de pedir resync y heartbeat de SSE
+    PUSH_BROKER: str = os.getenv("PUSH_BROKER", "local")
+    PUSH_BROKER_DIR: str = os.getenv("PUSH_BROKER_DIR", "/tmp/carsense-push")
+    PUSH_MAX_PENDING: int = int(os.getenv("PUSH_MAX_PENDING", "64"))
+    PUSH_PING_S: float = float(os.getenv("PUSH_PING_S", "25"))
+    # Scheduler (APScheduler; corre en un solo worker con lease en la BD):
+    # duración del lease, gracia ante misfires, hilos y horarios (cron en UTC).
+    # Recordatorios vencidos cada REMINDER_SCAN_S (0 = nunca)
+    SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "1") == "1"
+    SCHEDULER_LEASE_S: float = float(os.getenv("SCHEDULER_LEASE_S", "30"))
+    SCHEDULER_MISFIRE_GRACE_S: float = float(os.getenv("SCHEDULER_MISFIRE_GRACE_S", "300"))
+    SCHEDULER_THREADS: int = int(os.getenv("SCHEDULER_THREADS", "4"))
+    REMINDER_SCAN_S: float = float(os.getenv("REMINDER_SCAN_S", "60"))
+    ALERTS_CRON: str = os.getenv("ALERTS_CRON", "15 * * * *")
+    PRUNE_CRON: str = os.getenv("PRUNE_CRON", "30 3 * * *")
+    # Avisos por email/webhook (outbox): canales activos ("" = ninguno,
+    # p. ej. "email,webhook"), destino de cada transporte y política de despacho
+    NOTIFY_CHANNELS: str = os.getenv("NOTIFY_CHANNELS", "")
+    NOTIFY_SMTP_HOST: str = os.getenv("NOTIFY_SMTP_HOST", "localhost")
+    NOTIFY_SMTP_PORT: int = int(os.getenv("NOTIFY_SMTP_PORT", "1025"))
+    NOTIFY_SMTP_FROM: str = os.getenv("NOTIFY_SMTP_FROM", "CarSense <avisos@carsense.mx>")
+    NOTIFY_WEBHOOK_URL: str = os.getenv("NOTIFY_WEBHOOK_URL", "")
+    NOTIFY_BATCH: int = int(os.getenv("NOTIFY_BATCH", "100"))
+    NOTIFY_LEASE_S: float = float(os.getenv("NOTIFY_LEASE_S", "60"))
+    NOTIFY_POLL_S: float = float(os.getenv("NOTIFY_POLL_S", "2"))
+    NOTIFY_MAX_ATTEMPTS: int = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "8"))
+    NOTIFY_BACKOFF_S: float = float(os.getenv("NOTIFY_BACKOFF_S", "30"))
+    NOTIFY_BACKOFF_MAX_S: float = float(os.getenv("NOTIFY_BACKOFF_MAX_S", "3600"))
+    NOTIFY_RETENTION_DAYS: float = float(os.getenv("NOTIFY_RETENTION_DAYS", "7"))
+    # Idempotency-Key en altas: vigencia, respuestas en el LRU de cada worker y
+    # cada cuánto purga el scheduler las vencidas (0 = nunca)
+    IDEMPOTENCY_TTL_H: float = float(os.getenv("IDEMPOTENCY_TTL_H", "24"))
+    IDEMPOTENCY_LRU_SIZE: int = int(os.getenv("IDEMPOTENCY_LRU_SIZE", "10000"))
+    IDEMPOTENCY_PRUNE_S: float = float(os.getenv("IDEMPOTENCY_PRUNE_S", "600"))
+    # Límite de peticiones: unidades por minuto y ráfaga por usuario y por IP
+    # anónima, backend ("memory" por worker | "mmap" compartido en el host),
+    # cambios a los pesos por ruta ('{"POST /auth/login": 20}') y si se confía
+    # en X-Forwarded-For (sólo detrás de un proxy propio)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+    RATE_LIMIT_PER_MIN: float = float(os.getenv("RATE_LIMIT_PER_MIN", "600"))
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "120"))
+    RATE_LIMIT_IP_PER_MIN: float = float(os.getenv("RATE_LIMIT_IP_PER_MIN", "300"))
+    RATE_LIMIT_IP_BURST: int = int(os.getenv("RATE_LIMIT_IP_BURST", "60"))
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_MMAP_PATH: str = os.getenv("RATE_LIMIT_MMAP_PATH", "/dev/shm/carsense-ratelimit")
+    RATE_LIMIT_WEIGHTS: str = os.getenv("RATE_LIMIT_WEIGHTS", "")
+    RATE_LIMIT_TRUST_PROXY: bool = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+    # Tokens revocados: capacidad inicial del filtro de Bloom (crece al
+    # reconstruir), tasa de falsos positivos, cada cuánto cada worker lee las
+    # revocaciones nuevas y cada cuánto reconstruye todo desde la tabla
+    REVOCATION_CAPACITY: int = int(os.getenv("REVOCATION_CAPACITY", "1000000"))
+    REVOCATION_FP_RATE: float = float(os.getenv("REVOCATION_FP_RATE", "0.01"))
+    REVOCATION_REFRESH_S: float = float(os.getenv("REVOCATION_REFRESH_S", "2"))
+    REVOCATION_REBUILD_S: float = float(os.getenv("REVOCATION_REBUILD_S", "3600"))
+    REVOCATION_PRUNE_S: float = float(os.getenv("REVOCATION_PRUNE_S", "3600"))
+    # Decodificador de VIN: tablas WMI/VDS (vacío = las incluidas en
+    # app/data), resultados memorizados por worker y VINs por petición en lote
+    VIN_TABLES_PATH: str = os.getenv("VIN_TABLES_PATH", "")
+    VIN_CACHE_SIZE: int = int(os.getenv("VIN_CACHE_SIZE", "65536"))
+    VIN_BATCH_MAX: int = int(os.getenv("VIN_BATCH_MAX", "10000"))
+    # Catálogo de marcas/modelos (vacío = el incluido en app/data) y dónde se
+    # guarda su trie ya construido (vacío = directorio temporal del sistema)
+    CATALOG_PATH: str = os.getenv("CATALOG_PATH", "")
+    CATALOG_CACHE_DIR: str = os.getenv("CATALOG_CACHE_DIR", "")
+    # Reglas de mantenimiento (vacío = las incluidas en app/data) e intervalos
+    # resueltos memorizados por (marca, modelo, año, perfil) en cada worker
+    MAINTENANCE_RULES_PATH: str = os.getenv("MAINTENANCE_RULES_PATH", "")
+    MAINTENANCE_CACHE_SIZE: int = int(os.getenv("MAINTENANCE_CACHE_SIZE", "16384"))
+    # Shards (sólo SQLite): los datos de cada usuario viven en una de
+    # SHARD_COUNT BDs en SHARD_DIR; app.db queda como directorio (usuarios,
+    # tokens revocados, leases). 0 = una sola BD. Consultas de flota: un hilo
+    # por shard, hasta SHARD_FANOUT_THREADS
+    SHARD_COUNT: int = int(os.getenv("SHARD_COUNT", "0"))
+    SHARD_DIR: str = os.getenv("SHARD_DIR", "./shards")
+    SHARD_FANOUT_THREADS: int = int(os.getenv("SHARD_FANOUT_THREADS", "8"))
+    # Réplicas de lectura: las peticiones GET/HEAD leen de una réplica con
+    # retraso <= REPLICA_MAX_LAG_S que ya tenga la última escritura del
+    # usuario; lo demás va a la primaria. REPLICA_URLS: separadas por coma
+    # (Postgres en streaming). REPLICA_SNAPSHOT_S > 0: réplica local, una
+    # copia de app.db cada N s en REPLICA_SNAPSHOT_PATH (la hace el scheduler)
+    REPLICA_URLS: str = os.getenv("REPLICA_URLS", "")
+    REPLICA_SNAPSHOT_S: float = float(os.getenv("REPLICA_SNAPSHOT_S", "0"))
+    REPLICA_SNAPSHOT_PATH: str = os.getenv("REPLICA_SNAPSHOT_PATH", "./app-replica.db")
+    REPLICA_MAX_LAG_S: float = float(os.getenv("REPLICA_MAX_LAG_S", "30"))
+    REPLICA_CHECK_S: float = float(os.getenv("REPLICA_CHECK_S", "1"))
+    # Migraciones en línea (app/db/online_migration.py): filas del primer lote
+    # (luego se ajusta para que cada uno tarde ~MIGRATION_BATCH_S), fracción
+    # del tiempo copiando (0.5 = tras cada lote una pausa igual) y retraso de
+    # réplicas a partir del cual se espera (0 = no mirar réplicas)
+    MIGRATION_BATCH_ROWS: int = int(os.getenv("MIGRATION_BATCH_ROWS", "2000"))
+    MIGRATION_BATCH_S: float = float(os.getenv("MIGRATION_BATCH_S", "0.2"))
+    MIGRATION_DUTY: float = float(os.getenv("MIGRATION_DUTY", "0.5"))
+    MIGRATION_MAX_LAG_S: float = float(os.getenv("MIGRATION_MAX_LAG_S", "10"))
 
     @property
     def CORS_ORIGINS(self) -> List[str]:
@@ -0,0 +1,68 @@
+# backend/app/core/lease.py
+"""
+Lease de liderazgo sobre una fila de la BD (tabla `scheduler_leases`).
+
+`acquire()` toma o renueva el lease con un UPDATE condicionado
+(holder = yo, o el anterior ya venció): a lo más un holder a la vez, sin
+locks de sesión ni servicios extra. Si el holder muere, otro lo toma cuando
+vence. `held` también mira el reloj local: si una renovación se atrasa (BD
+lenta, GC) se deja de considerar líder antes de que otro pueda tomarlo.
+
+Todos los workers deben compartir reloj (mismo host) o tener un desfase muy
+por debajo de `ttl_s`.
+"""
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import or_, update
+
+from app.core.clock import utcnow
+from app.db.dialect import insert_for
+from app.db.models import SchedulerLease
+
+
+def default_holder() -> str:
+    return f"{socket.gethostname()[:32]}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Lease:
+    def __init__(self, engine, name: str, ttl_s: float, holder: Optional[str] = None):
+        self.engine = engine
+        self.name = name
+        self.ttl_s = ttl_s
+        self.holder = holder or default_holder()
+        self._valid_until = 0.0  # monotónico local
+
+    @property
+    def held(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    def acquire(self) -> bool:
+        """Toma o renueva el lease. Devuelve si quedó como holder."""
+        started = time.monotonic()
+        now = utcnow()
+        L = SchedulerLease
+        with self.engine.begin() as conn:
+            conn.execute(insert_for(conn, L.__table__).on_conflict_do_nothing(),
+                         {"name": self.name, "holder": self.holder, "expires_at": now})
+            got = conn.execute(
+                update(L)
+                .where(L.name == self.name, or_(L.holder == self.holder, L.expires_at <= now))
+                .values(holder=self.holder, expires_at=now + timedelta(seconds=self.ttl_s))
+            ).rowcount == 1
+        # se cuenta desde antes del UPDATE: nunca se cree líder más allá de lo que vale en la BD
+        self._valid_until = started + self.ttl_s if got else 0.0
+        return got
+
+    def release(self) -> None:
+        """Suelta el lease (al apagar) para que otro worker lo tome sin esperar."""
+        if not self._valid_until:
+            return
+        self._valid_until = 0.0
+        L = SchedulerLease
+        with self.engine.begin() as conn:
+            conn.execute(update(L).where(L.name == self.name, L.holder == self.holder).values(expires_at=utcnow()))
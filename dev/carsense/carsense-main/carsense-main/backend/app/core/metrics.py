@@ -0,0 +1,248 @@
+# backend/app/core/metrics.py
+"""
+Métricas en proceso expuestas en formato texto de Prometheus (`GET /metrics`).
+
+Cada hilo escribe sólo en su propio shard (dicts propios), así que el camino
+caliente no toma locks; el scrape suma todos los shards. Con varios workers de
+uvicorn cada proceso expone sus series (etiqueta `worker` = pid).
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+from sqlalchemy.pool import QueuePool
+
+Labels = Tuple[Tuple[str, str], ...]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+
+WORKER = str(os.getpid())
+
+
+# ---------- Almacenamiento por hilo ----------
+class _Shard:
+    __slots__ = ("values", "hists")
+
+    def __init__(self) -> None:
+        self.values: Dict[Tuple[str, Labels], float] = {}
+        # [cuentas por bucket..., +Inf, suma]
+        self.hists: Dict[Tuple[str, Labels], List[float]] = {}
+
+
+_local = threading.local()
+_shards: List[_Shard] = []
+_register_lock = threading.Lock()  # sólo se usa la primera vez que un hilo escribe
+
+# nombre -> (tipo, ayuda, buckets)
+_META: Dict[str, Tuple[str, str, Optional[tuple]]] = {}
+
+
+def _shard() -> _Shard:
+    s = getattr(_local, "shard", None)
+    if s is None:
+        s = _Shard()
+        with _register_lock:
+            _shards.append(s)
+        _local.shard = s
+    return s
+
+
+def describe(name: str, kind: str, help_text: str, buckets: Optional[tuple] = None) -> None:
+    _META[name] = (kind, help_text, buckets)
+
+
+def inc(name: str, labels: Labels = (), value: float = 1.0) -> None:
+    """Suma a un counter o gauge (un gauge se baja con valores negativos)."""
+    values = _shard().values
+    key = (name, labels)
+    values[key] = values.get(key, 0.0) + value
+
+
+def observe(name: str, value: float, labels: Labels = ()) -> None:
+    buckets = _META[name][2]
+    hists = _shard().hists
+    key = (name, labels)
+    h = hists.get(key)
+    if h is None:
+        h = hists[key] = [0.0] * (len(buckets) + 2)
+    h[bisect_left(buckets, value)] += 1
+    h[-1] += value
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Para cachés propias de la app (LRU, memo, etc.)."""
+    inc("carsense_cache_requests_total", (("cache", cache), ("result", "hit" if hit else "miss")))
+
+
+# ---------- Catálogo de métricas ----------
+describe("carsense_http_requests_total", "counter", "Peticiones HTTP atendidas.")
+describe("carsense_http_requests_in_flight", "gauge", "Peticiones HTTP en curso.")
+describe("carsense_http_request_seconds", "histogram", "Latencia por ruta.", LATENCY_BUCKETS)
+describe("carsense_db_statements_total", "counter", "Sentencias SQL ejecutadas.")
+describe("carsense_db_statement_seconds", "histogram", "Duración de cada sentencia SQL.", DB_BUCKETS)
+describe("carsense_db_statements_per_request", "histogram", "Sentencias SQL por petición.", COUNT_BUCKETS)
+describe("carsense_db_seconds_per_request", "histogram", "Tiempo en SQL por petición.", DB_BUCKETS)
+describe("carsense_db_pool_checkout_seconds", "histogram", "Espera para obtener conexión del pool.", DB_BUCKETS)
+describe("carsense_cache_requests_total", "counter", "Consultas a cachés (hit/miss).")
+describe("carsense_cache_hit_ratio", "gauge", "Proporción de hits por caché desde el arranque.")
+
+
+# ---------- Render (formato texto de Prometheus) ----------
+def _fmt_labels(labels: Labels, extra: Labels = ()) -> str:
+    items = (("worker", WORKER),) + labels + extra
+    return "{" + ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in items) + "}"
+
+
+def _fmt_num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(v)
+
+
+def snapshot() -> Tuple[Dict[Tuple[str, Labels], float], Dict[Tuple[str, Labels], List[float]]]:
+    values: Dict[Tuple[str, Labels], float] = {}
+    hists: Dict[Tuple[str, Labels], List[float]] = {}
+    for s in list(_shards):
+        for key, v in list(s.values.items()):
+            values[key] = values.get(key, 0.0) + v
+        for key, h in list(s.hists.items()):
+            acc = hists.get(key)
+            if acc is None:
+                hists[key] = list(h)
+            else:
+                for i, x in enumerate(h):
+                    acc[i] += x
+    return values, hists
+
+
+def render() -> str:
+    values, hists = snapshot()
+
+    # ratio de hits derivado de los counters de caché
+    totals: Dict[str, List[float]] = {}
+    for (name, labels), v in values.items():
+        if name == "carsense_cache_requests_total":
+            d = dict(labels)
+            t = totals.setdefault(d["cache"], [0.0, 0.0])
+            t[0 if d["result"] == "hit" else 1] += v
+    for cache, (hit, miss) in totals.items():
+        if hit + miss:
+            values[("carsense_cache_hit_ratio", (("cache", cache),))] = hit / (hit + miss)
+
+    by_name: Dict[str, List[str]] = {}
+    for (name, labels), v in sorted(values.items()):
+        by_name.setdefault(name, []).append(f"{name}{_fmt_labels(labels)} {_fmt_num(v)}")
+    for (name, labels), h in sorted(hists.items()):
+        buckets = _META[name][2]
+        lines = by_name.setdefault(name, [])
+        cumulative = 0.0
+        for le, n in zip(buckets, h):
+            cumulative += n
+            lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', _fmt_num(le)),))} {_fmt_num(cumulative)}")
+        cumulative += h[len(buckets)]
+        lines.append(f"{name}_bucket{_fmt_labels(labels, (('le', '+Inf'),))} {_fmt_num(cumulative)}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {_fmt_num(h[-1])}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {_fmt_num(cumulative)}")
+
+    out: List[str] = []
+    for name in sorted(by_name):
+        kind, help_text, _ = _META.get(name, ("untyped", "", None))
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+        out.extend(by_name[name])
+    return "\n".join(out) + "\n"
+
+
+# ---------- Estadísticas de BD por petición ----------
+# [sentencias, segundos]; el threadpool de FastAPI copia el contexto, así que
+# las sentencias de endpoints síncronos suman a la petición correcta.
+_request_db: ContextVar[Optional[List[float]]] = ContextVar("carsense_request_db", default=None)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mide la espera de checkout (no hay evento 'antes de checkout')."""
+
+    def connect(self):
+        t0 = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            observe("carsense_db_pool_checkout_seconds", time.perf_counter() - t0)
+
+
+def instrument_engine(engine: Engine, name: str = "primary") -> None:
+    labels: Labels = (("db", name),)
+    hit_labels: Labels = (("cache", f"sqlalchemy_{name}"), ("result", "hit"))
+    miss_labels: Labels = (("cache", f"sqlalchemy_{name}"), ("result", "miss"))
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("carsense_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        dt = time.perf_counter() - conn.info["carsense_t0"].pop()
+        inc("carsense_db_statements_total", labels)
+        observe("carsense_db_statement_seconds", dt, labels)
+        stats = _request_db.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += dt
+        ch = getattr(context, "cache_hit", None)
+        if ch is CACHE_HIT:
+            inc("carsense_cache_requests_total", hit_labels)
+        elif ch is CACHE_MISS:
+            inc("carsense_cache_requests_total", miss_labels)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(ctx):
+        # la sentencia falló: no habrá after_cursor_execute
+        starts = ctx.connection.info.get("carsense_t0") if ctx.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+# ---------- Middleware ASGI ----------
+class MetricsMiddleware:
+    """Latencia por plantilla de ruta, peticiones en curso y coste de BD por petición."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        db = [0, 0.0]
+        token = _request_db.set(db)
+        inc("carsense_http_requests_in_flight")
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            dt = time.perf_counter() - t0
+            inc("carsense_http_requests_in_flight", value=-1)
+            _request_db.reset(token)
+            # Plantilla ("/vehicles/{vehicle_id}") para no explotar la cardinalidad
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            labels: Labels = (("method", scope["method"]), ("route", route))
+            observe("carsense_http_request_seconds", dt, labels)
+            inc("carsense_http_requests_total", labels + (("status", str(status[0])),))
+            observe("carsense_db_statements_per_request", db[0], labels)
+            observe("carsense_db_seconds_per_request", db[1], labels)
@@ -0,0 +1,287 @@
+# backend/app/core/profiler.py
+"""
+Profiler estadístico por petición.
+
+Se activa para una petición cuando trae `X-CarSense-Profile: <ADMIN_TOKEN>` o
+por muestreo 1 de cada PROFILER_SAMPLE_RATE. Un hilo toma `sys._current_frames()`
+cada PROFILER_INTERVAL_MS mientras dura la petición, pero sólo lo de esa
+petición: el hilo del event loop cuando la tarea en curso lleva su contexto
+(otras peticiones async comparten el hilo) y los del threadpool que corren
+en su contexto. Guarda las pilas en formato "collapsed" (flamegraph.pl /
+speedscope) en un anillo acotado en disco.
+
+Si no hay token ni muestreo configurados el middleware ni se registra, así que
+el camino normal no paga nada.
+"""
+import asyncio
+import contextvars
+import hmac
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+PROFILE_HEADER = b"x-carsense-profile"
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_busy = threading.Lock()  # un perfil a la vez: acota el coste del muestreo
+# perfil de la petición en curso; el threadpool copia el contexto a sus hilos
+_current: contextvars.ContextVar[Optional["Sampler"]] = contextvars.ContextVar(
+    "carsense_profiler", default=None)
+_ring_lock = threading.Lock()
+_SAFE = re.compile(r"[^A-Za-z0-9]+")
+_NAME = re.compile(r"^(?P<ts>\d+)-(?P<method>[A-Z]+)-(?P<path>[A-Za-z0-9_]*)-(?P<ms>\d+)ms-(?P<samples>\d+)s\.folded$")
+
+
+# ---------- Muestreo ----------
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _touches_app(frame) -> bool:
+    while frame is not None:
+        if frame.f_code.co_filename.startswith(APP_DIR) and frame.f_code.co_filename != __file__:
+            return True
+        frame = frame.f_back
+    return False
+
+
+def _context_frame(frame, sampler: "Sampler"):
+    """Frame (cerca de la raíz) que ejecuta un contexto con `sampler` activo, o None.
+
+    El hilo del threadpool guarda el `contextvars.Context` de la tarea como
+    variable local del bucle del worker; ese frame vive lo que vive el hilo.
+    """
+    chain = []
+    while frame is not None:
+        chain.append(frame)
+        frame = frame.f_back
+    for f in reversed(chain[-8:] if len(chain) > 8 else chain):
+        if _runs_context(f, sampler):
+            return f
+    return None
+
+
+def _runs_context(frame, sampler: "Sampler") -> bool:
+    for v in frame.f_locals.values():
+        if isinstance(v, contextvars.Context) and v.get(_current) is sampler:
+            return True
+    return False
+
+
+def _loop_task(loop) -> Optional[asyncio.Task]:
+    """Tarea que el loop ejecuta ahora (None entre tareas: callbacks del propio loop)."""
+    return asyncio.current_task(loop) if loop is not None else None
+
+
+# tarea → perfil de la petición que la creó. Python 3.11 no expone el contexto
+# de una tarea (Task.get_context es de 3.12), así que se anota al crearla.
+_tasks: "weakref.WeakKeyDictionary[asyncio.Task, Sampler]" = weakref.WeakKeyDictionary()
+
+
+def _install_task_factory(loop) -> None:
+    """Anota en `_tasks` las tareas creadas en el contexto de una petición perfilada
+    (las hijas de anyio/Starlette: BaseHTTPMiddleware, grupos de tareas)."""
+    prev = loop.get_task_factory()
+    if getattr(prev, "carsense_profiler", False):
+        return
+
+    def factory(loop, coro, **kw):
+        task = prev(loop, coro, **kw) if prev is not None else asyncio.Task(coro, loop=loop, **kw)
+        ctx = kw.get("context")
+        sampler = ctx.get(_current) if ctx is not None else _current.get()
+        if sampler is not None:
+            _tasks[task] = sampler
+        return task
+
+    factory.carsense_profiler = True
+    loop.set_task_factory(factory)
+
+
+class Sampler:
+    """Hilo que acumula pilas (raíz→hoja) de los hilos de una petición."""
+
+    def __init__(self, interval: float, loop_thread: Optional[int] = None,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.interval = interval
+        self.loop_thread = loop_thread  # handlers async y middlewares
+        self.loop = loop  # sin loop, todo lo del hilo del loop cuenta
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="carsense-profiler", daemon=True)
+        self._workers: Dict[int, object] = {}  # tid → frame del worker que lleva el contexto
+
+    def _mine(self, tid: int, frame, task: Optional[asyncio.Task] = None) -> bool:
+        if tid == self.loop_thread:
+            if self.loop is None:
+                return True
+            # la misma tarea antes y después de tomar las pilas (si cambió, la
+            # pila puede ser de otra petición)
+            return task is not None and task is _loop_task(self.loop) and _tasks.get(task) is self
+        anchor = self._workers.get(tid)
+        if anchor is not None and _runs_context(anchor, self):
+            return True
+        anchor = _context_frame(frame, self)
+        if anchor is None:
+            self._workers.pop(tid, None)
+            return False
+        self._workers[tid] = anchor
+        return True
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            task = _loop_task(self.loop)
+            for tid, frame in sys._current_frames().items():
+                # sólo hilos de esta petición ejecutando código de la app
+                if tid == me or not _touches_app(frame) or not self._mine(tid, frame, task):
+                    continue
+                stack: List[str] = []
+                f = frame
+                while f is not None:
+                    stack.append(_frame_label(f))
+                    f = f.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def __enter__(self) -> "Sampler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        # idempotente: el middleware lo cierra al enviar la cabecera
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self._workers.clear()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+# ---------- Anillo en disco ----------
+class ProfileRing:
+    def __init__(self, directory: str, max_files: int):
+        self.directory = directory
+        self.max_files = max(1, max_files)
+
+    def _files(self) -> List[str]:
+        try:
+            return sorted(f for f in os.listdir(self.directory) if _NAME.match(f))
+        except FileNotFoundError:
+            return []
+
+    def write(self, method: str, path: str, elapsed_ms: float, sampler: Sampler) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        safe_path = _SAFE.sub("_", path).strip("_")[:80]
+        name = f"{time.time_ns() // 1000}-{method}-{safe_path}-{int(elapsed_ms)}ms-{sampler.samples}s.folded"
+        tmp = os.path.join(self.directory, f".{name}.tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(sampler.collapsed())
+        os.replace(tmp, os.path.join(self.directory, name))
+        with _ring_lock:
+            files = self._files()
+            for old in files[: max(0, len(files) - self.max_files)]:
+                try:
+                    os.remove(os.path.join(self.directory, old))
+                except FileNotFoundError:
+                    pass  # otro worker ya lo quitó
+        return name
+
+    def index(self) -> List[Dict[str, object]]:
+        out = []
+        for name in reversed(self._files()):
+            m = _NAME.match(name)
+            out.append({
+                "name": name,
+                "created_at": int(m["ts"]) / 1_000_000,
+                "method": m["method"],
+                "path_slug": m["path"],
+                "elapsed_ms": int(m["ms"]),
+                "samples": int(m["samples"]),
+            })
+        return out
+
+    def path_of(self, name: str) -> Optional[str]:
+        if not _NAME.match(name):
+            return None
+        p = os.path.join(self.directory, name)
+        return p if os.path.isfile(p) else None
+
+
+_default_ring: Optional[ProfileRing] = None
+
+
+def default_ring() -> ProfileRing:
+    """Anillo configurado por settings (compartido por middleware y /__debug__)."""
+    global _default_ring
+    if _default_ring is None:
+        from app.core.config import get_settings
+        s = get_settings()
+        _default_ring = ProfileRing(s.PROFILER_DIR, s.PROFILER_MAX_FILES)
+    return _default_ring
+
+
+# ---------- Middleware ASGI ----------
+class ProfilerMiddleware:
+    def __init__(self, app, ring: ProfileRing, sample_rate: int = 0,
+                 admin_token: Optional[str] = None, interval_ms: float = 5.0):
+        self.app = app
+        self.ring = ring
+        self.sample_rate = sample_rate
+        self.admin_token = (admin_token or "").encode()
+        self.interval = interval_ms / 1000.0
+        self._counter = itertools.count(1)
+
+    def _wanted(self, scope) -> bool:
+        if self.admin_token:
+            for k, v in scope["headers"]:
+                if k == PROFILE_HEADER:
+                    return hmac.compare_digest(v, self.admin_token)
+        return bool(self.sample_rate) and next(self._counter) % self.sample_rate == 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope) or not _busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        t0 = time.perf_counter()
+        loop, task = asyncio.get_running_loop(), asyncio.current_task()
+        sampler = Sampler(self.interval, loop_thread=threading.get_ident(), loop=loop)
+        _install_task_factory(loop)
+
+        def finish() -> str:
+            sampler.__exit__(None, None, None)
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            return self.ring.write(scope["method"], scope["path"], elapsed_ms, sampler)
+
+        async def send_wrapper(message):
+            # El handler ya terminó cuando sale la cabecera: cerramos el perfil
+            # aquí para poder devolver su id (en streaming se corta en este punto).
+            # El join y la escritura a disco van al threadpool, no al event loop.
+            if message["type"] == "http.response.start":
+                name = await run_in_threadpool(finish)
+                message = dict(message, headers=list(message.get("headers", [])) + [(b"x-profile-id", name.encode())])
+            await send(message)
+
+        token = _current.set(sampler)
+        _tasks[task] = sampler  # la del servidor; las que cree la petición, vía la fábrica
+        sampler.__enter__()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            _tasks.pop(task, None)
+            try:
+                await run_in_threadpool(sampler.__exit__, None, None, None)
+            finally:
+                _busy.release()
@@ -0,0 +1,302 @@
+# backend/app/core/pubsub.py
+"""
+Pub/sub en proceso para el canal push (WebSocket / SSE).
+
+Cada conexión es un `Subscriber` con __slots__: usuario, un buffer que sólo
+existe mientras hay mensajes sin entregar y el future del lector en espera.
+Una conexión inactiva cuesta unos cientos de bytes aquí; el resto es del
+servidor ASGI (transporte, parser). El `Hub` indexa suscriptores por usuario:
+un evento se serializa una vez y se reparte a las conexiones de ese usuario
+(o a todas con BROADCAST). Si un cliente lento acumula PUSH_MAX_PENDING
+mensajes, se descartan y se le manda `{"type":"resync"}` (debe usar /sync).
+
+Con varios workers de uvicorn, el hub también publica en un broker:
+  * "local": sólo este proceso (un worker, pruebas).
+  * "unix":  cada worker abre un socket datagrama en PUSH_BROKER_DIR; publicar
+             es enviar el datagrama a los demás sockets del directorio. Sin
+             servidor intermedio; el socket de un worker muerto se borra al
+             fallar el envío. Sirve en un mismo host (el despliegue actual).
+
+El hub vive en el event loop. Publicar desde hilos (endpoints síncronos en el
+threadpool, scheduler) pasa por call_soon_threadsafe.
+"""
+import asyncio
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from app.core import metrics
+from app.core.config import get_settings
+
+log = logging.getLogger("carsense.pubsub")
+
+BROADCAST = -1
+RESYNC = b'{"type":"resync"}'
+_HEAD = struct.Struct("<q")  # user_id del datagrama
+MAX_PAYLOAD = 60 * 1024
+
+metrics.describe("carsense_push_connections", "gauge", "Conexiones push abiertas por transporte.")
+metrics.describe("carsense_push_events_total", "counter",
+                 "Eventos push por resultado (published/delivered/overflow/broker_dropped).")
+
+
+def _expire(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+# ---------- Conexión ----------
+class Subscriber:
+    __slots__ = ("user_id", "closed", "_max", "_buf", "_waiter")
+
+    def __init__(self, user_id: int, max_pending: int):
+        self.user_id = user_id
+        self.closed = False
+        self._max = max_pending
+        self._buf: Optional[Deque[bytes]] = None
+        self._waiter: Optional[asyncio.Future] = None
+
+    def put(self, payload: bytes) -> None:
+        if self.closed:
+            return
+        buf = self._buf
+        if buf is None:
+            buf = self._buf = deque()
+        elif len(buf) >= self._max:
+            # cliente que no lee: se descarta lo pendiente y se pide resincronizar
+            metrics.inc("carsense_push_events_total", (("result", "overflow"),), len(buf))
+            buf.clear()
+            payload = RESYNC
+        buf.append(payload)
+        self._wake()
+
+    def close(self) -> None:
+        self.closed = True
+        self._wake()
+
+    def _wake(self) -> None:
+        w = self._waiter
+        if w is not None and not w.done():
+            w.set_result(None)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[bytes]:
+        """Siguiente mensaje; None si pasa `timeout` sin nada (toca heartbeat) o si se cerró."""
+        if not self._buf and not self.closed:
+            loop = asyncio.get_running_loop()
+            fut = self._waiter = loop.create_future()
+            timer = loop.call_later(timeout, _expire, fut) if timeout else None
+            try:
+                await fut
+            finally:
+                self._waiter = None
+                if timer is not None:
+                    timer.cancel()
+        buf = self._buf
+        if not buf:
+            return None
+        msg = buf.popleft()
+        if not buf:
+            self._buf = None  # sin pendientes no se guarda el deque
+        return msg
+
+
+# ---------- Brokers entre workers ----------
+class LocalBroker:
+    """Sin reparto entre procesos."""
+
+    def start(self, hub: "Hub") -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def publish(self, user_id: int, payload: bytes) -> None:
+        pass
+
+
+class UnixBroker:
+    """Sockets datagrama en un directorio compartido por los workers del host."""
+
+    PEERS_TTL_S = 1.0
+
+    def __init__(self, directory: str):
+        self.dir = directory
+        self.path = os.path.join(directory, f"{os.getpid()}.sock")
+        self._rx: Optional[socket.socket] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tx = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._tx.setblocking(False)
+        self._peers: List[str] = []
+        self._peers_at = 0.0
+        self._lock = threading.Lock()
+
+    def start(self, hub: "Hub") -> None:
+        os.makedirs(self.dir, exist_ok=True)
+        try:
+            os.unlink(self.path)  # pid reutilizado de un worker anterior
+        except FileNotFoundError:
+            pass
+        rx = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        rx.bind(self.path)
+        rx.setblocking(False)
+        self._rx, self._loop = rx, hub.loop
+        hub.loop.add_reader(rx.fileno(), self._on_readable, hub)
+
+    def stop(self) -> None:
+        if self._rx is None:
+            return
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.remove_reader(self._rx.fileno())
+        self._rx.close()
+        self._rx = self._loop = None
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _on_readable(self, hub: "Hub") -> None:
+        while True:
+            try:
+                data = self._rx.recv(_HEAD.size + MAX_PAYLOAD)
+            except (BlockingIOError, InterruptedError):
+                return
+            if len(data) > _HEAD.size:
+                hub.deliver(_HEAD.unpack_from(data)[0], data[_HEAD.size:])
+
+    def peers(self) -> List[str]:
+        now = time.monotonic()
+        if now - self._peers_at > self.PEERS_TTL_S:
+            with self._lock:
+                try:
+                    names = os.listdir(self.dir)
+                except FileNotFoundError:
+                    names = []
+                self._peers = [os.path.join(self.dir, n) for n in names
+                               if n.endswith(".sock") and os.path.join(self.dir, n) != self.path]
+                self._peers_at = now
+        return self._peers
+
+    def publish(self, user_id: int, payload: bytes) -> None:
+        if len(payload) > MAX_PAYLOAD:
+            log.warning("Evento push de %d bytes no cabe en un datagrama; sólo se entrega localmente", len(payload))
+            return
+        msg = _HEAD.pack(user_id) + payload
+        for peer in self.peers():
+            try:
+                self._tx.sendto(msg, peer)
+            except ConnectionRefusedError:
+                # nadie escucha: worker muerto
+                try:
+                    os.unlink(peer)
+                except FileNotFoundError:
+                    pass
+                self._peers_at = 0.0
+            except FileNotFoundError:
+                self._peers_at = 0.0
+            except (BlockingIOError, OSError):
+                # buffer del receptor lleno: se pierde para ese worker
+                metrics.inc("carsense_push_events_total", (("result", "broker_dropped"),))
+
+
+# ---------- Hub ----------
+class Hub:
+    def __init__(self, broker=None, max_pending: int = 64):
+        self.broker = broker or LocalBroker()
+        self.max_pending = max_pending
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subs: Dict[int, List[Subscriber]] = {}
+        self.connections = 0
+
+    def _bind(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # primer suscriptor (o loop nuevo, p. ej. otro TestClient)
+            self.broker.stop()
+            self.loop = loop
+            self.broker.start(self)
+
+    def subscribe(self, user_id: int) -> Subscriber:
+        """Desde el event loop."""
+        self._bind()
+        sub = Subscriber(user_id, self.max_pending)
+        self._subs.setdefault(user_id, []).append(sub)
+        self.connections += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        sub.close()
+        subs = self._subs.get(sub.user_id)
+        if subs and sub in subs:
+            subs.remove(sub)
+            self.connections -= 1
+            if not subs:
+                del self._subs[sub.user_id]
+
+    def deliver(self, user_id: int, payload: bytes) -> int:
+        """Reparte a las conexiones de este proceso (en el event loop)."""
+        if user_id == BROADCAST:
+            targets = [s for subs in self._subs.values() for s in subs]
+        else:
+            targets = self._subs.get(user_id, ())
+        for s in targets:
+            s.put(payload)
+        if targets:
+            metrics.inc("carsense_push_events_total", (("result", "delivered"),), len(targets))
+        return len(targets)
+
+    def publish(self, user_id: Optional[int], payload: bytes) -> None:
+        """Desde cualquier hilo. user_id None = todas las conexiones."""
+        uid = BROADCAST if user_id is None else user_id
+        metrics.inc("carsense_push_events_total", (("result", "published"),))
+        self.broker.publish(uid, payload)
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return  # nadie se ha conectado a este worker
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self.deliver(uid, payload)
+        else:
+            loop.call_soon_threadsafe(self.deliver, uid, payload)
+
+    def close(self) -> None:
+        for subs in list(self._subs.values()):
+            for s in subs:
+                s.close()
+        self._subs.clear()
+        self.connections = 0
+        self.broker.stop()
+
+
+def make_broker(kind: str, directory: str):
+    if kind == "unix":
+        return UnixBroker(directory)
+    if kind != "local":
+        log.warning("PUSH_BROKER=%s desconocido; se usa 'local'", kind)
+    return LocalBroker()
+
+
+_hub: Optional[Hub] = None
+_hub_lock = threading.Lock()
+
+
+def get_hub() -> Hub:
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                s = get_settings()
+                _hub = Hub(make_broker(s.PUSH_BROKER, s.PUSH_BROKER_DIR), s.PUSH_MAX_PENDING)
+    return _hub
+
+
+def shutdown() -> None:
+    if _hub is not None:
+        _hub.close()
@@ -0,0 +1,263 @@
+# backend/app/core/ratelimit.py
+"""
+Límite de peticiones por usuario (sub del JWT) o por IP, en ASGI crudo.
+
+Algoritmo: GCRA, equivalente a un token bucket de capacidad `burst` que se
+rellena a `per_min` unidades por minuto, pero con un solo float por llave (el
+"TAT": cuándo quedaría lleno el bucket). Cada ruta cuesta `weight` unidades:
+login/registro (bcrypt) cuestan mucho más que una lectura; peso 0 = exenta.
+
+Llave: "u:<sub>" con un Bearer válido (firma verificada una vez y cacheada por
+token; un sub falso no abre buckets nuevos) y si no "ip:<dirección>". Detrás
+de un proxy propio (RATE_LIMIT_TRUST_PROXY=1) se usa la última IP de
+X-Forwarded-For, que es la que agregó ese proxy.
+
+Backends:
+  * MemoryBackend: dict del proceso. Con N workers cada uno lleva su cuenta
+    (el límite efectivo llega a N veces el configurado).
+  * MmapBackend: tabla de slots (hash de 8 bytes + TAT) en un archivo mapeado
+    en memoria (/dev/shm), compartida por todos los workers del host; cada
+    grupo de slots se protege con un lock de rango (fcntl). Sin servicios
+    extra. Si un grupo se llena se desaloja la llave con el bucket más lleno.
+
+Cabeceras (draft IETF httpapi-ratelimit-headers): RateLimit-Limit,
+RateLimit-Remaining, RateLimit-Reset (s hasta bucket lleno) y RateLimit-Policy;
+en 429 además Retry-After. El costo de decidir se mide con
+`python -m bench.ratelimit_overhead` (µs por petición).
+"""
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from jose import JWTError, jwt
+
+from app.core import metrics
+from app.core.security import ALGORITHM, SECRET_KEY
+
+PREFIXES = ("/api/v1", "/api")
+
+# (método, ruta sin prefijo) -> costo; lo demás cuesta 1
+DEFAULT_WEIGHTS: Dict[Tuple[str, str], int] = {
+    ("POST", "/auth/login"): 10,
+    ("POST", "/auth/register"): 10,
+    ("POST", "/auth/password"): 20,
+    ("POST", "/chatbot/ask"): 2,
+    ("POST", "/chat"): 2,
+    ("GET", "/vehicles"): 2,
+    ("GET", "/services"): 2,
+    ("GET", "/service-records"): 2,
+    ("GET", "/reminders"): 2,
+    ("GET", "/sync"): 3,
+    ("POST", "/vins/decode"): 5,
+    ("GET", "/services/search"): 3,
+    ("GET", "/service-records/search"): 3,
+    # exentas
+    ("GET", "/health"): 0,
+    ("GET", "/healt"): 0,
+    ("GET", "/metrics"): 0,
+}
+
+metrics.describe("carsense_ratelimit_decisions_total", "counter", "Decisiones del limitador por tipo de llave y resultado.")
+
+
+def gcra(tat: float, now: float, increment: float, tau: float) -> Tuple[bool, float]:
+    """(permitido, TAT resultante). Denegada no consume."""
+    new_tat = max(tat, now) + increment
+    if new_tat - now > tau:
+        return False, tat
+    return True, new_tat
+
+
+# ---------- Backends ----------
+class MemoryBackend:
+    def __init__(self, max_keys: int = 200_000):
+        self.max_keys = max_keys
+        self._tat: Dict[str, float] = {}
+
+    def take(self, key: str, now: float, increment: float, tau: float) -> Tuple[bool, float]:
+        ok, tat = gcra(self._tat.get(key, 0.0), now, increment, tau)
+        if ok:
+            self._tat[key] = tat
+            if len(self._tat) > self.max_keys:
+                self._sweep(now)
+        return ok, tat
+
+    def _sweep(self, now: float) -> None:
+        # un TAT ya pasado equivale a bucket lleno: se puede olvidar
+        self._tat = {k: t for k, t in self._tat.items() if t > now}
+
+
+class MmapBackend:
+    SLOT = struct.Struct("<Qd")  # hash de la llave, TAT
+    WAYS = 4                     # slots por grupo (un lock por grupo)
+
+    def __init__(self, path: str, slots: int = 1 << 16):
+        self.groups = max(1, slots // self.WAYS)
+        self.size = self.groups * self.WAYS * self.SLOT.size
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self.fd).st_size < self.size:
+            os.ftruncate(self.fd, self.size)
+        self.mm = mmap.mmap(self.fd, self.size)
+
+    def take(self, key: str, now: float, increment: float, tau: float) -> Tuple[bool, float]:
+        h = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") | 1
+        group = h % self.groups
+        base = group * self.WAYS * self.SLOT.size
+        # lock de escritura sobre un byte por grupo, más allá de los datos
+        fcntl.lockf(self.fd, fcntl.LOCK_EX, 1, self.size + group)
+        try:
+            free, oldest, oldest_tat = None, base, math.inf
+            for off in range(base, base + self.WAYS * self.SLOT.size, self.SLOT.size):
+                kh, tat = self.SLOT.unpack_from(self.mm, off)
+                if kh == h:
+                    ok, tat = gcra(tat, now, increment, tau)
+                    if ok:
+                        self.SLOT.pack_into(self.mm, off, h, tat)
+                    return ok, tat
+                if free is None and (kh == 0 or tat <= now):
+                    free = off
+                if tat < oldest_tat:
+                    oldest, oldest_tat = off, tat
+            ok, tat = gcra(0.0, now, increment, tau)
+            if ok:
+                self.SLOT.pack_into(self.mm, oldest if free is None else free, h, tat)
+            return ok, tat
+        finally:
+            fcntl.lockf(self.fd, fcntl.LOCK_UN, 1, self.size + group)
+
+
+def make_backend(kind: str, path: str):
+    if kind == "mmap":
+        return MmapBackend(path)
+    return MemoryBackend()
+
+
+# ---------- Llave del cliente ----------
+class _SubCache:
+    """token -> (sub, exp): verificar la firma cuesta decenas de µs; se hace una vez por token."""
+
+    def __init__(self, size: int = 10_000):
+        self.size = size
+        self._d: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+
+    def sub(self, token: str, now: float) -> Optional[str]:
+        hit = self._d.get(token)
+        if hit is not None and hit[1] > now:
+            return hit[0]
+        try:
+            claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            sub, exp = claims.get("sub"), float(claims.get("exp") or now + 300)
+        except JWTError:
+            sub, exp = None, now + 300  # token inválido: se recuerda como anónimo un rato
+        self._d[token] = (sub, exp)
+        if len(self._d) > self.size:
+            self._d.popitem(last=False)
+        return sub
+
+
+# ---------- Middleware ----------
+class RateLimitMiddleware:
+    def __init__(self, app, backend=None, per_min: float = 600, burst: int = 120, ip_per_min: float = 300,
+                 ip_burst: int = 60, weights: Optional[Dict[Tuple[str, str], int]] = None,
+                 trust_proxy: bool = False):
+        self.app = app
+        self.backend = backend or MemoryBackend()
+        # (intervalo de emisión en s por unidad, tolerancia tau, burst)
+        self.user = (60.0 / per_min, 60.0 / per_min * burst, burst)
+        self.ip = (60.0 / ip_per_min, 60.0 / ip_per_min * ip_burst, ip_burst)
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        self.trust_proxy = trust_proxy
+        self.subs = _SubCache()
+
+    def weight(self, method: str, path: str) -> int:
+        for p in PREFIXES:
+            if path.startswith(p + "/"):
+                path = path[len(p):]
+                break
+        if len(path) > 1 and path.endswith("/"):
+            path = path[:-1]
+        return self.weights.get((method, path), 1)
+
+    def client_key(self, scope, now: float) -> Tuple[str, tuple]:
+        xff = None
+        for k, v in scope["headers"]:
+            if k == b"authorization":
+                if v[:7].lower() == b"bearer ":
+                    sub = self.subs.sub(v[7:].decode("latin-1"), now)
+                    if sub:
+                        return "u:" + sub, self.user
+            elif k == b"x-forwarded-for":
+                xff = v
+        if self.trust_proxy and xff:
+            ip = xff.decode("latin-1").rsplit(",", 1)[-1].strip()
+        else:
+            ip = (scope.get("client") or ("?",))[0]
+        return "ip:" + ip, self.ip
+
+    def decide(self, scope, now: float) -> Optional[Tuple[bool, list, str]]:
+        """None si la ruta está exenta; si no (permitido, cabeceras, tipo de llave)."""
+        w = self.weight(scope["method"], scope["path"])
+        if w <= 0:
+            return None
+        key, (interval, tau, burst) = self.client_key(scope, now)
+        ok, tat = self.backend.take(key, now, interval * w, tau)
+        # unidades disponibles tras esta petición y segundos hasta bucket lleno
+        remaining = max(0, int((tau - (tat - now)) / interval + 1e-9))
+        reset = max(0, math.ceil(tat - now))
+        headers = [
+            (b"ratelimit-limit", str(burst).encode()),
+            (b"ratelimit-remaining", str(remaining).encode()),
+            (b"ratelimit-reset", str(reset).encode()),
+            (b"ratelimit-policy", f"{burst};w={round(tau)}".encode()),
+        ]
+        if not ok:
+            # espera hasta que quepa esta petición
+            retry = math.ceil(tat + interval * w - tau - now)
+            headers.append((b"retry-after", str(max(1, retry)).encode()))
+        return ok, headers, key[:key.index(":")]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        verdict = self.decide(scope, time.time())
+        if verdict is None:
+            await self.app(scope, receive, send)
+            return
+        ok, headers, kind = verdict
+        metrics.inc("carsense_ratelimit_decisions_total", (("key", kind), ("result", "allowed" if ok else "limited")))
+        if not ok:
+            body = b'{"detail":"Demasiadas solicitudes, intenta m\xc3\xa1s tarde"}'
+            await send({"type": "http.response.start", "status": 429, "headers": headers + [
+                (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", ())) + headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+def parse_weights(raw: str) -> Dict[Tuple[str, str], int]:
+    """'{"POST /auth/login": 20, ...}' -> pesos por defecto con esos cambios."""
+    import json
+
+    out = dict(DEFAULT_WEIGHTS)
+    try:
+        items: Iterable = json.loads(raw).items() if raw else ()
+    except ValueError:
+        items = ()
+    for k, v in items:
+        method, _, path = k.partition(" ")
+        out[(method.upper(), path)] = int(v)
+    return out
@@ -0,0 +1,82 @@
+# backend/app/core/responses.py
+"""
+Respuestas JSON rápidas para listados grandes.
+
+Los listados seleccionan sólo las columnas necesarias (Core), construyen dicts
+planos y los codifican directo a bytes (orjson si está instalado, json si no),
+sin hidratar objetos ORM ni re-validar con Pydantic. Los cuerpos que pasan de
+COMPRESS_MIN_BYTES se comprimen (br si está `brotli`, si no gzip) según
+Accept-Encoding.
+"""
+import gzip
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, Sequence
+
+from fastapi import Request, Response
+
+from app.core.config import get_settings
+
+try:
+    import orjson
+except ImportError:  # opcional: json de la stdlib como respaldo
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # opcional
+    brotli = None
+
+
+def _default(o: Any):
+    if isinstance(o, (date, datetime)):
+        return o.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(o).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _qvalue(params: str) -> float:
+    for p in params.split(";"):
+        name, _, value = p.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0  # q mal formado: no se arriesga
+    return 1.0
+
+
+def _accepts(request: Request, coding: str) -> bool:
+    """`coding` aparece en Accept-Encoding (o `*`) con q > 0; `gzip;q=0` es un rechazo."""
+    wildcard = None
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if name == coding:
+            return _qvalue(params) > 0  # lo explícito manda sobre `*`
+        if name == "*":
+            wildcard = _qvalue(params)
+    return wildcard is not None and wildcard > 0
+
+
+def json_bytes(request: Request, body: bytes, status_code: int = 200) -> Response:
+    headers = {"Vary": "Accept-Encoding"}
+    threshold = get_settings().COMPRESS_MIN_BYTES
+    if threshold and len(body) >= threshold:
+        if brotli is not None and _accepts(request, "br"):
+            body = brotli.compress(body, quality=4)
+            headers["Content-Encoding"] = "br"
+        elif _accepts(request, "gzip"):
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def json_rows(request: Request, keys: Sequence[str], rows: Iterable[Sequence[Any]]) -> Response:
+    """Filas de Core (tuplas) -> lista de objetos JSON con `keys` como nombres."""
+    return json_bytes(request, dumps([dict(zip(keys, r)) for r in rows]))
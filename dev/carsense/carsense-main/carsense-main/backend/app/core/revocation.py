@@ -0,0 +1,258 @@
+# backend/app/core/revocation.py
+"""
+Tokens revocados (claim `jti`), consultados en cada petición sin tocar la BD.
+
+La fuente de verdad es `revoked_tokens` (jti, vencimiento del token, cuándo
+se revocó). Cada worker mantiene en memoria:
+
+  * un filtro de Bloom de los jti revocados: "no está" es definitivo, así que
+    el caso común (token vigente) se resuelve con unas pocas pruebas de bits;
+  * el conjunto exacto para confirmar los positivos (revocado o falso
+    positivo): un `array('Q')` ordenado con los 64 bits altos de cada jti
+    (8 bytes por entrada, búsqueda binaria) más un `set` con lo reciente, que
+    se funde en el arreglo al crecer.
+
+Como los jti son 128 bits aleatorios, las posiciones del filtro salen de sus
+propios bits (doble hashing), sin calcular hashes.
+
+Un hilo por worker trae cada REVOCATION_REFRESH_S lo revocado desde la última
+vez (con traslape, por commits concurrentes) y cada REVOCATION_REBUILD_S
+reconstruye todo desde la tabla: así salen los tokens ya vencidos y el filtro
+se redimensiona si pasó su capacidad. El worker que revoca lo agrega al
+momento; los demás lo ven en a lo más REVOCATION_REFRESH_S.
+
+Tamaño para 10M tokens emitidos (7 días de vida): sólo cuestan los revocados
+y vigentes. Con 1% de falsos positivos el filtro usa 9.6 bits/entrada (k=7);
+al reconstruir se dimensiona al doble de lo cargado. Con 10% revocados (1M):
+filtro 2.4 MB + arreglo exacto 8 MB ≈ 10 MB por worker. Peor caso, los 10M
+revocados: 24 MB + 80 MB ≈ 104 MB. Un `set` de str costaría ~100 bytes por
+entrada (≈1 GB en el peor caso). `python -m bench.revocation_check` lo mide.
+
+Tokens emitidos antes de existir `jti` no se pueden revocar uno por uno (sí
+con el corte por usuario de `User.tokens_valid_after`); vencen solos.
+"""
+import logging
+import math
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import timedelta
+from typing import Iterable, Optional, Set
+
+from sqlalchemy import delete, select
+
+from app.core import metrics
+from app.core.clock import utcnow
+
+log = logging.getLogger("carsense.revocation")
+
+metrics.describe("carsense_revocation_entries", "gauge", "Tokens revocados vigentes en memoria.")
+metrics.describe("carsense_revocation_bytes", "gauge", "Memoria del filtro + conjunto exacto.")
+metrics.describe("carsense_revocation_bloom_hits_total", "counter",
+                 "Positivos del filtro de Bloom (revoked / false_positive).")
+
+_MASK64 = (1 << 64) - 1
+
+
+def _key(jti: str) -> Optional[int]:
+    try:
+        v = int(jti, 16)
+    except (TypeError, ValueError):
+        return None
+    return v if 0 <= v < 1 << 128 else None
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(1, capacity)
+        self.m = max(64, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.k = max(1, round(self.m / capacity * math.log(2)))
+        self.capacity = capacity
+        self.bits = bytearray((self.m + 7) // 8)
+
+    def add(self, v: int) -> None:
+        h1, h2, m, bits = v & _MASK64, (v >> 64) | 1, self.m, self.bits
+        for i in range(self.k):
+            p = (h1 + i * h2) % m
+            bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, v: int) -> bool:
+        h1, h2, m, bits = v & _MASK64, (v >> 64) | 1, self.m, self.bits
+        for i in range(self.k):
+            p = (h1 + i * h2) % m
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+
+class Denylist:
+    MERGE_AT = 50_000  # entradas recientes antes de fundirlas en el arreglo
+
+    def __init__(self, engine=None, capacity: int = 1_000_000, fp_rate: float = 0.01,
+                 refresh_s: float = 2.0, rebuild_s: float = 3600.0):
+        self.engine = engine
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.refresh_s = refresh_s
+        self.rebuild_s = rebuild_s
+        self._bloom = BloomFilter(capacity, fp_rate)
+        self._base = array("Q")
+        self._recent: Set[int] = set()
+        self._since = None  # revoked_at de la última lectura
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._gauges = {}
+
+    # -- consulta (camino caliente) --
+    def is_revoked(self, jti: str) -> bool:
+        v = _key(jti)
+        if v is None or v not in self._bloom:
+            return False
+        hi = v >> 64
+        base = self._base
+        i = bisect_left(base, hi)
+        hit = hi in self._recent or (i < len(base) and base[i] == hi)
+        metrics.inc("carsense_revocation_bloom_hits_total", (("result", "revoked" if hit else "false_positive"),))
+        return hit
+
+    # -- altas --
+    def add(self, jti: str) -> None:
+        v = _key(jti)
+        if v is None:
+            return
+        self._bloom.add(v)
+        self._recent.add(v >> 64)
+
+    def load(self, jtis: Iterable[str]) -> int:
+        """Reemplaza todo el contenido (reconstrucción)."""
+        keys = [v for v in map(_key, jtis) if v is not None]
+        bloom = BloomFilter(max(self.capacity, 2 * len(keys)), self.fp_rate)
+        for v in keys:
+            bloom.add(v)
+        base = array("Q", sorted({v >> 64 for v in keys}))
+        # el filtro nuevo primero: un lector que vea filtro nuevo + conjunto
+        # viejo sólo puede dar falsos positivos, nunca perder un revocado
+        self._bloom = bloom
+        self._base = base
+        self._recent = set()
+        return len(keys)
+
+    def _merge(self) -> None:
+        # lo agregado por otros hilos durante la fusión se queda en `_recent`
+        recent = self._recent
+        merged = set(recent)
+        self._base = array("Q", sorted(merged.union(self._base)))
+        recent.difference_update(merged)
+
+    # -- sincronización con la tabla --
+    def rebuild(self) -> int:
+        from app.db.models import RevokedToken
+
+        now = utcnow()
+        with self.engine.connect() as conn:
+            jtis = conn.execute(select(RevokedToken.jti).where(RevokedToken.expires_at > now)).scalars().all()
+        self._since = now
+        n = self.load(jtis)
+        self._observe()
+        return n
+
+    def refresh(self) -> int:
+        from app.db.models import RevokedToken
+
+        now = utcnow()
+        since = self._since - timedelta(seconds=60)  # traslape: commits que llegaron tarde
+        with self.engine.connect() as conn:
+            jtis = conn.execute(select(RevokedToken.jti).where(RevokedToken.revoked_at >= since)).scalars().all()
+        self._since = now
+        for j in jtis:
+            self.add(j)
+        if len(self._recent) > self.MERGE_AT:
+            self._merge()
+        self._observe()
+        return len(jtis)
+
+    def nbytes(self) -> int:
+        # set: ~70 bytes por entrada (slot + int) aprox.
+        return len(self._bloom.bits) + self._base.itemsize * len(self._base) + 70 * len(self._recent)
+
+    def _observe(self) -> None:
+        for name, value in (("carsense_revocation_entries", len(self._base) + len(self._recent)),
+                            ("carsense_revocation_bytes", self.nbytes())):
+            metrics.inc(name, (), value - self._gauges.get(name, 0))
+            self._gauges[name] = value
+
+    # -- ciclo de vida --
+    def start(self) -> None:
+        if self._thread is not None or self.engine is None:
+            return
+        self.rebuild()
+        self._thread = threading.Thread(target=self._run, name="carsense-revocation", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(10)
+            self._thread = None
+
+    def _run(self) -> None:
+        last_rebuild = 0.0
+        elapsed = 0.0
+        while not self._stop.wait(self.refresh_s):
+            elapsed += self.refresh_s
+            try:
+                if elapsed - last_rebuild >= self.rebuild_s:
+                    last_rebuild = elapsed
+                    self.rebuild()
+                else:
+                    self.refresh()
+            except Exception:
+                log.exception("No se pudo actualizar la lista de tokens revocados")
+
+
+_denylist: Optional[Denylist] = None
+_denylist_lock = threading.Lock()
+
+
+def get_denylist() -> Denylist:
+    """Lista del proceso; la primera llamada la carga de la BD y arranca el hilo."""
+    global _denylist
+    if _denylist is None:
+        with _denylist_lock:
+            if _denylist is None:
+                from app.core.config import get_settings
+                from app.db.session import engine
+                s = get_settings()
+                d = Denylist(engine, s.REVOCATION_CAPACITY, s.REVOCATION_FP_RATE,
+                             s.REVOCATION_REFRESH_S, s.REVOCATION_REBUILD_S)
+                d.start()
+                _denylist = d
+    return _denylist
+
+
+def is_revoked(jti: str) -> bool:
+    return get_denylist().is_revoked(jti)
+
+
+def revoke(db, jti: str, expires_at) -> None:
+    """Registra la revocación y hace commit; este worker la aplica al momento."""
+    from app.db.dialect import insert_for
+    from app.db.models import RevokedToken
+
+    db.execute(insert_for(db, RevokedToken.__table__).on_conflict_do_nothing(),
+               {"jti": jti, "expires_at": expires_at, "revoked_at": utcnow()})
+    db.commit()
+    get_denylist().add(jti)
+
+
+def prune(engine) -> int:
+    """Borra revocaciones de tokens ya vencidos (un token vencido no pasa la firma)."""
+    from app.db.models import RevokedToken
+
+    with engine.begin() as conn:
+        return conn.execute(delete(RevokedToken).where(RevokedToken.expires_at <= utcnow())).rowcount
+
+
+def shutdown() -> None:
+    if _denylist is not None:
+        _denylist.stop()
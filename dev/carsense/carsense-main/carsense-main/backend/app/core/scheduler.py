@@ -1,17 +1,287 @@
-from threading import Thread, Event
+# backend/app/core/scheduler.py
+"""
+Tareas programadas (APScheduler) seguras con varios workers.
+
+Cada worker compite por el lease "scheduler" (ver app/core/lease.py) cada
+SCHEDULER_LEASE_S / 3. Sólo el líder tiene su BackgroundScheduler corriendo;
+los demás lo dejan en pausa y toman el relevo si el lease vence. Las
+definiciones viven en la tabla `apscheduler_jobs` (job store SQLAlchemy en la
+BD de la app): al cambiar de líder se conserva la próxima ejecución de cada
+tarea, y lo que se debió correr mientras no había líder es un misfire.
+
+Misfires: coalesce (varias ejecuciones atrasadas = una), una instancia a la
+vez por tarea, y se descarta lo que lleve más de SCHEDULER_MISFIRE_GRACE_S de
+atraso. Además cada ejecución revisa que el lease siga vigente antes de
+empezar (un líder que perdió la BD no corre nada).
+
+Horarios cron en UTC. Métricas:
+  carsense_scheduler_runs_total{job,result}     ok | error | skipped
+  carsense_scheduler_job_seconds{job}           duración
+  carsense_scheduler_overruns_total{job}        duró más que su periodo/presupuesto
+  carsense_scheduler_lag_seconds{job}           del horario previsto al envío
+  carsense_scheduler_misfires_total{job,reason} missed | max_instances
+  carsense_scheduler_leader                     1 en el worker líder
+"""
+import logging
+import threading
 import time
+from typing import Dict, Optional, Tuple
+
+from apscheduler.events import EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from app.core import metrics
+from app.core.clock import utcnow
+from app.core.config import get_settings
+from app.core.lease import Lease
+
+log = logging.getLogger("carsense.scheduler")
+
+LEASE_NAME = "scheduler"
+JOB_FUNC = "app.core.scheduler:run_job"  # referencia textual: lo único que guarda el job store
+
+metrics.describe("carsense_scheduler_runs_total", "counter", "Ejecuciones de tareas programadas por resultado.")
+metrics.describe("carsense_scheduler_job_seconds", "histogram", "Duración de las tareas programadas.",
+                 (0.01, 0.05, 0.1, 0.5, 1, 5, 15, 60, 300, 900))
+metrics.describe("carsense_scheduler_overruns_total", "counter", "Ejecuciones más largas que su periodo o presupuesto.")
+metrics.describe("carsense_scheduler_lag_seconds", "histogram", "Atraso entre la hora prevista y el envío.",
+                 (0.01, 0.1, 0.5, 1, 5, 30, 60, 300, 3600))
+metrics.describe("carsense_scheduler_misfires_total", "counter", "Ejecuciones descartadas (missed / max_instances).")
+metrics.describe("carsense_scheduler_leader", "gauge", "1 si este worker tiene el lease del scheduler.")
+
+
+# ---------- Tareas ----------
+# las tareas de flota recorren cada BD con datos (una sola sin shards)
+def _reminders() -> int:
+    from app.db import shards
+    from app.services import push
+
+    return sum(push.fire_due_reminders(db) for db in shards.sessions())
+
+
+def _alerts() -> int:
+    from app.db import shards
+    from app.services import alerts
+
+    return sum(alerts.generate(db) for db in shards.sessions())
+
+
+def _telemetry_prune() -> int:
+    from app.db import shards
+    from app.services import telemetry
+
+    return sum(telemetry.get_writer(k).prune() for k in shards.keys())
+
+
+def _prune_changes() -> int:
+    from app.jobs import prune_changes
+
+    return prune_changes.run()
+
+
+def _outbox_prune() -> int:
+    from app.db import shards
+    from app.services import outbox
+
+    return sum(outbox.prune(e, get_settings().NOTIFY_RETENTION_DAYS) for e in shards.data_engines())
+
+
+def _idempotency_prune() -> int:
+    from app.db import shards
+    from app.services import idempotency
+
+    return sum(idempotency.prune(e) for e in shards.data_engines())
+
+
+def _revocation_prune() -> int:
+    from app.core import revocation
+    from app.db.session import engine
 
-_stop = Event()
-_worker: Thread | None = None
+    return revocation.prune(engine)
 
-def _job():
-    # Aquí podrías ejecutar tareas periódicas (limpieza, recordatorios, etc.)
-    while not _stop.is_set():
-        time.sleep(60)
 
-def start_scheduler():
-    global _worker
-    if _worker and _worker.is_alive():
+def _replica_snapshot() -> None:
+    from app.db import replicas
+
+    replicas.refresh_snapshot()
+
+
+def job_table() -> Dict[str, Tuple[object, float, object]]:
+    """id -> (trigger, presupuesto en s, función). Intervalo 0 = tarea desactivada."""
+    s = get_settings()
+    utc = "UTC"
+    jobs = {
+        # recordatorios vencidos -> canal push + outbox
+        "reminders": (IntervalTrigger(seconds=s.REMINDER_SCAN_S, timezone=utc), s.REMINDER_SCAN_S, _reminders),
+        # alertas de mantenimiento por reglas
+        "alerts": (CronTrigger.from_crontab(s.ALERTS_CRON, timezone=utc), 600, _alerts),
+        # crudos de telemetría ya resumidos por minuto
+        "telemetry_prune": (IntervalTrigger(seconds=s.TELEMETRY_PRUNE_EVERY_S, timezone=utc),
+                            s.TELEMETRY_PRUNE_EVERY_S, _telemetry_prune),
+        "prune_changes": (CronTrigger.from_crontab(s.PRUNE_CRON, timezone=utc), 900, _prune_changes),
+        "outbox_prune": (CronTrigger.from_crontab(s.PRUNE_CRON, timezone=utc), 900, _outbox_prune),
+        # llaves de idempotencia vencidas (acota la tabla)
+        "idempotency_prune": (IntervalTrigger(seconds=s.IDEMPOTENCY_PRUNE_S, timezone=utc),
+                              s.IDEMPOTENCY_PRUNE_S, _idempotency_prune),
+        # revocaciones de tokens ya vencidos
+        "revocation_prune": (IntervalTrigger(seconds=s.REVOCATION_PRUNE_S, timezone=utc),
+                             s.REVOCATION_PRUNE_S, _revocation_prune),
+        # réplica local de lectura: copia de app.db (sólo pruebas/desarrollo)
+        "replica_snapshot": (IntervalTrigger(seconds=s.REPLICA_SNAPSHOT_S, timezone=utc),
+                             s.REPLICA_SNAPSHOT_S, _replica_snapshot),
+    }
+    off = {"reminders": s.REMINDER_SCAN_S, "telemetry_prune": s.TELEMETRY_PRUNE_EVERY_S,
+           "idempotency_prune": s.IDEMPOTENCY_PRUNE_S, "revocation_prune": s.REVOCATION_PRUNE_S,
+           "replica_snapshot": s.REPLICA_SNAPSHOT_S}
+    return {k: v for k, v in jobs.items() if off.get(k, 1) > 0}
+
+
+def run_job(job_id: str) -> None:
+    """Punto de entrada de toda tarea: valida el lease, mide y registra."""
+    labels = (("job", job_id),)
+    spec = job_table().get(job_id)
+    if spec is None or _lease is None or not _lease.held:
+        metrics.inc("carsense_scheduler_runs_total", labels + (("result", "skipped"),))
         return
-    _worker = Thread(target=_job, daemon=True)
-    _worker.start()
+    _, budget, func = spec
+    t0 = time.perf_counter()
+    result = "ok"
+    try:
+        n = func()
+        if n:
+            log.info("Tarea %s: %s", job_id, n)
+    except Exception:
+        result = "error"
+        log.exception("Fallo en la tarea %s", job_id)
+    elapsed = time.perf_counter() - t0
+    metrics.observe("carsense_scheduler_job_seconds", elapsed, labels)
+    metrics.inc("carsense_scheduler_runs_total", labels + (("result", result),))
+    if budget and elapsed > budget:
+        metrics.inc("carsense_scheduler_overruns_total", labels)
+        log.warning("Tarea %s tardó %.1fs (presupuesto %.0fs)", job_id, elapsed, budget)
+
+
+# ---------- Scheduler + liderazgo ----------
+def _on_event(event) -> None:
+    labels = (("job", event.job_id),)
+    if event.code == EVENT_JOB_SUBMITTED:
+        # scheduled_run_times: con coalesce, la última es la que se corre
+        when = event.scheduled_run_times[-1].replace(tzinfo=None)
+        metrics.observe("carsense_scheduler_lag_seconds", max(0.0, (utcnow() - when).total_seconds()), labels)
+    elif event.code == EVENT_JOB_MISSED:
+        metrics.inc("carsense_scheduler_misfires_total", labels + (("reason", "missed"),))
+        log.warning("Tarea %s se saltó (atraso mayor a la gracia)", event.job_id)
+    elif event.code == EVENT_JOB_MAX_INSTANCES:
+        metrics.inc("carsense_scheduler_misfires_total", labels + (("reason", "max_instances"),))
+        log.warning("Tarea %s sigue corriendo; se omite esta ejecución", event.job_id)
+
+
+def _build(engine) -> BackgroundScheduler:
+    s = get_settings()
+    sched = BackgroundScheduler(
+        jobstores={"default": SQLAlchemyJobStore(engine=engine, tablename="apscheduler_jobs")},
+        executors={"default": ThreadPoolExecutor(s.SCHEDULER_THREADS)},
+        job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": int(s.SCHEDULER_MISFIRE_GRACE_S)},
+        timezone="UTC",
+    )
+    sched.add_listener(_on_event, EVENT_JOB_SUBMITTED | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
+    return sched
+
+
+def sync_jobs(sched: BackgroundScheduler) -> None:
+    """Alinea el job store con job_table(); una tarea sin cambios conserva su próxima ejecución."""
+    wanted = job_table()
+    stored = {j.id: j for j in sched.get_jobs()}
+    for job_id, job in stored.items():
+        if job_id not in wanted:
+            sched.remove_job(job_id)
+    for job_id, (trigger, _, _) in wanted.items():
+        job = stored.get(job_id)
+        if job is None:
+            sched.add_job(JOB_FUNC, trigger, args=[job_id], id=job_id, name=job_id)
+        elif str(job.trigger) != str(trigger):
+            sched.reschedule_job(job_id, trigger=trigger)
+
+
+class _Leader:
+    """Hilo que renueva el lease y pausa/reanuda el scheduler según el resultado."""
+
+    def __init__(self, sched: BackgroundScheduler, lease: Lease):
+        self.sched = sched
+        self.lease = lease
+        self.leading = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="carsense-scheduler", daemon=True)
+
+    def _run(self) -> None:
+        every = self.lease.ttl_s / 3
+        while True:
+            try:
+                got = self.lease.acquire()
+            except Exception:
+                log.exception("No se pudo renovar el lease del scheduler")
+                got = self.lease.held
+            if got != self.leading:
+                self._switch(got)
+            if self._stop.wait(every):
+                return
+
+    def _switch(self, leading: bool) -> None:
+        if leading:
+            sync_jobs(self.sched)
+            self.sched.resume()
+            log.info("Scheduler: este worker es líder (%s)", self.lease.holder)
+        else:
+            self.sched.pause()
+            log.warning("Scheduler: se perdió el lease (%s)", self.lease.holder)
+        self.leading = leading
+        metrics.inc("carsense_scheduler_leader", (), 1 if leading else -1)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(10)
+        if self.leading:
+            self.sched.pause()
+            self.leading = False
+            metrics.inc("carsense_scheduler_leader", (), -1)
+        self.sched.shutdown(wait=False)
+        try:
+            self.lease.release()
+        except Exception:
+            log.exception("No se pudo soltar el lease del scheduler")
+
+
+_lease: Optional[Lease] = None
+_leader: Optional[_Leader] = None
+
+
+def start_scheduler(engine=None) -> None:
+    global _lease, _leader
+    s = get_settings()
+    if not s.SCHEDULER_ENABLED or _leader is not None:
+        return
+    if engine is None:
+        from app.db.session import engine
+    _lease = Lease(engine, LEASE_NAME, s.SCHEDULER_LEASE_S)
+    sched = _build(engine)
+    sched.start(paused=True)
+    _leader = _Leader(sched, _lease)
+    _leader.start()
+
+
+def stop_scheduler() -> None:
+    global _leader
+    if _leader is not None:
+        _leader.stop()
+        _leader = None
+
+
+def is_leader() -> bool:
+    return _leader is not None and _leader.leading
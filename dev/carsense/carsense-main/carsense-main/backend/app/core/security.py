@@ -1,4 +1,6 @@
 # app/core/security.py
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import jwt, JWTError
@@ -24,15 +26,35 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_ctx.verify(plain, hashed)
 
 def create_access_token(sub: str, expires_delta: Optional[timedelta] = None) -> str:
-    """Crea un JWT con el subject (sub) = user_id o email."""
+    """
+    Crea un JWT con el subject (sub) = user_id o email, un `jti` aleatorio
+    (para revocarlo) e `iat` en ms (corte por usuario al cambiar contraseña).
+    """
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode = {"sub": sub, "exp": expire}
+    to_encode = {"sub": sub, "exp": expire, "iat": int(time.time() * 1000) / 1000, "jti": uuid.uuid4().hex}
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def decode_token(token: str) -> Optional[str]:
-    """Decodifica el JWT y devuelve el 'sub' (o None si es inválido/expirado)."""
+def decode_claims(token: str) -> Optional[dict]:
+    """Claims de un JWT válido y no revocado (None si es inválido/expirado/revocado)."""
+    from app.core import revocation
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
     except JWTError:
         return None
+    jti = payload.get("jti")
+    if jti and revocation.is_revoked(jti):
+        return None
+    return payload
+
+def decode_token(token: str) -> Optional[str]:
+    """Decodifica el JWT y devuelve el 'sub' (o None si es inválido/expirado/revocado)."""
+    payload = decode_claims(token)
+    return payload.get("sub") if payload else None
+
+def issued_before(payload: dict, cutoff: Optional[datetime]) -> bool:
+    """True si el token se emitió antes del corte del usuario (sin `iat` cuenta como muy viejo)."""
+    if cutoff is None:
+        return False
+    iat = payload.get("iat") or 0
+    return iat < (cutoff - datetime(1970, 1, 1)).total_seconds()
@@ -0,0 +1,206 @@
+# backend/app/core/slow_queries.py
+"""
+Log de consultas lentas (opt-in con SLOW_QUERY_MS > 0).
+
+Cada sentencia que supera el umbral se registra con la "forma" de sus
+parámetros (tipos, no valores) y la ruta que la disparó. La primera vez que
+aparece una huella (sentencia normalizada) se captura su plan:
+`EXPLAIN QUERY PLAN` en SQLite, `EXPLAIN` en Postgres. Las N huellas más
+costosas quedan en memoria y se ven en `/__debug__/slow-queries`; una huella
+que no entraría en ese top no se explica.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger("carsense.slow_query")
+
+# scope ASGI de la petición en curso (la ruta se resuelve después del routing)
+_scope: ContextVar[Optional[dict]] = ContextVar("carsense_slow_query_scope", default=None)
+
+_lock = threading.Lock()
+_top: Dict[str, Dict[str, Any]] = {}
+_top_n = 50
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_PARAMS = re.compile(r"\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)")
+_RE_SPACES = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+# ---------- Helpers ----------
+def fingerprint(statement: str) -> str:
+    """Normaliza literales, listas IN y espacios para agrupar sentencias iguales."""
+    s = _RE_STRING.sub("?", statement)
+    s = _RE_NUMBER.sub("?", s)
+    s = _RE_PARAMS.sub("(?+)", s)
+    return _RE_SPACES.sub(" ", s).strip()
+
+
+def param_shape(parameters: Any, executemany: bool) -> str:
+    def one(p: Any) -> str:
+        if isinstance(p, dict):
+            return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in p.items()) + "}"
+        if isinstance(p, (list, tuple)):
+            return "(" + ", ".join(type(v).__name__ for v in p) + ")"
+        return type(p).__name__
+
+    if executemany and parameters:
+        return f"{len(parameters)} x {one(parameters[0])}"
+    return one(parameters)
+
+
+def current_route() -> str:
+    scope = _scope.get()
+    if scope is None:
+        return "<no-request>"
+    route = getattr(scope.get("route"), "path", None)
+    return f"{scope.get('method', '')} {route or scope.get('path', '')}".strip()
+
+
+def _explain(conn, statement: str, parameters: Any, executemany: bool) -> Optional[List[str]]:
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return None  # DDL/PRAGMA: no hay plan que ver
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        prefix = "EXPLAIN QUERY PLAN "
+    elif dialect == "postgresql":
+        prefix = "EXPLAIN "
+    else:
+        return None
+    params = parameters[0] if executemany and parameters else parameters
+    # misma conexión que la petición: en Postgres un error abortaría su
+    # transacción, así que el EXPLAIN va dentro de un SAVEPOINT propio
+    savepoint = dialect == "postgresql"
+    try:
+        cur = conn.connection.dbapi_connection.cursor()
+        try:
+            if savepoint:
+                cur.execute("SAVEPOINT carsense_explain")
+            try:
+                cur.execute(prefix + statement, params or ())
+                rows = cur.fetchall()
+            except Exception:
+                if savepoint:
+                    cur.execute("ROLLBACK TO SAVEPOINT carsense_explain")
+                raise
+            finally:
+                if savepoint:
+                    cur.execute("RELEASE SAVEPOINT carsense_explain")
+        finally:
+            cur.close()
+    except Exception as e:  # un plan que falla no debe romper la petición
+        return [f"<explain failed: {e}>"]
+    if dialect == "sqlite":
+        # (id, parent, notused, detail)
+        return [str(r[-1]) for r in rows]
+    return [str(r[0]) for r in rows]
+
+
+def _record(conn, statement: str, parameters: Any, executemany: bool, elapsed_ms: float) -> None:
+    fp = fingerprint(statement)
+    key = hashlib.sha1(fp.encode()).hexdigest()[:16]
+    route = current_route()
+    shape = param_shape(parameters, executemany)
+
+    with _lock:
+        # sólo se explica lo que va a entrar al top (la huella nueva desplaza
+        # a la de menor tiempo acumulado si la supera)
+        need_plan = key not in _top and (
+            len(_top) < _top_n or min(e["total_ms"] for e in _top.values()) <= elapsed_ms
+        )
+    # el EXPLAIN va fuera del lock (toca la BD)
+    plan = _explain(conn, statement, parameters, executemany) if need_plan else None
+
+    with _lock:
+        entry = _top.get(key)
+        if entry is None:
+            if len(_top) >= _top_n:
+                # expulsa la huella con menos tiempo acumulado si ésta la supera
+                victim = min(_top, key=lambda k: _top[k]["total_ms"])
+                if _top[victim]["total_ms"] <= elapsed_ms:
+                    del _top[victim]
+            if len(_top) < _top_n:
+                entry = _top[key] = {
+                    "fingerprint": key,
+                    "statement": fp,
+                    "plan": plan,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "param_shape": shape,
+                    "routes": {},
+                }
+        if entry is not None:
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["last_seen"] = time.time()
+            entry["param_shape"] = shape
+            entry["routes"][route] = entry["routes"].get(route, 0) + 1
+
+    log.warning("slow query %.1f ms [%s] %s params=%s", elapsed_ms, route, fp, shape)
+
+
+# ---------- API pública ----------
+def top(limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    with _lock:
+        rows = [dict(e, routes=dict(e["routes"])) for e in _top.values()]
+    rows.sort(key=lambda e: e["total_ms"], reverse=True)
+    for r in rows:
+        r["avg_ms"] = round(r["total_ms"] / r["count"], 3) if r["count"] else 0.0
+        r["total_ms"] = round(r["total_ms"], 3)
+        r["max_ms"] = round(r["max_ms"], 3)
+    return rows[:limit] if limit else rows
+
+
+def reset() -> None:
+    with _lock:
+        _top.clear()
+
+
+def install(engine: Engine, threshold_ms: float, top_n: int = 50) -> None:
+    global _top_n
+    _top_n = max(1, top_n)
+    threshold = threshold_ms / 1000.0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("carsense_slow_t0", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["carsense_slow_t0"].pop()
+        if elapsed >= threshold:
+            _record(conn, statement, parameters, executemany, elapsed * 1000.0)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(ctx):
+        starts = ctx.connection.info.get("carsense_slow_t0") if ctx.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+class QueryContextMiddleware:
+    """Deja el scope de la petición en un ContextVar para saber qué ruta lanzó cada consulta."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _scope.reset(token)
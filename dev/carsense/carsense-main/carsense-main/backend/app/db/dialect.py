@@ -0,0 +1,27 @@
+# backend/app/db/dialect.py
+# INSERT con ON CONFLICT (upsert / ignorar duplicados) para SQLite y Postgres.
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def _name(bind) -> str:
+    return bind.get_bind().dialect.name if hasattr(bind, "get_bind") else bind.dialect.name
+
+
+def insert_for(bind, table):
+    """Devuelve el `insert()` del dialecto de `bind` (Session, Connection o Engine)."""
+    name = _name(bind)
+    if name == "postgresql":
+        return postgresql.insert(table)
+    if name == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"ON CONFLICT no soportado para {name}")
+
+
+def least(bind, a, b):
+    """min escalar de dos valores (SQLite: min(a, b); Postgres: least)."""
+    return func.least(a, b) if _name(bind) == "postgresql" else func.min(a, b)
+
+
+def greatest(bind, a, b):
+    return func.greatest(a, b) if _name(bind) == "postgresql" else func.max(a, b)
@@ -1,7 +1,7 @@
 # app/db/models.py
-from datetime import date
+from datetime import date, datetime
 
-from sqlalchemy import Column, Integer, String, Date, Text, ForeignKey, Boolean
+from sqlalchemy import text, Column, Integer, BigInteger, SmallInteger, String, Date, DateTime, Float, Text, LargeBinary, ForeignKey, Boolean, Index, UniqueConstraint
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from app.db.base import Base
@@ -14,12 +14,22 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(255), unique=True, index=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
+    # tokens emitidos (iat) antes de esto ya no valen: cambio de contraseña
+    tokens_valid_after = Column(DateTime, nullable=True)
+    # shard con sus datos (app/db/shards.py); NULL = en esta misma BD
+    shard = Column(SmallInteger, nullable=True)
+    shard_moving = Column(Boolean, nullable=False, default=False, server_default=text("0"))
+    # última escritura (app/db/replicas.py): sus lecturas van a la primaria
+    # hasta que la réplica la tenga
+    last_write_at = Column(DateTime, nullable=True)
 
-    # Un usuario tiene muchos vehículos
+    # Un usuario tiene muchos vehículos. passive_deletes: el borrado en
+    # cascada lo hace la BD (ON DELETE CASCADE), el ORM no carga los hijos.
     vehicles = relationship(
         "Vehicle",
         back_populates="owner",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
 
@@ -32,6 +42,12 @@ class Vehicle(Base):
     model = Column(String(100), nullable=False)
     year = Column(Integer, nullable=True)
     odometer_km = Column(Integer, default=0, nullable=True)
+    vin = Column(String(17), nullable=True, index=True)  # normalizado y validado (app/services/vin.py)
+    # ids del catálogo (app/data/vehicle_catalog.tsv); NULL = texto libre sin coincidencia
+    make_id = Column(SmallInteger, nullable=True, index=True)
+    model_id = Column(Integer, nullable=True, index=True)
+    # perfil de las reglas de mantenimiento (app/services/maintenance.py); NULL = normal
+    usage_profile = Column(String(16), nullable=True)
 
     # Dueño del vehículo (nuevo)
     owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
@@ -42,6 +58,7 @@ class Vehicle(Base):
         "ServiceRecord",
         back_populates="vehicle",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     # (opcional) si quieres navegar a recordatorios desde vehículo:
     # reminders = relationship("Reminder", back_populates="vehicle", cascade="all, delete-orphan")
@@ -52,14 +69,22 @@ class ServiceRecord(Base):
     __tablename__ = "service_records"
 
     id = Column(Integer, primary_key=True, index=True)
-    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False, index=True)
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id", ondelete="CASCADE"), nullable=False, index=True)
     service_type = Column(String(100), nullable=False)
     date = Column(Date, nullable=True)  # ISO yyyy-mm-dd
     km = Column(Integer, nullable=True)
     notes = Column(Text, nullable=True)
+    # costo en centavos (entero: sin errores de redondeo) y moneda ISO 4217
+    cost_cents = Column(Integer, nullable=True)
+    currency = Column(String(3), nullable=False, default="MXN", server_default="MXN")
+    workshop = Column(String(120), nullable=True)
 
     vehicle = relationship("Vehicle", back_populates="services")
 
+    @property
+    def cost(self):
+        return None if self.cost_cents is None else self.cost_cents / 100
+
 
 # ================== Recordatorios ==================
 class Reminder(Base):
@@ -78,6 +103,240 @@ class Reminder(Base):
 
     notes: Mapped[str | None] = mapped_column(String(255), nullable=True)
     done: Mapped[bool] = mapped_column(Boolean, default=False)
+    # cuándo se notificó como vencido (None = pendiente de avisar)
+    fired_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     # (opcional) si activas relación inversa en Vehicle:
     # vehicle = relationship("Vehicle", back_populates="reminders")
+
+
+# ================== Alertas de mantenimiento ==================
+class Alert(Base):
+    """Servicio que ya toca según las reglas de mantenimiento (la genera el scheduler)."""
+    __tablename__ = "alerts"
+    __table_args__ = (
+        # a lo más una pendiente por (vehículo, servicio)
+        Index("uq_alerts_vehicle_servicio_pendiente", "vehicle_id", "servicio", unique=True,
+              sqlite_where=text("estado = 'pendiente'"), postgresql_where=text("estado = 'pendiente'")),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    vehicle_id: Mapped[int] = mapped_column(ForeignKey("vehicles.id", ondelete="CASCADE"), index=True)
+    servicio: Mapped[str] = mapped_column(String(50))
+    fecha_programada: Mapped[date | None] = mapped_column(Date, nullable=True)
+    estado: Mapped[str] = mapped_column(String(16), default="pendiente")  # pendiente | hecha
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+
+
+# ============== Odómetro (serie de tiempo) ==============
+class OdometerReading(Base):
+    __tablename__ = "odometer_readings"
+    # PK compuesta y sin rowid en SQLite: la tabla es el propio índice
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    vehicle_id: Mapped[int] = mapped_column(
+        ForeignKey("vehicles.id", ondelete="CASCADE"), primary_key=True
+    )
+    ts: Mapped[datetime] = mapped_column(DateTime, primary_key=True)  # UTC
+    km: Mapped[int] = mapped_column(Integer)
+
+
+class VehicleUsage(Base):
+    """Resumen incremental por vehículo: se actualiza en cada lectura, nunca se recalcula."""
+    __tablename__ = "vehicle_usage"
+
+    vehicle_id: Mapped[int] = mapped_column(
+        ForeignKey("vehicles.id", ondelete="CASCADE"), primary_key=True
+    )
+    first_ts: Mapped[datetime] = mapped_column(DateTime)
+    first_km: Mapped[int] = mapped_column(Integer)
+    last_ts: Mapped[datetime] = mapped_column(DateTime)
+    last_km: Mapped[int] = mapped_column(Integer)
+    # km/día suavizado exponencialmente (ponderado por tiempo)
+    km_per_day: Mapped[float | None] = mapped_column(Float, nullable=True)
+    # desde dónde se mide la próxima tasa si la última lectura llegó a menos
+    # de 1 h de la anterior (NULL = desde last_ts/last_km); km y ts van juntos
+    anchor_ts: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    anchor_km: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+
+# ============== Telemetría OBD ==============
+class TelemetrySample(Base):
+    """Muestra cruda (se purga pasada la ventana de retención)."""
+    __tablename__ = "telemetry_samples"
+    __table_args__ = (
+        Index("ix_telemetry_samples_ts", "ts"),  # purga por antigüedad
+        {"sqlite_with_rowid": False},
+    )
+
+    vehicle_id: Mapped[int] = mapped_column(
+        ForeignKey("vehicles.id", ondelete="CASCADE"), primary_key=True
+    )
+    pid: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    ts: Mapped[int] = mapped_column(BigInteger, primary_key=True)  # epoch ms UTC
+    value: Mapped[float] = mapped_column(Float)
+
+
+class TelemetryRollup(Base):
+    """Resumen por minuto (min/max/avg) de cada PID; se conserva."""
+    __tablename__ = "telemetry_rollups"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    vehicle_id: Mapped[int] = mapped_column(
+        ForeignKey("vehicles.id", ondelete="CASCADE"), primary_key=True
+    )
+    pid: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    minute: Mapped[int] = mapped_column(Integer, primary_key=True)  # epoch ms // 60000
+    n: Mapped[int] = mapped_column(Integer)
+    vmin: Mapped[float] = mapped_column(Float)
+    vmax: Mapped[float] = mapped_column(Float)
+    vsum: Mapped[float] = mapped_column(Float)
+
+
+# ============== Códigos de falla (DTC) ==============
+class DtcEvent(Base):
+    """Una ocurrencia (ya deduplicada) de un código en un vehículo."""
+    __tablename__ = "dtc_events"
+    # único: un reporte repetido con el mismo ts nunca crea otra fila
+    __table_args__ = (UniqueConstraint("vehicle_id", "code", "ts", name="uq_dtc_events_vehicle_code_ts"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    vehicle_id: Mapped[int] = mapped_column(ForeignKey("vehicles.id", ondelete="CASCADE"))
+    code: Mapped[str] = mapped_column(String(8))
+    source: Mapped[str] = mapped_column(String(16))  # chat | scanner | obd
+    ts: Mapped[datetime] = mapped_column(DateTime)
+
+
+class DtcSummary(Base):
+    """Contadores por (vehículo, código), mantenidos con upsert."""
+    __tablename__ = "dtc_summary"
+
+    vehicle_id: Mapped[int] = mapped_column(
+        ForeignKey("vehicles.id", ondelete="CASCADE"), primary_key=True
+    )
+    code: Mapped[str] = mapped_column(String(8), primary_key=True)
+    first_seen: Mapped[datetime] = mapped_column(DateTime)
+    last_seen: Mapped[datetime] = mapped_column(DateTime)        # último reporte
+    last_event_at: Mapped[datetime] = mapped_column(DateTime)    # última ocurrencia contada
+    count: Mapped[int] = mapped_column(Integer)                  # ocurrencias deduplicadas
+    reports: Mapped[int] = mapped_column(Integer)                # reportes crudos
+    cleared_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+
+class DtcCodeStats(Base):
+    """Contadores de flota por código (histórico; no baja al borrar vehículos)."""
+    __tablename__ = "dtc_code_stats"
+
+    code: Mapped[str] = mapped_column(String(8), primary_key=True)
+    occurrences: Mapped[int] = mapped_column(Integer)
+    vehicles: Mapped[int] = mapped_column(Integer)
+
+
+# ============== Costos (resúmenes mensuales) ==============
+class ServiceCostMonthly(Base):
+    """
+    Costo y número de servicios por vehículo, mes, tipo y moneda. Lo mantienen
+    los handlers de alta/baja de servicios; las analíticas leen sólo esto.
+    month = año*100 + mes (0 = servicio sin fecha).
+    """
+    __tablename__ = "service_cost_monthly"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    vehicle_id: Mapped[int] = mapped_column(
+        ForeignKey("vehicles.id", ondelete="CASCADE"), primary_key=True
+    )
+    month: Mapped[int] = mapped_column(Integer, primary_key=True)
+    service_type: Mapped[str] = mapped_column(String(100), primary_key=True)
+    currency: Mapped[str] = mapped_column(String(3), primary_key=True)
+    n: Mapped[int] = mapped_column(Integer)
+    cost_cents: Mapped[int] = mapped_column(BigInteger)
+
+
+# ============== Bitácora de cambios (/sync) ==============
+class ChangeLog(Base):
+    """Una fila por alta/cambio/baja; el id es el cursor de sincronización."""
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index("ix_change_log_owner_id_id", "owner_id", "id"),
+        {"sqlite_autoincrement": True},  # ids nunca reutilizados: son cursores
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # sin FK: al borrar la cuenta sus entradas se borran aparte (UNLINKED_USER_TABLES)
+    owner_id: Mapped[int] = mapped_column(Integer)
+    entity: Mapped[str] = mapped_column(String(16))   # vehicle | service | reminder
+    entity_id: Mapped[int] = mapped_column(Integer)
+    op: Mapped[str] = mapped_column(String(8))        # upsert | delete
+    ts: Mapped[datetime] = mapped_column(DateTime)
+
+
+# ============== Notificaciones (outbox transaccional) ==============
+class NotificationOutbox(Base):
+    """Aviso pendiente de enviar por un canal; se escribe junto con el disparo del recordatorio."""
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        # un aviso por (recordatorio, canal, disparo): reabrir el recordatorio es otro disparo
+        UniqueConstraint("reminder_id", "channel", "fired_at", name="uq_notification_outbox_reminder_channel"),
+        Index("ix_notification_outbox_status_available_at", "status", "available_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    reminder_id: Mapped[int] = mapped_column(ForeignKey("reminders.id", ondelete="CASCADE"), index=True)
+    channel: Mapped[str] = mapped_column(String(16))      # email | webhook
+    fired_at: Mapped[datetime] = mapped_column(DateTime)
+    payload: Mapped[str] = mapped_column(Text)            # JSON ya armado para el transporte
+    status: Mapped[str] = mapped_column(String(8), default="pending")  # pending | sent | dead
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    # visibilidad: no se reclama antes de esta hora (reintento o lease vigente)
+    available_at: Mapped[datetime] = mapped_column(DateTime)
+    claimed_by: Mapped[str | None] = mapped_column(String(36), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[str | None] = mapped_column(String(255), nullable=True)
+
+
+# ============== Idempotencia de altas ==============
+class IdempotencyKey(Base):
+    """Respuesta de un alta con Idempotency-Key, para reproducirla en reintentos."""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),  # purga
+        {"sqlite_with_rowid": False},
+    )
+
+    # sin FK: al borrar la cuenta sus llaves se borran aparte (UNLINKED_USER_TABLES)
+    owner_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    key: Mapped[bytes] = mapped_column(LargeBinary(16), primary_key=True)           # blake2b-128 de la llave
+    request_hash: Mapped[bytes] = mapped_column(LargeBinary(16))                    # ruta + cuerpo
+    status: Mapped[int] = mapped_column(SmallInteger)
+    body: Mapped[bytes] = mapped_column(LargeBinary)
+    expires_at: Mapped[datetime] = mapped_column(DateTime)
+
+
+# tablas por owner_id sin FK a users: no caen en cascada al borrar la cuenta y
+# SQLite puede reutilizar el id del usuario borrado, así que se borran a mano
+UNLINKED_USER_TABLES = (ChangeLog.__table__, IdempotencyKey.__table__)
+
+
+# ============== Tokens revocados ==============
+class RevokedToken(Base):
+    """jti de un JWT revocado antes de su vencimiento (logout). Ver app/core/revocation.py."""
+    __tablename__ = "revoked_tokens"
+    __table_args__ = (
+        Index("ix_revoked_tokens_expires_at", "expires_at"),  # purga y reconstrucción
+        Index("ix_revoked_tokens_revoked_at", "revoked_at"),  # lectura incremental
+    )
+
+    jti: Mapped[str] = mapped_column(String(32), primary_key=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime)  # exp del token
+    revoked_at: Mapped[datetime] = mapped_column(DateTime)
+
+
+# ============== Scheduler (liderazgo entre workers) ==============
+class SchedulerLease(Base):
+    """Lease con nombre: sólo su holder corre las tareas mientras no venza."""
+    __tablename__ = "scheduler_leases"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    holder: Mapped[str] = mapped_column(String(64))
+    expires_at: Mapped[datetime] = mapped_column(DateTime)
@@ -0,0 +1,582 @@
+# backend/app/db/online_migration.py
+"""
+Migraciones en línea sobre tablas grandes (SQLite y Postgres).
+
+Todo corre en una conexión en autocommit (en Alembic:
+`op.get_context().autocommit_block()`): cada lote es su propia transacción
+corta y el avance queda en `online_migrations`, así que una corrida cortada
+sigue donde iba al volver a lanzar `alembic upgrade head`.
+
+- `Batcher`: lotes por rango de llave con tamaño adaptativo (cada lote dura
+  ~MIGRATION_BATCH_S), pausa proporcional entre lotes (MIGRATION_DUTY) y
+  espera mientras las réplicas Postgres van atrasadas.
+- `backfill()`: UPDATE/DELETE por lotes sobre una tabla viva.
+- `rebuild()`: reescribe tablas vía sombra `_new_<tabla>`. Triggers sobre la
+  tabla vieja reflejan las escrituras concurrentes mientras se copia; al
+  final una transacción de renombres pone la sombra en su lugar y la vieja
+  queda como `_old_<tabla>` hasta `drop_old()`.
+- `replace_foreign_keys()`: Postgres, FK con otra definición (ON DELETE)
+  sin reescribir la tabla (NOT VALID + VALIDATE).
+- `create_index()`: Postgres con CONCURRENTLY (rehace los que dejó inválidos
+  una corrida cortada). SQLite no tiene equivalente: en las sombras los
+  índices se crean vacíos antes de copiar y su costo se reparte en los lotes.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Set
+
+import sqlalchemy as sa
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.core.config import get_settings
+from app.db.dialect import insert_for
+
+# cuelga de "alembic" para que `alembic upgrade` muestre el avance
+log = logging.getLogger("alembic.online")
+
+SHADOW, OLD = "_new_", "_old_"
+LOG_EVERY_S = 5.0
+SWAP_LOCK_TIMEOUT = "5s"
+SWAP_RETRIES = 20
+
+_meta = sa.MetaData()
+checkpoints = sa.Table(
+    "online_migrations", _meta,
+    sa.Column("name", sa.String(96), primary_key=True),
+    sa.Column("last_key", sa.BigInteger, nullable=True),
+    sa.Column("copied", sa.BigInteger, nullable=False, server_default="0"),
+    sa.Column("done", sa.Boolean, nullable=False, server_default=sa.false()),
+    sa.Column("updated_at", sa.DateTime, nullable=False),
+)
+
+
+def _check(conn: Connection) -> str:
+    name = conn.dialect.name
+    if name not in ("sqlite", "postgresql"):
+        raise NotImplementedError(f"Migraciones en línea no soportadas en {name}")
+    if conn.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+        raise ValueError("Se necesita una conexión en autocommit (autocommit_block() en Alembic)")
+    return name
+
+
+def _q(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+
+@contextmanager
+def _atomic(conn: Connection) -> Iterator[None]:
+    """Transacción explícita sobre una conexión en autocommit."""
+    conn.exec_driver_sql("BEGIN IMMEDIATE" if conn.dialect.name == "sqlite" else "BEGIN")
+    try:
+        yield
+    except BaseException:
+        conn.exec_driver_sql("ROLLBACK")
+        raise
+    conn.exec_driver_sql("COMMIT")
+
+
+# ---------- Checkpoints ----------
+def checkpoint(conn: Connection, name: str) -> Optional[sa.Row]:
+    checkpoints.create(conn, checkfirst=True)
+    return conn.execute(sa.select(checkpoints).where(checkpoints.c.name == name)).first()
+
+
+def save(conn: Connection, name: str, last_key: Optional[int], copied: int, done: bool = False) -> None:
+    values = {"last_key": last_key, "copied": copied, "done": done, "updated_at": datetime.utcnow()}
+    ins = insert_for(conn, checkpoints).values(name=name, **values)
+    conn.execute(ins.on_conflict_do_update(index_elements=["name"], set_=values))
+
+
+def reset(conn: Connection, name: str) -> None:
+    checkpoints.create(conn, checkfirst=True)
+    conn.execute(checkpoints.delete().where(checkpoints.c.name == name))
+
+
+# ---------- Throttling ----------
+_lag_pool = None
+
+
+def replica_lag() -> Optional[float]:
+    """Mayor retraso (s) entre las réplicas de REPLICA_URLS; None si no hay."""
+    global _lag_pool
+    if not get_settings().REPLICA_URLS.strip():
+        return None
+    if _lag_pool is None:
+        from app.db import replicas
+        _lag_pool = [r for r in replicas.build().replicas if r.path is None]
+    lags = []
+    for r in _lag_pool:
+        r.check()
+        lags.append(r.lag if r.up else float("inf"))
+    return max(lags, default=None)
+
+
+class Batcher:
+    """Tamaño de lote y pausas entre lotes."""
+
+    def __init__(self, batch: Optional[int] = None, target_s: Optional[float] = None,
+                 duty: Optional[float] = None, max_lag_s: Optional[float] = None,
+                 lag: Optional[Callable[[], Optional[float]]] = replica_lag,
+                 min_batch: int = 100, max_batch: int = 50000):
+        s = get_settings()
+        self.batch = batch or s.MIGRATION_BATCH_ROWS
+        self.target_s = target_s if target_s is not None else s.MIGRATION_BATCH_S
+        self.duty = min(1.0, max(0.05, duty if duty is not None else s.MIGRATION_DUTY))
+        self.max_lag_s = max_lag_s if max_lag_s is not None else s.MIGRATION_MAX_LAG_S
+        self.lag = lag
+        self.min_batch, self.max_batch = min_batch, max_batch
+
+    def after(self, elapsed: float, full: bool) -> None:
+        """Ajusta el lote según lo que tardó el último y duerme lo que toque."""
+        if elapsed > 2 * self.target_s:
+            self.batch = max(self.min_batch, self.batch // 2)
+        elif full and elapsed < self.target_s / 2:
+            self.batch = min(self.max_batch, self.batch * 2)
+        if self.duty < 1.0:
+            time.sleep(elapsed * (1 - self.duty) / self.duty)
+        if self.lag is None or self.max_lag_s <= 0:
+            return
+        waited = 0.0
+        while (lag := self.lag()) is not None and lag > self.max_lag_s:
+            if waited == 0.0:
+                log.info("Réplicas con %.1fs de retraso; esperando", lag)
+            time.sleep(1.0)
+            waited += 1.0
+
+
+# ---------- Lotes por rango de llave ----------
+def run_batches(conn: Connection, name: str, table: str, step: Callable[[int, int], int],
+                key: str = "id", batcher: Optional[Batcher] = None) -> int:
+    """
+    Llama `step(lo, hi)` por rangos (lo, hi] de `key` (entera) en orden, hasta
+    el máximo que había al empezar. Guarda el avance tras cada lote; devuelve
+    el total que reportó `step`.
+    """
+    _check(conn)
+    batcher = batcher or Batcher()
+    cp = checkpoint(conn, name)
+    if cp is not None and cp.done:
+        return cp.copied
+    t, k = _q(conn, table), _q(conn, key)
+    lo_hi = conn.exec_driver_sql(f"SELECT min({k}), max({k}) FROM {t}").first()
+    if lo_hi[0] is None:
+        save(conn, name, None, 0, done=True)
+        return 0
+    end = lo_hi[1]
+    lo = cp.last_key if cp is not None and cp.last_key is not None else lo_hi[0] - 1
+    total = cp.copied if cp is not None else 0
+    next_hi = sa.text(
+        f"SELECT max(k) FROM (SELECT {k} AS k FROM {t} WHERE {k} > :lo AND {k} <= :end "
+        f"ORDER BY {k} LIMIT :n) x"
+    )
+    t0 = last_log = time.monotonic()
+    done0 = total
+    while True:
+        hi = conn.execute(next_hi, {"lo": lo, "end": end, "n": batcher.batch}).scalar()
+        if hi is None:
+            break
+        started = time.monotonic()
+        total += step(lo, hi)
+        save(conn, name, hi, total)
+        lo = hi
+        now = time.monotonic()
+        if now - last_log >= LOG_EVERY_S:
+            rate = (total - done0) / max(now - t0, 1e-9)
+            log.info("%s: %s filas, llave %s de %s, %.0f filas/s, lote %s",
+                     name, f"{total:,}", hi, end, rate, batcher.batch)
+            last_log = now
+        batcher.after(now - started, hi < end)
+    save(conn, name, lo, total, done=True)
+    log.info("%s: listo, %s filas", name, f"{total:,}")
+    return total
+
+
+def backfill(conn: Connection, name: str, table: str, sql: str, key: str = "id",
+             batcher: Optional[Batcher] = None) -> int:
+    """
+    UPDATE/DELETE por lotes. `sql` filtra con `:lo` / `:hi` sobre `key`, p. ej.
+    "UPDATE vehicles SET vin = NULL WHERE id > :lo AND id <= :hi AND ...".
+    """
+    stmt = sa.text(sql)
+    return run_batches(conn, name, table, lambda lo, hi: conn.execute(stmt, {"lo": lo, "hi": hi}).rowcount,
+                       key, batcher)
+
+
+# ---------- Índices ----------
+def _index_name_used(conn: Connection, name: str) -> bool:
+    if conn.dialect.name == "sqlite":
+        sql = "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :n"
+    else:
+        sql = "SELECT 1 FROM pg_class WHERE relkind = 'i' AND relname = :n AND pg_table_is_visible(oid)"
+    return conn.execute(sa.text(sql), {"n": name}).first() is not None
+
+
+def create_index(conn: Connection, index: sa.Index) -> None:
+    """CREATE INDEX sin bloquear escrituras en Postgres; idempotente."""
+    if _check(conn) == "postgresql":
+        valid = conn.execute(sa.text(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :n AND pg_table_is_visible(c.oid)"
+        ), {"n": index.name}).scalar()
+        if valid is False:  # quedó a medias
+            log.info("Índice %s inválido; se vuelve a crear", index.name)
+            conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {_q(conn, index.name)}")
+        index.dialect_options["postgresql"]["concurrently"] = True
+    t0 = time.monotonic()
+    conn.execute(CreateIndex(index, if_not_exists=True))
+    log.info("Índice %s listo en %.1fs", index.name, time.monotonic() - t0)
+
+
+def _index_on(index: sa.Index, table: sa.Table, name: str) -> sa.Index:
+    return sa.Index(name, *[table.c[c.name] for c in index.columns], unique=index.unique,
+                    **index.dialect_kwargs)
+
+
+# ---------- Reescritura por tabla sombra ----------
+class Rebuild(NamedTuple):
+    table: sa.Table        # definición final (mismo nombre que la tabla vieja)
+    columns: Dict[str, str]  # columna final -> expresión sobre la fila vieja `{r}`
+    key: str = "id"
+
+
+def shadow_name(name: str) -> str:
+    return SHADOW + name
+
+
+def old_name(name: str) -> str:
+    return OLD + name
+
+
+def _shadow_table(table: sa.Table, rebuilt: Set[str]) -> sa.Table:
+    """Copia de `table` como `_new_<tabla>`; sus FK apuntan a las sombras de los padres reescritos."""
+    md = sa.MetaData()
+    name = shadow_name(table.name)
+    args: List = [sa.Column(c.name, c.type, nullable=c.nullable, autoincrement=c.autoincrement,
+                            server_default=None if c.server_default is None else sa.DefaultClause(c.server_default.arg))
+                  for c in table.columns]
+    args.append(sa.PrimaryKeyConstraint(*[c.name for c in table.primary_key.columns], name=f"{name}_pkey"))
+    for fk in table.foreign_key_constraints:
+        parent = fk.elements[0].target_fullname.split(".")[0]
+        target = shadow_name(parent) if parent in rebuilt else parent
+        refs = [e.target_fullname.split(".")[1] for e in fk.elements]
+        if target not in md.tables:
+            sa.Table(target, md, *[sa.Column(r, sa.Integer, primary_key=True) for r in refs])
+        args.append(sa.ForeignKeyConstraint(
+            [c.name for c in fk.columns], [f"{target}.{r}" for r in refs], ondelete=fk.ondelete,
+            name=f"{table.name}_{'_'.join(c.name for c in fk.columns)}_fkey",
+        ))
+    return sa.Table(name, md, *args)
+
+
+def _guards(conn: Connection, spec: Rebuild, r: str, rebuilt: Set[str]) -> List[str]:
+    """EXISTS del padre por cada FK: filas huérfanas o cuyo padre aún no llega a la sombra no se copian."""
+    out = []
+    for fk in spec.table.foreign_key_constraints:
+        parent, ref = fk.elements[0].target_fullname.split(".")
+        target = shadow_name(parent) if parent in rebuilt else parent
+        expr = spec.columns[fk.elements[0].parent.name].format(r=r)
+        out.append(f"EXISTS (SELECT 1 FROM {_q(conn, target)} p WHERE p.{_q(conn, ref)} = {expr})")
+    return out
+
+
+def _upsert_sql(conn: Connection, spec: Rebuild, r: str, rebuilt: Set[str]) -> str:
+    cols = list(spec.columns)
+    quoted = [_q(conn, c) for c in cols]
+    exprs = [spec.columns[c].format(r=r) for c in cols]
+    where = " AND ".join(_guards(conn, spec, r, rebuilt)) or "1 = 1"
+    sets = ", ".join(f"{c} = excluded.{c}" for c in quoted if c != _q(conn, spec.key))
+    return (f"INSERT INTO {_q(conn, shadow_name(spec.table.name))} ({', '.join(quoted)}) "
+            f"SELECT {', '.join(exprs)} WHERE {where} "
+            f"ON CONFLICT ({_q(conn, spec.key)}) DO UPDATE SET {sets}")
+
+
+def _trigger_names(table: str) -> List[str]:
+    return [f"_om_{table}_{op}" for op in ("ins", "upd", "del")]
+
+
+def _install_triggers(conn: Connection, spec: Rebuild, rebuilt: Set[str]) -> None:
+    src, k = spec.table.name, _q(conn, spec.key)
+    shadow = _q(conn, shadow_name(src))
+    if conn.dialect.name == "sqlite":
+        ins, upd, dele = _trigger_names(src)
+        upsert = _upsert_sql(conn, spec, "NEW", rebuilt)
+        conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {ins} AFTER INSERT ON {_q(conn, src)} BEGIN {upsert}; END")
+        conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {upd} AFTER UPDATE ON {_q(conn, src)} BEGIN {upsert}; END")
+        conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {dele} AFTER DELETE ON {_q(conn, src)} "
+                             f"BEGIN DELETE FROM {shadow} WHERE {k} = OLD.{k}; END")
+        return
+    fn = f"_om_{src}_sync"
+    with _atomic(conn):
+        conn.exec_driver_sql(
+            f"CREATE OR REPLACE FUNCTION {fn}() RETURNS trigger LANGUAGE plpgsql AS $$\n"
+            f"BEGIN\n"
+            f"  IF TG_OP = 'DELETE' THEN\n"
+            f"    DELETE FROM {shadow} WHERE {k} = OLD.{k};\n"
+            f"    RETURN OLD;\n"
+            f"  END IF;\n"
+            f"  {_upsert_sql(conn, spec, 'NEW', rebuilt)};\n"
+            f"  RETURN NEW;\n"
+            f"END $$"
+        )
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {fn} ON {_q(conn, src)}")
+        conn.exec_driver_sql(f"CREATE TRIGGER {fn} AFTER INSERT OR UPDATE OR DELETE ON {_q(conn, src)} "
+                             f"FOR EACH ROW EXECUTE FUNCTION {fn}()")
+
+
+def _drop_triggers(conn: Connection, table: str) -> None:
+    if conn.dialect.name == "sqlite":
+        for name in _trigger_names(table):
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {name}")
+    else:
+        fn = f"_om_{table}_sync"
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {fn} ON {_q(conn, table)}")
+        conn.exec_driver_sql(f"DROP FUNCTION IF EXISTS {fn}()")
+
+
+def _copy(conn: Connection, plan: str, spec: Rebuild, rebuilt: Set[str], batcher: Batcher) -> int:
+    cols = list(spec.columns)
+    k = _q(conn, spec.key)
+    where = " AND ".join([f"s.{k} > :lo", f"s.{k} <= :hi"] + _guards(conn, spec, "s", rebuilt))
+    lock = " FOR SHARE OF s" if conn.dialect.name == "postgresql" else ""  # que un DELETE concurrente espere al lote
+    stmt = sa.text(
+        f"INSERT INTO {_q(conn, shadow_name(spec.table.name))} ({', '.join(_q(conn, c) for c in cols)}) "
+        f"SELECT {', '.join(spec.columns[c].format(r='s') for c in cols)} "
+        f"FROM {_q(conn, spec.table.name)} s WHERE {where}{lock} ON CONFLICT DO NOTHING"
+    )
+    return run_batches(conn, f"{plan}:{spec.table.name}", spec.table.name,
+                       lambda lo, hi: conn.execute(stmt, {"lo": lo, "hi": hi}).rowcount, spec.key, batcher)
+
+
+def rebuild(conn: Connection, plan: str, specs: List[Rebuild], batcher: Optional[Batcher] = None) -> None:
+    """
+    Reescribe `specs` (de padres a hijos) sin cortar escrituras: sombra +
+    triggers, copia por lotes, índices, y renombres en una transacción.
+    Retomable: volver a llamarla sigue desde el último lote guardado.
+    """
+    dialect = _check(conn)
+    batcher = batcher or Batcher()
+    rebuilt = {s.table.name for s in specs}
+    shadows = {s.table.name: _shadow_table(s.table, rebuilt) for s in specs}
+    late: Dict[str, List[sa.Index]] = {}  # SQLite: índices cuyo nombre aún usa la tabla vieja
+
+    for spec in specs:
+        name, shadow = spec.table.name, shadows[spec.table.name]
+        if not sa.inspect(conn).has_table(shadow.name):
+            reset(conn, f"{plan}:{name}")  # sombra nueva: el avance anterior no vale
+            conn.execute(CreateTable(shadow))
+            log.info("Sombra %s creada", shadow.name)
+        if dialect == "sqlite":
+            for ix in spec.table.indexes:
+                if _index_name_used(conn, ix.name) and not _index_on_table(conn, ix.name, shadow.name):
+                    late.setdefault(name, []).append(ix)
+                else:
+                    conn.execute(CreateIndex(_index_on(ix, shadow, ix.name), if_not_exists=True))
+        _install_triggers(conn, spec, rebuilt)
+
+    for spec in specs:
+        _copy(conn, plan, spec, rebuilt, batcher)
+
+    if dialect == "postgresql":
+        for spec in specs:
+            shadow = shadows[spec.table.name]
+            for ix in spec.table.indexes:
+                create_index(conn, _index_on(ix, shadow, shadow_name(ix.name)))
+
+    _swap(conn, specs, late)
+    log.info("Tablas reescritas: %s (las viejas quedan como %s*)", ", ".join(sorted(rebuilt)), OLD)
+
+
+def _index_on_table(conn: Connection, index: str, table: str) -> bool:
+    return conn.execute(sa.text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :n AND tbl_name = :t"
+    ), {"n": index, "t": table}).first() is not None
+
+
+def _retry_locks(fn: Callable[[], List[tuple]], what: str) -> List[tuple]:
+    """Postgres: reintenta `fn` (una transacción con lock_timeout) mientras otro tenga la tabla."""
+    for attempt in range(1, SWAP_RETRIES + 1):
+        try:
+            return fn()
+        except OperationalError as e:  # lock_timeout: alguien tenía la tabla; se reintenta
+            if "lock timeout" not in str(e) or attempt == SWAP_RETRIES:
+                raise
+            log.info("%s esperando locks (intento %s)", what, attempt)
+            time.sleep(min(30.0, 0.5 * 2 ** attempt))
+
+
+def _validate(conn: Connection, constraints: List[tuple]) -> None:
+    for table, constraint in constraints:  # sin bloquear escrituras
+        conn.exec_driver_sql(f"ALTER TABLE {_q(conn, table)} VALIDATE CONSTRAINT {_q(conn, constraint)}")
+
+
+def _swap(conn: Connection, specs: List[Rebuild], late: Dict[str, List[sa.Index]]) -> None:
+    if conn.dialect.name == "sqlite":
+        _swap_sqlite(conn, specs, late)
+    else:
+        _validate(conn, _retry_locks(lambda: _swap_pg(conn, specs), "Cambio de tablas"))
+
+
+def _swap_sqlite(conn: Connection, specs: List[Rebuild], late: Dict[str, List[sa.Index]]) -> None:
+    # foreign_keys=OFF + legacy_alter_table=ON: renombrar la vieja no reescribe
+    # las FK que la nombran (tablas hijas no reescritas apuntan luego a la nueva)
+    conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+    try:
+        with _atomic(conn):
+            conn.exec_driver_sql("PRAGMA legacy_alter_table=ON")
+            moved = []  # triggers de la app (p. ej. el FTS de app/services/search.py): pasan a la nueva
+            for spec in specs:
+                _drop_triggers(conn, spec.table.name)
+                for name, ddl in conn.execute(sa.text(
+                    "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :t"
+                ), {"t": spec.table.name}).all():
+                    conn.exec_driver_sql(f"DROP TRIGGER {_q(conn, name)}")
+                    moved.append(ddl)
+                conn.exec_driver_sql(f"ALTER TABLE {_q(conn, spec.table.name)} "
+                                     f"RENAME TO {_q(conn, old_name(spec.table.name))}")
+            conn.exec_driver_sql("PRAGMA legacy_alter_table=OFF")
+            for spec in specs:
+                conn.exec_driver_sql(f"ALTER TABLE {_q(conn, shadow_name(spec.table.name))} "
+                                     f"RENAME TO {_q(conn, spec.table.name)}")
+            for ddl in moved:
+                conn.exec_driver_sql(ddl)
+            for spec in specs:  # SQLite no renombra índices: se rehacen con su nombre
+                for ix in late.get(spec.table.name, []):
+                    t0 = time.monotonic()
+                    conn.exec_driver_sql(f"DROP INDEX IF EXISTS {_q(conn, ix.name)}")
+                    conn.execute(CreateIndex(_index_on(ix, spec.table, ix.name)))
+                    log.info("Índice %s listo en %.1fs", ix.name, time.monotonic() - t0)
+    finally:
+        conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+    for spec in specs:
+        bad = conn.exec_driver_sql(f"PRAGMA foreign_key_check({_q(conn, spec.table.name)})").fetchall()
+        if bad:
+            log.warning("%s: %s filas con FK rota tras el cambio", spec.table.name, len(bad))
+
+
+def _pg_owned(conn: Connection, table: str) -> List[tuple]:
+    """(INDEX|SEQUENCE, nombre) de los índices y secuencias serial de `table`."""
+    return conn.execute(sa.text(
+        "SELECT 'INDEX', c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE i.indrelid = to_regclass(:t) "
+        "UNION ALL "
+        "SELECT 'SEQUENCE', c.relname FROM pg_depend d JOIN pg_class c ON c.oid = d.objid "
+        "WHERE d.refobjid = to_regclass(:t) AND c.relkind = 'S' AND d.deptype = 'a'"
+    ), {"t": table}).all()
+
+
+def _swap_pg(conn: Connection, specs: List[Rebuild]) -> List[tuple]:
+    """Renombres, secuencias y FK de otras tablas en una transacción; devuelve las FK por validar."""
+    retargeted = []
+    with _atomic(conn):
+        conn.exec_driver_sql(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+        # todos los índices y secuencias de la vieja pasan a _old_*, también los
+        # que el modelo ya no tiene: sus nombres quedan libres para la nueva
+        for spec in specs:
+            name = spec.table.name
+            _drop_triggers(conn, name)
+            owned = _pg_owned(conn, name)
+            conn.exec_driver_sql(f"ALTER TABLE {_q(conn, name)} RENAME TO {_q(conn, old_name(name))}")
+            for kind, obj in owned:
+                conn.exec_driver_sql(f"ALTER {kind} {_q(conn, obj)} RENAME TO {_q(conn, OLD + obj)}")
+        for spec in specs:
+            name, k = spec.table.name, spec.key
+            owned = _pg_owned(conn, shadow_name(name))
+            conn.exec_driver_sql(f"ALTER TABLE {_q(conn, shadow_name(name))} RENAME TO {_q(conn, name)}")
+            for kind, obj in owned:
+                if obj.startswith(SHADOW):
+                    conn.exec_driver_sql(f"ALTER {kind} {_q(conn, obj)} RENAME TO {_q(conn, obj[len(SHADOW):])}")
+            # la secuencia nueva arranca donde iba la vieja (incluye ids ya borrados)
+            conn.execute(sa.text(
+                "SELECT setval(pg_get_serial_sequence(:t, :k), GREATEST("
+                f"  (SELECT coalesce(max({_q(conn, k)}), 0) FROM {_q(conn, name)}),"
+                "   (SELECT coalesce(last_value, 0) FROM pg_sequences "
+                "    WHERE format('%I.%I', schemaname, sequencename)::regclass"
+                "          = pg_get_serial_sequence(:old, :k)::regclass), 1))"
+            ), {"t": name, "old": old_name(name), "k": k})
+        # FK de tablas no reescritas: en Postgres siguen a la tabla vieja por OID
+        olds = [old_name(s.table.name) for s in specs]
+        rows = conn.execute(sa.text(
+            "SELECT c.conrelid::regclass::text, c.conname, c.confrelid::regclass::text, "
+            "       pg_get_constraintdef(c.oid) "
+            "FROM pg_constraint c WHERE c.contype = 'f' "
+            "AND c.confrelid::regclass::text = ANY(:olds) AND NOT (c.conrelid::regclass::text = ANY(:olds))"
+        ), {"olds": olds}).all()
+        for table, constraint, parent, definition in rows:
+            new_parent = parent[len(OLD):]
+            definition = definition.replace(f"REFERENCES {parent}(", f"REFERENCES {_q(conn, new_parent)}(")
+            conn.exec_driver_sql(f"ALTER TABLE {table} DROP CONSTRAINT {_q(conn, constraint)}")
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD CONSTRAINT {_q(conn, constraint)} {definition} NOT VALID")
+            retargeted.append((table, constraint))
+    return retargeted
+
+
+# ---------- FK ----------
+def replace_foreign_keys(conn: Connection, table: sa.Table, fks: List[sa.ForeignKeyConstraint]) -> None:
+    """
+    Postgres: rehace `fks` de `table` con la definición del modelo (p. ej. otro
+    ON DELETE) sin reescribir la tabla: DROP + ADD ... NOT VALID en una
+    transacción corta y VALIDATE después, que no bloquea escrituras. SQLite no
+    puede cambiar una FK: ahí la tabla se reescribe con `rebuild()`.
+    """
+    if _check(conn) != "postgresql":
+        raise NotImplementedError("SQLite: reescribir la tabla con rebuild()")
+    names = {(tuple(fk["constrained_columns"]), fk["referred_table"]): fk["name"]
+             for fk in sa.inspect(conn).get_foreign_keys(table.name)}
+    t = _q(conn, table.name)
+
+    def swap() -> List[tuple]:
+        out = []
+        with _atomic(conn):
+            conn.exec_driver_sql(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+            for fk in fks:
+                cols = [c.name for c in fk.columns]
+                parent = fk.referred_table.name
+                old = names.get((tuple(cols), parent))
+                name = old or f"{table.name}_{'_'.join(cols)}_fkey"
+                if old:
+                    conn.exec_driver_sql(f"ALTER TABLE {t} DROP CONSTRAINT {_q(conn, old)}")
+                refs = ", ".join(_q(conn, e.column.name) for e in fk.elements)
+                on_delete = f" ON DELETE {fk.ondelete}" if fk.ondelete else ""
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {t} ADD CONSTRAINT {_q(conn, name)} FOREIGN KEY "
+                    f"({', '.join(_q(conn, c) for c in cols)}) REFERENCES {_q(conn, parent)} ({refs})"
+                    f"{on_delete} NOT VALID")
+                out.append((table.name, name))
+        return out
+
+    _validate(conn, _retry_locks(swap, f"FK de {table.name}"))
+    log.info("FK de %s rehechas: %s", table.name, ", ".join(c.name for fk in fks for c in fk.columns))
+
+
+def drop_old(conn: Connection, tables: Optional[List[str]] = None) -> List[str]:
+    """Borra las `_old_<tabla>` (todas si no se indican), de hijas a padres."""
+    _check(conn)
+    names = tables or [t for t in sa.inspect(conn).get_table_names() if t.startswith(OLD)]
+    names = [n if n.startswith(OLD) else old_name(n) for n in names]
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")  # sin cascadas hacia las tablas vivas
+    try:
+        for name in _children_first(conn, names):
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {_q(conn, name)}")
+            log.info("%s borrada", name)
+    finally:
+        if conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+    return names
+
+
+def _children_first(conn: Connection, names: List[str]) -> List[str]:
+    insp = sa.inspect(conn)
+    pending, out = set(names), []
+    while pending:
+        # hojas: nadie de lo pendiente las referencia
+        leaves = sorted(n for n in pending if not any(
+            fk["referred_table"] == n for other in pending - {n} for fk in insp.get_foreign_keys(other)))
+        leaves = leaves or sorted(pending)
+        out += leaves
+        pending -= set(leaves)
+    return out
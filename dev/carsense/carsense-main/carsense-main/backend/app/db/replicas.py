@@ -0,0 +1,327 @@
+# backend/app/db/replicas.py
+"""
+Réplicas de lectura para la BD principal (el directorio si hay shards).
+
+`get_db` marca como "de lectura" las sesiones de peticiones GET/HEAD; en
+ellas `ReplicaSession.get_bind` manda cada SELECT a una réplica si:
+
+  * la sesión no ha escrito (cualquier INSERT/UPDATE/DELETE o flush va a la
+    primaria y la sesión se queda ahí hasta el final);
+  * no toca tablas que se leen siempre de la primaria (PRIMARY_TABLES:
+    usuarios, tokens revocados, leases, idempotencia);
+  * hay una réplica sana con retraso <= REPLICA_MAX_LAG_S que ya incluye la
+    última escritura del usuario (leer-lo-escrito).
+
+La marca es `users.last_write_at`: la sesión que escribe para un usuario la
+actualiza en su mismo commit y `get_current_user`, que ya lee esa fila de la
+primaria en cada petición, la deja en la sesión (`pin`). Así funciona entre
+workers y hosts sin estado compartido aparte de la BD. Se compara con la
+frescura de la réplica (hasta cuándo tiene todo) con SLACK de margen.
+
+Réplicas:
+  * REPLICA_URLS: Postgres en streaming. Frescura = último commit aplicado
+    (`pg_last_xact_replay_timestamp`), o ahora si ya aplicó todo lo recibido.
+  * REPLICA_SNAPSHOT_S > 0: para probar en local, una copia de app.db
+    (API de backup de SQLite) que el scheduler rehace cada N s; frescura =
+    cuándo empezó la copia (queda en el mtime del archivo).
+
+Un hilo por worker revisa cada REPLICA_CHECK_S la frescura de cada réplica.
+Métricas: carsense_replica_lag_seconds / carsense_replica_up por réplica y
+carsense_db_route_total por destino y motivo de cada decisión. Estado:
+GET /__debug__/replicas.
+"""
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine, event, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.clock import naive_utc, utcnow
+from app.core.config import get_settings
+
+log = logging.getLogger("carsense.replicas")
+
+metrics.describe("carsense_replica_lag_seconds", "gauge", "Retraso de cada réplica de lectura.")
+metrics.describe("carsense_replica_up", "gauge", "1 si la réplica responde.")
+metrics.describe("carsense_db_route_total", "counter", "Sentencias por destino (primary/replica) y motivo.")
+
+# tablas que se leen siempre de la primaria (consultas chicas y sensibles al retraso)
+PRIMARY_TABLES = frozenset({"users", "revoked_tokens", "scheduler_leases", "apscheduler_jobs", "idempotency_keys"})
+# la marca va truncada al segundo (utcnow) y el commit llega después de
+# escribirla; también cubre relojes algo distintos entre hosts
+SLACK = timedelta(seconds=2)
+
+READ_KEY = "carsense_read"          # en Session.info
+WROTE_KEY = "carsense_wrote"
+USER_KEY = "carsense_user"
+MARKER_KEY = "carsense_last_write"
+REPLICA_KEY = "carsense_replica"
+
+# frescura de una réplica Postgres: si ya aplicó todo lo recibido, ahora
+PG_FRESHNESS = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN now() "
+    "ELSE pg_last_xact_replay_timestamp() END"
+)
+
+
+def enabled() -> bool:
+    s = get_settings()
+    return bool(s.REPLICA_URLS.strip()) or s.REPLICA_SNAPSHOT_S > 0
+
+
+# ---------- Réplicas ----------
+class Replica:
+    def __init__(self, name: str, engine: Engine, path: Optional[str] = None):
+        self.name = name
+        self.engine = engine
+        self.path = path            # archivo SQLite (frescura = mtime) o None (Postgres)
+        self.fresh_at: Optional[datetime] = None
+        self.lag: Optional[float] = None
+        self.up = False
+        self._mtime: Optional[float] = None
+
+    def check(self) -> None:
+        try:
+            if self.path is None:
+                with self.engine.connect() as conn:
+                    fresh = conn.execute(PG_FRESHNESS).scalar()
+                self.fresh_at = naive_utc(fresh) if fresh is not None else None
+            else:
+                mtime = os.stat(self.path).st_mtime
+                if self._mtime is not None and mtime != self._mtime:
+                    self.engine.dispose()  # archivo nuevo: las conexiones abiertas ven el anterior
+                self._mtime = mtime
+                self.fresh_at = datetime.fromtimestamp(mtime, timezone.utc).replace(tzinfo=None)
+            self.up = self.fresh_at is not None
+        except Exception:
+            if self.up:
+                log.warning("Réplica %s sin respuesta", self.name, exc_info=True)
+            self.up = False
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        self.lag = max(0.0, (now - self.fresh_at).total_seconds()) if self.up else None
+
+    def usable(self, since: Optional[datetime], max_lag: float) -> bool:
+        if not self.up or self.lag is None or self.lag > max_lag:
+            return False
+        return since is None or self.fresh_at >= since + SLACK
+
+    def status(self) -> Dict:
+        return {"name": self.name, "up": self.up, "lag_s": self.lag,
+                "fresh_at": self.fresh_at.isoformat() if self.fresh_at else None}
+
+
+class ReplicaPool:
+    def __init__(self, replicas: List[Replica], max_lag: float, check_s: float):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_s = check_s
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._gauges: Dict[tuple, float] = {}
+
+    def pick(self, since: Optional[datetime]) -> Optional[Replica]:
+        ok = [r for r in self.replicas if r.usable(since, self.max_lag)]
+        return random.choice(ok) if ok else None
+
+    def any_up(self) -> bool:
+        return any(r.up and r.lag is not None and r.lag <= self.max_lag for r in self.replicas)
+
+    def check(self) -> None:
+        for r in self.replicas:
+            r.check()
+            labels = (("replica", r.name),)
+            for name, value in (("carsense_replica_up", 1.0 if r.up else 0.0),
+                                ("carsense_replica_lag_seconds", r.lag or 0.0)):
+                metrics.inc(name, labels, value - self._gauges.get((name, labels), 0.0))
+                self._gauges[(name, labels)] = value
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.check()
+        self._thread = threading.Thread(target=self._run, name="carsense-replicas", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(10)
+            self._thread = None
+        for r in self.replicas:
+            r.engine.dispose()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.check_s):
+            try:
+                self.check()
+            except Exception:
+                log.exception("No se pudo revisar las réplicas")
+
+
+def _engine(url: str, name: str) -> Engine:
+    from app.core import slow_queries
+
+    s = get_settings()
+    kw = {"connect_args": {"check_same_thread": False}} if url.startswith("sqlite") else {}
+    eng = create_engine(url, poolclass=metrics.InstrumentedQueuePool if s.METRICS_ENABLED else None, **kw)
+    if s.METRICS_ENABLED:
+        metrics.instrument_engine(eng, name)
+    if s.SLOW_QUERY_MS > 0:
+        slow_queries.install(eng, s.SLOW_QUERY_MS, s.SLOW_QUERY_TOP_N)
+    return eng
+
+
+def build() -> ReplicaPool:
+    s = get_settings()
+    replicas = []
+    if s.REPLICA_SNAPSHOT_S > 0:
+        path = os.path.abspath(s.REPLICA_SNAPSHOT_PATH)
+        # sólo lectura: una escritura mal ruteada falla en vez de perderse en la copia
+        replicas.append(Replica("snapshot", _engine(f"sqlite:///file:{path}?mode=ro&uri=true", "snapshot"), path))
+    for i, url in enumerate(u.strip() for u in s.REPLICA_URLS.split(",")):
+        if url:
+            path = url.split("///", 1)[1] if url.startswith("sqlite") else None
+            replicas.append(Replica(f"replica{i}", _engine(url, f"replica{i}"), path))
+    return ReplicaPool(replicas, s.REPLICA_MAX_LAG_S, s.REPLICA_CHECK_S)
+
+
+_pool: Optional[ReplicaPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[ReplicaPool]:
+    """Réplicas del proceso (None si no hay); la primera llamada arranca el hilo de revisión."""
+    global _pool
+    if _pool is None and enabled():
+        with _pool_lock:
+            if _pool is None:
+                p = build()
+                p.start()
+                _pool = p
+    return _pool
+
+
+def shutdown() -> None:
+    if _pool is not None:
+        _pool.stop()
+
+
+# ---------- Réplica local (copia de la BD) ----------
+def snapshot(src_path: str, dest_path: str) -> float:
+    """Copia consistente de src en dest (atómica); el mtime de dest es cuándo empezó. Segundos que tardó."""
+    started = time.time()
+    tmp = f"{dest_path}.{os.getpid()}.tmp"
+    src, dst = sqlite3.connect(src_path), sqlite3.connect(tmp)
+    try:
+        src.backup(dst)  # de un solo paso: ve un estado de la BD, sin escrituras a medias
+    finally:
+        src.close()
+        dst.close()
+    os.utime(tmp, (started, started))
+    os.replace(tmp, dest_path)
+    return time.time() - started
+
+
+def refresh_snapshot() -> None:
+    from app.db.session import engine
+
+    snapshot(engine.url.database, os.path.abspath(get_settings().REPLICA_SNAPSHOT_PATH))
+
+
+# ---------- Ruteo ----------
+def mark_read(db: Session) -> None:
+    """Sesión de una petición de sólo lectura: sus SELECT pueden ir a una réplica."""
+    if enabled():
+        db.info[READ_KEY] = True
+
+
+def pin(db: Session, user) -> None:
+    """Usuario de la petición: sus escrituras mueven la marca y sus lecturas la respetan."""
+    if enabled():
+        db.info[USER_KEY] = user.id
+        db.info[MARKER_KEY] = user.last_write_at
+
+
+def _is_read(clause) -> bool:
+    if clause is None:
+        return False  # flush del ORM, session.connection()
+    if getattr(clause, "is_select", False):
+        return True
+    sql = getattr(clause, "text", None)  # text(): FTS y similares
+    return isinstance(sql, str) and sql.lstrip()[:6].upper() == "SELECT"
+
+
+def _route(target: str, reason: str) -> None:
+    metrics.inc("carsense_db_route_total", (("target", target), ("reason", reason)))
+
+
+def choose(db: Session, primary: Engine, mapper, clause) -> Engine:
+    info = db.info
+    if not _is_read(clause):
+        info[WROTE_KEY] = True
+        if info.get(READ_KEY):
+            _route("primary", "write")
+        return primary
+    if not info.get(READ_KEY):
+        return primary
+    from app.db.session import engine
+
+    if primary is not engine:
+        _route("primary", "shard")  # los shards no tienen réplicas
+        return primary
+    if info.get(WROTE_KEY):
+        _route("primary", "sticky")
+        return primary
+    from app.db.shards import statement_tables
+
+    tables = statement_tables(mapper, clause)
+    if tables is not None and tables & PRIMARY_TABLES:
+        _route("primary", "table")
+        return primary
+    replica = info.get(REPLICA_KEY)
+    if replica is None:
+        pool = get_pool()
+        replica = pool.pick(info.get(MARKER_KEY)) if pool is not None else None
+        if replica is None:
+            _route("primary", "ryw" if pool is not None and pool.any_up() else "lag")
+            return primary
+        info[REPLICA_KEY] = replica  # toda la petición lee de la misma réplica
+    _route("replica", replica.name)
+    return replica.engine
+
+
+class ReplicaSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kw):
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kw)
+        if bind is not None:
+            return primary
+        return choose(self, primary, mapper, clause)
+
+
+@event.listens_for(ReplicaSession, "before_commit")
+def _mark_write(session: Session) -> None:
+    """La sesión escribió para un usuario: mueve su marca en el mismo commit."""
+    info = session.info
+    uid = info.get(USER_KEY)
+    if uid is None or not (info.get(WROTE_KEY) or session.new or session.dirty or session.deleted):
+        return
+    from app.db import shards
+    from app.db.models import User
+
+    now = utcnow()
+    # datos en un shard: sus lecturas nunca van a réplica, y la marca tomaría
+    # el lock de escritura del directorio en cada escritura
+    if shards.current(session) is None and info.get(MARKER_KEY) != now:
+        session.execute(update(User).where(User.id == uid).values(last_write_at=now))
+        info[MARKER_KEY] = now
+    info[WROTE_KEY] = False
+    info.pop(REPLICA_KEY, None)
+
@@ -1,13 +1,61 @@
 # backend/app/db/session.py
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import sqlite3
+
+from sqlalchemy import create_engine, event
+from fastapi import Request
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import get_settings
+from app.core import metrics, slow_queries
+from app.db import replicas
+
+settings = get_settings()
+
+
+# SQLite ignora ON DELETE CASCADE salvo con foreign_keys=ON (por conexión).
+# Se aplica a todo engine SQLite del proceso (app, seeds, benchmarks).
+@event.listens_for(Engine, "connect")
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cur = dbapi_connection.cursor()
+        cur.execute("PRAGMA foreign_keys=ON")
+        cur.close()
+
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./app.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=metrics.InstrumentedQueuePool if settings.METRICS_ENABLED else None,
+)
+if settings.METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+if settings.SLOW_QUERY_MS > 0:
+    slow_queries.install(engine, settings.SLOW_QUERY_MS, settings.SLOW_QUERY_TOP_N)
+
+# Clase de sesión según el despliegue: ReplicaSession (GET/HEAD a réplicas,
+# app/db/replicas.py) por fuera de RoutingSession (shard del usuario,
+# app/db/shards.py; app.db queda como directorio).
+_bases = []
+if replicas.enabled():
+    _bases.append(replicas.ReplicaSession)
+if settings.SHARD_COUNT > 0:
+    from app.db.shards import RoutingSession
+    _bases.append(RoutingSession)
+if not _bases:
+    _session_class = Session
+elif len(_bases) == 1:
+    _session_class = _bases[0]
+else:
+    _session_class = type("AppSession", tuple(_bases), {})
+SessionLocal = sessionmaker(class_=_session_class, autocommit=False, autoflush=False,
+                            bind=None if settings.SHARD_COUNT > 0 else engine)
 
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    if request.method in ("GET", "HEAD"):
+        replicas.mark_read(db)
     try:
         yield db
     finally:
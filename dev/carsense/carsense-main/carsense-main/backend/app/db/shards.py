@@ -0,0 +1,303 @@
+# backend/app/db/shards.py
+"""
+Modo con shards (SHARD_COUNT > 0, sólo SQLite): cada BD SQLite serializa sus
+escrituras, así que los datos de usuario se reparten por `owner_id` en
+SHARD_COUNT archivos (SHARD_DIR/shard-NN.db) y se escribe en paralelo.
+
+  * Directorio: la BD de siempre (app.db). Guarda `users` (con la asignación
+    `users.shard`), tokens revocados y leases: lo que se consulta antes de
+    saber el shard. Usuarios con shard NULL siguen con sus datos aquí (los de
+    antes de activar los shards, hasta que el rebalanceo los mueva).
+  * Shards: el resto de las tablas más una copia mínima de la fila del
+    usuario ("sombra": id y email) para que las FK y los JOIN con users
+    funcionen dentro del shard. La contraseña nunca sale del directorio.
+
+Ruteo: `RoutingSession.get_bind` manda al directorio lo que sólo toca tablas
+globales y el resto al shard elegido con `route()`, que `get_current_user`
+llama al identificar al usuario; los routers no cambian. Sin shard elegido,
+tocar una tabla de datos es un error (ShardNotSelected) y no una escritura en
+el lugar equivocado. Una petición puede abrir dos transacciones (directorio y
+shard); no hay commit atómico entre ambas, por eso lo que cruza (alta de
+usuario, mudanzas) está ordenado para poder repetirse.
+
+Tareas de flota (scheduler, jobs): `sessions()` / `data_engines()` recorren
+el directorio y cada shard; `fanout()` corre una consulta en todos en
+paralelo y devuelve los resultados para combinarlos (p. ej. /dtc/top).
+
+Cursores de /sync: `change_log` es AUTOINCREMENT y en el shard k su secuencia
+arranca en (k + 1) << 40, así que el cursor dice de qué BD salió; uno de otra
+BD (el usuario se mudó) fuerza un reset completo.
+
+Mudanzas: `python -m app.jobs.rebalance_shards`. Reparto actual:
+GET /__debug__/shards. Rendimiento de escritura: `python -m bench.shard_writes`.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, create_engine, distinct, func, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.util import find_tables
+
+from app.core.config import get_settings
+
+# tablas que viven sólo en el directorio
+GLOBAL_TABLES = frozenset({"users", "revoked_tokens", "scheduler_leases", "apscheduler_jobs"})
+CURSOR_BITS = 40  # cursores de /sync: (shard + 1) << 40 + id
+
+SHARD_KEY = "carsense_shard"  # en Session.info
+_UNSET = object()
+
+
+class ShardNotSelected(RuntimeError):
+    pass
+
+
+def enabled() -> bool:
+    return get_settings().SHARD_COUNT > 0
+
+
+def count() -> int:
+    return get_settings().SHARD_COUNT
+
+
+def directory():
+    from app.db.session import engine
+    return engine
+
+
+# ---------- Engines por shard ----------
+_engines: Dict[int, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def path(shard: int) -> str:
+    return os.path.join(get_settings().SHARD_DIR, f"shard-{shard:02d}.db")
+
+
+def engine_for(shard: Optional[int]) -> Engine:
+    """Engine de un shard (None = el directorio). Crea el archivo y las tablas la primera vez."""
+    if shard is None:
+        return directory()
+    eng = _engines.get(shard)
+    if eng is None:
+        with _engines_lock:
+            eng = _engines.get(shard)
+            if eng is None:
+                eng = _engines[shard] = _create(shard)
+    return eng
+
+
+def _create(shard: int) -> Engine:
+    from app.core import metrics, slow_queries
+    from app.db.base import Base
+
+    s = get_settings()
+    os.makedirs(s.SHARD_DIR, exist_ok=True)
+    eng = create_engine(f"sqlite:///{path(shard)}", connect_args={"check_same_thread": False},
+                        poolclass=metrics.InstrumentedQueuePool if s.METRICS_ENABLED else None)
+    if s.METRICS_ENABLED:
+        metrics.instrument_engine(eng)
+    if s.SLOW_QUERY_MS > 0:
+        slow_queries.install(eng, s.SLOW_QUERY_MS, s.SLOW_QUERY_TOP_N)
+    tables = [t for t in Base.metadata.sorted_tables if t.name == "users" or t.name not in GLOBAL_TABLES]
+    Base.metadata.create_all(bind=eng, tables=tables)
+    with eng.begin() as conn:
+        # cursores de /sync distinguibles por shard (ver cursor_tag)
+        conn.execute(text(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT 'change_log', :base "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'change_log')"
+        ), {"base": (shard + 1) << CURSOR_BITS})
+    return eng
+
+
+def keys() -> List[Optional[int]]:
+    """BDs con datos de usuario: el directorio (None) y cada shard."""
+    return [None] + list(range(count())) if enabled() else [None]
+
+
+def data_engines() -> List[Engine]:
+    return [engine_for(k) for k in keys()]
+
+
+def owner_here(key: Optional[int], user=None):
+    """
+    Filtro de las tareas de flota en la BD `key` (None = directorio): dueños
+    cuyos datos viven ahí y que no se están mudando. En el shard origen la
+    sombra queda con `shard_moving` hasta que la mudanza purga sus datos.
+    `user`: entidad o alias de User ya unido a la consulta.
+    """
+    from app.db.models import User
+
+    u = User if user is None else user
+    cond = u.shard_moving.is_(False)
+    if key is None and enabled():
+        cond = and_(cond, u.shard.is_(None))  # en el directorio, sólo los que no tienen shard
+    return cond
+
+
+def dispose() -> None:
+    with _engines_lock:
+        for eng in _engines.values():
+            eng.dispose()
+        _engines.clear()
+
+
+# ---------- Asignación ----------
+def placement(user_id: int) -> int:
+    """Shard de un usuario nuevo (o destino del rebalanceo)."""
+    return user_id % count()
+
+
+def ensure_shadow(shard: Optional[int], user_id: int, email: str) -> None:
+    """
+    Fila sombra del usuario en su shard (idempotente). Una sombra con el mismo
+    email y otro id es de una cuenta ya borrada cuyo alta no llegó a anotar el
+    shard (ver assign): se quita para que no choque con el email único.
+    """
+    if shard is None:
+        return
+    from app.db.dialect import insert_for
+    from app.db.models import User
+
+    eng = engine_for(shard)
+    with eng.begin() as conn:
+        t = User.__table__
+        conn.execute(t.delete().where(t.c.email == email, t.c.id != user_id))
+        ins = insert_for(conn, t)
+        conn.execute(ins.on_conflict_do_update(index_elements=["id"], set_={"email": ins.excluded.email}),
+                     {"id": user_id, "email": email, "password_hash": "", "shard": shard})
+
+
+def assign(db: Session, user) -> None:
+    """
+    Alta de usuario: elige shard, crea la sombra y sólo entonces lo anota en el
+    directorio. Si se cae en medio, el usuario queda con shard NULL (sus datos
+    en el directorio) y una sombra sin datos en el shard; nunca con un shard
+    anotado sin sombra.
+    """
+    if not enabled():
+        return
+    if user.id is None:
+        db.flush()
+    shard = placement(user.id)
+    ensure_shadow(shard, user.id, user.email)
+    user.shard = shard
+    db.commit()
+
+
+def delete_shadows(db: Session, user_ids: List[int]) -> None:
+    """Borra las sombras (y por cascada los datos) de usuarios antes de borrarlos del directorio.
+
+    change_log e idempotency_keys no tienen FK a users: se borran aparte.
+    """
+    if not enabled() or not user_ids:
+        return
+    from app.db import delete_children
+    from app.db.models import UNLINKED_USER_TABLES, User
+
+    rows = db.execute(select(User.shard, User.id).where(User.id.in_(user_ids), User.shard.is_not(None))).all()
+    by_shard: Dict[int, List[int]] = {}
+    for shard, uid in rows:
+        by_shard.setdefault(shard, []).append(uid)
+    for shard, ids in by_shard.items():
+        with engine_for(shard).begin() as conn:
+            for t in UNLINKED_USER_TABLES:
+                conn.execute(t.delete().where(t.c.owner_id.in_(ids)))
+            delete_children(conn, User.__table__, User.__table__.c.id.in_(ids))
+            conn.execute(User.__table__.delete().where(User.__table__.c.id.in_(ids)))
+
+
+# ---------- Sesión con ruteo ----------
+def statement_tables(mapper, clause) -> Optional[frozenset]:
+    """Tablas que toca la sentencia; None si no se sabe (SQL crudo)."""
+    if mapper is not None and mapper.persist_selectable.name not in GLOBAL_TABLES:
+        return frozenset((mapper.persist_selectable.name,))  # camino rápido: ya es de datos
+    names = set()
+    if clause is not None:
+        names.update(t.name for t in find_tables(clause, include_crud=True, check_columns=True)
+                     if hasattr(t, "name"))
+    if mapper is not None:
+        names.add(mapper.persist_selectable.name)
+    return frozenset(names) or None
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kw):
+        if bind is not None:
+            return bind
+        shard = self.info.get(SHARD_KEY, _UNSET)
+        tables = statement_tables(mapper, clause)
+        if tables is None:
+            # dialecto, text() (p. ej. FTS): el shard elegido o el directorio
+            return directory() if shard is _UNSET else engine_for(shard)
+        if tables <= GLOBAL_TABLES:
+            return directory()
+        if shard is _UNSET:
+            raise ShardNotSelected(f"Consulta a {', '.join(sorted(tables))} sin shard elegido (falta route())")
+        return engine_for(shard)
+
+
+def route(db: Session, shard: Optional[int]) -> None:
+    """Fija el shard de la sesión (None = datos en el directorio)."""
+    if enabled():
+        db.info[SHARD_KEY] = shard
+
+
+def current(db: Session) -> Optional[int]:
+    return db.info.get(SHARD_KEY)
+
+
+def cursor_tag(db: Session) -> int:
+    """0 = directorio, k + 1 = shard k (bits altos de los cursores de /sync)."""
+    shard = current(db) if enabled() else None
+    return 0 if shard is None else shard + 1
+
+
+def session(shard: Optional[int] = None) -> Session:
+    """Sesión fija en una BD de datos (tareas de flota)."""
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    route(db, shard)
+    return db
+
+
+def sessions() -> Iterator[Session]:
+    """Una sesión (ya cerrada al avanzar) por cada BD con datos."""
+    for k in keys():
+        with session(k) as db:
+            yield db
+
+
+def fanout(fn: Callable[[Session], object], shards: Optional[List[Optional[int]]] = None) -> List[Tuple[Optional[int], object]]:
+    """Corre fn(sesión) en cada BD con datos, en paralelo; [(shard, resultado)]."""
+    targets = keys() if shards is None else shards
+
+    def one(k):
+        with session(k) as db:
+            return k, fn(db)
+
+    if len(targets) == 1:
+        return [one(targets[0])]
+    with ThreadPoolExecutor(max_workers=min(len(targets), get_settings().SHARD_FANOUT_THREADS),
+                            thread_name_prefix="carsense-fanout") as pool:
+        return list(pool.map(one, targets))
+
+
+def stats() -> List[Dict]:
+    """Dueños, vehículos y tamaño por BD (para /admin/shards)."""
+    from app.db.models import Vehicle
+
+    def one(db: Session):
+        owners, vehicles = db.execute(select(func.count(distinct(Vehicle.owner_id)), func.count(Vehicle.id))).one()
+        return {"owners": owners, "vehicles": vehicles}
+
+    out = []
+    for k, r in fanout(one):
+        p = path(k) if k is not None else None
+        r.update(shard=k, bytes=os.path.getsize(p) if p and os.path.exists(p) else None)
+        out.append(r)
+    return out
@@ -0,0 +1,38 @@
+# backend/app/jobs/backfill_costs.py
+"""
+Reconstruye `service_cost_monthly` a partir de service_records (una
+transacción por BD; altas y bajas esperan a que termine, ver costs.backfill).
+
+    python -m app.jobs.backfill_costs --batch 10000
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine
+
+from app.db.base import Base
+from app.services.costs import backfill
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Backfill de resúmenes de costos")
+    ap.add_argument("--db", default=None, help="URL de BD (por defecto la de app.db.session)")
+    ap.add_argument("--batch", type=int, default=5000, help="servicios por lote (todo va en una transacción)")
+    args = ap.parse_args()
+
+    if args.db:
+        engines = [create_engine(args.db)]
+    else:
+        from app.db import shards
+        engines = shards.data_engines()  # el directorio y cada shard
+    t0 = time.perf_counter()
+    n = 0
+    for engine in engines:
+        Base.metadata.create_all(bind=engine)
+        with engine.connect() as conn:
+            n += backfill(conn, args.batch)
+    print(f"Listo en {time.perf_counter() - t0:.1f}s: {n:,} servicios")
+
+
+if __name__ == "__main__":
+    main()
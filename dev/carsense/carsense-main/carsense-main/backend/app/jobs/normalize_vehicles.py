@@ -0,0 +1,86 @@
+# backend/app/jobs/normalize_vehicles.py
+"""
+Lleva make/model de los vehículos existentes al catálogo (nombre canónico +
+make_id/model_id). Un UPDATE por par distinto (marca, modelo) sin normalizar;
+cada vehículo tocado queda en la bitácora de /sync para que los clientes lo
+vuelvan a bajar. Lo que no coincide se deja igual y se lista para curar el
+catálogo (alias nuevos en app/data/vehicle_catalog.tsv).
+
+    python -m app.jobs.normalize_vehicles [--dry-run] [--pairs-per-tx 200]
+"""
+import argparse
+from collections import Counter
+
+from sqlalchemy import and_, func, insert, select, update
+
+from app.core.clock import utcnow
+from app.db.base import Base
+from app.db.models import ChangeLog, Vehicle
+from app.services import catalog, changes
+
+
+def run(engine, pairs_per_tx: int = 200, dry_run: bool = False):
+    """(vehículos actualizados, Counter de pares sin coincidencia)."""
+    V = Vehicle
+    with engine.connect() as conn:
+        groups = conn.execute(
+            select(V.make, V.model, V.make_id, func.count())
+            .where(V.model_id.is_(None))
+            .group_by(V.make, V.model, V.make_id)
+        ).all()
+    unresolved: Counter = Counter()
+    todo = []
+    for make, model, make_id, n in groups:
+        fields = catalog.normalize(make, model)
+        if fields["model_id"] is None:
+            unresolved[(make, model)] += n
+        if (fields["make"], fields["model"], fields["make_id"]) == (make, model, make_id):
+            continue  # ya normalizado hasta donde da el catálogo
+        todo.append((make, model, make_id, n, fields))
+    if dry_run:
+        return sum(t[3] for t in todo), unresolved
+
+    updated = 0
+    for i in range(0, len(todo), pairs_per_tx):
+        with engine.begin() as conn:
+            now = utcnow()
+            for make, model, make_id, _, fields in todo[i:i + pairs_per_tx]:
+                same_make = V.make_id.is_(None) if make_id is None else V.make_id == make_id
+                rows = conn.execute(
+                    update(V)
+                    .where(and_(V.make == make, V.model == model, same_make, V.model_id.is_(None)))
+                    .values(**fields)
+                    .returning(V.id, V.owner_id)
+                ).all()
+                if rows:
+                    conn.execute(insert(ChangeLog), [
+                        {"owner_id": owner, "entity": changes.VEHICLE, "entity_id": vid,
+                         "op": changes.UPSERT, "ts": now} for vid, owner in rows
+                    ])
+                updated += len(rows)
+    return updated, unresolved
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Normaliza marca/modelo de vehículos al catálogo")
+    ap.add_argument("--pairs-per-tx", type=int, default=200, help="pares (marca, modelo) por transacción")
+    ap.add_argument("--dry-run", action="store_true", help="sólo contar")
+    ap.add_argument("--top", type=int, default=20, help="pares sin coincidencia a listar")
+    args = ap.parse_args()
+
+    from app.db import shards
+    from app.db.session import engine
+    Base.metadata.create_all(bind=engine)
+    updated, unresolved = 0, Counter()
+    for eng in shards.data_engines():  # el directorio y cada shard
+        n, missing = run(eng, args.pairs_per_tx, args.dry_run)
+        updated += n
+        unresolved.update(missing)
+    print(f"{updated:,} vehículos {'por normalizar' if args.dry_run else 'normalizados'}; "
+          f"{sum(unresolved.values()):,} sin modelo en el catálogo ({len(unresolved):,} pares)")
+    for (make, model), n in unresolved.most_common(args.top):
+        print(f"  {n:>7,}  {make!r} / {model!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# backend/app/jobs/online_migration.py
+"""
+Avance de las migraciones en línea (app/db/online_migration.py) y limpieza
+de las tablas `_old_*` que dejan tras el cambio.
+
+    python -m app.jobs.online_migration                 # checkpoints
+    python -m app.jobs.online_migration --drop-old      # borra todas las _old_*
+    python -m app.jobs.online_migration --drop-old vehicles --db sqlite:///./app.db
+"""
+import argparse
+
+import sqlalchemy as sa
+from sqlalchemy import create_engine
+
+from app.core.config import get_settings
+from app.db import online_migration as om
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Migraciones en línea: avance y limpieza")
+    ap.add_argument("--db", default=None, help="URL de BD (por defecto DATABASE_URL, como alembic)")
+    ap.add_argument("--drop-old", nargs="*", default=None, metavar="TABLA",
+                    help="borrar las _old_<tabla> indicadas (sin nombres: todas)")
+    args = ap.parse_args()
+
+    engine = create_engine(args.db or get_settings().DATABASE_URL)
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        if args.drop_old is not None:
+            for name in om.drop_old(conn, args.drop_old or None):
+                print(f"  {name} borrada")
+            return
+        om.checkpoints.create(conn, checkfirst=True)
+        rows = conn.execute(sa.select(om.checkpoints).order_by(om.checkpoints.c.name)).all()
+        for r in rows:
+            state = "listo" if r.done else f"en llave {r.last_key}"
+            print(f"  {r.name}: {r.copied:,} filas, {state} ({r.updated_at:%Y-%m-%d %H:%M:%S})")
+        old = [t for t in sa.inspect(conn).get_table_names() if t.startswith(om.OLD)]
+        print(f"{len(rows)} checkpoints; tablas viejas: {', '.join(old) or 'ninguna'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+# backend/app/jobs/prune_changes.py
+"""
+Purga la bitácora de /sync más vieja que SYNC_LOG_RETENTION_DAYS.
+
+    python -m app.jobs.prune_changes
+"""
+from app.core.config import get_settings
+from app.db import shards
+from app.services.changes import prune
+
+
+def run() -> int:
+    n = 0
+    for db in shards.sessions():  # cada shard tiene su bitácora
+        n += prune(db, get_settings().SYNC_LOG_RETENTION_DAYS)
+        db.commit()
+    return n
+
+
+if __name__ == "__main__":
+    print(f"{run()} entradas purgadas")
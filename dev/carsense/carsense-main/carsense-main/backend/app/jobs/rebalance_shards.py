@@ -0,0 +1,263 @@
+# backend/app/jobs/rebalance_shards.py
+"""
+Muda usuarios al shard que les toca (`id % SHARD_COUNT`): los de antes de
+activar los shards (datos en el directorio, shard NULL) y los que quedaron
+fuera de lugar al cambiar SHARD_COUNT. Ver app/db/shards.py.
+
+Por usuario:
+  1. marca `shard_moving` en el directorio (sus peticiones reciben 503 con
+     Retry-After) y en su fila del origen (sombra o directorio: las tareas
+     de flota de esa BD, recordatorios y outbox, lo saltan; ver
+     shards.owner_here) y espera `--grace` s a que terminen las peticiones
+     que ya iban;
+  2. crea la sombra y copia sus filas al destino en una sola transacción,
+     tabla por tabla siguiendo las FK. Los ids autoincrementales se
+     vuelven a asignar en el destino y las FK se reescriben;
+  3. apunta `users.shard` al destino y quita la marca del directorio;
+  4. espera otros `--grace` s y copia la telemetría que llegó al origen
+     después del paso 2 (lotes que la cola de algún worker ya tenía);
+  5. borra sus filas del origen (por cascada desde vehicles y la sombra).
+
+Si algo falla antes de 3 el destino no queda con nada (rollback) y el
+usuario sigue en el origen. Si falla en 4 o 5 quedan copias huérfanas en
+el origen: `--cleanup` las borra. Telemetría encolada que tarde más que
+el segundo `--grace` en escribirse se pierde (la purga se llevó su
+vehículo). La bitácora de /sync y las llaves de
+idempotencia no se copian: los ids cambiaron y el cursor del cliente es de
+otra BD, así que su próximo /sync es un reset completo.
+
+    python -m app.jobs.rebalance_shards [--dry-run] [--limit 100] [--grace 2]
+    python -m app.jobs.rebalance_shards --user 42 --to 3
+    python -m app.jobs.rebalance_shards --cleanup
+"""
+import argparse
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Integer, func, select, update
+from sqlalchemy.engine import Connection
+
+from app.db import shards
+from app.db.base import Base
+from app.db.dialect import greatest, insert_for
+from app.db.models import DtcCodeStats, DtcSummary, TelemetrySample, User, Vehicle
+from app.services import search, telemetry
+
+SKIP = frozenset({"change_log", "idempotency_keys", "dtc_code_stats"})
+CHUNK = 500
+
+
+def candidates(limit: Optional[int] = None) -> List[tuple]:
+    """(id, shard actual, destino) de los usuarios fuera de lugar."""
+    n = shards.count()
+    q = select(User.id, User.shard).where(User.shard.is_(None) | (User.shard != User.id % n)).order_by(User.id)
+    if limit:
+        q = q.limit(limit)
+    with shards.directory().connect() as conn:
+        return [(uid, shard, shards.placement(uid)) for uid, shard in conn.execute(q)]
+
+
+def _serial_pk(table):
+    """Columna de PK autoincremental (entera, sola y sin FK) o None."""
+    pk = list(table.primary_key.columns)
+    if len(pk) == 1 and isinstance(pk[0].type, Integer) and not pk[0].foreign_keys:
+        return pk[0]
+    return None
+
+
+def copy_user(src: Connection, dst: Connection, user_id: int) -> Tuple[Dict[str, int], Dict[int, int]]:
+    """Copia las filas del usuario de src a dst; (filas por tabla, id de vehículo origen → destino)."""
+    ids: Dict[str, Dict[int, int]] = {"users": {user_id: user_id}}
+    copied: Dict[str, int] = {}
+    for table in Base.metadata.sorted_tables:
+        if table.name in shards.GLOBAL_TABLES or table.name in SKIP:
+            continue
+        fks = [fk for fk in table.foreign_keys if fk.column.table.name in ids]
+        if not fks:
+            continue
+        parent = fks[0]
+        serial = _serial_pk(table)
+        mapping: Dict[int, int] = {}
+        n = 0
+        parents = list(ids[parent.column.table.name])
+        for i in range(0, len(parents), CHUNK):
+            rows = [dict(r._mapping) for r in src.execute(
+                select(table).where(parent.parent.in_(parents[i:i + CHUNK])).order_by(*table.primary_key.columns)
+            )]
+            if not rows:
+                continue
+            for r in rows:
+                for fk in fks:
+                    if r[fk.parent.name] is not None:
+                        r[fk.parent.name] = ids[fk.column.table.name][r[fk.parent.name]]
+            if serial is None:
+                dst.execute(table.insert(), rows)
+            else:
+                old = [r.pop(serial.name) for r in rows]
+                new = dst.execute(table.insert().returning(serial, sort_by_parameter_order=True), rows).scalars()
+                mapping.update(zip(old, new))
+            n += len(rows)
+        if serial is not None:
+            ids[table.name] = mapping
+        copied[table.name] = n
+    return copied, ids.get("vehicles", {})
+
+
+def copy_late_telemetry(src: Connection, dst: Connection, vehicles: Dict[int, int]) -> int:
+    """Muestras crudas del origen que faltan en el destino; el resumen sólo suma ésas."""
+    S = TelemetrySample
+    n = 0
+    for old, new in vehicles.items():
+        samples = {(pid, ts): v for pid, ts, v in src.execute(
+            select(S.pid, S.ts, S.value).where(S.vehicle_id == old))}
+        if samples:
+            n += telemetry.insert_samples(dst, new, samples)
+    return n
+
+
+def _code_stats(conn: Connection, user_id: int) -> List[tuple]:
+    """Aporte del usuario a dtc_code_stats: (código, ocurrencias, vehículos)."""
+    S = DtcSummary
+    return conn.execute(
+        select(S.code, func.sum(S.count), func.count())
+        .join(Vehicle, Vehicle.id == S.vehicle_id)
+        .where(Vehicle.owner_id == user_id)
+        .group_by(S.code)
+    ).all()
+
+
+def _add_code_stats(conn: Connection, stats: List[tuple], sign: int) -> None:
+    C = DtcCodeStats
+    for code, occurrences, vehicles in stats:
+        ins = insert_for(conn, C).values(code=code, occurrences=max(0, sign * occurrences),
+                                         vehicles=max(0, sign * vehicles))
+        conn.execute(ins.on_conflict_do_update(
+            index_elements=["code"],
+            set_={"occurrences": greatest(conn, C.occurrences + sign * occurrences, 0),
+                  "vehicles": greatest(conn, C.vehicles + sign * vehicles, 0)},
+        ))
+    if sign < 0:
+        conn.execute(C.__table__.delete().where(C.__table__.c.occurrences <= 0))
+
+
+def purge(conn: Connection, user_id: int, shard: Optional[int]) -> None:
+    """Borra del origen los datos del usuario (y su sombra si el origen es un shard)."""
+    _add_code_stats(conn, _code_stats(conn, user_id), -1)
+    for table in Base.metadata.sorted_tables:
+        if table.name not in shards.GLOBAL_TABLES and "owner_id" in table.c:
+            conn.execute(table.delete().where(table.c.owner_id == user_id))
+    if shard is not None:
+        conn.execute(User.__table__.delete().where(User.__table__.c.id == user_id))
+
+
+def _set_moving(user_id: int, moving: bool, shard=shards._UNSET) -> None:
+    values = {"shard_moving": moving}
+    if shard is not shards._UNSET:
+        values["shard"] = shard
+    with shards.directory().begin() as conn:
+        conn.execute(update(User).where(User.id == user_id).values(**values))
+
+
+def _pause_source(source: Optional[int], user_id: int, paused: bool) -> None:
+    """Marca la sombra del origen: sus tareas de flota dejan al usuario hasta la purga."""
+    if source is None:
+        return  # en el directorio la marca es la de _set_moving (y luego users.shard)
+    with shards.engine_for(source).begin() as conn:
+        conn.execute(update(User).where(User.id == user_id).values(shard_moving=paused))
+
+
+def move(user_id: int, dest: int, grace: float = 2.0) -> Dict[str, int]:
+    with shards.directory().connect() as conn:
+        row = conn.execute(select(User.email, User.shard).where(User.id == user_id)).first()
+    if row is None:
+        raise SystemExit(f"Usuario {user_id} no existe")
+    email, source = row
+    if source == dest:
+        return {}
+    _set_moving(user_id, True)
+    try:
+        _pause_source(source, user_id, True)
+        time.sleep(grace)  # peticiones que ya habían pasado por get_current_user
+        shards.ensure_shadow(dest, user_id, email)
+        search.install(shards.engine_for(dest))
+        with shards.engine_for(source).connect() as src, shards.engine_for(dest).begin() as dst:
+            copied, vehicles = copy_user(src, dst, user_id)
+            # sombra vieja de una mudanza anterior que salió de aquí: vuelve a estar activa
+            dst.execute(update(User).where(User.id == user_id).values(shard_moving=False))
+            _add_code_stats(dst, _code_stats(dst, user_id), +1)
+    except BaseException:
+        _pause_source(source, user_id, False)
+        _set_moving(user_id, False)
+        raise
+    _set_moving(user_id, False, dest)
+    # la cola de telemetría de cada worker pudo tener lotes para el origen
+    # (aceptados antes del paso 1): se dejan escribir y se copia la diferencia
+    time.sleep(grace)
+    with shards.engine_for(source).connect() as src, shards.engine_for(dest).begin() as dst:
+        copied["telemetry_samples_late"] = copy_late_telemetry(src, dst, vehicles)
+    with shards.engine_for(source).begin() as conn:
+        purge(conn, user_id, source)
+    return copied
+
+
+def cleanup() -> int:
+    """Borra de cada BD los datos de usuarios que ya no viven ahí (mudanzas a medias)."""
+    with shards.directory().connect() as conn:
+        home = dict(conn.execute(select(User.id, User.shard)).all())
+    n = 0
+    for k in shards.keys():
+        with shards.engine_for(k).begin() as conn:
+            owners = conn.execute(select(Vehicle.owner_id).distinct()).scalars().all()
+            if k is not None:
+                owners = set(owners) | set(conn.execute(select(User.id)).scalars())
+            for uid in owners:
+                if uid in home and home[uid] != k and not _moving(uid):
+                    purge(conn, uid, k)
+                    n += 1
+    return n
+
+
+def _moving(user_id: int) -> bool:
+    with shards.directory().connect() as conn:
+        return bool(conn.execute(select(User.shard_moving).where(User.id == user_id)).scalar())
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Muda usuarios a su shard")
+    ap.add_argument("--dry-run", action="store_true", help="sólo listar")
+    ap.add_argument("--limit", type=int, default=None, help="usuarios a mudar en esta corrida")
+    ap.add_argument("--grace", type=float, default=2.0, help="segundos de espera tras marcar la mudanza y tras apuntar al destino")
+    ap.add_argument("--user", type=int, default=None, help="mudar sólo este usuario")
+    ap.add_argument("--to", type=int, default=None, help="shard destino (con --user)")
+    ap.add_argument("--cleanup", action="store_true", help="borrar copias huérfanas de mudanzas a medias")
+    args = ap.parse_args()
+
+    if not shards.enabled():
+        raise SystemExit("SHARD_COUNT=0: no hay shards")
+    from app.db.session import engine
+    Base.metadata.create_all(bind=engine)
+    if args.cleanup:
+        print(f"{cleanup():,} copias huérfanas borradas")
+        return
+    if args.user is not None:
+        dest = args.to if args.to is not None else shards.placement(args.user)
+        if not 0 <= dest < shards.count():
+            raise SystemExit(f"--to fuera de rango (0..{shards.count() - 1})")
+        with shards.directory().connect() as conn:
+            source = conn.execute(select(User.shard).where(User.id == args.user)).scalar()
+        todo = [(args.user, source, dest)]
+    else:
+        todo = candidates(args.limit)
+    t0 = time.perf_counter()
+    for uid, source, dest in todo:
+        if args.dry_run:
+            print(f"  usuario {uid}: {'directorio' if source is None else f'shard {source}'} -> shard {dest}")
+            continue
+        copied = move(uid, dest, args.grace)
+        print(f"  usuario {uid} -> shard {dest}: {sum(copied.values()):,} filas")
+    print(f"{len(todo):,} usuarios {'por mudar' if args.dry_run else 'mudados'} "
+          f"en {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
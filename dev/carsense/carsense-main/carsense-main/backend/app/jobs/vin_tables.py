@@ -0,0 +1,72 @@
+# backend/app/jobs/vin_tables.py
+"""
+Valida y reordena las tablas de VIN (app/data/vin_tables.tsv) tras editarlas.
+
+El decodificador busca por bisección sobre los bytes del archivo: debe quedar
+ordenado por bytes, sin llaves repetidas y con los campos de cada tipo.
+
+    python -m app.jobs.vin_tables [--check] [--source otro.tsv]
+"""
+import argparse
+import re
+import sys
+from typing import List
+
+from app.services.vin import DEFAULT_TABLES
+
+HEADER = "# Tablas WMI/VDS/planta de app/services/vin.py. Ordenado por bytes: python -m app.jobs.vin_tables\n"
+
+# tipo -> (regex de la llave, número de campos tras la llave)
+KINDS = {
+    "W": (re.compile(r"W[A-HJ-NPR-Z0-9]{3}"), 3),
+    "V": (re.compile(r"V[A-HJ-NPR-Z0-9]{3}[A-HJ-NPR-Z0-9*]{5}"), 4),
+    "P": (re.compile(r"P[A-HJ-NPR-Z0-9]{4}"), 1),
+}
+
+
+def check(lines: List[str]) -> List[str]:
+    errors, seen = [], set()
+    for n, line in enumerate(lines, 1):
+        fields = line.split("\t")
+        key = fields[0]
+        kind = KINDS.get(key[:1])
+        if kind is None or not kind[0].fullmatch(key):
+            errors.append(f"{n}: llave inválida {key!r}")
+        elif len(fields) - 1 != kind[1]:
+            errors.append(f"{n}: {key} tiene {len(fields) - 1} campos (se esperan {kind[1]})")
+        elif key[0] == "V" and not (fields[2].isdigit() and fields[3].isdigit()):
+            errors.append(f"{n}: {key} años inválidos")
+        if key in seen:
+            errors.append(f"{n}: llave repetida {key}")
+        seen.add(key)
+    return errors
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Valida y ordena las tablas de VIN")
+    ap.add_argument("--source", default=DEFAULT_TABLES, help="archivo a leer (por defecto el incluido)")
+    ap.add_argument("--out", default=DEFAULT_TABLES)
+    ap.add_argument("--check", action="store_true", help="sólo validar (código 1 si no está ordenado)")
+    args = ap.parse_args()
+
+    with open(args.source, encoding="utf-8") as f:
+        raw = f.read()
+    lines = [l for l in raw.splitlines() if l and not l.startswith("#")]
+    errors = check(lines)
+    for e in errors:
+        print(e, file=sys.stderr)
+    if errors:
+        return 1
+    packed = HEADER + "".join(l + "\n" for l in sorted(lines, key=lambda l: l.encode()))
+    if args.check:
+        ok = raw == packed
+        print("ordenado" if ok else "sin ordenar: corre python -m app.jobs.vin_tables")
+        return 0 if ok else 1
+    with open(args.out, "w", encoding="utf-8", newline="\n") as f:
+        f.write(packed)
+    print(f"{len(lines)} registros -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
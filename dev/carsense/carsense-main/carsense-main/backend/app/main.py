@@ -1,33 +1,97 @@
 # backend/app/main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
+from app.core import metrics, profiler, pubsub, ratelimit, revocation, slow_queries
+from app.core.scheduler import start_scheduler, stop_scheduler
+from app.core.config import get_settings
+from app.db import check_fk_cascades, replicas, shards
 from app.db.base import Base
 from app.db.session import engine
+from app.services import catalog as catalog_service
+from app.services import maintenance as maintenance_service
+from app.services import search as search_service
+from app.services import outbox as outbox_service
+from app.services import telemetry as telemetry_service
 
 # Routers v1
 from app.api.v1 import vehicles
 from app.api.v1 import service_records
 from app.api.v1 import reminders
+from app.api.v1 import odometer
+from app.api.v1 import telemetry
+from app.api.v1 import dtc
+from app.api.v1 import alerts
+from app.api.v1 import analytics
+from app.api.v1 import sync
+from app.api.v1 import push
 from app.api.v1 import chatbot
+from app.api.v1 import vin
+from app.api.v1 import catalog
 from app.api.v1 import auth as auth_router  # auth: /auth/register, /auth/login
+from app.api import debug
+
+settings = get_settings()
 
 app = FastAPI(title="CarSense API")
 
+# --- Límite de peticiones ---
+# Se registra antes que CORS (queda por dentro): los 429 llevan cabeceras CORS
+# y los preflight no cuentan.
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        ratelimit.RateLimitMiddleware,
+        backend=ratelimit.make_backend(settings.RATE_LIMIT_BACKEND, settings.RATE_LIMIT_MMAP_PATH),
+        per_min=settings.RATE_LIMIT_PER_MIN,
+        burst=settings.RATE_LIMIT_BURST,
+        ip_per_min=settings.RATE_LIMIT_IP_PER_MIN,
+        ip_burst=settings.RATE_LIMIT_IP_BURST,
+        weights=ratelimit.parse_weights(settings.RATE_LIMIT_WEIGHTS),
+        trust_proxy=settings.RATE_LIMIT_TRUST_PROXY,
+    )
+
 # --- CORS ---
+CORS_ORIGINS = [
+    "http://localhost:5173",
+    "http://127.0.0.1:5173",
+    "http://localhost",
+    "http://127.0.0.1",
+]
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173",
-        "http://127.0.0.1:5173",
-        "http://localhost",
-        "http://127.0.0.1",
-    ],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# --- Log de consultas lentas: ruta que origina cada sentencia ---
+if settings.SLOW_QUERY_MS > 0:
+    app.add_middleware(slow_queries.QueryContextMiddleware)
+
+# --- Profiler por petición (no se registra si no hay token ni muestreo) ---
+if settings.ADMIN_TOKEN or settings.PROFILER_SAMPLE_RATE > 0:
+    app.add_middleware(
+        profiler.ProfilerMiddleware,
+        ring=profiler.default_ring(),
+        sample_rate=settings.PROFILER_SAMPLE_RATE,
+        admin_token=settings.ADMIN_TOKEN,
+        interval_ms=settings.PROFILER_INTERVAL_MS,
+    )
+
+# --- Métricas (Prometheus) ---
+# Se registra después de CORS para que quede como capa más externa.
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics_endpoint():
+        return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+# --- Canal push (/push/ws, /push/events): ASGI crudo por fuera del stack ---
+app.add_middleware(push.PushGateway, ping_s=settings.PUSH_PING_S, allow_origins=CORS_ORIGINS)
+
 # --- Health (varias rutas por compatibilidad) ---
 @app.get("/health")
 @app.get("/api/health")
@@ -40,6 +104,32 @@ def health():
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
+    check_fk_cascades(engine)
+    for k in shards.keys():  # el directorio y cada shard (si SHARD_COUNT > 0)
+        search_service.install(shards.engine_for(k))  # índice de texto completo + triggers
+        telemetry_service.get_writer(k)  # hilo escritor de telemetría OBD
+    revocation.get_denylist()  # tokens revocados en memoria (+ hilo de refresco)
+    catalog_service.get_catalog()  # trie del autocompletado (de la caché en disco si existe)
+    maintenance_service.get_rules()  # reglas de mantenimiento indexadas por marca/modelo
+    replicas.get_pool()  # réplicas de lectura (si hay) + hilo que mide su retraso
+    start_scheduler()  # tareas programadas (sólo corren en el worker líder)
+    for k in shards.keys():
+        outbox_service.get_dispatcher(k)  # avisos email/webhook (si hay canales)
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    stop_scheduler()
+    outbox_service.shutdown()
+    replicas.shutdown()
+    revocation.shutdown()
+    pubsub.shutdown()  # cierra conexiones push y el socket del broker
+    telemetry_service.shutdown()  # vacía la cola antes de salir
+    shards.dispose()
+
+# --- Router de diagnóstico (sólo si DEBUG_ROUTES=1) ---
+if settings.DEBUG_ROUTES:
+    app.include_router(debug.router)
 
 # --- Registrar routers con 3 prefijos: "", "/api", "/api/v1" ---
 for prefix in ("", "/api", "/api/v1"):
@@ -47,4 +137,12 @@ for prefix in ("", "/api", "/api/v1"):
     app.include_router(vehicles.router,        prefix=prefix, tags=["vehicles"])
     app.include_router(service_records.router, prefix=prefix, tags=["services"])
     app.include_router(reminders.router,       prefix=prefix, tags=["reminders"])
+    app.include_router(odometer.router,        prefix=prefix, tags=["odometer"])
+    app.include_router(telemetry.router,       prefix=prefix, tags=["telemetry"])
+    app.include_router(dtc.router,             prefix=prefix, tags=["dtc"])
+    app.include_router(alerts.router,          prefix=prefix, tags=["alerts"])
+    app.include_router(analytics.router,       prefix=prefix, tags=["analytics"])
+    app.include_router(sync.router,            prefix=prefix, tags=["sync"])
     app.include_router(chatbot.router,         prefix=prefix, tags=["chatbot"])
+    app.include_router(vin.router,             prefix=prefix, tags=["vin"])
+    app.include_router(catalog.router,         prefix=prefix, tags=["catalog"])
@@ -0,0 +1,12 @@
+# app/schemas/catalog.py
+from typing import Optional
+from pydantic import BaseModel
+
+class CatalogItemOut(BaseModel):
+    make_id: int
+    make: str
+    model_id: Optional[int] = None  # None = la marca sola
+    model: Optional[str] = None
+    label: str
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None  # None = vigente
@@ -0,0 +1,38 @@
+# app/schemas/dtc.py
+from typing import List, Literal, Optional
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field
+
+Source = Literal["scanner", "obd", "chat"]
+
+class DtcReportIn(BaseModel):
+    codes: List[str] = Field(min_length=1, max_length=50)
+    ts: Optional[datetime] = None  # UTC; si falta, ahora
+    source: Source = "scanner"
+
+class DtcReportOut(BaseModel):
+    code: str
+    new: bool  # False = deduplicado dentro de la ventana
+
+class DtcCodeOut(BaseModel):
+    code: str
+    description: str
+    first_seen: datetime
+    last_seen: datetime
+    count: int
+    reports: int
+    active: bool
+    recurring: bool
+    cleared_at: Optional[datetime] = None
+
+class DtcFleetOut(BaseModel):
+    code: str
+    description: str
+    occurrences: int
+    vehicles: int
+
+class DtcEventOut(BaseModel):
+    code: str
+    source: str
+    ts: datetime
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,26 @@
+# app/schemas/odometer.py
+from typing import List, Optional
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field
+
+class OdometerReadingIn(BaseModel):
+    km: int = Field(ge=0)
+    ts: Optional[datetime] = None  # UTC; si falta, ahora
+
+class OdometerReadingOut(BaseModel):
+    ts: datetime
+    km: int
+    model_config = ConfigDict(from_attributes=True)
+
+class ReminderProjection(BaseModel):
+    reminder_id: int
+    due_km: int
+    km_left: int
+    projected_at: Optional[datetime] = None
+
+class UsageOut(BaseModel):
+    vehicle_id: int
+    odometer_km: int
+    km_per_day: Optional[float] = None
+    last_reading_at: Optional[datetime] = None
+    reminders: List[ReminderProjection] = []
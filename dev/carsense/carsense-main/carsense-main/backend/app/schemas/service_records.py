@@ -1,7 +1,8 @@
 # backend/app/schemas/service_records.py
 from datetime import date as Date
+from decimal import Decimal
 from typing import Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 
 class ServiceBase(BaseModel):
     vehicle_id: int
@@ -9,12 +10,34 @@ class ServiceBase(BaseModel):
     date: Optional[Date] = None
     km: Optional[int] = None
     notes: Optional[str] = None
+    cost: Optional[Decimal] = Field(None, ge=0, max_digits=12, decimal_places=2)
+    currency: str = "MXN"
+    workshop: Optional[str] = Field(None, max_length=120)
+
+    @field_validator("currency")
+    @classmethod
+    def _currency(cls, v: str) -> str:
+        v = (v or "").strip().upper()
+        if len(v) != 3 or not v.isalpha():
+            raise ValueError("Moneda ISO 4217 de 3 letras (p. ej. MXN, USD)")
+        return v
 
 class ServiceCreate(ServiceBase):
     pass
 
 class ServiceOut(ServiceBase):
     id: int
+    cost: Optional[float] = None
 
     class Config:
         from_attributes = True  # Pydantic v2
+
+class ServiceSearchHit(BaseModel):
+    id: int
+    vehicle_id: int
+    service_type: str
+    date: Optional[Date] = None
+    km: Optional[int] = None
+    type_hl: str       # tipo con <mark>…</mark>, HTML escapado
+    snippet: str       # fragmento de notas con <mark>…</mark>, HTML escapado
+    score: float       # menor = más relevante
@@ -1,16 +1,24 @@
 # app/schemas/vehicles.py
-from typing import Optional
-from pydantic import BaseModel, ConfigDict
+from typing import Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field
 
 class VehicleBase(BaseModel):
     make: str
     model: str
     year: Optional[int] = None
     odometer_km: Optional[int] = 0
+    vin: Optional[str] = None
+    # intervalos de mantenimiento para uso severo (tráfico, polvo, remolque)
+    usage_profile: Optional[Literal["normal", "severo"]] = None
 
 class VehicleCreate(VehicleBase):
-    pass
+    # con un VIN decodificable, marca/modelo/año pueden omitirse
+    make: Optional[str] = None
+    model: Optional[str] = None
+    vin: Optional[str] = Field(None, max_length=32)
 
 class VehicleOut(VehicleBase):
     id: int
+    make_id: Optional[int] = None   # catálogo; None = texto libre
+    model_id: Optional[int] = None
     model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,19 @@
+# app/schemas/vin.py
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+class VinBatchIn(BaseModel):
+    vins: List[str] = Field(min_length=1)
+
+class VinDecodedOut(BaseModel):
+    vin: str
+    valid: bool
+    error: Optional[str] = None
+    check_digit: Optional[bool] = None  # None = no aplica (fuera de Norteamérica)
+    wmi: Optional[str] = None
+    manufacturer: Optional[str] = None
+    make: Optional[str] = None
+    model: Optional[str] = None
+    model_year: Optional[int] = None
+    country: Optional[str] = None
+    plant: Optional[str] = None
@@ -1,25 +1,13 @@
-from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
-from app.db.models import Service
-
-DEFAULT_SERVICES = [
-    {"tipo": "aceite", "intervalo_km": 10000, "intervalo_meses": 6, "descripcion": "Cambio de aceite y filtro."},
-    {"tipo": "freno", "intervalo_km": 20000, "intervalo_meses": 12, "descripcion": "Revisión de balatas y discos."},
-    {"tipo": "filtro_aire", "intervalo_km": 15000, "intervalo_meses": 12, "descripcion": "Reemplazo filtro de aire."},
-    {"tipo": "rotacion_llantas", "intervalo_km": 10000, "intervalo_meses": 6, "descripcion": "Rotación de llantas."},
-]
+# backend/app/seeds/seed_services.py
+# Los intervalos de servicio viven en app/data/maintenance_rules.tsv
+# (app/services/maintenance.py); el generador sintético los usa por vehículo.
 
 def run():
-    db: Session = SessionLocal()
-    try:
-        for s in DEFAULT_SERVICES:
-            exists = db.query(Service).filter(Service.tipo == s["tipo"]).first()
-            if not exists:
-                db.add(Service(**s))
-        db.commit()
-        print("Seed services OK")
-    finally:
-        db.close()
+    # Cuenta demo con su historial (demo@carsense.mx)
+    from app.db.session import engine
+    from app.seeds.synthetic import generate
+    generate(engine, users=1)
+    print("Seed demo OK")
 
 if __name__ == "__main__":
     run()
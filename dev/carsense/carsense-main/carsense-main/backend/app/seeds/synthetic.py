@@ -0,0 +1,324 @@
+# backend/app/seeds/synthetic.py
+"""
+Generador de datos sintéticos a gran escala.
+
+Crea usuarios, vehículos (marca/modelo/año/odómetro con distribuciones del
+parque vehicular mexicano), historiales de servicio de varios años y
+recordatorios. Es determinista por --seed y escribe con inserts masivos de
+Core en transacciones grandes; en SQLite relaja los PRAGMA de la conexión de
+carga (synchronous=OFF, journal en memoria).
+
+Todas las cuentas comparten la contraseña DEMO_PASSWORD: el hash bcrypt se
+calcula una sola vez y se reutiliza.
+
+    python -m app.seeds.synthetic --users 200000 --years 6 --seed 7
+    python -m app.seeds.synthetic --demo          # sólo demo@carsense.mx
+"""
+import argparse
+import math
+import random
+import time
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.security import hash_password
+from app.db.base import Base
+from app.db import models
+from app.services import catalog, maintenance
+from app.services.costs import backfill
+
+DEMO_EMAIL = "demo@carsense.mx"
+DEMO_PASSWORD = "Demo1234!"
+
+# (marca, modelo, peso de mercado, año desde, año hasta)
+VEHICLE_MIX: List[Tuple[str, str, int, int, int]] = [
+    ("Nissan", "Versa", 90, 2012, 2025),
+    ("Nissan", "March", 60, 2011, 2025),
+    ("Nissan", "Sentra", 45, 2007, 2025),
+    ("Nissan", "Tsuru", 35, 2000, 2017),
+    ("Nissan", "NP300", 40, 2008, 2025),
+    ("Chevrolet", "Aveo", 70, 2008, 2025),
+    ("Chevrolet", "Spark", 25, 2011, 2022),
+    ("Chevrolet", "Beat", 25, 2018, 2022),
+    ("Volkswagen", "Jetta", 55, 2005, 2025),
+    ("Volkswagen", "Vento", 35, 2014, 2023),
+    ("Volkswagen", "Gol", 25, 2009, 2021),
+    ("Toyota", "Corolla", 40, 2005, 2025),
+    ("Toyota", "Hilux", 30, 2006, 2025),
+    ("Toyota", "Yaris", 25, 2016, 2025),
+    ("Honda", "Civic", 30, 2006, 2025),
+    ("Honda", "CR-V", 30, 2007, 2025),
+    ("Kia", "Rio", 35, 2017, 2025),
+    ("Kia", "Sportage", 20, 2017, 2025),
+    ("Mazda", "Mazda 3", 30, 2010, 2025),
+    ("Mazda", "CX-5", 20, 2013, 2025),
+    ("Ford", "Figo", 15, 2016, 2021),
+    ("Ford", "Ranger", 15, 2013, 2025),
+    ("Hyundai", "Grand i10", 20, 2015, 2025),
+    ("Suzuki", "Swift", 15, 2012, 2025),
+]
+
+# reparaciones sin intervalo fijo: (tipo, probabilidad anual, nota)
+REPAIRS = [
+    ("bateria", 0.15, "Cambio de batería {pn}."),
+    ("bomba_agua", 0.04, "Reemplazo de bomba de agua {pn}, fuga por sello."),
+    ("amortiguadores", 0.06, "Amortiguadores delanteros {pn}, golpeteo en baches."),
+]
+
+NOTES = {
+    "aceite": ["Aceite 5W-30 sintético y filtro {pn}.", "Cambio de aceite 10W-40, filtro {pn}.",
+               "Aceite y filtro; se revisaron niveles."],
+    "freno": ["Balatas delanteras {pn}.", "Rectificado de discos y balatas.", "Revisión de frenos, purga de líquido."],
+    "filtro_aire": ["Filtro de aire {pn}.", "Filtro de aire y de cabina."],
+    "rotacion_llantas": ["Rotación y balanceo.", "Rotación de llantas, presión a 32 psi."],
+    "liquido_frenos": ["Cambio de líquido de frenos DOT 4.", "Purga y cambio de líquido de frenos."],
+    "bujias": ["Bujías iridium {pn}.", "Juego de bujías {pn}, tirones en aceleración."],
+    "refrigerante": ["Cambio de anticongelante, purgado del sistema."],
+}
+WORKSHOPS = ["Taller Hernández", "Servicio Express Jalisco", "Agencia", "Llantera El Güero", "Mecánica Ruiz"]
+
+# costo típico en MXN por tipo (mediana, dispersión lognormal); la agencia cobra más
+COSTS = {
+    "aceite": (1100, 0.25), "freno": (2200, 0.35), "filtro_aire": (450, 0.3), "rotacion_llantas": (350, 0.3),
+    "bateria": (2600, 0.2), "bomba_agua": (3800, 0.35), "amortiguadores": (5200, 0.35),
+    "bujias": (1600, 0.3), "refrigerante": (900, 0.3), "liquido_frenos": (700, 0.3),
+}
+
+
+_PN_LETTERS = "ABCDEFGHKMPRSTW"
+
+
+def _part_number(rng: random.Random) -> str:
+    # un solo random() en vez de choice + 2 randint: esto corre por cada servicio
+    letter, rest = divmod(int(rng.random() * 12_150_000), 810_000)
+    two, four = divmod(rest, 9000)
+    return f"{_PN_LETTERS[letter]}{two + 10}-{four + 1000}"
+
+
+def _choice(rng: random.Random, seq):
+    return seq[int(rng.random() * len(seq))]
+
+
+class Generator:
+    """Produce filas como dicts listos para `insert(...)`, con ids asignados aquí."""
+
+    def __init__(self, seed: int, years: int, today: Optional[date] = None,
+                 first_ids: Optional[Dict[str, int]] = None):
+        self.rng = random.Random(seed)
+        self.years = years
+        self.today = today or date.today()
+        ids = first_ids or {}
+        self.next_user = ids.get("users", 1)
+        self.next_vehicle = ids.get("vehicles", 1)
+        self.next_service = ids.get("service_records", 1)
+        self.next_reminder = ids.get("reminders", 1)
+        self._cum = list(_accumulate(w for _, _, w, _, _ in VEHICLE_MIX))
+        # ids del catálogo por entrada de VEHICLE_MIX (las reglas de mantenimiento van por id)
+        self._ids = [catalog.normalize(make, model) for make, model, _, _, _ in VEHICLE_MIX]
+
+    # ---------- Entidades ----------
+    def user(self, email: str, pw_hash: str) -> Dict:
+        row = {"id": self.next_user, "email": email, "password_hash": pw_hash}
+        self.next_user += 1
+        return row
+
+    def vehicle(self, owner_id: int) -> Tuple[Dict, float]:
+        rng = self.rng
+        k = _pick(self._cum, rng.random() * self._cum[-1])
+        make, model, _, y0, y1 = VEHICLE_MIX[k]
+        y1 = min(y1, self.today.year)
+        # más autos recientes que viejos (decaimiento exponencial por antigüedad)
+        age = min(y1 - y0, int(rng.expovariate(1 / 6.0)))
+        year = y1 - age
+        # km/año lognormal centrado en ~15k
+        km_per_year = min(60_000.0, max(2_000.0, rng.lognormvariate(math.log(15_000), 0.45)))
+        odometer = int(km_per_year * (self.today.year - year + rng.random()))
+        row = {"id": self.next_vehicle, "owner_id": owner_id, "make": make, "model": model,
+               "year": year, "odometer_km": odometer,
+               "make_id": self._ids[k]["make_id"], "model_id": self._ids[k]["model_id"]}
+        self.next_vehicle += 1
+        return row, km_per_year
+
+    def history(self, v: Dict, km_per_year: float) -> Tuple[List[Dict], List[Dict]]:
+        """Servicios de los últimos `years` años (o desde que el auto es nuevo) y recordatorios."""
+        rng = self.rng
+        span_days = int(min(self.years, self.today.year - v["year"] + 1) * 365)
+        start = self.today - timedelta(days=span_days)
+        km_per_day = km_per_year / 365.0
+        km_start = max(0, v["odometer_km"] - int(km_per_day * span_days))
+
+        services: List[Dict] = []
+        reminders: List[Dict] = []
+        for tipo, _, _, every_km, every_months in maintenance.plan(v["make_id"], v["model_id"], v["year"]):
+            notes = NOTES.get(tipo, ["{pn}"])
+            # cada dueño se retrasa a su manera respecto del intervalo nominal
+            lateness = 1.0 + rng.random() * 0.3
+            days_by_time = every_months * 30.4 * lateness if every_months else math.inf
+            days_by_km = every_km / km_per_day * lateness if every_km else math.inf
+            step = max(20.0, min(days_by_time, days_by_km))
+            t = rng.random() * step
+            last_day, last_km = None, None
+            while t < span_days:
+                d = start + timedelta(days=int(t))
+                km = km_start + int(km_per_day * t)
+                services.append(self._service(v["id"], tipo, d, km,
+                                              _choice(rng, notes).format(pn=_part_number(rng)),
+                                              _choice(rng, WORKSHOPS)))
+                last_day, last_km = t, km
+                t += step * (0.85 + rng.random() * 0.3)
+            if last_day is not None and every_months:
+                due = start + timedelta(days=int(last_day + days_by_time / lateness))
+                reminders.append(self._reminder(v["id"], "date", due, None, f"Próximo: {tipo}",
+                                                done=due < self.today - timedelta(days=60)))
+            if last_day is not None and every_km:
+                reminders.append(self._reminder(v["id"], "odometer", None, last_km + every_km,
+                                                f"Próximo: {tipo} por km", done=False))
+
+        years_span = span_days / 365.0
+        for tipo, p_year, note in REPAIRS:
+            for _ in range(_poisson(rng, p_year * years_span)):
+                t = rng.random() * span_days
+                workshop = _choice(rng, WORKSHOPS)
+                services.append(self._service(v["id"], tipo, start + timedelta(days=int(t)),
+                                              km_start + int(km_per_day * t),
+                                              note.format(pn=_part_number(rng)) + f" {workshop}.", workshop))
+        return services, reminders
+
+    def _service(self, vehicle_id: int, tipo: str, d: date, km: int, notes: str, workshop: str) -> Dict:
+        median, sigma = COSTS.get(tipo, (800, 0.4))
+        cost = self.rng.lognormvariate(math.log(median * (1.4 if workshop == "Agencia" else 1.0)), sigma)
+        row = {"id": self.next_service, "vehicle_id": vehicle_id, "service_type": tipo,
+               "date": d, "km": km, "notes": notes, "cost_cents": int(cost) * 100, "currency": "MXN",
+               "workshop": workshop}
+        self.next_service += 1
+        return row
+
+    def _reminder(self, vehicle_id: int, kind: str, due_date: Optional[date], due_km: Optional[int],
+                  notes: str, done: bool) -> Dict:
+        row = {"id": self.next_reminder, "vehicle_id": vehicle_id, "kind": kind, "due_date": due_date,
+               "due_km": due_km, "notes": notes, "done": done}
+        self.next_reminder += 1
+        return row
+
+
+def _accumulate(weights) -> Iterator[int]:
+    total = 0
+    for w in weights:
+        total += w
+        yield total
+
+
+def _pick(cum: List[int], x: float) -> int:
+    lo, hi = 0, len(cum) - 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if cum[mid] > x:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    # Knuth: lam es pequeño (reparaciones por vehículo)
+    limit, k, p = math.exp(-lam), 0, 1.0
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return k
+        k += 1
+
+
+# ---------- Escritura ----------
+def _relax_sqlite(conn: Connection) -> None:
+    # PRAGMAs de conexión: sólo afectan a la conexión de carga
+    for pragma in ("synchronous=OFF", "journal_mode=MEMORY", "temp_store=MEMORY", "cache_size=-262144"):
+        conn.exec_driver_sql(f"PRAGMA {pragma}")
+
+
+def _first_ids(conn: Connection) -> Dict[str, int]:
+    out = {}
+    for model in (models.User, models.Vehicle, models.ServiceRecord, models.Reminder):
+        out[model.__tablename__] = (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+    return out
+
+
+def generate(engine: Engine, users: int, years: int = 5, seed: int = 1, vehicles_per_user: Tuple[int, int] = (1, 3),
+             batch_users: int = 5000, demo: bool = True, log=print) -> Dict[str, int]:
+    """Inserta el dataset y devuelve cuántas filas se escribieron por tabla."""
+    Base.metadata.create_all(bind=engine)
+    pw_hash = hash_password(DEMO_PASSWORD)  # una vez: bcrypt no debe dominar la carga
+    counts = {"users": 0, "vehicles": 0, "service_records": 0, "reminders": 0}
+    t0 = time.perf_counter()
+
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            _relax_sqlite(conn)
+        gen = Generator(seed, years, first_ids=_first_ids(conn))
+        demo = demo and conn.execute(select(models.User.id).where(models.User.email == DEMO_EMAIL)).first() is None
+        conn.commit()
+        lo_v, hi_v = vehicles_per_user
+
+        done = 0
+        while done < users:
+            n = min(batch_users, users - done)
+            urows, vrows, srows, rrows = [], [], [], []
+            for i in range(done, done + n):
+                email = DEMO_EMAIL if demo and i == 0 else f"user{gen.next_user}@carsense.mx"
+                u = gen.user(email, pw_hash)
+                urows.append(u)
+                for _ in range(gen.rng.randint(lo_v, hi_v)):
+                    v, km_per_year = gen.vehicle(u["id"])
+                    vrows.append(v)
+                    s, r = gen.history(v, km_per_year)
+                    srows.extend(s)
+                    rrows.extend(r)
+            # una transacción por lote de usuarios
+            with conn.begin():
+                conn.execute(insert(models.User), urows)
+                conn.execute(insert(models.Vehicle), vrows)
+                if srows:
+                    conn.execute(insert(models.ServiceRecord), srows)
+                if rrows:
+                    conn.execute(insert(models.Reminder), rrows)
+            done += n
+            counts["users"] += len(urows)
+            counts["vehicles"] += len(vrows)
+            counts["service_records"] += len(srows)
+            counts["reminders"] += len(rrows)
+            elapsed = time.perf_counter() - t0
+            log(f"{done}/{users} usuarios · {counts['service_records']:,} servicios "
+                f"· {counts['service_records'] / max(elapsed, 1e-9):,.0f} servicios/s")
+
+        # resúmenes de costos (la carga masiva no pasa por los handlers)
+        backfill(conn, batch=50_000, log=lambda *_: None)
+    return counts
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Datos sintéticos para CarSense")
+    ap.add_argument("--db", default=None, help="URL de BD (por defecto la de app.db.session)")
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--years", type=int, default=5, help="años de historial por vehículo")
+    ap.add_argument("--min-vehicles", type=int, default=1)
+    ap.add_argument("--max-vehicles", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--batch-users", type=int, default=5000, help="usuarios por transacción")
+    ap.add_argument("--demo", action="store_true", help="sólo la cuenta demo")
+    args = ap.parse_args()
+
+    if args.db:
+        engine = create_engine(args.db)
+    else:
+        from app.db.session import engine
+    users = 1 if args.demo else args.users
+    t0 = time.perf_counter()
+    counts = generate(engine, users, args.years, args.seed, (args.min_vehicles, args.max_vehicles), args.batch_users)
+    print(f"Listo en {time.perf_counter() - t0:.1f}s: {counts} · login {DEMO_EMAIL} / {DEMO_PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
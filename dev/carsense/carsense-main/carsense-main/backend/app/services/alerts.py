@@ -0,0 +1,113 @@
+# backend/app/services/alerts.py
+"""
+Alertas de mantenimiento a partir del historial de servicios.
+
+Por cada vehículo y servicio de su plan (app/services/maintenance.py: por
+marca/modelo/año y perfil de uso) se toma el último servicio que coincide
+(fecha y km máximos) y la alerta toca si ya pasaron los km del intervalo sobre
+el odómetro actual o sus meses. Sin historial de ese servicio no se alerta
+(no hay de dónde contar). Se recorre la flota por lotes de vehículos; cada
+alerta nueva se anuncia por el canal push al confirmar.
+
+Lo corre el scheduler (toda la flota) y `POST /alerts/run-now` (un usuario).
+Con shards, por BD y sólo para los dueños que viven ahí (shards.owner_here).
+"""
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.clock import utcnow
+from app.db.dialect import insert_for
+from app.db import shards
+from app.db.models import Alert, ServiceRecord, User, Vehicle
+from app.services import maintenance, push
+
+PENDIENTE, HECHA = "pendiente", "hecha"
+
+
+def add_months(d: date, months: int) -> date:
+    y, m = divmod(d.month - 1 + months, 12)
+    y, m = d.year + y, m + 1
+    days = [31, 29 if y % 4 == 0 and (y % 100 or y % 400 == 0) else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+    return date(y, m, min(d.day, days[m - 1]))
+
+
+def due_date(interval: maintenance.Interval, last_date: Optional[date], last_km: Optional[int],
+             odometer_km: Optional[int], today: date) -> Optional[date]:
+    """Fecha programada si el servicio ya toca; None si todavía no."""
+    by_date = add_months(last_date, interval.months) if last_date and interval.months else None
+    if by_date and by_date <= today:
+        return by_date
+    if interval.km and last_km is not None and odometer_km is not None and odometer_km - last_km >= interval.km:
+        return today
+    return None
+
+
+def generate(db: Session, owner_id: Optional[int] = None, today: Optional[date] = None, batch: int = 1000) -> int:
+    """Crea las alertas pendientes que falten. Hace commit por lote; devuelve cuántas creó."""
+    now = utcnow()
+    today = today or now.date()
+    V, S, A = Vehicle, ServiceRecord, Alert
+    created, last_id = 0, 0
+    # dueños en mudanza (o ya mudados, sin purgar): sus alertas se generan en el destino
+    here = shards.owner_here(shards.current(db))
+    while True:
+        q = (select(V.id, V.owner_id, V.odometer_km, V.make_id, V.model_id, V.year, V.usage_profile)
+             .join(User, User.id == V.owner_id)
+             .where(V.id > last_id, here).order_by(V.id).limit(batch))
+        if owner_id is not None:
+            q = q.where(V.owner_id == owner_id)
+        vehicles = db.execute(q).all()
+        if not vehicles:
+            break
+        last_id = vehicles[-1].id
+        ids = [v.id for v in vehicles]
+
+        # último servicio por (vehículo, regla)
+        latest: Dict[Tuple[int, str], list] = {}
+        for vid, stype, d, km in db.execute(
+            select(S.vehicle_id, S.service_type, func.max(S.date), func.max(S.km))
+            .where(S.vehicle_id.in_(ids))
+            .group_by(S.vehicle_id, S.service_type)
+        ):
+            rule = maintenance.rule_for(stype)
+            if rule is None:
+                continue
+            cur = latest.setdefault((vid, rule), [d, km])
+            cur[0] = max(filter(None, (cur[0], d)), default=None)
+            cur[1] = max(filter(lambda x: x is not None, (cur[1], km)), default=None)
+        pending = set(db.execute(
+            select(A.vehicle_id, A.servicio).where(A.vehicle_id.in_(ids), A.estado == PENDIENTE)
+        ).tuples())
+
+        rows = []
+        for v in vehicles:
+            # memorizado por (marca, modelo, año, perfil): en una flota se repite mucho
+            for interval in maintenance.plan(v.make_id, v.model_id, v.year, v.usage_profile):
+                rule = interval.service
+                if (v.id, rule) in pending or (v.id, rule) not in latest:
+                    continue
+                when = due_date(interval, *latest[(v.id, rule)], v.odometer_km, today)
+                if when is not None:
+                    rows.append({"vehicle_id": v.id, "servicio": rule, "fecha_programada": when,
+                                 "estado": PENDIENTE, "created_at": now})
+        if rows:
+            owners = {v.id: v.owner_id for v in vehicles}
+            # otra generación concurrente (run-now) pudo ganar: el índice único decide
+            new = db.execute(
+                insert_for(db, Alert.__table__).on_conflict_do_nothing()
+                .returning(A.id, A.vehicle_id, A.servicio, A.fecha_programada),
+                rows,
+            ).all()
+            for a in new:
+                push.publish_after_commit(db, owners[a.vehicle_id], push.ALERT_CREATED, {
+                    "id": a.id, "vehicle_id": a.vehicle_id, "servicio": a.servicio,
+                    "fecha_programada": a.fecha_programada,
+                })
+            created += len(new)
+        db.commit()
+        if len(vehicles) < batch:
+            break
+    return created
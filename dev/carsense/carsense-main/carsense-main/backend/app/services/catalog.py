@@ -0,0 +1,278 @@
+# backend/app/services/catalog.py
+"""
+Catálogo de marcas/modelos (app/data/vehicle_catalog.tsv) y autocompletado.
+
+Las llaves se pliegan (`fold`): sin acentos, minúsculas y sólo letras y
+dígitos, así "VW", "vw" y "Volkswagen" o "CR-V", "crv" y "Cr V" coinciden.
+Cada modelo se indexa por su nombre, sus alias y "marca + modelo" (con cada
+alias de la marca): "vw jet" y "jetta" llegan al mismo Jetta.
+
+Autocompletado: trie comprimido (radix) en memoria con los TOP_K mejores
+resultados precalculados en cada nodo (marcas antes que modelos, luego el
+orden del archivo), así que una consulta es recorrer el prefijo: O(largo del
+prefijo), sin recorrer subárboles. Los nodos van aplanados en tuplas:
+
+    (primeras letras de las aristas, etiquetas, hijos, top)
+
+con `top` empaquetado como uint16 en bytes (se lee con memoryview, sin
+copiar): la mayor parte del tamaño son esas listas y así se cargan de disco
+sin crear un objeto por entero.
+
+La construcción se guarda en disco (marshal, en CATALOG_CACHE_DIR) con el
+hash del TSV en el nombre: los workers siguientes sólo la cargan.
+
+`normalize()` lleva un texto libre (marca, modelo) a los ids del catálogo;
+lo usan las altas de vehículos y `python -m app.jobs.normalize_vehicles`
+para las filas existentes. `python -m bench.catalog_autocomplete` mide
+consulta, construcción y carga.
+"""
+import hashlib
+import logging
+import marshal
+import os
+import tempfile
+import threading
+import unicodedata
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+log = logging.getLogger("carsense.catalog")
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "vehicle_catalog.tsv")
+FORMAT = 2   # súbelo si cambia la estructura guardada en disco
+TOP_K = 64   # resultados precalculados por nodo (alcanza para filtrar por marca/año)
+
+# entrada: (make_id, model_id o 0, marca, modelo o "", año desde, año hasta)
+Entry = Tuple[int, int, str, str, int, int]
+
+
+def fold(text: str) -> str:
+    s = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in s.casefold() if c.isalnum() and not unicodedata.combining(c))
+
+
+# ---------- Construcción ----------
+def parse(raw: str) -> Tuple[List[Entry], Dict[str, int], Dict[str, int], List[List[str]]]:
+    """(entradas, llave -> make_id, "make_id:llave" -> índice de entrada, llaves por entrada)."""
+    entries: List[Entry] = []
+    keys: List[List[str]] = []
+    makes: Dict[int, Tuple[str, List[str]]] = {}
+    make_keys: Dict[str, int] = {}
+    model_keys: Dict[str, int] = {}
+    for line in raw.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        f = line.split("\t")
+        if f[0] == "M":
+            make_id, name = int(f[1]), f[2]
+            folded = [fold(name)] + [fold(a) for a in f[3].split(";") if a]
+            makes[make_id] = (name, folded)
+            for k in folded:
+                make_keys.setdefault(k, make_id)
+            entries.append((make_id, 0, name, "", 0, 0))
+            keys.append(folded)
+        elif f[0] == "L":
+            model_id, make_id, name = int(f[1]), int(f[2]), f[3]
+            make_name, make_folded = makes[make_id]
+            own = [fold(name)] + [fold(a) for a in f[6].split(";") if a]
+            for k in own:
+                model_keys.setdefault(f"{make_id}:{k}", len(entries))
+            entries.append((make_id, model_id, make_name, name, int(f[4]), int(f[5])))
+            keys.append(own + [m + k for m in make_folded for k in own])
+    return entries, make_keys, model_keys, keys
+
+
+def build_trie(entries: List[Entry], keys: List[List[str]]) -> List[tuple]:
+    """Trie comprimido aplanado; el nodo 0 es la raíz."""
+    # rango: marcas primero, luego orden del archivo
+    assert len(entries) < 1 << 16, "top se guarda como uint16"
+    rank = sorted(range(len(entries)), key=lambda i: (entries[i][1] != 0, i))
+    order = {e: r for r, e in enumerate(rank)}
+
+    # 1) trie de un carácter por arista, con las entradas bajo cada nodo
+    children: List[Dict[str, int]] = [{}]
+    under: List[set] = [set()]
+    for i, ks in enumerate(keys):
+        for k in set(ks):
+            node = 0
+            under[0].add(i)
+            for c in k:
+                nxt = children[node].get(c)
+                if nxt is None:
+                    nxt = len(children)
+                    children[node][c] = nxt
+                    children.append({})
+                    under.append(set())
+                node = nxt
+                under[node].add(i)
+
+    # 2) compresión de cadenas sin bifurcación y aplanado
+    flat: List[Optional[tuple]] = []
+
+    def emit(node: int) -> int:
+        idx = len(flat)
+        flat.append(None)
+        firsts, labels, kids = [], [], []
+        for c, child in sorted(children[node].items()):
+            label = c
+            # mismo conjunto de entradas y un solo hijo: nada distingue al nodo intermedio
+            while len(children[child]) == 1 and under[child] == under[next(iter(children[child].values()))]:
+                c2, child = next(iter(children[child].items()))
+                label += c2
+            firsts.append(c)
+            labels.append(label)
+            kids.append(emit(child))
+        top = array("H", sorted(under[node], key=order.__getitem__)[:TOP_K]).tobytes()
+        flat[idx] = ("".join(firsts), tuple(labels), tuple(kids), top)
+        return idx
+
+    emit(0)
+    return flat
+
+
+# ---------- Catálogo ----------
+class Catalog:
+    def __init__(self, entries: List[Entry], make_keys: Dict[str, int], model_keys: Dict[str, int],
+                 nodes: List[tuple]):
+        self.entries = entries
+        self.make_keys = make_keys
+        self.model_keys = model_keys
+        self.nodes = nodes
+        self.make_entry = {e[0]: i for i, e in enumerate(entries) if e[1] == 0}
+        self.model_entry = {e[1]: i for i, e in enumerate(entries) if e[1]}
+        # modelos cuyo nombre plegado es único en todo el catálogo (para inferir la marca)
+        seen: Dict[str, List[int]] = {}
+        for k, i in model_keys.items():
+            seen.setdefault(k.split(":", 1)[1], []).append(i)
+        self.unique_models = {k: v[0] for k, v in seen.items() if len(set(v)) == 1}
+
+    def _top(self, prefix: str) -> bytes:
+        nodes = self.nodes
+        firsts, labels, kids, top = nodes[0]
+        rest = prefix
+        while rest:
+            i = firsts.find(rest[0])
+            if i < 0:
+                return b""
+            label, child = labels[i], kids[i]
+            if rest.startswith(label):
+                rest = rest[len(label):]
+                firsts, labels, kids, top = nodes[child]
+            elif label.startswith(rest):
+                return nodes[child][3]
+            else:
+                return b""
+        return top
+
+    def complete(self, q: str, make_id: Optional[int] = None, year: Optional[int] = None,
+                 limit: int = 10) -> List[Dict]:
+        prefix = fold(q)
+        if make_id is not None:
+            make = self.make_entry.get(make_id)
+            if make is None:
+                return []
+            prefix = fold(self.entries[make][2]) + prefix
+        out = []
+        for i in memoryview(self._top(prefix)).cast("H"):
+            e = self.entries[i]
+            if make_id is not None and (e[0] != make_id or not e[1]):
+                continue
+            if year is not None and e[1] and not (e[4] <= year <= (e[5] or 9999)):
+                continue
+            out.append(self.item(e))
+            if len(out) >= limit:
+                break
+        return out
+
+    @staticmethod
+    def item(e: Entry) -> Dict:
+        return {
+            "make_id": e[0], "make": e[2], "model_id": e[1] or None, "model": e[3] or None,
+            "label": f"{e[2]} {e[3]}" if e[1] else e[2],
+            "year_from": e[4] or None, "year_to": e[5] or None,
+        }
+
+    def normalize(self, make: Optional[str], model: Optional[str]) -> Tuple[Optional[Entry], Optional[Entry]]:
+        """(entrada de la marca, entrada del modelo) por coincidencia exacta plegada; None si no hay."""
+        fm, fmo = fold(make or ""), fold(model or "")
+        make_id = self.make_keys.get(fm)
+        if make_id is None and fmo in self.unique_models:
+            e = self.entries[self.unique_models[fmo]]
+            return self.entries[self.make_entry[e[0]]], e
+        if make_id is None:
+            return None, None
+        mk = self.entries[self.make_entry[make_id]]
+        i = self.model_keys.get(f"{make_id}:{fmo}")
+        if i is None:
+            # "Nissan Versa" capturado en el campo de modelo
+            for k, mid in self.make_keys.items():
+                if mid == make_id and fmo.startswith(k) and len(fmo) > len(k):
+                    i = self.model_keys.get(f"{make_id}:{fmo[len(k):]}")
+                    if i is not None:
+                        break
+        return mk, (self.entries[i] if i is not None else None)
+
+
+# ---------- Carga (con caché en disco) ----------
+def _cache_path(digest: str) -> str:
+    d = get_settings().CATALOG_CACHE_DIR or tempfile.gettempdir()
+    return os.path.join(d, f"carsense-catalog-{FORMAT}-{digest[:16]}.bin")
+
+
+def build(raw: str) -> Catalog:
+    entries, make_keys, model_keys, keys = parse(raw)
+    return Catalog(entries, make_keys, model_keys, build_trie(entries, keys))
+
+
+def load(path: Optional[str] = None, use_cache: bool = True) -> Catalog:
+    with open(path or get_settings().CATALOG_PATH or DEFAULT_PATH, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data + str(TOP_K).encode()).hexdigest()
+    cache = _cache_path(digest)
+    if use_cache:
+        try:
+            with open(cache, "rb") as f:
+                # loads(read()) y no load(f): éste lee de a poco y es ~10x más lento
+                fmt, stored, entries, make_keys, model_keys, nodes = marshal.loads(f.read())
+            if fmt == FORMAT and stored == digest:
+                return Catalog(list(entries), make_keys, model_keys, list(nodes))
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+    cat = build(data.decode("utf-8"))
+    if use_cache:
+        try:
+            os.makedirs(os.path.dirname(cache), exist_ok=True)
+            tmp = f"{cache}.{os.getpid()}"
+            with open(tmp, "wb") as f:
+                marshal.dump((FORMAT, digest, tuple(cat.entries), cat.make_keys, cat.model_keys,
+                              tuple(cat.nodes)), f)
+            os.replace(tmp, cache)  # atómico: otro worker nunca lee un archivo a medias
+        except OSError:
+            log.warning("No se pudo guardar la caché del catálogo en %s", cache)
+    return cat
+
+
+_catalog: Optional[Catalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> Catalog:
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = load()
+    return _catalog
+
+
+def normalize(make: Optional[str], model: Optional[str]) -> Dict:
+    """Campos del vehículo ya normalizados: nombres del catálogo e ids (o el texto tal cual)."""
+    mk, mo = get_catalog().normalize(make, model)
+    return {
+        "make": mk[2] if mk else make,
+        "make_id": mk[0] if mk else None,
+        "model": mo[3] if mo else model,
+        "model_id": mo[1] if mo else None,
+    }
@@ -0,0 +1,127 @@
+# backend/app/services/changes.py
+"""
+Bitácora de cambios para sincronización incremental (`/sync?since=<cursor>`).
+
+Los routers de vehículos, servicios y recordatorios llaman a `record()` en la
+misma transacción que el cambio. El cursor es el id de la bitácora: un cliente
+pide lo posterior a su cursor y recibe, por entidad, el estado actual de lo
+insertado/actualizado y los ids borrados (compactado: si un registro cambió
+varias veces sólo va su última versión).
+
+Un vehículo borrado implica que sus servicios y recordatorios también (se van
+por ON DELETE CASCADE sin pasar por los routers): el cliente debe quitarlos.
+
+La purga conserva siempre la última entrada, así que `min(id)` delimita lo que
+sigue disponible; un cursor anterior a eso recibe `reset` y resincroniza todo.
+En Postgres los ids se asignan antes del commit, por eso sólo se entregan
+entradas con más de SYNC_SETTLE_MS de antigüedad (en SQLite no hace falta:
+las escrituras son seriales).
+"""
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.core.clock import utcnow
+from app.core.config import get_settings
+from app.db import shards
+from app.db.models import ChangeLog, Reminder, ServiceRecord, Vehicle
+
+VEHICLE, SERVICE, REMINDER = "vehicle", "service", "reminder"
+UPSERT, DELETE = "upsert", "delete"
+
+# entidad -> (clave en la respuesta, modelo)
+ENTITIES = {
+    VEHICLE: ("vehicles", Vehicle),
+    SERVICE: ("services", ServiceRecord),
+    REMINDER: ("reminders", Reminder),
+}
+
+
+def record(db: Session, owner_id: int, entity: str, entity_id: int, op: str = UPSERT) -> None:
+    """Anota un cambio (en la transacción en curso; no hace commit)."""
+    db.add(ChangeLog(owner_id=owner_id, entity=entity, entity_id=entity_id, op=op, ts=utcnow()))
+
+
+def prune(db: Session, older_than_days: float) -> int:
+    cutoff = utcnow() - timedelta(days=older_than_days)
+    newest = select(func.max(ChangeLog.id)).scalar_subquery()
+    res = db.execute(delete(ChangeLog).where(ChangeLog.ts < cutoff, ChangeLog.id < newest))
+    return res.rowcount
+
+
+def _rows(db: Session, columns, keys, where) -> List[Dict]:
+    return [dict(zip(keys, r)) for r in db.execute(select(*columns).where(where))]
+
+
+def _entity_columns() -> Dict[str, Tuple[tuple, tuple]]:
+    # mismas columnas que los listados (import tardío: los routers importan este módulo)
+    from app.api.v1 import reminders, service_records, vehicles
+    return {
+        VEHICLE: (vehicles.LIST_COLUMNS, vehicles.LIST_KEYS),
+        SERVICE: (service_records.LIST_COLUMNS, service_records.LIST_KEYS),
+        REMINDER: (reminders.LIST_COLUMNS, reminders.LIST_KEYS),
+    }
+
+
+def _empty(cursor: int, reset: bool = False) -> Dict:
+    out = {"cursor": cursor, "reset": reset, "has_more": False}
+    for key, _ in ENTITIES.values():
+        out[key] = {"upserted": [], "deleted": []}
+    return out
+
+
+def full(db: Session, owner_id: int) -> Dict:
+    """Estado completo del usuario + cursor actual (primer arranque o reset)."""
+    cols = _entity_columns()
+    # piso = base de los cursores de esta BD: un cursor vacío ya dice de qué shard es
+    floor = shards.cursor_tag(db) << shards.CURSOR_BITS
+    cursor = db.execute(select(func.max(ChangeLog.id))).scalar() or floor
+    out = _empty(cursor, reset=True)
+    owned = select(Vehicle.id).where(Vehicle.owner_id == owner_id)
+    out["vehicles"]["upserted"] = _rows(db, *cols[VEHICLE], Vehicle.owner_id == owner_id)
+    out["services"]["upserted"] = _rows(db, *cols[SERVICE], ServiceRecord.vehicle_id.in_(owned))
+    out["reminders"]["upserted"] = _rows(db, *cols[REMINDER], Reminder.vehicle_id.in_(owned))
+    return out
+
+
+def delta(db: Session, owner_id: int, since: int, limit: int = 5000) -> Dict:
+    """Cambios del usuario con id > since (a lo más `limit` entradas de bitácora)."""
+    if since >> shards.CURSOR_BITS != shards.cursor_tag(db):
+        return full(db, owner_id)  # cursor de otra BD: el usuario cambió de shard
+    oldest = db.execute(select(func.min(ChangeLog.id))).scalar()
+    if oldest is not None and since < oldest - 1:
+        return full(db, owner_id)  # el cursor cae en la parte purgada
+
+    q = select(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op).where(
+        ChangeLog.owner_id == owner_id, ChangeLog.id > since
+    )
+    settle = get_settings().SYNC_SETTLE_MS
+    if settle and db.get_bind().dialect.name != "sqlite":
+        q = q.where(ChangeLog.ts <= utcnow() - timedelta(milliseconds=settle))
+    entries = db.execute(q.order_by(ChangeLog.id).limit(limit + 1)).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if not entries:
+        return _empty(since)
+
+    # compactar: última operación por (entidad, id)
+    last: Dict[Tuple[str, int], str] = {}
+    for _, entity, entity_id, op in entries:
+        last[(entity, entity_id)] = op
+
+    out = _empty(entries[-1].id)
+    out["has_more"] = has_more
+    cols = _entity_columns()
+    for entity, (key, model) in ENTITIES.items():
+        ups = [i for (e, i), op in last.items() if e == entity and op == UPSERT]
+        dels = [i for (e, i), op in last.items() if e == entity and op == DELETE]
+        if ups:
+            found = _rows(db, *cols[entity], model.id.in_(ups))
+            out[key]["upserted"] = found
+            # anotado como upsert pero ya no existe (cascada): es un borrado
+            seen = {r["id"] for r in found}
+            dels.extend(i for i in ups if i not in seen)
+        out[key]["deleted"] = sorted(dels)
+    return out
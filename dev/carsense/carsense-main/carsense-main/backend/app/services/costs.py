@@ -0,0 +1,162 @@
+# backend/app/services/costs.py
+"""
+Costos de mantenimiento.
+
+`service_cost_monthly` guarda (vehículo, mes, tipo, moneda) -> n, centavos.
+Alta y baja de servicios aplican un delta (+1/-1) con un upsert, así que las
+analíticas agregan filas de resumen (≈ meses × tipos), nunca servicios. No se
+convierten monedas: cada total va por moneda.
+"""
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.db.dialect import insert_for
+from app.db.models import ServiceCostMonthly, ServiceRecord, Vehicle, VehicleUsage
+
+Key = Tuple[int, int, str, str]  # (vehicle_id, month, service_type, currency)
+
+
+def month_of(d: Optional[date]) -> int:
+    return d.year * 100 + d.month if d else 0
+
+
+def key_of(rec) -> Key:
+    return (rec.vehicle_id, month_of(rec.date), rec.service_type, rec.currency or "MXN")
+
+
+def apply(bind, deltas: Dict[Key, List[int]]) -> None:
+    """Suma deltas [n, centavos] a los resúmenes (bind: Session o Connection). No hace commit."""
+    if not deltas:
+        return
+    T = ServiceCostMonthly
+    ins = insert_for(bind, T)
+    bind.execute(
+        ins.on_conflict_do_update(
+            index_elements=["vehicle_id", "month", "service_type", "currency"],
+            set_={"n": T.n + ins.excluded.n, "cost_cents": T.cost_cents + ins.excluded.cost_cents},
+        ),
+        [{"vehicle_id": k[0], "month": k[1], "service_type": k[2], "currency": k[3], "n": d[0], "cost_cents": d[1]}
+         for k, d in deltas.items()],
+    )
+    if any(d[0] < 0 for d in deltas.values()):
+        bind.execute(delete(T).where(T.n <= 0))
+
+
+def on_created(db: Session, rec: ServiceRecord) -> None:
+    apply(db, {key_of(rec): [1, rec.cost_cents or 0]})
+
+
+def on_deleted(db: Session, rec: ServiceRecord) -> None:
+    apply(db, {key_of(rec): [-1, -(rec.cost_cents or 0)]})
+
+
+def accumulate(rows: Iterable) -> Dict[Key, List[int]]:
+    acc: Dict[Key, List[int]] = {}
+    for r in rows:
+        a = acc.setdefault(key_of(r), [0, 0])
+        a[0] += 1
+        a[1] += r.cost_cents or 0
+    return acc
+
+
+# ---------- Lectura (sólo resúmenes) ----------
+def _scope(owner_id: int, vehicle_id: Optional[int]):
+    T = ServiceCostMonthly
+    q = [Vehicle.owner_id == owner_id]
+    if vehicle_id is not None:
+        q.append(T.vehicle_id == vehicle_id)
+    return q
+
+
+def _money(cents) -> float:
+    return round((cents or 0) / 100, 2)
+
+
+def by_month(db: Session, owner_id: int, vehicle_id: Optional[int] = None,
+             since: Optional[int] = None, until: Optional[int] = None) -> List[Dict]:
+    T = ServiceCostMonthly
+    q = (select(T.month, T.currency, func.sum(T.n), func.sum(T.cost_cents))
+         .join(Vehicle, Vehicle.id == T.vehicle_id)
+         .where(*_scope(owner_id, vehicle_id), T.month > 0))
+    if since is not None:
+        q = q.where(T.month >= since)
+    if until is not None:
+        q = q.where(T.month <= until)
+    rows = db.execute(q.group_by(T.month, T.currency).order_by(T.month, T.currency)).all()
+    return [{"month": f"{m // 100:04d}-{m % 100:02d}", "currency": c, "services": n, "cost": _money(cents)}
+            for m, c, n, cents in rows]
+
+
+def by_type(db: Session, owner_id: int, vehicle_id: Optional[int] = None) -> List[Dict]:
+    T = ServiceCostMonthly
+    total = func.sum(T.cost_cents)
+    rows = db.execute(
+        select(T.service_type, T.currency, func.sum(T.n), total)
+        .join(Vehicle, Vehicle.id == T.vehicle_id)
+        .where(*_scope(owner_id, vehicle_id))
+        .group_by(T.service_type, T.currency)
+        .order_by(total.desc())
+    ).all()
+    return [{"service_type": t, "currency": c, "services": n, "cost": _money(cents)} for t, c, n, cents in rows]
+
+
+def by_vehicle(db: Session, owner_id: int) -> List[Dict]:
+    """Total por vehículo y costo por km (km recorridos según el historial de odómetro)."""
+    T = ServiceCostMonthly
+    rows = db.execute(
+        select(Vehicle.id, Vehicle.make, Vehicle.model, T.currency, func.sum(T.n), func.sum(T.cost_cents),
+               VehicleUsage.first_km, VehicleUsage.last_km)
+        .join(T, T.vehicle_id == Vehicle.id)
+        .outerjoin(VehicleUsage, VehicleUsage.vehicle_id == Vehicle.id)
+        .where(Vehicle.owner_id == owner_id)
+        .group_by(Vehicle.id, Vehicle.make, Vehicle.model, T.currency, VehicleUsage.first_km, VehicleUsage.last_km)
+        .order_by(Vehicle.id, T.currency)
+    ).all()
+    out = []
+    for vid, make, model, cur, n, cents, first_km, last_km in rows:
+        km = (last_km - first_km) if first_km is not None and last_km is not None else None
+        out.append({
+            "vehicle_id": vid, "make": make, "model": model, "currency": cur, "services": n,
+            "cost": _money(cents), "km_driven": km,
+            "cost_per_km": round(cents / 100 / km, 4) if km else None,
+        })
+    return out
+
+
+# ---------- Backfill ----------
+def backfill(conn: Connection, batch: int = 5000, log=print) -> int:
+    """
+    Reconstruye los resúmenes desde service_records en una sola transacción:
+    borra y vuelve a sumar por lotes de id (keyset, para no cargar todo en
+    memoria) y confirma al final. Nadie ve la tabla vacía o a medias y, si
+    falla, quedan los resúmenes de antes.
+
+    Altas y bajas concurrentes esperan a que termine (en Postgres la tabla se
+    bloquea en modo EXCLUSIVE, las lecturas siguen; en SQLite el DELETE toma
+    el candado de escritura). Su servicio aún no está confirmado, así que el
+    recorrido no lo cuenta y su delta se aplica después: no hay dobles.
+    """
+    T, S = ServiceCostMonthly, ServiceRecord
+    cols = (S.id, S.vehicle_id, S.date, S.service_type, S.currency, S.cost_cents)
+    last_id, done = 0, 0
+    try:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(f"LOCK TABLE {T.__tablename__} IN EXCLUSIVE MODE"))
+        conn.execute(delete(T))
+        while True:
+            rows = conn.execute(select(*cols).where(S.id > last_id).order_by(S.id).limit(batch)).all()
+            if not rows:
+                break
+            apply(conn, accumulate(rows))
+            last_id = rows[-1].id
+            done += len(rows)
+            log(f"backfill costos: {done:,} servicios")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return done
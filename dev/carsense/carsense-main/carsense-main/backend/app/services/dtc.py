@@ -0,0 +1,145 @@
+# backend/app/services/dtc.py
+"""
+Bitácora de códigos de falla (DTC) por vehículo.
+
+Cada reporte hace un upsert sobre `dtc_summary` (vehículo, código): si llega
+dentro de DTC_DEDUP_MINUTES de la última ocurrencia contada sólo suma a
+`reports`; si no, cuenta una ocurrencia nueva y deja una fila en `dtc_events`.
+Las consultas de "activos/recurrentes" y el top de flota leen sólo contadores
+(`dtc_summary`, `dtc_code_stats`), nunca los eventos.
+
+DTC_MAP es la misma base que usa el chatbot para describir códigos.
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, case, desc, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db import shards
+from app.db.dialect import greatest, insert_for, least
+from app.db.models import DtcCodeStats, DtcEvent, DtcSummary
+
+DTC_MAP: Dict[str, str] = {
+    "P0171": "Mezcla pobre (Bank 1). Revisa tomas de aire falsas, MAF sucio, presion de combustible y fugas de vacio.",
+    "P0420": "Eficiencia del catalizador por debajo del umbral. Revisa fugas en escape, sensores O2 y estado del catalizador.",
+    "P0300": "Fallo de encendido aleatorio. Revisa bujias, bobinas, cables, inyectores y compresion.",
+    "P0442": "Fuga pequena en sistema EVAP. Revisa tapa de combustible, mangueras EVAP y valvula de purga.",
+    "P0128": "Temperatura de refrigerante baja. Termostato abierto o sensor ECT defectuoso.",
+}
+
+SYSTEMS = {"P": "Tren motriz", "B": "Carrocería", "C": "Chasis", "U": "Red/comunicación"}
+CODE_RE = re.compile(r"^[PBCU][0-3][0-9A-F]{3}$")
+
+
+def normalize(code: str) -> Optional[str]:
+    c = (code or "").strip().upper()
+    return c if CODE_RE.match(c) else None
+
+
+def describe(code: str) -> str:
+    return DTC_MAP.get(code) or f"{SYSTEMS.get(code[:1], 'Sistema')}: código {code} sin descripción en la base."
+
+
+# ---------- Escritura ----------
+def record(db: Session, vehicle_id: int, code: str, ts: datetime, source: str) -> bool:
+    """Registra un reporte. Devuelve True si contó como ocurrencia nueva. No hace commit."""
+    s = get_settings()
+    cutoff = ts - timedelta(minutes=s.DTC_DEDUP_MINUTES)
+    S = DtcSummary
+    ins = insert_for(db, S).values(
+        vehicle_id=vehicle_id, code=code, first_seen=ts, last_seen=ts,
+        last_event_at=ts, count=1, reports=1, cleared_at=None,
+    )
+    # ocurrencia nueva: fuera de la ventana, o el código volvió tras borrarse
+    new = or_(S.last_event_at <= literal(cutoff, S.last_event_at.type),
+              and_(S.cleared_at.is_not(None), S.cleared_at < literal(ts, S.cleared_at.type)))
+    stmt = ins.on_conflict_do_update(
+        index_elements=["vehicle_id", "code"],
+        set_={
+            "count": S.count + case((new, 1), else_=0),
+            "last_event_at": case((new, ins.excluded.last_event_at), else_=S.last_event_at),
+            "cleared_at": case((new, None), else_=S.cleared_at),
+            "first_seen": least(db, S.first_seen, ins.excluded.first_seen),
+            "last_seen": greatest(db, S.last_seen, ins.excluded.last_seen),
+            "reports": S.reports + 1,
+        },
+    ).returning(S.last_event_at, S.reports)
+    last_event_at, reports = db.execute(stmt).one()
+    if last_event_at != ts:
+        return False
+
+    # el UNIQUE (vehicle_id, code, ts) descarta reintentos con el mismo ts
+    ev = insert_for(db, DtcEvent).values(vehicle_id=vehicle_id, code=code, ts=ts, source=source)
+    if db.execute(ev.on_conflict_do_nothing()).rowcount != 1:
+        return False
+
+    C = DtcCodeStats
+    first_for_vehicle = 1 if reports == 1 else 0
+    fleet = insert_for(db, C).values(code=code, occurrences=1, vehicles=first_for_vehicle)
+    db.execute(fleet.on_conflict_do_update(
+        index_elements=["code"],
+        set_={"occurrences": C.occurrences + 1, "vehicles": C.vehicles + fleet.excluded.vehicles},
+    ))
+    return True
+
+
+def record_many(db: Session, vehicle_id: int, codes: Iterable[str], ts: datetime, source: str) -> List[Dict]:
+    return [{"code": c, "new": record(db, vehicle_id, c, ts, source)} for c in dict.fromkeys(codes)]
+
+
+def clear(db: Session, vehicle_id: int, ts: datetime) -> int:
+    """Borrado de códigos en el escáner: los activos dejan de estarlo hasta reaparecer."""
+    return db.execute(
+        update(DtcSummary)
+        .where(DtcSummary.vehicle_id == vehicle_id, DtcSummary.cleared_at.is_(None))
+        .values(cleared_at=ts)
+    ).rowcount
+
+
+# ---------- Lectura (sólo contadores) ----------
+def vehicle_codes(db: Session, vehicle_id: int, now: datetime, active: Optional[bool] = None,
+                  recurring: Optional[bool] = None) -> List[Dict]:
+    s = get_settings()
+    S = DtcSummary
+    active_expr = and_(S.cleared_at.is_(None), S.last_seen >= now - timedelta(days=s.DTC_ACTIVE_DAYS))
+    q = select(S.code, S.first_seen, S.last_seen, S.count, S.reports, S.cleared_at,
+               active_expr.label("active")).where(S.vehicle_id == vehicle_id)
+    if active is not None:
+        q = q.where(active_expr if active else ~active_expr)
+    if recurring is not None:
+        q = q.where(S.count > 1 if recurring else S.count <= 1)
+    rows = db.execute(q.order_by(desc(S.last_seen))).all()
+    return [dict(r._mapping, active=bool(r.active), recurring=r.count > 1, description=describe(r.code))
+            for r in rows]
+
+
+def fleet_top(db: Session, limit: int = 10) -> List[Dict]:
+    C = DtcCodeStats
+    if shards.enabled():
+        return _fleet_top_sharded(limit)
+    rows = db.execute(
+        select(C.code, C.occurrences, C.vehicles).order_by(desc(C.occurrences), C.code).limit(limit)
+    ).all()
+    return [dict(r._mapping, description=describe(r.code)) for r in rows]
+
+
+def _fleet_top_sharded(limit: int) -> List[Dict]:
+    """Con shards: contadores de todas las BDs sumados por código (la tabla es de a lo más miles de filas)."""
+    C = DtcCodeStats
+    totals: Dict[str, List[int]] = {}
+    for _, rows in shards.fanout(lambda db: db.execute(select(C.code, C.occurrences, C.vehicles)).all()):
+        for code, occurrences, vehicles in rows:
+            t = totals.setdefault(code, [0, 0])
+            t[0] += occurrences
+            t[1] += vehicles
+    top = sorted(totals.items(), key=lambda kv: (-kv[1][0], kv[0]))[:limit]
+    return [{"code": code, "occurrences": o, "vehicles": v, "description": describe(code)} for code, (o, v) in top]
+
+
+def events(db: Session, vehicle_id: int, limit: int = 100) -> List[DtcEvent]:
+    return db.execute(
+        select(DtcEvent).where(DtcEvent.vehicle_id == vehicle_id).order_by(desc(DtcEvent.ts)).limit(limit)
+    ).scalars().all()
@@ -0,0 +1,167 @@
+# backend/app/services/idempotency.py
+"""
+Cabecera `Idempotency-Key` en los endpoints de alta.
+
+`claim()` inserta (usuario, llave) en `idempotency_keys` dentro de la misma
+transacción que el alta, y `respond()` guarda ahí el cuerpo de la respuesta
+justo antes del commit: o quedan la entidad y su respuesta, o ninguna. Un
+reintento con la misma llave recibe el cuerpo guardado (cabecera
+`Idempotent-Replayed: true`) sin tocar las tablas de entidades.
+
+Reintentos concurrentes: la PK hace que el INSERT del segundo espere al
+primero (lock de escritura en SQLite, índice único en Postgres); cuando éste
+confirma, el segundo ve el conflicto y reproduce su respuesta. Si el primero
+falla (rollback) la llave queda libre.
+
+Misma llave con otra petición (otra ruta u otro cuerpo) -> 422. Las llaves se
+guardan como digest de 16 bytes y vencen a las IDEMPOTENCY_TTL_H; el
+scheduler purga las vencidas. Cada worker mantiene un LRU con las respuestas
+recientes: el reintento típico (segundos después) no llega a la BD.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+from sqlalchemy import delete, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.clock import utcnow
+from app.core.config import get_settings
+from app.core.responses import dumps
+from app.db.dialect import insert_for
+from app.db.models import IdempotencyKey
+
+REPLAYED = "Idempotent-Replayed"
+
+metrics.describe("carsense_idempotency_total", "counter",
+                 "Altas con Idempotency-Key por resultado (new/replay_cache/replay_db/mismatch).")
+
+Entry = Tuple[bytes, int, bytes, datetime]  # request_hash, status, body, expires_at
+
+
+def _digest(*parts: str) -> bytes:
+    return hashlib.blake2b("\x00".join(parts).encode(), digest_size=16).digest()
+
+
+# ---------- LRU por worker ----------
+class _Lru:
+    def __init__(self, size: int):
+        self.size = size
+        self._d: "OrderedDict[Tuple[int, bytes], Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, k: Tuple[int, bytes], now: datetime) -> Optional[Entry]:
+        with self._lock:
+            e = self._d.get(k)
+            if e is None:
+                return None
+            if e[3] <= now:
+                del self._d[k]
+                return None
+            self._d.move_to_end(k)
+            return e
+
+    def put(self, k: Tuple[int, bytes], e: Entry) -> None:
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._d[k] = e
+            self._d.move_to_end(k)
+            while len(self._d) > self.size:
+                self._d.popitem(last=False)
+
+    def forget(self, owner_ids) -> None:
+        ids = set(owner_ids)
+        with self._lock:
+            for k in [k for k in self._d if k[0] in ids]:
+                del self._d[k]
+
+
+_lru = _Lru(get_settings().IDEMPOTENCY_LRU_SIZE)
+
+
+# ---------- Alta ----------
+class Claim:
+    """Llave reclamada en la transacción en curso, o respuesta a reproducir (`replay`)."""
+
+    __slots__ = ("owner_id", "key", "request_hash", "expires_at", "replay")
+
+    def __init__(self, owner_id: int, key: bytes, request_hash: bytes, expires_at: Optional[datetime] = None,
+                 replay: Optional[Response] = None):
+        self.owner_id, self.key, self.request_hash = owner_id, key, request_hash
+        self.expires_at, self.replay = expires_at, replay
+
+
+def _replay(e: Entry, request_hash: bytes, source: str) -> Response:
+    if e[0] != request_hash:
+        metrics.inc("carsense_idempotency_total", (("result", "mismatch"),))
+        raise HTTPException(status_code=422, detail="Idempotency-Key ya usada con otra petición")
+    metrics.inc("carsense_idempotency_total", (("result", source),))
+    return Response(content=e[2], status_code=e[1], media_type="application/json", headers={REPLAYED: "true"})
+
+
+def claim(db: Session, owner_id: int, key: Optional[str], route: str, payload: BaseModel) -> Optional[Claim]:
+    """None sin llave. No hace commit (el INSERT va en la transacción del alta)."""
+    if key is None:
+        return None
+    now = utcnow()
+    k = _digest(key)
+    request_hash = _digest(route, payload.model_dump_json())
+    cached = _lru.get((owner_id, k), now)
+    if cached is not None:
+        return Claim(owner_id, k, request_hash, replay=_replay(cached, request_hash, "replay_cache"))
+
+    I = IdempotencyKey
+    expires = now + timedelta(hours=get_settings().IDEMPOTENCY_TTL_H)
+    row = {"owner_id": owner_id, "key": k, "request_hash": request_hash, "status": 0, "body": b"",
+           "expires_at": expires}
+    if db.execute(insert_for(db, I.__table__).on_conflict_do_nothing(), row).rowcount == 1:
+        metrics.inc("carsense_idempotency_total", (("result", "new"),))
+        return Claim(owner_id, k, request_hash, expires)
+    stored = db.execute(
+        select(I.request_hash, I.status, I.body, I.expires_at).where(I.owner_id == owner_id, I.key == k)
+    ).one()
+    if stored.expires_at <= now:
+        # vencida pero aún sin purgar: se reutiliza
+        db.execute(update(I).where(I.owner_id == owner_id, I.key == k).values(**row))
+        metrics.inc("carsense_idempotency_total", (("result", "new"),))
+        return Claim(owner_id, k, request_hash, expires)
+    entry = tuple(stored)
+    _lru.put((owner_id, k), entry)
+    return Claim(owner_id, k, request_hash, replay=_replay(entry, request_hash, "replay_db"))
+
+
+def respond(db: Session, c: Claim, out: BaseModel, status_code: int) -> Response:
+    """Guarda la respuesta junto con el alta, hace commit y la devuelve."""
+    body = dumps(out.model_dump(mode="json"))
+    I = IdempotencyKey
+    db.execute(update(I).where(I.owner_id == c.owner_id, I.key == c.key).values(status=status_code, body=body))
+    db.commit()
+    _lru.put((c.owner_id, c.key), (c.request_hash, status_code, body, c.expires_at))
+    return Response(content=body, status_code=status_code, media_type="application/json")
+
+
+# ---------- Purga ----------
+def forget(owner_ids) -> None:
+    """Quita del LRU de este worker las respuestas de cuentas borradas (sus filas las borra delete_accounts)."""
+    _lru.forget(owner_ids)
+
+
+def prune(engine, batch: int = 5000) -> int:
+    """Borra llaves vencidas en lotes cortos (no retiene el lock de escritura). Lo corre el scheduler."""
+    I = IdempotencyKey
+    now = utcnow()
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            keys = conn.execute(select(I.owner_id, I.key).where(I.expires_at <= now).limit(batch)).all()
+            if keys:
+                conn.execute(delete(I).where(tuple_(I.owner_id, I.key).in_(keys)))
+        total += len(keys)
+        if len(keys) < batch:
+            return total
@@ -0,0 +1,227 @@
+# backend/app/services/maintenance.py
+"""
+Catálogo único de intervalos de mantenimiento (app/data/maintenance_rules.tsv).
+
+Lo consumen las alertas (app/services/alerts.py), el generador sintético y
+las respuestas del chatbot; no hay otra copia de los intervalos.
+
+  S  servicio, etiqueta, descripción, factor de uso severo
+  R  servicio, perfil, marca, modelo, año desde, año hasta, km, meses
+
+Marca y modelo se resuelven con el catálogo de vehículos (app/services/
+catalog.py) al cargar, así que las reglas quedan indexadas por
+(make_id, model_id): 0 = cualquiera. Por servicio gana la regla más
+específica que incluya el año: modelo > marca > genérica y, a igual nivel,
+con rango de años > sin rango.
+
+Perfiles: "normal" y "severo". Para "severo" se usa la regla severa más
+específica si es al menos tan específica como la normal; si no, la normal
+multiplicada por el factor del servicio (un Tsuru en uso severo parte de su
+regla de modelo, no de la genérica severa).
+
+`plan(make_id, model_id, year, profile)` se memoriza por worker: después del
+primer vehículo de cada (marca, modelo, año, perfil) es una búsqueda en dict.
+"""
+import os
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services import catalog
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "maintenance_rules.tsv")
+
+NORMAL, SEVERE = "normal", "severo"
+PROFILES = (NORMAL, SEVERE)
+
+
+class Interval(NamedTuple):
+    service: str
+    label: str
+    description: str
+    km: int      # 0 = sólo por tiempo
+    months: int  # 0 = sólo por km
+
+
+# regla: (servicio, perfil, año desde, año hasta, km, meses, especificidad)
+Rule = Tuple[str, str, int, int, int, int, Tuple[int, int]]
+
+
+class RuleBook:
+    def __init__(self, services: Dict[str, Tuple[str, str, float]], index: Dict[Tuple[int, int], List[Rule]]):
+        self.services = services  # servicio -> (etiqueta, descripción, factor severo), en orden del archivo
+        self.index = index
+
+    def _best(self, rules: List[Rule], service: str, profile: str, year: Optional[int]) -> Optional[Rule]:
+        best = None
+        for r in rules:
+            if r[0] != service or r[1] != profile:
+                continue
+            if r[2] or r[3]:
+                if year is None or not (r[2] or 0) <= year <= (r[3] or 9999):
+                    continue
+            if best is None or r[6] > best[6]:
+                best = r
+        return best
+
+    def resolve(self, make_id: int, model_id: int, year: Optional[int], profile: str) -> Tuple[Interval, ...]:
+        rules = self.index.get((0, 0), []) + self.index.get((make_id, 0), []) + \
+            (self.index.get((make_id, model_id), []) if model_id else [])
+        out = []
+        for service, (label, description, factor) in self.services.items():
+            normal = self._best(rules, service, NORMAL, year)
+            if profile == SEVERE:
+                severe = self._best(rules, service, SEVERE, year)
+                if severe is not None and (normal is None or severe[6] >= normal[6]):
+                    out.append(Interval(service, label, description, severe[4], severe[5]))
+                    continue
+                if normal is not None:
+                    out.append(Interval(service, label, description, _scale(normal[4], factor, 500),
+                                        _scale(normal[5], factor, 1)))
+                    continue
+            if normal is not None:
+                out.append(Interval(service, label, description, normal[4], normal[5]))
+        return tuple(out)
+
+
+def _scale(value: int, factor: float, step: int) -> int:
+    if not value:
+        return 0
+    return max(step, round(value * factor / step) * step)
+
+
+def parse(raw: str) -> RuleBook:
+    cat = catalog.get_catalog()
+    services: Dict[str, Tuple[str, str, float]] = {}
+    index: Dict[Tuple[int, int], List[Rule]] = {}
+    for n, line in enumerate(raw.splitlines(), 1):
+        if not line or line.startswith("#"):
+            continue
+        f = line.split("\t")
+        try:
+            if f[0] == "S":
+                services[f[1]] = (f[2], f[3], float(f[4]))
+            elif f[0] == "R":
+                service, profile, make, model = f[1], f[2], f[3], f[4]
+                y0, y1, km, months = map(int, f[5:9])
+            else:
+                raise ValueError(f"tipo de registro desconocido {f[0]!r}")
+        except (IndexError, ValueError) as e:
+            raise ValueError(f"{n}: línea inválida ({e})") from None
+        if f[0] == "S":
+            continue
+        if service not in services:
+            raise ValueError(f"{n}: servicio {service!r} no declarado")
+        if profile not in PROFILES:
+            raise ValueError(f"{n}: perfil {profile!r} desconocido")
+        make_id = model_id = 0
+        if make != "*":
+            mk, mo = cat.normalize(make, None if model == "*" else model)
+            if mk is None or (model != "*" and mo is None):
+                raise ValueError(f"{n}: {make} {model} no está en el catálogo de vehículos")
+            make_id, model_id = mk[0], (mo[1] if mo else 0)
+        spec = (2 if model_id else 1 if make_id else 0, 1 if y0 or y1 else 0)
+        index.setdefault((make_id, model_id), []).append((service, profile, y0, y1, km, months, spec))
+    return RuleBook(services, index)
+
+
+def load(path: Optional[str] = None) -> RuleBook:
+    with open(path or get_settings().MAINTENANCE_RULES_PATH or DEFAULT_PATH, encoding="utf-8") as f:
+        return parse(f.read())
+
+
+_rules: Optional[RuleBook] = None
+_rules_lock = threading.Lock()
+
+
+def get_rules() -> RuleBook:
+    global _rules
+    if _rules is None:
+        with _rules_lock:
+            if _rules is None:
+                _rules = load()
+    return _rules
+
+
+# ---------- Consulta ----------
+@lru_cache(maxsize=get_settings().MAINTENANCE_CACHE_SIZE)
+def plan(make_id: Optional[int], model_id: Optional[int], year: Optional[int],
+         profile: Optional[str] = NORMAL) -> Tuple[Interval, ...]:
+    """Intervalos vigentes para un vehículo ya normalizado (ids del catálogo; None = genérico)."""
+    return get_rules().resolve(make_id or 0, model_id or 0, year, profile or NORMAL)
+
+
+@lru_cache(maxsize=4096)
+def plan_for(make: Optional[str], model: Optional[str], year: Optional[int],
+             profile: Optional[str] = NORMAL) -> Tuple[Interval, ...]:
+    """Igual que `plan` pero desde texto libre (pasa por el catálogo)."""
+    ids = catalog.normalize(make, model)
+    return plan(ids["make_id"], ids["model_id"], year, profile)
+
+
+def services() -> Tuple[str, ...]:
+    return tuple(get_rules().services)
+
+
+def cache_info():
+    return plan.cache_info()
+
+
+# ---------- Tipo de servicio capturado -> servicio del catálogo ----------
+def _words(text: str) -> Tuple[str, ...]:
+    plain = unicodedata.normalize("NFKD", text.lower()).encode("ascii", "ignore").decode()
+    return tuple(plain.replace("_", " ").split())
+
+
+@lru_cache(maxsize=4096)
+def rule_for(service_type: str) -> Optional[str]:
+    """
+    Servicio cuyo nombre aparece (por prefijo de palabra) en el tipo capturado;
+    si varios, el de más palabras ("Cambio de líquido de frenos" es
+    liquido_frenos y no freno).
+    """
+    words = _words(service_type)
+    best, best_len = None, 0
+    for service in get_rules().services:
+        needed = _words(service)
+        if len(needed) > best_len and all(any(w.startswith(n) for w in words) for n in needed):
+            best, best_len = service, len(needed)
+    return best
+
+
+# ---------- Texto para el chatbot ----------
+def describe(i: Interval) -> str:
+    """'10,000 km o 6 meses'"""
+    parts = []
+    if i.km:
+        parts.append(f"{i.km:,} km")
+    if i.months:
+        parts.append(f"{i.months} meses" if i.months != 1 else "1 mes")
+    return " o ".join(parts) or "según el manual"
+
+
+def summary(intervals: Tuple[Interval, ...], only: Optional[Tuple[str, ...]] = None) -> str:
+    """'Aceite y filtro cada 10,000 km o 6 meses; Frenos cada ...'"""
+    return "; ".join(f"{i.label} cada {describe(i)}" for i in intervals if only is None or i.service in only)
+
+
+def get(intervals: Tuple[Interval, ...], service: str) -> Optional[Interval]:
+    for i in intervals:
+        if i.service == service:
+            return i
+    return None
+
+
+def advice(service: str, make_id: Optional[int] = None, model_id: Optional[int] = None,
+           year: Optional[int] = None) -> str:
+    """'cada 10,000 km o 6 meses (uso severo: 5,000 km o 3 meses)'"""
+    normal = get(plan(make_id, model_id, year), service)
+    severe = get(plan(make_id, model_id, year, SEVERE), service)
+    if normal is None:
+        return "según el manual"
+    text = f"cada {describe(normal)}"
+    if severe is not None and (severe.km, severe.months) != (normal.km, normal.months):
+        text += f" (uso severo: {describe(severe)})"
+    return text
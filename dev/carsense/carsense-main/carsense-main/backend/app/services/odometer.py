@@ -0,0 +1,100 @@
+# backend/app/services/odometer.py
+"""
+Historial de odómetro y tasa de uso (km/día) incremental.
+
+Cada lectura nueva actualiza `vehicle_usage` en O(1): el km/día es una media
+móvil exponencial ponderada por tiempo (vida media ~USAGE_TAU_DAYS), así que
+nunca se relee el historial. El odómetro actual y la fecha proyectada para un
+`due_km` salen de esa única fila.
+"""
+import math
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import desc, select
+from sqlalchemy.orm import Session
+
+from app.db.dialect import insert_for
+from app.db.models import OdometerReading, Vehicle, VehicleUsage
+
+USAGE_TAU_DAYS = 30.0
+_MIN_DT_DAYS = 1.0 / 24  # lecturas a menos de 1 h no mueven la tasa
+
+
+def _apply(usage: VehicleUsage, ts: datetime, km: int) -> None:
+    """Incorpora una lectura posterior a la última conocida."""
+    if km < usage.last_km:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El odómetro no puede bajar ({km} < {usage.last_km} km)",
+        )
+    anchor_ts = usage.anchor_ts or usage.last_ts
+    anchor_km = usage.anchor_km if usage.anchor_km is not None else usage.last_km
+    usage.last_ts, usage.last_km = ts, km
+    dt_days = (ts - anchor_ts).total_seconds() / 86400.0
+    if dt_days < _MIN_DT_DAYS:
+        # muy cerca: la tasa se medirá luego desde el mismo ancla, sin perder estos km
+        usage.anchor_ts, usage.anchor_km = anchor_ts, anchor_km
+        return
+    rate = (km - anchor_km) / dt_days
+    if usage.km_per_day is None:
+        usage.km_per_day = rate
+    else:
+        alpha = 1.0 - math.exp(-dt_days / USAGE_TAU_DAYS)
+        usage.km_per_day += alpha * (rate - usage.km_per_day)
+    usage.anchor_ts = usage.anchor_km = None
+
+
+def record_readings(db: Session, vehicle: Vehicle, readings: Iterable[Tuple[datetime, int]]) -> VehicleUsage:
+    """Guarda lecturas (ts, km) y actualiza el resumen. No hace commit."""
+    rows = sorted(readings)
+    if not rows:
+        raise HTTPException(status_code=400, detail="Sin lecturas")
+    for (_, a), (_, b) in zip(rows, rows[1:]):
+        if b < a:
+            raise HTTPException(status_code=400, detail="Las lecturas deben crecer con el tiempo")
+
+    usage = db.get(VehicleUsage, vehicle.id)
+    if usage is None:
+        ts, km = rows[0]
+        usage = VehicleUsage(vehicle_id=vehicle.id, first_ts=ts, first_km=km, last_ts=ts, last_km=km)
+        db.add(usage)
+
+    for ts, km in rows:
+        if ts > usage.last_ts:
+            _apply(usage, ts, km)
+        elif ts < usage.first_ts:
+            # lectura atrasada: sólo amplía el inicio de la serie
+            if km > usage.first_km:
+                raise HTTPException(status_code=400, detail="Lectura histórica mayor que una posterior")
+            usage.first_ts, usage.first_km = ts, km
+        elif not usage.first_km <= km <= usage.last_km:
+            # intermedia: se guarda pero no mueve la tasa; sólo se acota
+            raise HTTPException(status_code=400, detail="Lectura fuera del rango conocido para esa fecha")
+
+    # duplicados (mismo vehículo y ts) se ignoran: reintentos idempotentes
+    stmt = insert_for(db, OdometerReading).on_conflict_do_nothing(index_elements=["vehicle_id", "ts"])
+    db.execute(stmt, [{"vehicle_id": vehicle.id, "ts": ts, "km": km} for ts, km in rows])
+    vehicle.odometer_km = usage.last_km
+    return usage
+
+
+def projected_at(usage: Optional[VehicleUsage], due_km: int) -> Optional[datetime]:
+    """Fecha estimada en la que el vehículo llega a `due_km` (None si no hay tasa)."""
+    if usage is None:
+        return None
+    if due_km <= usage.last_km:
+        return usage.last_ts
+    if not usage.km_per_day or usage.km_per_day <= 0:
+        return None
+    return usage.last_ts + timedelta(days=(due_km - usage.last_km) / usage.km_per_day)
+
+
+def recent(db: Session, vehicle_id: int, limit: int = 100) -> List[OdometerReading]:
+    return db.execute(
+        select(OdometerReading)
+        .where(OdometerReading.vehicle_id == vehicle_id)
+        .order_by(desc(OdometerReading.ts))
+        .limit(limit)
+    ).scalars().all()
@@ -0,0 +1,320 @@
+# backend/app/services/outbox.py
+"""
+Outbox transaccional de avisos de recordatorios (email, webhook).
+
+`enqueue()` escribe una fila por canal en la misma transacción que marca el
+recordatorio como disparado: quedan ambos o ninguno. El UNIQUE
+(reminder_id, channel, fired_at) evita duplicados si ese disparo se reintenta.
+
+El `Dispatcher` (un hilo por worker) reclama lotes con un UPDATE que adelanta
+`available_at` a now + lease y apunta un token de reclamo: mientras dure el
+lease nadie más ve esas filas, y si el worker muere a media entrega vuelven a
+quedar disponibles al vencer (entrega al menos una vez). Al cerrar el lote:
+éxito -> sent; fallo -> reintento con backoff exponencial con jitter, o dead
+tras NOTIFY_MAX_ATTEMPTS. En Postgres el subselect usa FOR UPDATE SKIP LOCKED
+para que varios workers no se estorben.
+
+Transportes enchufables: canal -> objeto con `send_batch(payloads)` que
+devuelve un error (o None) por aviso. SMTP reutiliza una conexión por lote (en
+desarrollo, un servidor de depuración tipo MailHog en localhost:1025); el
+webhook usa una sesión HTTP keep-alive.
+"""
+import json
+import logging
+import random
+import smtplib
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.clock import utcnow
+from app.core.config import get_settings
+from app.core.responses import dumps
+from app.db import shards
+from app.db.dialect import insert_for
+from app.db.models import NotificationOutbox, Reminder, User, Vehicle
+
+log = logging.getLogger("carsense.outbox")
+
+EMAIL, WEBHOOK = "email", "webhook"
+PENDING, SENT, DEAD = "pending", "sent", "dead"
+
+metrics.describe("carsense_outbox_notifications_total", "counter", "Avisos procesados por canal y resultado (sent/retry/dead).")
+metrics.describe("carsense_outbox_backlog", "gauge", "Avisos pendientes en el outbox.")
+metrics.describe("carsense_outbox_oldest_pending_seconds", "gauge", "Antigüedad del aviso pendiente más viejo.")
+metrics.describe("carsense_outbox_delivery_lag_seconds", "histogram", "Del disparo del recordatorio a la entrega.",
+                 (1, 5, 15, 60, 300, 900, 3600, 4 * 3600, 24 * 3600))
+metrics.describe("carsense_outbox_batch_seconds", "histogram", "Duración del envío de un lote por canal.",
+                 metrics.LATENCY_BUCKETS)
+
+
+# ---------- Encolado (misma transacción que el disparo) ----------
+def channels() -> List[str]:
+    return [c.strip() for c in get_settings().NOTIFY_CHANNELS.split(",") if c.strip()]
+
+
+def _email(reminder: Dict, vehicle: Dict) -> Dict:
+    car = f"{vehicle['make']} {vehicle['model']}".strip()
+    what = reminder["notes"] or ("servicio por fecha" if reminder["kind"] == "date" else "servicio por kilometraje")
+    due = reminder["due_date"].isoformat() if reminder["due_date"] else f"{reminder['due_km']} km"
+    return {
+        "to": vehicle["email"],
+        "subject": f"CarSense: {what} ({car})",
+        "body": f"Tu recordatorio «{what}» para el {car} venció ({due}).\n\n— CarSense",
+    }
+
+
+def enqueue(db: Session, fired: Iterable[Tuple[Dict, Dict]], fired_at: datetime) -> int:
+    """Una fila por (recordatorio, canal configurado); `fired` son pares
+    (recordatorio, vehículo con owner_id/email). Un solo INSERT; no hace commit."""
+    chans = channels()
+    rows = []
+    for reminder, vehicle in fired if chans else ():
+        event = {"type": "reminder.due", "user_id": vehicle["owner_id"], "reminder": reminder,
+                 "vehicle": {"id": vehicle["id"], "make": vehicle["make"], "model": vehicle["model"]}}
+        for ch in chans:
+            payload = _email(reminder, vehicle) if ch == EMAIL else event
+            rows.append({"reminder_id": reminder["id"], "channel": ch, "fired_at": fired_at,
+                         "payload": dumps(payload).decode(), "status": PENDING, "attempts": 0,
+                         "available_at": fired_at, "created_at": fired_at})
+    if not rows:
+        return 0
+    stmt = insert_for(db, NotificationOutbox.__table__).on_conflict_do_nothing()
+    return db.execute(stmt, rows).rowcount
+
+
+# ---------- Transportes ----------
+class SmtpTransport:
+    def __init__(self, host: str, port: int, sender: str, timeout: float = 10.0):
+        self.host, self.port, self.sender, self.timeout = host, port, sender, timeout
+
+    def send_batch(self, payloads: Sequence[Dict]) -> List[Optional[str]]:
+        errors: List[Optional[str]] = []
+        try:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        except OSError as exc:
+            return [f"SMTP: {exc}"] * len(payloads)
+        try:
+            for p in payloads:
+                msg = EmailMessage()
+                msg["From"], msg["To"], msg["Subject"] = self.sender, p["to"], p["subject"]
+                msg.set_content(p["body"])
+                try:
+                    smtp.send_message(msg)
+                    errors.append(None)
+                except smtplib.SMTPServerDisconnected as exc:
+                    # la conexión se cayó: lo que falta se reintenta en otro lote
+                    errors.extend([f"SMTP: {exc}"] * (len(payloads) - len(errors)))
+                    return errors
+                except smtplib.SMTPException as exc:
+                    errors.append(f"SMTP: {exc}")
+        finally:
+            try:
+                smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        return errors
+
+
+class WebhookTransport:
+    def __init__(self, url: str, timeout: float = 10.0):
+        import requests  # sólo si se usa el canal
+
+        self.url, self.timeout = url, timeout
+        self.session = requests.Session()
+        self._exc = requests.RequestException
+
+    def send_batch(self, payloads: Sequence[Dict]) -> List[Optional[str]]:
+        errors: List[Optional[str]] = []
+        for p in payloads:
+            try:
+                r = self.session.post(self.url, data=dumps(p), timeout=self.timeout,
+                                      headers={"Content-Type": "application/json"})
+                errors.append(None if r.status_code < 300 else f"HTTP {r.status_code}")
+            except self._exc as exc:
+                errors.append(f"webhook: {exc}")
+        return errors
+
+
+def default_transports() -> Dict[str, object]:
+    s = get_settings()
+    out: Dict[str, object] = {}
+    for ch in channels():
+        if ch == EMAIL:
+            out[ch] = SmtpTransport(s.NOTIFY_SMTP_HOST, s.NOTIFY_SMTP_PORT, s.NOTIFY_SMTP_FROM)
+        elif ch == WEBHOOK and s.NOTIFY_WEBHOOK_URL:
+            out[ch] = WebhookTransport(s.NOTIFY_WEBHOOK_URL)
+        else:
+            log.warning("Canal de aviso %r sin transporte configurado", ch)
+    return out
+
+
+# ---------- Despacho ----------
+class Dispatcher:
+    def __init__(self, engine, transports: Dict[str, object], batch: int = 100, lease_s: float = 60.0,
+                 poll_s: float = 2.0, max_attempts: int = 8, backoff_s: float = 30.0,
+                 backoff_max_s: float = 3600.0, shard: Optional[int] = None):
+        self.engine = engine
+        self.shard = shard  # BD que atiende (None = la principal): filtra dueños en mudanza
+        self.transports = transports
+        self.batch = batch
+        self.lease = timedelta(seconds=lease_s)
+        self.poll_s = poll_s
+        self.max_attempts = max_attempts
+        self.backoff_s = backoff_s
+        self.backoff_max_s = backoff_max_s
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._gauges: Dict[str, float] = {}
+
+    # -- ciclo de vida --
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="carsense-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                n = self.tick()
+                self.observe_backlog()
+            except Exception:
+                log.exception("Fallo en el despacho de avisos")
+                n = 0
+            if n < self.batch:
+                self._stop.wait(self.poll_s)  # lote lleno: seguir sin esperar
+
+    # -- reclamo y cierre --
+    def backoff(self, attempts: int) -> float:
+        base = min(self.backoff_max_s, self.backoff_s * 2 ** (attempts - 1))
+        return base * random.uniform(0.5, 1.0)
+
+    def claim(self, now: datetime, token: str):
+        O = NotificationOutbox
+        ids = (
+            select(O.id)
+            .join(Reminder, Reminder.id == O.reminder_id)
+            .join(Vehicle, Vehicle.id == Reminder.vehicle_id)
+            .join(User, User.id == Vehicle.owner_id)
+            .where(O.status == PENDING, O.available_at <= now, O.channel.in_(list(self.transports)),
+                   shards.owner_here(self.shard))  # en mudanza: lo envía el destino tras copiarlo
+            .order_by(O.available_at)
+            .limit(self.batch)
+            .with_for_update(of=O, skip_locked=True)
+        )
+        with self.engine.begin() as conn:
+            return conn.execute(
+                update(O)
+                .where(O.id.in_(ids))
+                .values(available_at=now + self.lease, claimed_by=token, attempts=O.attempts + 1)
+                .returning(O.id, O.channel, O.payload, O.attempts, O.created_at)
+            ).all()
+
+    def tick(self) -> int:
+        """Reclama y envía un lote. Devuelve cuántos avisos reclamó."""
+        token = uuid.uuid4().hex
+        rows = self.claim(utcnow(), token)
+        by_channel: Dict[str, list] = {}
+        for r in rows:
+            by_channel.setdefault(r.channel, []).append(r)
+        for ch, items in by_channel.items():
+            t0 = time.perf_counter()
+            errors = self.transports[ch].send_batch([json.loads(r.payload) for r in items])
+            metrics.observe("carsense_outbox_batch_seconds", time.perf_counter() - t0, (("channel", ch),))
+            self.finish(token, ch, items, errors)
+        return len(rows)
+
+    def finish(self, token: str, channel: str, items: Iterable, errors: Sequence[Optional[str]]) -> None:
+        O = NotificationOutbox
+        now = utcnow()
+        sent, failed = [], []
+        for r, err in zip(items, errors):
+            if err is None:
+                sent.append(r.id)
+                metrics.observe("carsense_outbox_delivery_lag_seconds", (now - r.created_at).total_seconds(),
+                                (("channel", channel),))
+            else:
+                dead = r.attempts >= self.max_attempts
+                failed.append({"b_id": r.id, "b_status": DEAD if dead else PENDING, "b_err": err[:255],
+                               "b_at": now + timedelta(seconds=0 if dead else self.backoff(r.attempts))})
+                metrics.inc("carsense_outbox_notifications_total", (("channel", channel), ("result", "dead" if dead else "retry")))
+                if dead:
+                    log.warning("Aviso %s (%s) descartado tras %d intentos: %s", r.id, channel, r.attempts, err)
+        with self.engine.begin() as conn:
+            # claimed_by = token: si el lease venció y otro worker lo reclamó, ese decide
+            if sent:
+                conn.execute(
+                    update(O).where(O.id.in_(sent), O.claimed_by == token)
+                    .values(status=SENT, sent_at=now, claimed_by=None)
+                )
+                metrics.inc("carsense_outbox_notifications_total", (("channel", channel), ("result", "sent")), len(sent))
+            if failed:
+                conn.execute(
+                    update(O).where(O.id == bindparam("b_id"), O.claimed_by == token)
+                    .values(status=bindparam("b_status"), available_at=bindparam("b_at"),
+                            last_error=bindparam("b_err"), claimed_by=None),
+                    failed,
+                )
+
+    # -- métricas --
+    def _gauge(self, name: str, value: float) -> None:
+        # sólo este hilo escribe estos gauges: se aplica la diferencia
+        metrics.inc(name, (), value - self._gauges.get(name, 0.0))
+        self._gauges[name] = value
+
+    def observe_backlog(self) -> None:
+        O = NotificationOutbox
+        with self.engine.connect() as conn:
+            n, oldest = conn.execute(select(func.count(), func.min(O.created_at)).where(O.status == PENDING)).one()
+        self._gauge("carsense_outbox_backlog", n)
+        self._gauge("carsense_outbox_oldest_pending_seconds", (utcnow() - oldest).total_seconds() if oldest else 0.0)
+
+
+def prune(engine, retention_days: float) -> int:
+    """Borra avisos ya resueltos (sent/dead) más viejos que la retención. Lo corre el scheduler."""
+    O = NotificationOutbox
+    cutoff = utcnow() - timedelta(days=retention_days)
+    with engine.begin() as conn:
+        return conn.execute(delete(O).where(O.status != PENDING, O.created_at < cutoff)).rowcount
+
+
+_dispatchers: Dict[Optional[int], Dispatcher] = {}
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher(shard: Optional[int] = None) -> Optional[Dispatcher]:
+    """Despachador de una BD (None = la principal, uno por shard); None si no hay canales configurados."""
+    d = _dispatchers.get(shard)
+    if d is None:
+        with _dispatcher_lock:
+            d = _dispatchers.get(shard)
+            if d is None:
+                transports = default_transports()
+                if not transports:
+                    return None
+                s = get_settings()
+                d = Dispatcher(shards.engine_for(shard), transports, s.NOTIFY_BATCH, s.NOTIFY_LEASE_S, s.NOTIFY_POLL_S,
+                               s.NOTIFY_MAX_ATTEMPTS, s.NOTIFY_BACKOFF_S, s.NOTIFY_BACKOFF_MAX_S, shard=shard)
+                _dispatchers[shard] = d
+    d.start()
+    return d
+
+
+def shutdown() -> None:
+    for d in list(_dispatchers.values()):
+        d.stop()
@@ -0,0 +1,120 @@
+# backend/app/services/push.py
+"""
+Eventos del canal push: recordatorios vencidos y alertas (DTC nuevos,
+servicios que ya tocan).
+
+`publish()` reparte al momento. `publish_after_commit()` deja el evento en la
+sesión y sólo lo publica si la transacción confirma (un rollback no deja
+avisos fantasma). `fire_due_reminders()` lo corre el scheduler: marca
+`fired_at` con un UPDATE condicionado, así que dos workers no disparan el
+mismo recordatorio, y publica un `reminder.due` por cada uno. En la misma
+transacción deja los avisos por email/webhook en el outbox (ver
+app/services/outbox.py).
+
+Formato: `{"type": ..., "ts": ..., "data": {...}}` en JSON.
+"""
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, event, or_, select, update
+from sqlalchemy.orm import Session, aliased
+
+from app.core import pubsub
+from app.core.clock import utcnow
+from app.core.responses import dumps
+from app.db import shards
+from app.db.models import Reminder, User, Vehicle
+from app.services import dtc, outbox
+
+REMINDER_DUE = "reminder.due"
+DTC_DETECTED = "dtc.detected"
+ALERT_CREATED = "alert.created"
+
+_PENDING = "push_pending"
+
+
+def encode(type_: str, data: Dict[str, Any]) -> bytes:
+    return dumps({"type": type_, "ts": utcnow().isoformat(), "data": data})
+
+
+def publish(user_id: Optional[int], type_: str, data: Dict[str, Any]) -> None:
+    pubsub.get_hub().publish(user_id, encode(type_, data))
+
+
+def publish_after_commit(db: Session, user_id: int, type_: str, data: Dict[str, Any]) -> None:
+    db.info.setdefault(_PENDING, []).append((user_id, type_, data))
+
+
+@event.listens_for(Session, "after_commit")
+def _flush_pending(session: Session) -> None:
+    pending = session.info.pop(_PENDING, None)
+    for user_id, type_, data in pending or ():
+        publish(user_id, type_, data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+# ---------- Recordatorios vencidos ----------
+def due_clause(today: date):
+    R = Reminder
+    km = select(Vehicle.odometer_km).where(Vehicle.id == R.vehicle_id).scalar_subquery()
+    return and_(
+        R.done.is_(False),
+        R.fired_at.is_(None),
+        or_(and_(R.kind == "date", R.due_date <= today),
+            and_(R.kind == "odometer", R.due_km <= km)),
+    )
+
+
+def fire_due_reminders(db: Session, today: Optional[date] = None, batch: int = 500) -> int:
+    """Marca y anuncia los recordatorios que vencieron. Hace commit por lote."""
+    now = utcnow()
+    today = today or now.date()
+    R = Reminder
+    total = 0
+    # dueños en mudanza (o ya mudados, sin purgar): sus recordatorios se disparan en el destino;
+    # alias para no correlacionar con el Vehicle de due_clause
+    V, U = aliased(Vehicle), aliased(User)
+    here = shards.owner_here(shards.current(db), U)
+    while True:
+        ids = (select(R.id).join(V, V.id == R.vehicle_id).join(U, U.id == V.owner_id)
+               .where(due_clause(today), here).order_by(R.id).limit(batch))
+        fired = db.execute(
+            update(R)
+            .where(R.id.in_(ids), R.fired_at.is_(None))
+            .values(fired_at=now)
+            .returning(R.id, R.vehicle_id, R.kind, R.due_date, R.due_km, R.notes)
+            .execution_options(synchronize_session=False)
+        ).all()
+        if not fired:
+            break
+        vehicles = {v["id"]: v for v in db.execute(
+            select(Vehicle.id, Vehicle.owner_id, Vehicle.make, Vehicle.model, User.email)
+            .join(User, User.id == Vehicle.owner_id)
+            .where(Vehicle.id.in_({r.vehicle_id for r in fired}))
+        ).mappings()}
+        events = []
+        for r in fired:
+            data = {"id": r.id, "vehicle_id": r.vehicle_id, "kind": r.kind,
+                    "due_date": r.due_date, "due_km": r.due_km, "notes": r.notes}
+            v = vehicles[r.vehicle_id]
+            publish_after_commit(db, v["owner_id"], REMINDER_DUE, data)
+            events.append((data, v))
+        outbox.enqueue(db, events, now)  # misma transacción que fired_at
+        db.commit()
+        total += len(fired)
+        if len(fired) < batch:
+            break
+    return total
+
+
+def dtc_alerts(db: Session, user_id: int, vehicle_id: int, results: List[Dict]) -> None:
+    """Un `dtc.detected` por código que contó como ocurrencia nueva."""
+    for r in results:
+        if r["new"]:
+            publish_after_commit(db, user_id, DTC_DETECTED, {
+                "vehicle_id": vehicle_id, "code": r["code"], "description": dtc.describe(r["code"]),
+            })
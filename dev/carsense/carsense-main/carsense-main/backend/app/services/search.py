@@ -0,0 +1,195 @@
+# backend/app/services/search.py
+"""
+Búsqueda de texto completo sobre servicios (tipo + notas).
+
+SQLite: tabla FTS5 `service_records_fts` con tokenizador unicode61 y
+remove_diacritics (bomba = bómba, balatas = BALATAS). Guarda su propia copia
+del texto (para snippet/highlight) y una columna `owner` con el token `u<id>`
+del dueño: la consulta intersecta `owner:u<id>` con los términos dentro del
+índice, así que el costo depende de los servicios del usuario, no de la flota.
+Triggers sobre service_records la mantienen al día, incluido el borrado en
+cascada de vehículos y cuentas.
+
+Postgres: columna generada `search_tsv` (config 'spanish' + unaccent) con
+índice GIN; el filtro por dueño va por join y el resaltado con ts_headline.
+
+El resaltado vuelve como HTML: el texto del usuario se escapa y sólo las
+marcas `<mark>` quedan sin escapar.
+
+`install()` es idempotente y, si crea el índice, lo llena con lo existente.
+"""
+import html
+import logging
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+log = logging.getLogger("carsense.search")
+
+MARK_OPEN, MARK_CLOSE = "<mark>", "</mark>"
+# el motor marca con centinelas (uso privado de Unicode) y se sustituyen tras escapar
+_SENT_OPEN, _SENT_CLOSE = "\ue000", "\ue001"
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# ---------- DDL ----------
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS service_records_fts USING fts5(
+        service_type, notes, owner,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS service_records_fts_ai AFTER INSERT ON service_records BEGIN
+        INSERT INTO service_records_fts(rowid, service_type, notes, owner)
+        SELECT new.id, replace(new.service_type, '_', ' '), coalesce(new.notes, ''), 'u' || v.owner_id
+        FROM vehicles v WHERE v.id = new.vehicle_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS service_records_fts_ad AFTER DELETE ON service_records BEGIN
+        DELETE FROM service_records_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS service_records_fts_au
+    AFTER UPDATE OF service_type, notes, vehicle_id ON service_records BEGIN
+        DELETE FROM service_records_fts WHERE rowid = old.id;
+        INSERT INTO service_records_fts(rowid, service_type, notes, owner)
+        SELECT new.id, replace(new.service_type, '_', ' '), coalesce(new.notes, ''), 'u' || v.owner_id
+        FROM vehicles v WHERE v.id = new.vehicle_id;
+    END
+    """,
+]
+
+_SQLITE_FILL = """
+    INSERT INTO service_records_fts(rowid, service_type, notes, owner)
+    SELECT s.id, replace(s.service_type, '_', ' '), coalesce(s.notes, ''), 'u' || v.owner_id
+    FROM service_records s JOIN vehicles v ON v.id = s.vehicle_id
+"""
+
+_PG_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    # unaccent() no es IMMUTABLE; el envoltorio permite usarlo en la columna generada
+    """
+    CREATE OR REPLACE FUNCTION carsense_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS $$ SELECT public.unaccent('public.unaccent', $1) $$
+    """,
+    """
+    ALTER TABLE service_records ADD COLUMN IF NOT EXISTS search_tsv tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', carsense_unaccent(replace(service_type, '_', ' '))), 'A') ||
+        setweight(to_tsvector('spanish', carsense_unaccent(coalesce(notes, ''))), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_service_records_search_tsv ON service_records USING gin (search_tsv)",
+]
+
+
+def install(engine: Engine) -> None:
+    """Crea índice y triggers si faltan (idempotente)."""
+    name = engine.dialect.name
+    with engine.begin() as conn:
+        if name == "sqlite":
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'service_records_fts'"
+            )).first()
+            for ddl in _SQLITE_DDL:
+                conn.exec_driver_sql(ddl)
+            if not exists:
+                n = conn.exec_driver_sql(_SQLITE_FILL).rowcount
+                log.info("Índice FTS5 creado con %s servicios", n)
+        elif name == "postgresql":
+            for ddl in _PG_DDL:
+                conn.exec_driver_sql(ddl)
+        else:
+            log.warning("Búsqueda de texto no soportada en %s", name)
+
+
+def rebuild(engine: Engine) -> None:
+    """Reconstruye el índice desde cero (tras cargas masivas sin triggers)."""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM service_records_fts")
+        conn.exec_driver_sql(_SQLITE_FILL)
+        conn.exec_driver_sql("INSERT INTO service_records_fts(service_records_fts) VALUES ('optimize')")
+
+
+# ---------- Consulta ----------
+def terms(q: str) -> List[str]:
+    return _WORD.findall(q or "")[:12]
+
+
+def _fts_query(owner_id: int, words: List[str], prefix: bool) -> str:
+    # cada palabra entre comillas (sin operadores del usuario); con prefix la
+    # última se completa (autocompletar; ~3x más caro en términos comunes)
+    quoted = [f'"{w}"' for w in words]
+    if prefix:
+        quoted[-1] += "*"
+    return f'owner:u{owner_id} AND {{service_type notes}}: ({" AND ".join(quoted)})'
+
+
+def _search_sqlite(db: Session, owner_id: int, words: List[str], vehicle_id: Optional[int], limit: int,
+                   prefix: bool):
+    sql = f"""
+        SELECT s.id, s.vehicle_id, s.service_type, s.date, s.km,
+               highlight(service_records_fts, 0, :o, :c) AS type_hl,
+               snippet(service_records_fts, 1, :o, :c, '…', 16) AS snippet,
+               bm25(service_records_fts, 4.0, 1.0, 0.0) AS score
+        FROM service_records_fts
+        JOIN service_records s ON s.id = service_records_fts.rowid
+        WHERE service_records_fts MATCH :q
+          {"AND s.vehicle_id = :vid" if vehicle_id is not None else ""}
+        ORDER BY score, s.date DESC
+        LIMIT :limit
+    """
+    params = {"q": _fts_query(owner_id, words, prefix), "o": _SENT_OPEN, "c": _SENT_CLOSE, "limit": limit}
+    if vehicle_id is not None:
+        params["vid"] = vehicle_id
+    return db.execute(text(sql), params).mappings().all()
+
+
+def _search_postgres(db: Session, owner_id: int, words: List[str], vehicle_id: Optional[int], limit: int,
+                     prefix: bool):
+    sql = f"""
+        SELECT s.id, s.vehicle_id, s.service_type, s.date, s.km,
+               s.service_type AS type_hl,
+               ts_headline('spanish', coalesce(s.notes, ''), q,
+                           'StartSel=' || :o || ', StopSel=' || :c || ', MaxFragments=1, MaxWords=16') AS snippet,
+               -ts_rank_cd(s.search_tsv, q) AS score
+        FROM service_records s
+        JOIN vehicles v ON v.id = s.vehicle_id,
+             to_tsquery('spanish', carsense_unaccent(:q)) q
+        WHERE v.owner_id = :owner AND s.search_tsv @@ q
+          {"AND s.vehicle_id = :vid" if vehicle_id is not None else ""}
+        ORDER BY score, s.date DESC NULLS LAST
+        LIMIT :limit
+    """
+    # misma semántica que en SQLite: AND de términos, opcionalmente el último como prefijo
+    q = " & ".join(w.lower() for w in words) + (":*" if prefix else "")
+    params = {"q": q, "owner": owner_id, "o": _SENT_OPEN, "c": _SENT_CLOSE, "limit": limit}
+    if vehicle_id is not None:
+        params["vid"] = vehicle_id
+    return db.execute(text(sql), params).mappings().all()
+
+
+def _marked(s: Optional[str]) -> str:
+    """Escapa el texto del usuario y convierte los centinelas en <mark>."""
+    s = html.escape(s or "", quote=False)
+    return s.replace(_SENT_OPEN, MARK_OPEN).replace(_SENT_CLOSE, MARK_CLOSE)
+
+
+def search(db: Session, owner_id: int, q: str, vehicle_id: Optional[int] = None, limit: int = 20,
+           prefix: bool = False) -> List[Dict]:
+    """Servicios del dueño que contienen todos los términos, mejor puntuados primero."""
+    words = terms(q)
+    if not words:
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        rows = _search_postgres(db, owner_id, words, vehicle_id, limit, prefix)
+    else:
+        rows = _search_sqlite(db, owner_id, words, vehicle_id, limit, prefix)
+    return [dict(r, type_hl=_marked(r["type_hl"]), snippet=_marked(r["snippet"])) for r in rows]
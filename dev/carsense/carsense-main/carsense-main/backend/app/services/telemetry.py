@@ -0,0 +1,296 @@
+# backend/app/services/telemetry.py
+"""
+Ingesta de telemetría OBD-II.
+
+Las peticiones sólo decodifican el lote y lo encolan (cola acotada en número de
+muestras; si está llena se responde 503 y el lector reintenta). Un hilo escritor
+por worker vacía la cola en transacciones grandes: inserta las muestras crudas
+y acumula en Python los resúmenes por minuto (n/min/max/suma) que luego se
+fusionan con un upsert. Cada TELEMETRY_PRUNE_EVERY_S el scheduler (un solo
+worker) purga los crudos fuera de la ventana de retención; los resúmenes se
+conservan.
+
+Formato binario (application/octet-stream): registros little-endian de 14 bytes
+`<qHf` = ts (epoch ms), pid, valor. Con `msgpack` instalado también se acepta
+application/msgpack: lista de [pid, valor, ts_ms].
+"""
+import logging
+import struct
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.db.dialect import greatest, insert_for, least
+from app.db.models import TelemetryRollup, TelemetrySample
+
+try:
+    import msgpack
+except ImportError:  # opcional
+    msgpack = None
+
+log = logging.getLogger("carsense.telemetry")
+
+RECORD = struct.Struct("<qHf")
+Sample = Tuple[int, int, float]  # (ts_ms, pid, valor)
+PID_MAX = 32767  # telemetry_samples.pid es SmallInteger
+
+metrics.describe("carsense_telemetry_samples_total", "counter", "Muestras OBD por resultado (queued/written/rejected/dropped).")
+metrics.describe("carsense_telemetry_queue_samples", "gauge", "Muestras OBD en cola pendientes de escribir.")
+metrics.describe("carsense_telemetry_flush_seconds", "histogram", "Duración de cada transacción del escritor.",
+                 metrics.DB_BUCKETS + (2.5, 5.0))
+
+
+class QueueFull(Exception):
+    pass
+
+
+class BadFrame(ValueError):
+    pass
+
+
+# ---------- Decodificación ----------
+def _checked(samples: List[Sample]) -> List[Sample]:
+    for _, pid, _ in samples:
+        if not 0 <= pid <= PID_MAX:
+            raise BadFrame(f"pid fuera de rango (0..{PID_MAX}): {pid}")
+    return samples
+
+
+def decode_binary(body: bytes) -> List[Sample]:
+    if len(body) % RECORD.size:
+        raise BadFrame(f"El cuerpo debe ser múltiplo de {RECORD.size} bytes")
+    return _checked(list(RECORD.iter_unpack(body)))
+
+
+def decode_msgpack(body: bytes) -> List[Sample]:
+    if msgpack is None:
+        raise BadFrame("msgpack no está instalado en el servidor")
+    try:
+        samples = [(int(ts), int(pid), float(v)) for pid, v, ts in msgpack.unpackb(body)]
+    except (ValueError, TypeError, msgpack.ExtraData) as exc:
+        raise BadFrame(f"msgpack inválido: {exc}") from None
+    return _checked(samples)
+
+
+def encode_binary(samples: List[Sample]) -> bytes:
+    """Inverso de decode_binary (clientes, benchmark)."""
+    return b"".join(RECORD.pack(ts, pid, v) for ts, pid, v in samples)
+
+
+# ---------- Resúmenes ----------
+def rollup(batch: List[Tuple[int, List[Sample]]]) -> Dict[Tuple[int, int, int], List[float]]:
+    """(vehicle_id, pid, minuto) -> [n, min, max, suma] del lote."""
+    acc: Dict[Tuple[int, int, int], List[float]] = {}
+    for vid, samples in batch:
+        for ts, pid, v in samples:
+            key = (vid, pid, ts // 60000)
+            a = acc.get(key)
+            if a is None:
+                acc[key] = [1, v, v, v]
+            else:
+                a[0] += 1
+                if v < a[1]:
+                    a[1] = v
+                elif v > a[2]:
+                    a[2] = v
+                a[3] += v
+    return acc
+
+
+def insert_samples(conn, vehicle_id: int, samples: Dict[Tuple[int, int], float]) -> int:
+    """
+    Inserta {(pid, ts): valor} de un vehículo y suma al resumen sólo las que
+    entraron (las ya guardadas se ignoran). No abre transacción. También lo
+    usa el rebalanceo de shards para copiar lo que llegó al origen tarde.
+    """
+    S, T = TelemetrySample, TelemetryRollup
+    raw = insert_for(conn, S).on_conflict_do_nothing().returning(S.ts, S.pid, S.value)
+    rows = [{"vehicle_id": vehicle_id, "pid": pid, "ts": ts, "value": v} for (pid, ts), v in samples.items()]
+    inserted = [tuple(r) for r in conn.execute(raw, rows)]
+    if inserted:
+        ins = insert_for(conn, T)
+        ex = ins.excluded
+        up = ins.on_conflict_do_update(
+            index_elements=["vehicle_id", "pid", "minute"],
+            set_={
+                "n": T.n + ex.n,
+                "vmin": least(conn, T.vmin, ex.vmin),
+                "vmax": greatest(conn, T.vmax, ex.vmax),
+                "vsum": T.vsum + ex.vsum,
+            },
+        )
+        conn.execute(up, [
+            {"vehicle_id": vehicle_id, "pid": pid, "minute": minute,
+             "n": a[0], "vmin": a[1], "vmax": a[2], "vsum": a[3]}
+            for (_, pid, minute), a in rollup([(vehicle_id, inserted)]).items()
+        ])
+    return len(inserted)
+
+
+# ---------- Escritor en segundo plano ----------
+class TelemetryWriter:
+    def __init__(self, engine, queue_max: int, batch: int, flush_ms: float,
+                 retention_h: float, prune_every_s: float):
+        self.engine = engine
+        self.queue_max = queue_max
+        self.batch = batch
+        self.flush_s = flush_ms / 1000.0
+        self.retention_ms = int(retention_h * 3600 * 1000)
+        self.prune_every_s = prune_every_s
+        self._items: Deque[Tuple[int, List[Sample]]] = deque()
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._stop = False
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread: Optional[threading.Thread] = None
+        self._last_prune = 0.0
+
+    # -- lado petición --
+    def submit(self, vehicle_id: int, samples: List[Sample]) -> int:
+        n = len(samples)
+        with self._cond:
+            if self._pending + n > self.queue_max:
+                metrics.inc("carsense_telemetry_samples_total", (("result", "rejected"),), n)
+                raise QueueFull()
+            self._items.append((vehicle_id, samples))
+            self._pending += n
+            self._idle.clear()
+            if self._pending >= self.batch:
+                self._cond.notify()
+        metrics.inc("carsense_telemetry_samples_total", (("result", "queued"),), n)
+        metrics.inc("carsense_telemetry_queue_samples", (), n)
+        return n
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    # -- ciclo de vida --
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="carsense-telemetry", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Vacía lo pendiente y detiene el hilo."""
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def drain(self, timeout: float = 30.0) -> bool:
+        """Espera a que la cola quede vacía y escrita (benchmarks, apagado)."""
+        with self._cond:
+            self._cond.notify()
+        return self._idle.wait(timeout)
+
+    # -- hilo escritor --
+    def _take(self) -> List[Tuple[int, List[Sample]]]:
+        with self._cond:
+            if self._pending < self.batch and not self._stop:
+                self._cond.wait(self.flush_s)
+            out, n = [], 0
+            while self._items and n < self.batch:
+                item = self._items.popleft()
+                out.append(item)
+                n += len(item[1])
+            self._pending -= n
+        if n:
+            metrics.inc("carsense_telemetry_queue_samples", (), -n)
+        return out
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take()
+            if batch:
+                try:
+                    self.flush(batch)
+                except Exception:
+                    # falla de la BD completa: se pierde el lote, no el hilo
+                    log.exception("Fallo al escribir %d lotes de telemetría", len(batch))
+            now = time.monotonic()
+            if self.prune_every_s and now - self._last_prune >= self.prune_every_s:
+                self._last_prune = now
+                try:
+                    self.prune()
+                except Exception:
+                    log.exception("Fallo al purgar telemetría")
+            with self._cond:
+                if not self._items:
+                    self._idle.set()
+                    if self._stop:
+                        return
+
+    def flush(self, batch: List[Tuple[int, List[Sample]]]) -> int:
+        """
+        Escribe el lote con un savepoint por vehículo: una fila mala (vehículo
+        borrado tras encolar, valor fuera de rango) sólo tira lo de ese
+        vehículo. Los resúmenes salen de las muestras que sí se insertaron, así
+        que un reintento del mismo frame no cuenta dos veces.
+        """
+        t0 = time.perf_counter()
+        by_vehicle: Dict[int, Dict[Tuple[int, int], float]] = {}
+        for vid, samples in batch:
+            seen = by_vehicle.setdefault(vid, {})
+            for ts, pid, v in samples:
+                seen.setdefault((pid, ts), v)  # repetida dentro del lote: la primera
+        written = dropped = 0
+        with self.engine.begin() as conn:
+            for vid, seen in by_vehicle.items():
+                try:
+                    with conn.begin_nested():
+                        n = insert_samples(conn, vid, seen)
+                except SQLAlchemyError as exc:
+                    log.warning("Telemetría del vehículo %s descartada (%d muestras): %s",
+                                vid, len(seen), exc.__class__.__name__)
+                    dropped += len(seen)
+                    continue
+                written += n
+        metrics.observe("carsense_telemetry_flush_seconds", time.perf_counter() - t0)
+        metrics.inc("carsense_telemetry_samples_total", (("result", "written"),), written)
+        if dropped:
+            metrics.inc("carsense_telemetry_samples_total", (("result", "dropped"),), dropped)
+        return written
+
+    def prune(self, now_ms: Optional[int] = None) -> int:
+        if not self.retention_ms:
+            return 0
+        cutoff = (now_ms if now_ms is not None else int(time.time() * 1000)) - self.retention_ms
+        with self.engine.begin() as conn:
+            return conn.execute(delete(TelemetrySample).where(TelemetrySample.ts < cutoff)).rowcount
+
+
+_writers: Dict[Optional[int], TelemetryWriter] = {}
+_writer_lock = threading.Lock()
+
+
+def get_writer(shard: Optional[int] = None) -> TelemetryWriter:
+    """Escritor de una BD (None = la principal, uno por shard); se arranca en el startup y aquí, por si acaso."""
+    w = _writers.get(shard)
+    if w is None:
+        with _writer_lock:
+            w = _writers.get(shard)
+            if w is None:
+                from app.db import shards
+                s = get_settings()
+                w = TelemetryWriter(shards.engine_for(shard), s.TELEMETRY_QUEUE_MAX, s.TELEMETRY_BATCH,
+                                    s.TELEMETRY_FLUSH_MS, s.TELEMETRY_RAW_RETENTION_H, 0)  # la purga va en el scheduler
+                _writers[shard] = w
+    w.start()
+    return w
+
+
+def shutdown() -> None:
+    for w in list(_writers.values()):
+        w.stop()
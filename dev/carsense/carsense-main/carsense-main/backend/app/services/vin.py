@@ -0,0 +1,230 @@
+# backend/app/services/vin.py
+"""
+Validación y decodificación offline de VIN (NIV, ISO 3779 / 49 CFR 565).
+
+Tablas: `app/data/vin_tables.tsv`, un archivo de texto ordenado por bytes con
+una línea por registro (llave<TAB>campos):
+
+  W<WMI>             fabricante, marca, país
+  V<WMI><VDS 4-8>    modelo, año desde, año hasta (0 = vigente), marca si
+                     el WMI la comparte (p. ej. 1C4: Jeep / Chrysler / Dodge)
+  P<WMI><pos. 11>    planta
+
+El patrón VDS usa '*' como comodín; gana el más específico cuyo rango de años
+incluya el año modelo. El archivo se abre con mmap y se busca por bisección
+sobre los bytes (sin índice ni dict en memoria); lo leído por WMI se memoriza.
+Después de editarlo: `python -m app.jobs.vin_tables` lo valida y reordena.
+
+Año modelo (posición 10): ciclo de 30 años. En vehículos para Norteamérica
+(WMI 1-5) la posición 7 lo desambigua (letra = 2010-2039, dígito = 1980-2009);
+fuera, se toma el año más reciente que no pase del próximo.
+
+Dígito verificador (posición 9): obligatorio sólo en Norteamérica; fuera de
+ahí `check_digit` es None y no se valida.
+
+Cada worker memoriza el resultado por VIN sin el dígito verificador ni el
+número de serie (posiciones 1-8 y 10-11): en una importación de flotilla
+casi todos los VIN comparten eso y sólo se calcula el verificador.
+`python -m bench.vin_decode` mide el rendimiento.
+"""
+import mmap
+import os
+import re
+from datetime import date
+from functools import lru_cache
+from operator import mul
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+VIN_RE = re.compile(r"[A-HJ-NPR-Z0-9]{17}")
+
+# transliteración del dígito verificador
+_TRANS = bytes.maketrans(
+    b"ABCDEFGHJKLMNPRSTUVWXYZ0123456789",
+    bytes([1, 2, 3, 4, 5, 6, 7, 8, 1, 2, 3, 4, 5, 7, 9, 2, 3, 4, 5, 6, 7, 8, 9, 0, 1, 2, 3, 4, 5, 6, 7, 8, 9]),
+)
+_WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+_YEAR_CODES = "ABCDEFGHJKLMNPRSTVWXY123456789"  # 1980 + índice (ciclo de 30)
+
+# país por primer carácter cuando el WMI no está en las tablas
+REGIONS = {
+    "1": "Estados Unidos", "4": "Estados Unidos", "5": "Estados Unidos", "2": "Canadá", "3": "México",
+    "6": "Australia", "7": "Nueva Zelanda", "8": "Argentina", "9": "Brasil",
+    "J": "Japón", "K": "Corea del Sur", "L": "China", "M": "India / Sudeste asiático",
+    "S": "Reino Unido", "T": "Europa central", "V": "Francia / España", "W": "Alemania",
+    "Y": "Suecia / Finlandia", "Z": "Italia",
+}
+
+DEFAULT_TABLES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "vin_tables.tsv")
+
+Decoded = Tuple  # manufacturer, make, model, model_year, country, plant
+_FIELDS = ("manufacturer", "make", "model", "model_year", "country", "plant")
+
+
+def normalize(vin: Optional[str]) -> str:
+    return (vin or "").strip().upper()
+
+
+def check_digit(vin: str) -> str:
+    """Dígito verificador calculado ('0'-'9' o 'X') de un VIN de 17 caracteres válidos."""
+    r = sum(map(mul, _WEIGHTS, vin.encode("ascii").translate(_TRANS))) % 11
+    return "X" if r == 10 else chr(48 + r)
+
+
+def north_american(vin: str) -> bool:
+    return "1" <= vin[0] <= "5"
+
+
+def model_year(vin: str, today: Optional[date] = None) -> Optional[int]:
+    i = _YEAR_CODES.find(vin[9])
+    if i < 0:
+        return None
+    if north_american(vin):
+        return 1980 + i + (30 if vin[6].isalpha() else 0)
+    limit = (today or date.today()).year + 1
+    year = 1980 + i
+    while year + 30 <= limit:
+        year += 30
+    return year
+
+
+# ---------- Tablas (archivo ordenado + bisección) ----------
+class SortedTable:
+    """Líneas ordenadas por bytes en un mmap; búsqueda por prefijo sin índice."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = len(self.mm)
+
+    def _line_start(self, pos: int) -> int:
+        # inicio de la primera línea que empieza en `pos` o después
+        if pos == 0:
+            return 0
+        i = self.mm.find(b"\n", pos - 1)
+        return self.size if i < 0 else i + 1
+
+    def lower_bound(self, key: bytes) -> int:
+        mm, n = self.mm, len(key)
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            s = self._line_start(mid)
+            if s < self.size and mm[s:s + n] < key:
+                lo = s + 1
+            else:
+                hi = mid
+        return self._line_start(lo)
+
+    def scan(self, prefix: str) -> List[List[str]]:
+        """Campos de las líneas cuya llave empieza con `prefix` (la llave va primero)."""
+        key = prefix.encode()
+        pos = self.lower_bound(key)
+        out = []
+        while pos < self.size and self.mm[pos:pos + len(key)] == key:
+            end = self.mm.find(b"\n", pos)
+            end = self.size if end < 0 else end
+            out.append(self.mm[pos:end].decode("utf-8").split("\t"))
+            pos = end + 1
+        return out
+
+    def get(self, key: str) -> Optional[List[str]]:
+        for fields in self.scan(key + "\t"):
+            return fields
+        return None
+
+    def close(self) -> None:
+        self.mm.close()
+
+
+_table: Optional[SortedTable] = None
+
+
+def get_table() -> SortedTable:
+    global _table
+    if _table is None:
+        _table = SortedTable(get_settings().VIN_TABLES_PATH or DEFAULT_TABLES)
+    return _table
+
+
+@lru_cache(maxsize=4096)
+def _wmi(wmi: str) -> Optional[Tuple[str, str, str]]:
+    row = get_table().get("W" + wmi)
+    return (row[1], row[2], row[3]) if row else None
+
+
+@lru_cache(maxsize=4096)
+def _patterns(wmi: str) -> Tuple[Tuple[str, int, str, int, int, str], ...]:
+    """(patrón, especificidad, modelo, desde, hasta, marca), más específicos primero."""
+    rows = []
+    for key, model, y0, y1, make in get_table().scan("V" + wmi):
+        pattern = key[1 + len(wmi):]
+        rows.append((pattern, 5 - pattern.count("*"), model, int(y0), int(y1) or 9999, make))
+    rows.sort(key=lambda r: -r[1])
+    return tuple(rows)
+
+
+@lru_cache(maxsize=4096)
+def _plant(wmi: str, code: str) -> Optional[str]:
+    row = get_table().get("P" + wmi + code)
+    return row[1] if row else None
+
+
+def _match(wmi: str, vds: str, year: Optional[int]) -> Tuple[Optional[str], str]:
+    fallback = None
+    for pattern, _, model, y0, y1, make in _patterns(wmi):
+        if all(p == "*" or p == c for p, c in zip(pattern, vds)):
+            if year is None or y0 <= year <= y1:
+                return model, make
+            if fallback is None:
+                fallback = (model, make)
+    return fallback or (None, "")
+
+
+def _decode_key(key: str) -> Decoded:
+    """key = posiciones 1-8 + 10-11 (lo que no varía entre unidades de un mismo lote)."""
+    wmi = key[:3]
+    year = model_year(key[:8] + "0" + key[8:])
+    w = _wmi(wmi)
+    model, make = _match(wmi, key[3:8], year)
+    manufacturer, wmi_make, country = w if w else (None, "", REGIONS.get(wmi[0]))
+    return manufacturer, make or wmi_make or None, model, year, country, _plant(wmi, key[9])
+
+
+_decode_cached = lru_cache(maxsize=get_settings().VIN_CACHE_SIZE)(_decode_key)
+
+
+# ---------- API ----------
+def validate(vin: str) -> Tuple[Optional[str], Optional[bool]]:
+    """(error o None, check_digit) de un VIN ya normalizado."""
+    if len(vin) != 17:
+        return "Debe tener 17 caracteres", None
+    if not VIN_RE.fullmatch(vin):
+        return "Caracteres inválidos (sólo A-Z sin I, O, Q y 0-9)", None
+    if not north_american(vin):
+        return None, None
+    if check_digit(vin) != vin[8]:
+        return "Dígito verificador incorrecto", False
+    return None, True
+
+
+def decode(vin: Optional[str]) -> Dict:
+    v = normalize(vin)
+    error, cd = validate(v)
+    out = {"vin": v, "valid": error is None, "error": error, "check_digit": cd, "wmi": None}
+    if error is not None:
+        out.update(dict.fromkeys(_FIELDS))
+        return out
+    out["wmi"] = v[:3]
+    out.update(zip(_FIELDS, _decode_cached(v[:8] + v[9:11])))
+    return out
+
+
+def decode_many(vins: Iterable[str]) -> List[Dict]:
+    return [decode(v) for v in vins]
+
+
+def cache_info():
+    return _decode_cached.cache_info()
@@ -0,0 +1,78 @@
+# backend/bench/catalog_autocomplete.py
+"""
+Latencia del autocompletado de catálogo con carga de teclado y costo de arranque.
+
+Simula usuarios escribiendo "marca modelo" letra por letra (minúsculas, sin
+acentos, a veces con alias: "vw", "mercedes"...) y mide por consulta lo que
+hace GET /catalog/autocomplete sin la capa HTTP: `complete()` + JSON.
+Reporta p50/p99/máx en µs y los tiempos de construir el trie vs cargarlo de la
+caché en disco.
+
+    python -m bench.catalog_autocomplete --sessions 2000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+ALIASES = {"Volkswagen": "vw", "Mercedes-Benz": "mercedes", "Citroën": "citroen", "Chirey": "chery"}
+
+
+def _typed(rng: random.Random, cat) -> str:
+    e = rng.choice([e for e in cat.entries if e[1]])
+    make = ALIASES.get(e[2], e[2]) if rng.random() < 0.5 else e[2]
+    text = f"{make} {e[3]}" if rng.random() < 0.8 else e[3]
+    return text.lower()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=2000, help="textos escritos letra por letra")
+    ap.add_argument("--target-ms", type=float, default=1.0)
+    args = ap.parse_args()
+
+    os.environ.setdefault("CATALOG_CACHE_DIR", tempfile.mkdtemp(prefix="carsense-catalog-"))
+    from app.core.responses import dumps
+    from app.services import catalog
+
+    t0 = time.perf_counter()
+    cat = catalog.load()  # caché vacía: construye y guarda
+    build_ms = (time.perf_counter() - t0) * 1e3
+    t0 = time.perf_counter()
+    cat = catalog.load()
+    load_ms = (time.perf_counter() - t0) * 1e3
+
+    rng = random.Random(11)
+    queries = []
+    for _ in range(args.sessions):
+        text = _typed(rng, cat)
+        queries.extend(text[:i] for i in range(1, len(text) + 1))
+    lat = []
+    empty = 0
+    for q in queries:
+        t0 = time.perf_counter()
+        body = dumps(cat.complete(q, limit=10))
+        lat.append(time.perf_counter() - t0)
+        empty += body == b"[]"
+    lat.sort()
+    pct = lambda p: round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1e6, 1)
+    out = {
+        "queries": len(queries),
+        "empty_results": empty,
+        "latency_us": {"p50": pct(0.50), "p99": pct(0.99), "max": round(lat[-1] * 1e6, 1)},
+        "startup_ms": {"build": round(build_ms, 2), "cached_load": round(load_ms, 2)},
+        "trie": {"nodes": len(cat.nodes), "entries": len(cat.entries)},
+    }
+    print(json.dumps(out, indent=2))
+    return 0 if lat[int(0.99 * len(lat))] * 1e3 < args.target_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# backend/bench/list_serialization.py
+"""
+Listado de servicios: camino ORM + Pydantic (anterior) vs. columnas Core + orjson.
+
+Para 1k/10k/100k filas mide filas/s (mejor de --repeat) y el pico de memoria
+asignada (tracemalloc, en una pasada aparte para no distorsionar el tiempo).
+
+    python -m bench.list_serialization --sizes 1000 10000 100000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import List
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import create_engine, desc, insert, select  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.api.v1.service_records import LIST_COLUMNS, LIST_KEYS  # noqa: E402
+from app.core.responses import dumps  # noqa: E402
+from app.db import models  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.schemas.service_records import ServiceOut  # noqa: E402
+
+ADAPTER = TypeAdapter(List[ServiceOut])
+
+
+def build(path: str, n: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    today = date.today()
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": 1, "email": "b@b.mx", "password_hash": "x"}])
+        conn.execute(insert(models.Vehicle), [{"id": 1, "owner_id": 1, "make": "Kia", "model": "Rio", "year": 2020}])
+        conn.execute(insert(models.ServiceRecord), [
+            {"vehicle_id": 1, "service_type": "aceite", "date": today - timedelta(days=i % 3000),
+             "km": i * 7, "notes": f"Aceite 5W-30 y filtro P{i:06d}"} for i in range(n)
+        ])
+    return engine
+
+
+def orm_path(engine) -> bytes:
+    # lo que hacía el endpoint: ORM -> validación response_model -> JSON
+    with Session(engine) as db:
+        rows = db.execute(
+            select(models.ServiceRecord)
+            .where(models.ServiceRecord.vehicle_id == 1)
+            .order_by(desc(models.ServiceRecord.id))
+        ).scalars().all()
+        objs = ADAPTER.validate_python(rows, from_attributes=True)
+        return json.dumps(ADAPTER.dump_python(objs, mode="json")).encode()
+
+
+def fast_path(engine) -> bytes:
+    with Session(engine) as db:
+        rows = db.execute(
+            select(*LIST_COLUMNS)
+            .where(models.ServiceRecord.vehicle_id == 1)
+            .order_by(desc(models.ServiceRecord.id))
+        )
+        return dumps([dict(zip(LIST_KEYS, r)) for r in rows])
+
+
+def measure(fn, engine, repeat: int):
+    fn(engine)  # calentamiento (caché de compilación, páginas de SQLite)
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        body = fn(engine)
+        best = min(best, time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    fn(engine)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, len(body)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    results = []
+    tmp = tempfile.mkdtemp(prefix="carsense-ser-")
+    for n in args.sizes:
+        engine = build(os.path.join(tmp, f"s{n}.db"), n)
+        row = {"rows": n}
+        for name, fn in (("orm_pydantic", orm_path), ("core_fastjson", fast_path)):
+            t, peak, size = measure(fn, engine, args.repeat)
+            row[name] = {"ms": round(t * 1000, 2), "rows_per_s": round(n / t), "peak_alloc_kb": peak // 1024,
+                         "body_bytes": size}
+        row["speedup"] = round(row["orm_pydantic"]["ms"] / row["core_fastjson"]["ms"], 2)
+        row["alloc_ratio"] = round(row["orm_pydantic"]["peak_alloc_kb"] / max(1, row["core_fastjson"]["peak_alloc_kb"]), 2)
+        results.append(row)
+        engine.dispose()
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+# backend/bench/loadtest.py
+"""
+Benchmark reproducible de la API.
+
+Siembra N usuarios × M vehículos × K servicios/recordatorios en una BD temporal
+y lanza una mezcla realista de peticiones (login, listados del dashboard,
+altas y turnos de chatbot) contra la app ASGI real:
+
+  * in-process con httpx.ASGITransport (por defecto), o
+  * contra uvicorn con varios workers (--mode uvicorn --workers 4).
+
+Imprime/guarda JSON con throughput y p50/p95/p99 por ruta. Con --baseline
+compara contra una corrida anterior y sale con código 1 si alguna ruta empeora
+más que --threshold por ciento.
+
+    python -m bench.loadtest --users 20 --vehicles 3 --records 50 --requests 5000 --out run.json
+    python -m bench.loadtest ... --baseline run.json --threshold 10
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Dict, List
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "Bench1234!"
+
+# (nombre, peso)
+MIX = [
+    ("login", 2),
+    ("list_vehicles", 25),
+    ("get_vehicle", 10),
+    ("list_services", 20),
+    ("list_reminders", 20),
+    ("create_service", 8),
+    ("create_reminder", 5),
+    ("chatbot", 10),
+]
+
+CHAT_PROMPTS = [
+    "¿Cada cuanto cambio el aceite?",
+    "Mi coche marca P0171",
+    "Mis frenos rechinan",
+    "¿Cuando toca mi proximo servicio?",
+    "Se calienta en trafico",
+]
+
+
+# ---------- Siembra ----------
+def seed(db_url: str, users: int, vehicles: int, records: int, rng: random.Random) -> List[Dict]:
+    """Inserta el dataset con Core (un solo hash bcrypt reutilizado) y devuelve las cuentas."""
+    from sqlalchemy import create_engine, insert
+    from app.core.security import hash_password
+    from app.db.base import Base
+    from app.db import models
+
+    engine = create_engine(db_url)
+    Base.metadata.create_all(bind=engine)
+    pw_hash = hash_password(PASSWORD)
+    today = date.today()
+    accounts = []
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": u + 1, "email": f"bench{u}@carsense.mx", "password_hash": pw_hash} for u in range(users)
+        ])
+        vrows, srows, rrows = [], [], []
+        vid = 0
+        for u in range(users):
+            owned = []
+            for _ in range(vehicles):
+                vid += 1
+                owned.append(vid)
+                vrows.append({"id": vid, "owner_id": u + 1, "make": "Nissan", "model": "Versa",
+                              "year": rng.randint(2008, 2024), "odometer_km": rng.randint(0, 200_000)})
+                for k in range(records):
+                    srows.append({"vehicle_id": vid, "service_type": rng.choice(["aceite", "frenos", "llantas"]),
+                                  "date": today - timedelta(days=30 * k), "km": 5000 * k, "notes": "bench"})
+                    rrows.append({"vehicle_id": vid, "kind": "date", "due_date": today + timedelta(days=k),
+                                  "due_km": None, "notes": "bench", "done": False})
+            accounts.append({"email": f"bench{u}@carsense.mx", "vehicles": owned})
+        conn.execute(insert(models.Vehicle), vrows)
+        if srows:
+            conn.execute(insert(models.ServiceRecord), srows)
+            conn.execute(insert(models.Reminder), rrows)
+    engine.dispose()
+    return accounts
+
+
+# ---------- Carga ----------
+async def _op(client, name: str, acct: Dict, rng: random.Random):
+    h = {"Authorization": f"Bearer {acct['token']}"}
+    vid = rng.choice(acct["vehicles"])
+    if name == "login":
+        return await client.post("/api/v1/auth/login", json={"email": acct["email"], "password": PASSWORD})
+    if name == "list_vehicles":
+        return await client.get("/api/v1/vehicles", headers=h)
+    if name == "get_vehicle":
+        return await client.get(f"/api/v1/vehicles/{vid}", headers=h)
+    if name == "list_services":
+        return await client.get("/api/v1/service-records", headers=h)
+    if name == "list_reminders":
+        return await client.get("/api/v1/reminders", headers=h)
+    if name == "create_service":
+        return await client.post("/api/v1/service-records", headers=h, json={
+            "vehicle_id": vid, "service_type": "aceite", "date": date.today().isoformat(), "km": 1000})
+    if name == "create_reminder":
+        return await client.post("/api/v1/reminders", headers=h, json={
+            "vehicle_id": vid, "kind": "odometer", "due_km": 150_000})
+    if name == "chatbot":
+        return await client.post("/api/v1/chatbot/ask", json={
+            "messages": [{"role": "user", "content": rng.choice(CHAT_PROMPTS)}]})
+    raise ValueError(name)
+
+
+async def drive(client, accounts: List[Dict], total: int, concurrency: int, seed_value: int) -> Dict:
+    for acct in accounts:
+        r = await client.post("/api/v1/auth/login", json={"email": acct["email"], "password": PASSWORD})
+        r.raise_for_status()
+        acct["token"] = r.json()["access_token"]
+
+    names = [n for n, _ in MIX]
+    weights = [w for _, w in MIX]
+    lat: Dict[str, List[float]] = {n: [] for n in names}
+    errors: Dict[str, int] = {n: 0 for n in names}
+    remaining = [total]
+
+    async def worker(i: int):
+        rng = random.Random(seed_value * 1000 + i)
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            name = rng.choices(names, weights)[0]
+            acct = rng.choice(accounts)
+            t0 = time.perf_counter()
+            r = await _op(client, name, acct, rng)
+            lat[name].append(time.perf_counter() - t0)
+            if r.status_code >= 400:
+                errors[name] += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    return {"elapsed_s": elapsed, "latencies": lat, "errors": errors}
+
+
+def _pct(sorted_vals: List[float], p: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    # nearest-rank
+    k = max(0, min(len(sorted_vals) - 1, math.ceil(p / 100.0 * len(sorted_vals)) - 1))
+    return sorted_vals[k]
+
+
+def summarize(raw: Dict, meta: Dict) -> Dict:
+    routes = {}
+    total = 0
+    for name, vals in raw["latencies"].items():
+        vals = sorted(vals)
+        total += len(vals)
+        routes[name] = {
+            "count": len(vals),
+            "errors": raw["errors"][name],
+            "rps": round(len(vals) / raw["elapsed_s"], 2),
+            "p50_ms": round(_pct(vals, 50) * 1000, 3),
+            "p95_ms": round(_pct(vals, 95) * 1000, 3),
+            "p99_ms": round(_pct(vals, 99) * 1000, 3),
+        }
+    return dict(meta, elapsed_s=round(raw["elapsed_s"], 3),
+                throughput_rps=round(total / raw["elapsed_s"], 2), routes=routes)
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Regresiones: p95 sube o rps por ruta baja más que threshold %."""
+    problems = []
+    for name, cur in current["routes"].items():
+        base = baseline.get("routes", {}).get(name)
+        if not base or not base["count"] or not cur["count"]:
+            continue
+        if base["p95_ms"] and (cur["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100 > threshold:
+            problems.append(f"{name}: p95 {base['p95_ms']} -> {cur['p95_ms']} ms")
+        if base["rps"] and (base["rps"] - cur["rps"]) / base["rps"] * 100 > threshold:
+            problems.append(f"{name}: rps {base['rps']} -> {cur['rps']}")
+    return problems
+
+
+# ---------- Modos ----------
+async def run_inproc(accounts, args) -> Dict:
+    import httpx
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return await drive(client, accounts, args.requests, args.concurrency, args.seed)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_uvicorn(accounts, args, workdir: str) -> Dict:
+    import httpx
+
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=BACKEND)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    try:
+        base = f"http://127.0.0.1:{port}"
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base, limits=limits, timeout=60) as client:
+            for _ in range(200):
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn no arrancó")
+            return await drive(client, accounts, args.requests, args.concurrency, args.seed)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--users", type=int, default=20)
+    ap.add_argument("--vehicles", type=int, default=3, help="vehículos por usuario")
+    ap.add_argument("--records", type=int, default=20, help="servicios y recordatorios por vehículo")
+    ap.add_argument("--requests", type=int, default=3000)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--mode", choices=["inproc", "uvicorn"], default="inproc")
+    ap.add_argument("--workers", type=int, default=2, help="sólo en --mode uvicorn")
+    ap.add_argument("--out", help="ruta del JSON de resultados")
+    ap.add_argument("--baseline", help="JSON de una corrida previa para comparar")
+    ap.add_argument("--threshold", type=float, default=10.0, help="regresión permitida en %%")
+    args = ap.parse_args()
+
+    out = os.path.abspath(args.out) if args.out else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    sys.path.insert(0, BACKEND)
+    # app.db es relativo al cwd: la corrida vive en su propio directorio temporal
+    workdir = tempfile.mkdtemp(prefix="carsense-load-")
+    os.chdir(workdir)
+    # pocas cuentas generan todo el tráfico: el límite por usuario falsearía la medición
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    rng = random.Random(args.seed)
+    accounts = seed("sqlite:///./app.db", args.users, args.vehicles, args.records, rng)
+
+    if args.mode == "inproc":
+        raw = asyncio.run(run_inproc(accounts, args))
+    else:
+        raw = asyncio.run(run_uvicorn(accounts, args, workdir))
+
+    meta = {k: getattr(args, k) for k in ("mode", "workers", "users", "vehicles", "records",
+                                          "requests", "concurrency", "seed")}
+    result = summarize(raw, meta)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if out:
+        with open(out, "w") as fh:
+            fh.write(text + "\n")
+
+    if baseline:
+        with open(baseline) as fh:
+            problems = compare(result, json.load(fh), args.threshold)
+        for p in problems:
+            print(f"REGRESIÓN {p}", file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# backend/bench/maintenance_plan.py
+"""
+Costo de resolver los intervalos de mantenimiento de un vehículo.
+
+  * cold_us: `RuleBook.resolve` sin memoria (reglas genéricas + marca + modelo
+    filtradas por año y perfil), lo que cuesta el primer vehículo de cada
+    combinación;
+  * warm_us: `maintenance.plan` memorizado, lo que paga `alerts.generate`
+    por vehículo en una flota;
+  * combos: combinaciones distintas (marca, modelo, año, perfil) en la flota
+    simulada; es lo que ocupa la memoria.
+
+    python -m bench.maintenance_plan --vehicles 200000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--vehicles", type=int, default=200_000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    from app.services import catalog, maintenance
+
+    t0 = time.perf_counter()
+    rules = maintenance.load()
+    load_ms = (time.perf_counter() - t0) * 1e3
+
+    rng = random.Random(args.seed)
+    models = [(e[0], e[1], e[4], e[5] or 2025) for e in catalog.get_catalog().entries if e[1]]
+    fleet = []
+    for _ in range(args.vehicles):
+        make_id, model_id, y0, y1 = rng.choice(models)
+        profile = maintenance.SEVERE if rng.random() < 0.2 else None
+        fleet.append((make_id, model_id, rng.randint(max(y0, 1995), max(y0, y1)), profile))
+
+    sample = fleet[:20_000]
+    t0 = time.perf_counter()
+    for make_id, model_id, year, profile in sample:
+        rules.resolve(make_id, model_id, year, profile or maintenance.NORMAL)
+    cold = (time.perf_counter() - t0) / len(sample) * 1e6
+
+    plan = maintenance.plan
+    for v in fleet:  # calienta
+        plan(*v)
+    t0 = time.perf_counter()
+    for v in fleet:
+        plan(*v)
+    warm = (time.perf_counter() - t0) / len(fleet) * 1e6
+
+    info = maintenance.cache_info()
+    print(json.dumps({"vehicles": len(fleet), "load_ms": round(load_ms, 2), "cold_us": round(cold, 2),
+                      "warm_us": round(warm, 3), "combos": info.currsize, "cache": info._asdict()}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# backend/bench/metrics_overhead.py
+"""
+Mide el sobrecoste de MetricsMiddleware + hooks del engine.
+
+Lanza el mismo ciclo de peticiones (in-process vía httpx.ASGITransport) en dos
+subprocesos, con METRICS_ENABLED=0 y =1, alternando varias rondas, y compara la
+mediana de peticiones/s. Sale con código 1 si supera el umbral.
+
+    python -m bench.metrics_overhead --requests 3000 --rounds 5 --max-overhead 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def _drive(n: int) -> float:
+    import httpx
+    from app.main import app, on_startup
+
+    on_startup()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        await c.post("/auth/register", json={"email": "bench@carsense.mx", "password": "bench"})
+        r = await c.post("/auth/login", json={"email": "bench@carsense.mx", "password": "bench"})
+        h = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        for i in range(5):
+            await c.post("/vehicles", json={"make": "Nissan", "model": "Versa", "year": 2015 + i}, headers=h)
+
+        # calentamiento
+        for _ in range(200):
+            await c.get("/vehicles", headers=h)
+
+        t0 = time.perf_counter()
+        for i in range(n):
+            if i % 2:
+                await c.get("/health")
+            else:
+                await c.get("/vehicles", headers=h)
+        return n / (time.perf_counter() - t0)
+
+
+def _child(n: int) -> None:
+    # app.db es relativo al cwd: cada subproceso usa su directorio temporal
+    sys.path.insert(0, BACKEND)
+    os.chdir(tempfile.mkdtemp(prefix="carsense-bench-"))
+    print(json.dumps({"rps": asyncio.run(_drive(n))}))
+
+
+def _run(enabled: bool, n: int) -> float:
+    env = dict(os.environ, METRICS_ENABLED="1" if enabled else "0", RATE_LIMIT_ENABLED="0")
+    out = subprocess.run(
+        [sys.executable, "-m", "bench.metrics_overhead", "--child", "--requests", str(n)],
+        cwd=BACKEND, env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])["rps"]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=3000)
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--max-overhead", type=float, default=2.0, help="porcentaje permitido")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        _child(args.requests)
+        return 0
+
+    off, on = [], []
+    for _ in range(args.rounds):
+        off.append(_run(False, args.requests))
+        on.append(_run(True, args.requests))
+
+    rps_off, rps_on = statistics.median(off), statistics.median(on)
+    overhead = (rps_off - rps_on) / rps_off * 100
+    print(json.dumps({
+        "requests": args.requests,
+        "rounds": args.rounds,
+        "rps_disabled": round(rps_off, 1),
+        "rps_enabled": round(rps_on, 1),
+        "overhead_pct": round(overhead, 2),
+        "max_overhead_pct": args.max_overhead,
+    }, indent=2))
+    return 1 if overhead > args.max_overhead else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+# backend/bench/outbox_dispatch.py
+"""
+Despacho del outbox de avisos contra un servidor SMTP de depuración local.
+
+Crea --reminders recordatorios vencidos en una BD temporal, los dispara
+(`push.fire_due_reminders`, que escribe el outbox en la misma transacción) y
+corre el `Dispatcher` hasta vaciarlo. El sumidero SMTP (asyncio, en un hilo)
+rechaza con 451 una fracción --fail-rate de los mensajes para ejercitar los
+reintentos; el backoff se acorta a --backoff-s.
+
+Reporta avisos/s, reintentos, lag de entrega (p50/p99 desde el disparo) y
+verifica que cada recordatorio llegó exactamente una vez.
+
+    python -m bench.outbox_dispatch --reminders 20000 --batch 200
+    python -m bench.outbox_dispatch --reminders 5000 --fail-rate 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from typing import List
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+def _pct(vals: List[float], p: float) -> float:
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(p / 100 * len(vals)))] if vals else 0.0
+
+
+# ---------- Sumidero SMTP ----------
+class SmtpSink:
+    """SMTP mínimo (HELO/MAIL/RCPT/DATA/RSET/QUIT) que cuenta mensajes por Subject."""
+
+    def __init__(self, fail_rate: float):
+        self.fail_rate = fail_rate
+        self.subjects: Counter = Counter()
+        self.rejected = 0
+        self.loop = asyncio.new_event_loop()
+        self.port = 0
+
+    async def _session(self, reader, writer) -> None:
+        writer.write(b"220 sink\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            cmd = line[:4].upper()
+            if cmd == b"DATA":
+                writer.write(b"354 go\r\n")
+                subject = ""
+                while True:
+                    row = await reader.readline()
+                    if row in (b".\r\n", b""):
+                        break
+                    if row.startswith(b"Subject: "):
+                        subject = row[9:].strip().decode()
+                if random.random() < self.fail_rate:
+                    self.rejected += 1
+                    writer.write(b"451 try later\r\n")
+                else:
+                    self.subjects[subject] += 1
+                    writer.write(b"250 ok\r\n")
+            elif cmd == b"QUIT":
+                writer.write(b"221 bye\r\n")
+                break
+            elif cmd in (b"EHLO", b"HELO"):
+                writer.write(b"250 sink\r\n")
+            else:
+                writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
+
+    def start(self) -> None:
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            server = self.loop.run_until_complete(asyncio.start_server(self._session, "127.0.0.1", 0))
+            self.port = server.sockets[0].getsockname()[1]
+            ready.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        ready.wait()
+
+
+def seed(n: int, users: int) -> None:
+    from sqlalchemy import insert
+    from app.db import models
+    from app.db.base import Base
+    from app.db.session import engine
+
+    Base.metadata.create_all(engine)
+    past = date.today() - timedelta(days=1)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": i + 1, "email": f"u{i}@carsense.mx", "password_hash": "x"}
+                                           for i in range(users)])
+        conn.execute(insert(models.Vehicle), [{"id": i + 1, "make": "Nissan", "model": "Versa", "owner_id": i + 1,
+                                               "odometer_km": 0} for i in range(users)])
+        conn.execute(insert(models.Reminder), [{"id": i + 1, "vehicle_id": i % users + 1, "kind": "date",
+                                                "due_date": past, "notes": f"bench-{i + 1}", "done": False}
+                                               for i in range(n)])
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--reminders", type=int, default=20000)
+    ap.add_argument("--users", type=int, default=500)
+    ap.add_argument("--batch", type=int, default=200)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    ap.add_argument("--backoff-s", type=float, default=0.05)
+    args = ap.parse_args()
+
+    # app.db es relativo al cwd y el engine lo fija al importarse
+    os.chdir(tempfile.mkdtemp(prefix="carsense-outbox-"))
+    os.environ["NOTIFY_CHANNELS"] = "email"
+
+    from app.db.models import NotificationOutbox
+    from app.db.session import SessionLocal, engine
+    from app.services import outbox, push
+    from sqlalchemy import func, select
+
+    sink = SmtpSink(args.fail_rate)
+    sink.start()
+    seed(args.reminders, args.users)
+
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        fired = push.fire_due_reminders(db)
+    fire_s = time.perf_counter() - t0
+
+    d = outbox.Dispatcher(engine, {"email": outbox.SmtpTransport("127.0.0.1", sink.port, "bench@carsense.mx")},
+                          batch=args.batch, max_attempts=50, backoff_s=args.backoff_s, backoff_max_s=args.backoff_s * 8)
+    t0 = time.perf_counter()
+    ticks = 0
+    while True:
+        n = d.tick()
+        ticks += 1
+        if n == 0:
+            with engine.connect() as conn:
+                left = conn.execute(select(func.count()).where(NotificationOutbox.status == "pending")).scalar()
+            if not left:
+                break
+            time.sleep(args.backoff_s / 4)
+    dispatch_s = time.perf_counter() - t0
+
+    with engine.connect() as conn:
+        rows = conn.execute(select(NotificationOutbox.created_at, NotificationOutbox.sent_at,
+                                   NotificationOutbox.attempts).where(NotificationOutbox.status == "sent")).all()
+    lag = [(s - c).total_seconds() for c, s, _ in rows]
+    dupes = sum(1 for v in sink.subjects.values() if v > 1)
+    print(json.dumps({
+        "reminders": args.reminders, "fired": fired, "fire_s": round(fire_s, 3),
+        "sent": len(rows), "delivered_unique": len(sink.subjects), "duplicates": dupes,
+        "rejected_451": sink.rejected, "retries": sum(a - 1 for *_, a in rows), "ticks": ticks,
+        "dispatch_s": round(dispatch_s, 3), "per_s": round(len(rows) / dispatch_s, 1),
+        "lag_p50_s": round(_pct(lag, 50), 3), "lag_p99_s": round(_pct(lag, 99), 3),
+    }, indent=2))
+    return 0 if len(sink.subjects) == args.reminders and not dupes else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+# backend/bench/push_connections.py
+"""
+Escalamiento de conexiones del canal push (/push/events SSE o /push/ws).
+
+Levanta uvicorn en un directorio temporal (broker "unix"), crea --users
+cuentas y abre conexiones inactivas repartidas entre ellas hasta cada escalón
+de --steps. En cada escalón mide:
+
+  * rss_mb / kb_per_conn: memoria residente del servidor y costo marginal
+    por conexión respecto al arranque.
+  * connect_s: tiempo en abrir las conexiones del escalón.
+  * fanout: latencia desde que se publica un broadcast (datagrama al broker,
+    como lo haría otro worker) hasta que cada cliente lo recibe (p50/p99/max).
+    Incluye el costo del propio cliente leyendo N sockets en un solo loop.
+
+    python -m bench.push_connections --steps 1000,5000,10000 --transport sse
+    python -m bench.push_connections --steps 2000,8000 --transport ws
+
+Ojo con `ulimit -n`: cliente y servidor necesitan un descriptor por conexión.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+PASSWORD = "Bench1234!"
+
+
+def _pct(vals: List[float], p: float) -> float:
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(p / 100 * len(vals)))] if vals else 0.0
+
+
+def _rss_kb(pid: int) -> int:
+    """RSS del proceso y sus hijos (workers de uvicorn)."""
+    total = 0
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as fh:
+            pids += [int(p) for p in fh.read().split()]
+    except OSError:
+        pass
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as fh:
+                for line in fh:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return total
+
+
+def seed_users(n: int) -> List[str]:
+    from sqlalchemy import create_engine, insert
+    from app.core.security import create_access_token, hash_password
+    from app.db import models
+    from app.db.base import Base
+
+    engine = create_engine("sqlite:///./app.db")
+    Base.metadata.create_all(engine)
+    pw = hash_password(PASSWORD)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": i + 1, "email": f"push{i}@carsense.mx", "password_hash": pw}
+                                           for i in range(n)])
+    engine.dispose()
+    return [create_access_token(f"push{i}@carsense.mx") for i in range(n)]
+
+
+# ---------- Clientes ----------
+class Clients:
+    def __init__(self, port: int, transport: str):
+        self.port = port
+        self.transport = transport
+        self.tasks: List[asyncio.Task] = []
+        self.received: Dict[int, List[float]] = {}  # marca del broadcast -> tiempos de recepción
+        self.connected = 0
+
+    def _got(self, raw: bytes) -> None:
+        ev = json.loads(raw)
+        mark = ev.get("data", {}).get("mark")
+        if mark is not None:
+            self.received.setdefault(mark, []).append(time.time())
+
+    async def _sse(self, token: str, ready: asyncio.Future) -> None:
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write(f"GET /push/events?token={token} HTTP/1.1\r\nHost: bench\r\n"
+                     "Accept: text/event-stream\r\n\r\n".encode())
+        await reader.readuntil(b"\r\n\r\n")
+        ready.set_result(True)
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            # chunked: las líneas de tamaño no empiezan con "data: "
+            if line.startswith(b"data: "):
+                self._got(line[6:])
+
+    async def _ws(self, token: str, ready: asyncio.Future) -> None:
+        import websockets
+
+        async with websockets.connect(f"ws://127.0.0.1:{self.port}/push/ws?token={token}",
+                                      ping_interval=None, max_queue=4) as ws:
+            ready.set_result(True)
+            async for msg in ws:
+                self._got(msg)
+
+    async def open(self, tokens: List[str], batch: int = 200) -> None:
+        run = self._sse if self.transport == "sse" else self._ws
+        for i in range(0, len(tokens), batch):
+            loop = asyncio.get_running_loop()
+            ready = [loop.create_future() for _ in tokens[i:i + batch]]
+            for tok, fut in zip(tokens[i:i + batch], ready):
+                self.tasks.append(asyncio.ensure_future(run(tok, fut)))
+            await asyncio.gather(*ready)
+            self.connected += len(ready)
+
+    def close(self) -> None:
+        for t in self.tasks:
+            t.cancel()
+
+
+async def fanout(clients: Clients, broker_dir: str, mark: int, timeout: float) -> Dict[str, float]:
+    from app.core import pubsub
+    from app.core.responses import dumps
+
+    broker = pubsub.UnixBroker(broker_dir)
+    t0 = time.time()
+    broker.publish(pubsub.BROADCAST, dumps({"type": "bench", "data": {"mark": mark}}))
+    deadline = time.monotonic() + timeout
+    while len(clients.received.get(mark, ())) < clients.connected and time.monotonic() < deadline:
+        await asyncio.sleep(0.005)
+    lat = [(t - t0) * 1000 for t in clients.received.get(mark, ())]
+    return {"delivered": len(lat), "p50_ms": round(_pct(lat, 50), 1), "p99_ms": round(_pct(lat, 99), 1),
+            "max_ms": round(max(lat), 1) if lat else 0.0}
+
+
+async def run(args, tokens: List[str], server: subprocess.Popen, broker_dir: str) -> List[Dict]:
+    import httpx
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}") as c:
+        for _ in range(100):
+            try:
+                if (await c.get("/health")).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    await asyncio.sleep(0.5)
+    base_kb = _rss_kb(server.pid)
+
+    clients = Clients(args.port, args.transport)
+    out = []
+    steps = sorted(int(s) for s in args.steps.split(","))
+    for mark, target in enumerate(steps):
+        want = target - clients.connected
+        t0 = time.perf_counter()
+        await clients.open([tokens[(clients.connected + i) % len(tokens)] for i in range(want)])
+        connect_s = time.perf_counter() - t0
+        await asyncio.sleep(1.0)
+        rss_kb = _rss_kb(server.pid)
+        out.append({
+            "connections": clients.connected,
+            "rss_mb": round(rss_kb / 1024, 1),
+            "kb_per_conn": round((rss_kb - base_kb) / clients.connected, 2),
+            "connect_s": round(connect_s, 2),
+            "fanout": await fanout(clients, broker_dir, mark, args.timeout),
+        })
+        print(json.dumps(out[-1]), file=sys.stderr)
+    clients.close()
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--steps", default="1000,5000,10000")
+    ap.add_argument("--transport", choices=("sse", "ws"), default="sse")
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--ws", default="websockets-sansio", help="implementación WebSocket de uvicorn")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--port", type=int, default=8931)
+    ap.add_argument("--timeout", type=float, default=30.0, help="espera máxima del fan-out (s)")
+    args = ap.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="carsense-push-")
+    broker_dir = os.path.join(workdir, "broker")
+    # app.db es relativo al cwd y el engine lo fija al importarse la app
+    os.chdir(workdir)
+    tokens = seed_users(args.users)
+    env = dict(os.environ, PYTHONPATH=BACKEND, PUSH_BROKER="unix", PUSH_BROKER_DIR=broker_dir,
+               REMINDER_SCAN_S="0", PUSH_MAX_PENDING="16")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--workers", str(args.workers),
+         "--ws", args.ws, "--ws-per-message-deflate", "false",
+         "--backlog", "4096", "--log-level", "warning", "--timeout-graceful-shutdown", "2"],
+        env=env, cwd=workdir,
+    )
+    result: Optional[List[Dict]] = None
+    try:
+        result = asyncio.run(run(args, tokens, server, broker_dir))
+    finally:
+        server.terminate()
+        server.wait(30)
+    print(json.dumps({"transport": args.transport, "ws": args.ws, "workers": args.workers, "steps": result}, indent=2))
+    return 0 if result and all(s["fanout"]["delivered"] == s["connections"] for s in result) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
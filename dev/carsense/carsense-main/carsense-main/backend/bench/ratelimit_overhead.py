@@ -0,0 +1,117 @@
+# backend/bench/ratelimit_overhead.py
+"""
+Costo por petición de RateLimitMiddleware y exactitud del backend compartido.
+
+  * decide_us: `decide()` (peso de la ruta + llave + GCRA) por escenario:
+    anónimo por IP, usuario con JWT (firma ya cacheada) y con cada backend.
+  * middleware_us: llamada ASGI completa (con la inyección de cabeceras)
+    contra una app vacía, menos lo que cuesta la app vacía sola.
+  * shared: --procs procesos consumen la misma llave en el backend mmap con
+    ráfaga --burst y relleno casi nulo; deben permitir exactamente --burst.
+
+    python -m bench.ratelimit_overhead --iterations 200000
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+def _scope(path: str, token: str = None, ip: str = "10.0.0.1") -> dict:
+    headers = [(b"host", b"bench"), (b"accept", b"application/json")]
+    if token:
+        headers.append((b"authorization", b"Bearer " + token.encode()))
+    return {"type": "http", "method": "GET", "path": path, "headers": headers, "client": (ip, 50000)}
+
+
+def _limiter(backend):
+    from app.core import ratelimit
+
+    # límites altos: se mide la decisión, no el rechazo
+    return ratelimit.RateLimitMiddleware(None, backend=backend, per_min=1e9, burst=10**6,
+                                         ip_per_min=1e9, ip_burst=10**6)
+
+
+def bench_decide(limiter, scope: dict, n: int) -> float:
+    limiter.decide(scope, time.time())  # calienta la caché del JWT
+    t0 = time.perf_counter()
+    for _ in range(n):
+        limiter.decide(scope, time.time())
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def bench_middleware(limiter, scope: dict, n: int) -> float:
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    async def loop(target) -> float:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            await target(dict(scope), receive, send)
+        return time.perf_counter() - t0
+
+    limiter.app = app
+    bare = asyncio.run(loop(app))
+    full = asyncio.run(loop(limiter))
+    return (full - bare) / n * 1e6
+
+
+def _consume(path: str, tries: int, burst: int, q) -> None:
+    from app.core import ratelimit
+
+    b = ratelimit.MmapBackend(path)
+    interval = 1e6  # relleno despreciable durante la prueba
+    q.put(sum(b.take("u:shared", time.time(), interval, interval * burst)[0] for _ in range(tries)))
+
+
+def bench_shared(procs: int, burst: int) -> dict:
+    path = os.path.join(tempfile.mkdtemp(prefix="carsense-rl-"), "rl")
+    q = multiprocessing.Queue()
+    ps = [multiprocessing.Process(target=_consume, args=(path, burst, burst, q)) for _ in range(procs)]
+    for p in ps:
+        p.start()
+    allowed = sum(q.get() for _ in ps)
+    for p in ps:
+        p.join()
+    return {"procs": procs, "burst": burst, "allowed": allowed, "exact": allowed == burst}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--iterations", type=int, default=200_000)
+    ap.add_argument("--procs", type=int, default=4)
+    ap.add_argument("--burst", type=int, default=5000)
+    args = ap.parse_args()
+
+    from app.core import ratelimit
+    from app.core.security import create_access_token
+
+    token = create_access_token("bench@carsense.mx")
+    shm = os.path.join(tempfile.mkdtemp(prefix="carsense-rl-"), "rl")
+    out = {"decide_us": {}, "middleware_us": {}}
+    for name, backend in (("memory", ratelimit.MemoryBackend()), ("mmap", ratelimit.MmapBackend(shm))):
+        lim = _limiter(backend)
+        out["decide_us"][f"{name}/ip"] = round(bench_decide(lim, _scope("/api/v1/vehicles"), args.iterations), 2)
+        out["decide_us"][f"{name}/jwt"] = round(bench_decide(lim, _scope("/api/v1/vehicles", token), args.iterations), 2)
+        out["middleware_us"][name] = round(bench_middleware(lim, _scope("/api/v1/vehicles", token), args.iterations // 4), 2)
+    out["shared"] = bench_shared(args.procs, args.burst)
+    print(json.dumps(out, indent=2))
+    return 0 if out["shared"]["exact"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+# backend/bench/revocation_check.py
+"""
+Costo de la consulta de tokens revocados y memoria por worker.
+
+Carga --revoked jti aleatorios en un Denylist (sin BD) y mide:
+  * ns por consulta de un token vigente (lo normal: lo descarta el filtro),
+    de uno revocado (filtro + búsqueda exacta) y de decode_claims completo
+    (firma JWT + lista) para comparar;
+  * tasa de falsos positivos observada contra la configurada;
+  * bytes en memoria, y la proyección para 10M tokens emitidos con 10% y
+    100% revocados.
+
+    python -m bench.revocation_check --revoked 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+
+def _per_call_ns(fn, items) -> float:
+    t0 = time.perf_counter()
+    for x in items:
+        fn(x)
+    return (time.perf_counter() - t0) / len(items) * 1e9
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--revoked", type=int, default=1_000_000)
+    ap.add_argument("--probes", type=int, default=200_000)
+    ap.add_argument("--fp-rate", type=float, default=0.01)
+    args = ap.parse_args()
+
+    from app.core import revocation
+    from app.core.security import create_access_token, decode_claims
+
+    revoked = [uuid.uuid4().hex for _ in range(args.revoked)]
+    d = revocation.Denylist(capacity=args.revoked, fp_rate=args.fp_rate)
+    t0 = time.perf_counter()
+    d.load(revoked)
+    load_s = time.perf_counter() - t0
+    revocation._denylist = d  # decode_claims usa esta lista, sin BD
+
+    fresh = [uuid.uuid4().hex for _ in range(args.probes)]
+    hits = revoked[:args.probes]
+    fp = sum(d.is_revoked(j) for j in fresh)
+    assert all(d.is_revoked(j) for j in hits)
+
+    tokens = [create_access_token("bench@carsense.mx") for _ in range(min(args.probes, 20_000))]
+    bloom, base = len(d._bloom.bits), d._base.itemsize * len(d._base)
+    per_entry = (bloom + base) / max(1, args.revoked)
+    out = {
+        "revoked": args.revoked,
+        "load_s": round(load_s, 2),
+        "check_ns": {
+            "not_revoked": round(_per_call_ns(d.is_revoked, fresh)),
+            "revoked": round(_per_call_ns(d.is_revoked, hits)),
+            "decode_claims": round(_per_call_ns(decode_claims, tokens)),
+        },
+        "false_positive_rate": {"configured": args.fp_rate, "observed": round(fp / len(fresh), 4)},
+        "bytes": {"bloom": bloom, "exact": base, "per_entry": round(per_entry, 1)},
+        "projection_10M_issued_mb": {
+            "10pct_revoked": round(per_entry * 1_000_000 / 2**20, 1),
+            "all_revoked": round(per_entry * 10_000_000 / 2**20, 1),
+        },
+    }
+    print(json.dumps(out, indent=2))
+    return 0 if fp / len(fresh) <= args.fp_rate * 2 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# backend/bench/search_fts.py
+"""
+Búsqueda en notas de servicio: FTS5 vs. LIKE '%...%'.
+
+Genera ~--records servicios con el generador sintético (notas con números de
+parte, talleres y síntomas), construye el índice FTS5 y compara latencias
+(p50/p95 sobre --queries consultas) de:
+
+  * fts:         app.services.search.search (por dueño, ranking + snippet)
+  * fts_prefix:  igual, completando la última palabra
+  * like_owner:  LIKE sobre los servicios del dueño (join por vehicles.owner_id)
+  * like_fleet:  LIKE sobre toda la tabla (lo que haría un buscador sin índice)
+
+Con pocos servicios por dueño el LIKE acotado es rápido pero encuentra menos
+(sin plegado de acentos, sin términos no contiguos, sin ranking); el LIKE de
+flota escala con la tabla completa.
+
+    python -m bench.search_fts --records 1000000 --queries 300
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+from sqlalchemy import create_engine, func, select, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.db import models  # noqa: E402
+from app.seeds.synthetic import generate  # noqa: E402
+from app.services import search  # noqa: E402
+
+RECORDS_PER_USER = 54  # promedio del generador con 5 años y 1-3 vehículos
+QUERIES = ["bomba agua", "balatas", "amortiguadores golpeteo", "bujias iridium", "anticongelante",
+           "aceite sintetico", "rectificado discos", "bateria", "Hernandez", "fuga sello"]
+
+LIKE_OWNER = text("""
+    SELECT s.id FROM service_records s JOIN vehicles v ON v.id = s.vehicle_id
+    WHERE v.owner_id = :owner AND (s.notes LIKE :p OR s.service_type LIKE :p)
+    ORDER BY s.date DESC LIMIT 20
+""")
+LIKE_FLEET = text("""
+    SELECT s.id FROM service_records s
+    WHERE s.notes LIKE :p OR s.service_type LIKE :p
+    ORDER BY s.date DESC LIMIT 20
+""")
+
+
+def _pct(vals: List[float], p: float) -> float:
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(p / 100 * len(vals)))]
+
+
+def timed(fn: Callable[[], object], n: int) -> Dict[str, float]:
+    fn()  # calentamiento
+    lat = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        lat.append((time.perf_counter() - t0) * 1000)
+    return {"p50_ms": round(_pct(lat, 50), 3), "p95_ms": round(_pct(lat, 95), 3), "max_ms": round(max(lat), 3)}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--records", type=int, default=1_000_000)
+    ap.add_argument("--queries", type=int, default=300)
+    ap.add_argument("--fleet-queries", type=int, default=10, help="LIKE de flota es lento: menos repeticiones")
+    ap.add_argument("--seed", type=int, default=3)
+    ap.add_argument("--db", help="reusar una BD ya generada (sqlite:///ruta)")
+    args = ap.parse_args()
+
+    if args.db:
+        engine = create_engine(args.db)
+    else:
+        path = os.path.join(tempfile.mkdtemp(prefix="carsense-fts-"), "fts.db")
+        engine = create_engine(f"sqlite:///{path}")
+        t0 = time.perf_counter()
+        generate(engine, max(1, args.records // RECORDS_PER_USER), seed=args.seed, demo=False, log=lambda *_: None)
+        print(f"datos: {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    search.install(engine)
+    build_s = time.perf_counter() - t0
+
+    with Session(engine) as db:
+        n_records = db.execute(select(func.count()).select_from(models.ServiceRecord)).scalar_one()
+        max_user = db.execute(select(func.max(models.User.id))).scalar_one()
+        rng = random.Random(args.seed)
+
+        def pick():
+            return rng.randint(1, max_user), rng.choice(QUERIES)
+
+        def fts():
+            owner, q = pick()
+            return search.search(db, owner, q)
+
+        def fts_prefix():
+            owner, q = pick()
+            return search.search(db, owner, q, prefix=True)
+
+        def like_owner():
+            owner, q = pick()
+            return db.execute(LIKE_OWNER, {"owner": owner, "p": f"%{q}%"}).all()
+
+        def like_fleet():
+            _, q = pick()
+            return db.execute(LIKE_FLEET, {"p": f"%{q}%"}).all()
+
+        # mismas 100 consultas: LIKE no pliega acentos ni encuentra palabras no contiguas
+        sample = [pick() for _ in range(100)]
+        hits = sum(len(search.search(db, o, q)) for o, q in sample)
+        like_hits = sum(len(db.execute(LIKE_OWNER, {"owner": o, "p": f"%{q}%"}).all()) for o, q in sample)
+        result = {
+            "records": n_records,
+            "fts_build_s": round(build_s, 2),
+            "fts_hits_per_query": round(hits / 100, 2),
+            "like_owner_hits_per_query": round(like_hits / 100, 2),
+            "fts": timed(fts, args.queries),
+            "fts_prefix": timed(fts_prefix, args.queries),
+            "like_owner": timed(like_owner, args.queries),
+            "like_fleet": timed(like_fleet, args.fleet_queries),
+        }
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
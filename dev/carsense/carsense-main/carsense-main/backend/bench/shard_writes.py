@@ -0,0 +1,130 @@
+# backend/bench/shard_writes.py
+"""
+Escrituras concurrentes con 1, 2, 4 y 8 shards SQLite (app/db/shards.py).
+
+--writers procesos escriben en paralelo, cada uno para sus propios usuarios,
+transacciones chicas como las de la API (alta de vehículo + fila en la
+bitácora de /sync, commit) por la misma ruta que las peticiones:
+`shards.session()` + ORM. Cada corrida usa un directorio temporal nuevo.
+
+Reporta por cantidad de shards: escrituras/s, latencia p50/p99 del commit,
+reintentos por "database is locked" y la aceleración contra 1 shard.
+
+    python -m bench.shard_writes --writers 8 --ops 400
+    python -m bench.shard_writes --shards 1,4 --writers 16
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from typing import List
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+USERS_PER_WRITER = 16
+
+
+def _pct(vals: List[float], p: float) -> float:
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(p / 100 * len(vals)))] if vals else 0.0
+
+
+def _setup(writers: int) -> None:
+    """Crea directorio, shards y sombras (en un proceso aparte: los settings se leen del entorno)."""
+    sys.path.insert(0, BACKEND)
+    from app.db import shards
+    from app.db.base import Base
+    from app.db.session import engine
+
+    Base.metadata.create_all(bind=engine)
+    for uid in range(1, writers * USERS_PER_WRITER + 1):
+        shards.ensure_shadow(shards.placement(uid), uid, f"u{uid}@bench.local")
+
+
+def _writer(w: int, ops: int, start, out) -> None:
+    sys.path.insert(0, BACKEND)
+    from sqlalchemy.exc import OperationalError
+
+    from app.db import shards
+    from app.db.models import Vehicle
+    from app.services import changes
+
+    users = [w * USERS_PER_WRITER + j + 1 for j in range(USERS_PER_WRITER)]
+    for k in {shards.placement(u) for u in users}:
+        shards.engine_for(k)  # abre engines antes de medir
+    lat, retries = [], 0
+    start.wait()
+    t0 = time.perf_counter()
+    for i in range(ops):
+        uid = users[i % len(users)]
+        while True:
+            t = time.perf_counter()
+            try:
+                with shards.session(shards.placement(uid)) as db:
+                    v = Vehicle(owner_id=uid, make="Nissan", model="Versa", year=2020)
+                    db.add(v)
+                    db.flush()
+                    changes.record(db, uid, changes.VEHICLE, v.id)
+                    db.commit()
+                break
+            except OperationalError:
+                retries += 1
+        lat.append(time.perf_counter() - t)
+    out.put((time.perf_counter() - t0, lat, retries))
+
+
+def run(n: int, writers: int, ops: int) -> dict:
+    ctx = mp.get_context("spawn")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="carsense-shards-") as tmp:
+        os.chdir(tmp)  # app.db (el directorio) se crea en ./
+        os.environ.update(SHARD_COUNT=str(n), SHARD_DIR=os.path.join(tmp, "shards"),
+                          SCHEDULER_ENABLED="0", METRICS_ENABLED="0")
+        try:
+            p = ctx.Process(target=_setup, args=(writers,))
+            p.start()
+            p.join()
+            start, out = ctx.Event(), ctx.Queue()
+            procs = [ctx.Process(target=_writer, args=(w, ops, start, out)) for w in range(writers)]
+            for p in procs:
+                p.start()
+            time.sleep(1.0)  # que todos importen y abran sus engines
+            t0 = time.perf_counter()
+            start.set()
+            results = [out.get() for _ in procs]
+            wall = time.perf_counter() - t0
+            for p in procs:
+                p.join()
+        finally:
+            os.chdir(cwd)
+    lat = [x for r in results for x in r[1]]
+    return {
+        "shards": n,
+        "writes_s": round(len(lat) / wall, 1),
+        "p50_ms": round(_pct(lat, 50) * 1e3, 2),
+        "p99_ms": round(_pct(lat, 99) * 1e3, 2),
+        "locked_retries": sum(r[2] for r in results),
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--shards", default="1,2,4,8", help="cantidades de shards a comparar")
+    ap.add_argument("--writers", type=int, default=8, help="procesos escritores")
+    ap.add_argument("--ops", type=int, default=400, help="transacciones por escritor")
+    args = ap.parse_args()
+
+    runs = [run(int(n), args.writers, args.ops) for n in args.shards.split(",")]
+    base = runs[0]["writes_s"] or 1
+    for r in runs:
+        r["speedup"] = round(r["writes_s"] / base, 2)
+    print(json.dumps({"writers": args.writers, "ops_per_writer": args.ops, "runs": runs}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+# backend/bench/telemetry_replay.py
+"""
+Replay de una traza OBD contra POST /vehicles/{id}/telemetry.
+
+Primero se graba (o se trae) una traza: frames de 1 s por vehículo con RPM,
+velocidad, temperatura, acelerador y MAF a --hz muestras/s por PID. El archivo
+es binario: por frame `<HI` (índice de vehículo, bytes) + registros `<qHf`.
+
+    python -m bench.telemetry_replay --record trace.bin --vehicles 20 --seconds 600 --hz 10
+    python -m bench.telemetry_replay --trace trace.bin --concurrency 8
+
+Mide muestras/s aceptadas por la API y muestras/s hasta quedar escritas
+(cola drenada), rechazos 503 y comprueba que los resúmenes cuadren.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+from typing import Iterator, List, Tuple
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+FRAME = struct.Struct("<HI")
+PASSWORD = "Bench1234!"
+PIDS = (0x0C, 0x0D, 0x05, 0x11, 0x10)  # rpm, km/h, °C, acelerador %, MAF g/s
+
+
+# ---------- Grabación ----------
+def record(path: str, vehicles: int, seconds: int, hz: int, seed: int) -> int:
+    from app.services.telemetry import RECORD
+
+    rng = random.Random(seed)
+    t0 = int(time.time() * 1000) - seconds * 1000
+    phase = [rng.random() * 100 for _ in range(vehicles)]
+    n = 0
+    with open(path, "wb") as fh:
+        for s in range(seconds):
+            for v in range(vehicles):
+                recs = []
+                for k in range(hz):
+                    ts = t0 + s * 1000 + k * (1000 // hz)
+                    x = (s + k / hz + phase[v]) / 60.0
+                    speed = max(0.0, 60 + 50 * math.sin(x) + rng.gauss(0, 3))
+                    rpm = 800 + speed * 35 + rng.gauss(0, 50)
+                    thr = min(100.0, max(0.0, 20 + 30 * math.cos(x) + rng.gauss(0, 5)))
+                    vals = (rpm, speed, 88 + rng.gauss(0, 1.5), thr, rpm / 150)
+                    recs.extend(RECORD.pack(ts, pid, val) for pid, val in zip(PIDS, vals))
+                payload = b"".join(recs)
+                fh.write(FRAME.pack(v, len(payload)))
+                fh.write(payload)
+                n += len(recs)
+    return n
+
+
+def frames(path: str) -> Iterator[Tuple[int, bytes]]:
+    with open(path, "rb") as fh:
+        while True:
+            head = fh.read(FRAME.size)
+            if not head:
+                return
+            v, size = FRAME.unpack(head)
+            yield v, fh.read(size)
+
+
+# ---------- Replay ----------
+def seed_accounts(vehicles: int) -> List[int]:
+    from sqlalchemy import create_engine, insert
+    from app.core.security import hash_password
+    from app.db.base import Base
+    from app.db import models
+
+    engine = create_engine("sqlite:///./app.db")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [{"id": 1, "email": "obd@carsense.mx",
+                                            "password_hash": hash_password(PASSWORD)}])
+        conn.execute(insert(models.Vehicle), [{"id": v + 1, "owner_id": 1, "make": "Mazda", "model": "3",
+                                               "year": 2020} for v in range(vehicles)])
+    engine.dispose()
+    return list(range(1, vehicles + 1))
+
+
+async def replay(trace: str, concurrency: int) -> dict:
+    import httpx
+    from app.main import app, on_startup
+    from app.services import telemetry
+
+    on_startup()  # ASGITransport no dispara el lifespan
+    writer = telemetry.get_writer()
+    data = list(frames(trace))
+    vehicles = max(v for v, _ in data) + 1
+    seed_accounts(vehicles)
+    total = sum(len(p) for _, p in data) // telemetry.RECORD.size
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        r = await client.post("/api/v1/auth/login", json={"email": "obd@carsense.mx", "password": PASSWORD})
+        r.raise_for_status()
+        h = {"Authorization": f"Bearer {r.json()['access_token']}", "Content-Type": "application/octet-stream"}
+        idx, rejected = [0], [0]
+
+        async def worker():
+            while idx[0] < len(data):
+                v, payload = data[idx[0]]
+                idx[0] += 1
+                while True:
+                    resp = await client.post(f"/api/v1/vehicles/{v + 1}/telemetry", content=payload, headers=h)
+                    if resp.status_code != 503:
+                        resp.raise_for_status()
+                        break
+                    rejected[0] += 1
+                    await asyncio.sleep(0.05)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        accepted_s = time.perf_counter() - t0
+        writer.drain(300)
+        written_s = time.perf_counter() - t0
+
+    from sqlalchemy import func, select
+    from app.db.models import TelemetryRollup, TelemetrySample
+    from app.db.session import engine
+    with engine.connect() as conn:
+        raw = conn.execute(select(func.count()).select_from(TelemetrySample)).scalar_one()
+        rolled = conn.execute(select(func.sum(TelemetryRollup.n))).scalar_one()
+    return {
+        "frames": len(data),
+        "samples": total,
+        "accepted_samples_per_s": round(total / accepted_s),
+        "written_samples_per_s": round(total / written_s),
+        "rejected_503": rejected[0],
+        "raw_rows": raw,
+        "rollup_samples": rolled,
+        "consistent": raw == total == rolled,
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--record", help="graba una traza sintética en esta ruta y sale")
+    ap.add_argument("--trace", help="traza a reproducir (si falta se graba una temporal)")
+    ap.add_argument("--vehicles", type=int, default=20)
+    ap.add_argument("--seconds", type=int, default=300)
+    ap.add_argument("--hz", type=int, default=10)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--concurrency", type=int, default=8)
+    args = ap.parse_args()
+
+    if args.record:
+        n = record(args.record, args.vehicles, args.seconds, args.hz, args.seed)
+        print(json.dumps({"trace": args.record, "samples": n}))
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix="carsense-obd-")
+    trace = os.path.abspath(args.trace) if args.trace else os.path.join(workdir, "trace.bin")
+    # app.db es relativo al cwd y el engine lo fija al importarse la app
+    os.chdir(workdir)
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")  # se mide la ingesta, no el límite
+    if not args.trace:
+        record(trace, args.vehicles, args.seconds, args.hz, args.seed)
+    result = asyncio.run(replay(trace, args.concurrency))
+    print(json.dumps(result, indent=2))
+    return 0 if result["consistent"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# backend/bench/vin_decode.py
+"""
+Rendimiento del decodificador de VIN (objetivo: 100k VINs/s por worker).
+
+Genera VINs válidos (dígito verificador correcto) a partir de los patrones de
+las tablas incluidas y mide:
+  * fleet: importación típica, --models combinaciones WMI/VDS/año/planta y
+    números de serie distintos (la caché por prefijo acierta casi siempre);
+  * cold: cada VIN con prefijo distinto y la caché vacía (bisección en el
+    archivo + patrones por WMI);
+  * batch_body: decode_many + serialización JSON, lo que hace POST /vins/decode.
+
+    python -m bench.vin_decode --count 200000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+ALNUM = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+YEARS = "ABCDEFGHJKLMNPRSTVWXY123456789"
+
+
+def _vin(prefix8: str, year: str, plant: str, serial: int) -> str:
+    from app.services import vin
+
+    v = f"{prefix8}0{year}{plant}{serial:06d}"
+    return v[:8] + vin.check_digit(v) + v[9:]
+
+
+def _prefixes(rng: random.Random, n: int) -> list:
+    """Prefijos de 8 caracteres que caen en los patrones V de las tablas."""
+    from app.services import vin
+
+    keys = [f[0] for f in vin.get_table().scan("V")]
+    out = []
+    for _ in range(n):
+        k = rng.choice(keys)
+        wmi, pattern = k[1:4], k[4:9]
+        out.append(wmi + "".join(rng.choice(ALNUM) if c == "*" else c for c in pattern))
+    return out
+
+
+def _rate(fn, vins) -> float:
+    t0 = time.perf_counter()
+    fn(vins)
+    return len(vins) / (time.perf_counter() - t0)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--count", type=int, default=200_000)
+    ap.add_argument("--models", type=int, default=200, help="combinaciones distintas en la flotilla")
+    ap.add_argument("--target", type=float, default=100_000)
+    args = ap.parse_args()
+
+    from app.core.responses import dumps
+    from app.services import vin
+
+    rng = random.Random(7)
+    combos = [(p, rng.choice(YEARS), rng.choice(ALNUM)) for p in _prefixes(rng, args.models)]
+    fleet = [_vin(*rng.choice(combos), i) for i in range(args.count)]
+    cold = [_vin(p, rng.choice(YEARS), rng.choice(ALNUM), i) for i, p in enumerate(_prefixes(rng, args.count // 4))]
+    assert all(d["valid"] for d in vin.decode_many(fleet[:1000]))
+
+    vin._decode_cached.cache_clear()
+    out = {
+        "fleet_per_s": round(_rate(vin.decode_many, fleet)),
+        "cache": vin.cache_info()._asdict(),
+    }
+    vin._decode_cached.cache_clear()
+    vin._patterns.cache_clear()
+    vin._wmi.cache_clear()
+    vin._plant.cache_clear()
+    out["cold_per_s"] = round(_rate(vin.decode_many, cold))
+    out["batch_body_per_s"] = round(_rate(lambda vs: dumps(vin.decode_many(vs)), fleet))
+    out["target_per_s"] = args.target
+    out["ok"] = out["batch_body_per_s"] >= args.target
+    print(json.dumps(out, indent=2))
+    return 0 if out["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
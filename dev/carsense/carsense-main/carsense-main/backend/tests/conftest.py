@@ -0,0 +1,62 @@
+# backend/tests/conftest.py
+"""
+Cliente de la API contra una BD SQLite nueva en un directorio temporal.
+
+app.db.session abre ./app.db al importarse: el cambio de directorio y las
+variables de entorno van antes de importar la app.
+"""
+import itertools
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import MetaData, create_engine
+
+_tmp = tempfile.TemporaryDirectory(prefix="carsense-tests-")
+os.chdir(_tmp.name)
+os.environ.update(RATE_LIMIT_ENABLED="0", SCHEDULER_ENABLED="0", REPLICA_SNAPSHOT_S="0",
+                  REPLICA_URLS="", SHARD_COUNT="0")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.db import Base  # noqa: E402
+
+_emails = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def auth(client):
+    """Cabeceras de un usuario nuevo por prueba."""
+    email = f"u{next(_emails)}@tests.mx"
+    assert client.post("/api/v1/auth/register", json={"email": email, "password": "secret123"}).status_code == 201
+    r = client.post("/api/v1/auth/login", json={"email": email, "password": "secret123"})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+@pytest.fixture
+def vehicle(client, auth):
+    r = client.post("/api/v1/vehicles", json={"make": "Nissan", "model": "Versa", "year": 2019,
+                                              "odometer_km": 30000}, headers=auth)
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    """BD de create_all anterior al ON DELETE CASCADE en service_records.vehicle_id."""
+    md = MetaData()
+    for t in Base.metadata.sorted_tables:
+        t.to_metadata(md)
+    for fk in md.tables["service_records"].foreign_key_constraints:
+        fk.ondelete = None
+    eng = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    md.create_all(eng)
+    yield eng
+    eng.dispose()
@@ -0,0 +1,79 @@
+# backend/tests/test_auth.py
+import uuid
+from datetime import datetime, timezone
+
+from jose import jwt
+from sqlalchemy import func, select
+
+from app.core import revocation
+from app.db.models import ChangeLog, IdempotencyKey, RevokedToken, User
+from app.db.session import SessionLocal, engine
+
+
+def _login(client, email):
+    client.post("/api/v1/auth/register", json={"email": email, "password": "secret123"})
+    r = client.post("/api/v1/auth/login", json={"email": email, "password": "secret123"})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def test_delete_me_removes_unlinked_rows(client):
+    h = _login(client, "borrar@tests.mx")
+    body = {"make": "Mazda", "model": "3", "year": 2020}
+    assert client.post("/api/v1/vehicles", json=body, headers={**h, "Idempotency-Key": "k1"}).status_code == 201
+    assert client.delete("/api/v1/auth/me", headers=h).status_code == 204
+
+    with SessionLocal() as db:
+        for model in (ChangeLog, IdempotencyKey):
+            orphans = select(func.count()).select_from(model).where(model.owner_id.not_in(select(User.id)))
+            assert db.execute(orphans).scalar() == 0
+
+    # SQLite reutiliza el id más alto: la cuenta nueva no hereda llaves ni historial
+    h = _login(client, "nuevo@tests.mx")
+    r = client.post("/api/v1/vehicles", json={**body, "year": 2021}, headers={**h, "Idempotency-Key": "k1"})
+    assert r.status_code == 201, r.text
+    assert r.json()["year"] == 2021
+
+
+def test_logout_revokes_token(client):
+    h = _login(client, "salir@tests.mx")
+    token = h["Authorization"].split()[1]
+    assert client.get("/api/v1/vehicles", headers=h).status_code == 200
+    assert client.post("/api/v1/auth/logout", headers=h).status_code == 204
+    assert client.get("/api/v1/vehicles", headers=h).status_code == 401
+
+    claims = jwt.get_unverified_claims(token)
+    with SessionLocal() as db:
+        expires_at = db.scalar(select(RevokedToken.expires_at).where(RevokedToken.jti == claims["jti"]))
+    assert expires_at == datetime.fromtimestamp(claims["exp"], timezone.utc).replace(tzinfo=None)
+
+
+def test_password_change_cuts_old_tokens(client):
+    old = _login(client, "clave@tests.mx")
+    r = client.post("/api/v1/auth/password", json={"current_password": "secret123", "new_password": "otra1234"},
+                    headers=old)
+    assert r.status_code == 200, r.text
+    new = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    assert client.get("/api/v1/vehicles", headers=old).status_code == 401
+    assert client.get("/api/v1/vehicles", headers=new).status_code == 200
+
+
+def test_other_worker_sees_revocation(client):
+    h = _login(client, "worker@tests.mx")
+    jti = jwt.get_unverified_claims(h["Authorization"].split()[1])["jti"]
+    other = revocation.Denylist(engine, capacity=100)  # otro worker, con su propia copia en memoria
+    other.rebuild()
+    assert not other.is_revoked(jti)
+    assert client.post("/api/v1/auth/logout", headers=h).status_code == 204
+    other.refresh()
+    assert other.is_revoked(jti)
+
+
+def test_denylist_no_false_negatives():
+    d = revocation.Denylist(capacity=1000, fp_rate=0.01)
+    revoked = [uuid.uuid4().hex for _ in range(2000)]  # más que la capacidad
+    d.load(revoked[:1000])
+    for j in revoked[1000:]:
+        d.add(j)
+    d._merge()
+    assert all(d.is_revoked(j) for j in revoked)
+    assert not d.is_revoked("no-hex") and not d.is_revoked(uuid.uuid4().hex)
@@ -0,0 +1,52 @@
+# backend/tests/test_catalog.py
+import os
+
+from app.core.config import get_settings
+from app.services import catalog
+
+
+def test_fold():
+    assert catalog.fold("  Jetta Clásico ") == "jettaclasico"
+    assert catalog.fold("CR-V") == catalog.fold("cr v") == "crv"
+
+
+def test_normalize_aliases_and_free_text():
+    assert catalog.normalize("vw", "Jetta Clásico") == {"make": "Volkswagen", "make_id": 3,
+                                                        "model": "Jetta", "model_id": 301}
+    assert catalog.normalize("NISSAN", "Nissan Versa")["model_id"] == 101  # marca dentro del modelo
+    assert catalog.normalize(None, "crv")["make"] == "Honda"  # modelo único: se infiere la marca
+    assert catalog.normalize("Datsun", "Inventado") == {"make": "Nissan", "make_id": 1,
+                                                        "model": "Inventado", "model_id": None}
+    assert catalog.normalize("Marca X", "Modelo Y") == {"make": "Marca X", "make_id": None,
+                                                        "model": "Modelo Y", "model_id": None}
+
+
+def test_autocomplete_prefix_make_and_year():
+    cat = catalog.get_catalog()
+    assert cat.complete("niss")[0]["label"] == "Nissan"  # marcas antes que modelos
+    assert cat.complete("vw jet")[0]["label"] == "Volkswagen Jetta"
+    tsuru = [x["model"] for x in cat.complete("ts", make_id=1)]
+    assert "Tsuru" in tsuru
+    assert "Tsuru" not in [x["model"] for x in cat.complete("ts", make_id=1, year=2020)]  # hasta 2017
+    assert all(x["make_id"] == 1 and x["model_id"] for x in cat.complete("", make_id=1, limit=50))
+    assert cat.complete("zzzz") == [] and cat.complete("a", make_id=999) == []
+
+
+def test_disk_cache_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "CATALOG_CACHE_DIR", str(tmp_path))
+    built = catalog.load()
+    assert len(os.listdir(tmp_path)) == 1
+    cached = catalog.load()
+    assert cached.entries == built.entries and cached.complete("sen") == built.complete("sen")
+
+
+def test_vehicle_create_normalizes(client, auth):
+    r = client.post("/api/v1/vehicles", json={"make": "volks", "model": "jetta", "year": 2018}, headers=auth)
+    assert r.status_code == 201, r.text
+    assert (r.json()["make"], r.json()["model"]) == ("Volkswagen", "Jetta")
+
+
+def test_autocomplete_endpoint(client):
+    r = client.get("/api/v1/catalog/autocomplete", params={"q": "cr", "make_id": 7})
+    assert r.status_code == 200 and r.headers["cache-control"].startswith("public")
+    assert [x["model"] for x in r.json()] == ["CR-V"]
@@ -0,0 +1,35 @@
+# backend/tests/test_chatbot.py
+import re
+
+import pytest
+
+from app.api.v1 import chat, chatbot
+from app.services import maintenance
+
+
+def _km(text):
+    return {int(n.replace(",", "")) for n in re.findall(r"(\d[\d,]*) km", text)}
+
+
+@pytest.mark.parametrize("answer, services", [
+    (chatbot.answer_tires, ("rotacion_llantas",)),
+    (chatbot.answer_brakes, ("freno", "liquido_frenos")),
+    (chatbot.answer_coolant, ("refrigerante",)),
+    (chatbot.answer_plugs, ("bujias",)),
+    (chatbot.answer_filters, ("filtro_aire",)),
+])
+def test_answers_use_rule_book(answer, services):
+    # los km de la respuesta salen del catálogo (normal, severo y autos viejos), no de texto fijo
+    allowed = set()
+    for year in (None, 2004):
+        for profile in maintenance.PROFILES:
+            plan = maintenance.plan(None, None, year, profile)
+            allowed |= {maintenance.get(plan, s).km for s in services}
+    text = answer()
+    assert _km(text) <= allowed, text
+    assert maintenance.advice(services[0]) in text
+
+
+def test_faq_brakes_from_rule_book():
+    reply = chat.intent_reply(chat.ChatIn(message="cada cuanto cambio pastillas de frenos")).reply
+    assert maintenance.advice("freno") in reply
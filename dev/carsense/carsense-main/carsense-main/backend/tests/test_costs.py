@@ -0,0 +1,34 @@
+# backend/tests/test_costs.py
+import pytest
+from sqlalchemy import select, update
+
+from app.db.models import ServiceCostMonthly
+from app.db.session import engine
+from app.services import costs
+
+
+def _rollups(vehicle_id):
+    T = ServiceCostMonthly
+    with engine.connect() as conn:
+        return conn.execute(select(T.month, T.service_type, T.n, T.cost_cents)
+                            .where(T.vehicle_id == vehicle_id).order_by(T.month)).all()
+
+
+def test_backfill_is_atomic(client, auth, vehicle):
+    for d, cost in (("2024-05-01", 850.5), ("2024-06-01", 1200)):
+        body = {"vehicle_id": vehicle["id"], "service_type": "Cambio de aceite", "date": d, "cost": cost}
+        assert client.post("/api/v1/service-records", json=body, headers=auth).status_code == 201
+    expected = [(202405, "Cambio de aceite", 1, 85050), (202406, "Cambio de aceite", 1, 120000)]
+    assert _rollups(vehicle["id"]) == expected
+
+    def fail(msg):
+        raise RuntimeError(msg)
+    with engine.connect() as conn, pytest.raises(RuntimeError):
+        costs.backfill(conn, batch=1, log=fail)  # se cae tras el primer lote
+    assert _rollups(vehicle["id"]) == expected  # nada a medias
+
+    with engine.begin() as conn:
+        conn.execute(update(ServiceCostMonthly).values(n=7))  # resúmenes desviados
+    with engine.connect() as conn:
+        assert costs.backfill(conn, batch=1, log=lambda *_: None) >= 2
+    assert _rollups(vehicle["id"]) == expected
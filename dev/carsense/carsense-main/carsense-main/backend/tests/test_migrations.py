@@ -0,0 +1,62 @@
+# backend/tests/test_migrations.py
+import os
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+
+from app.core.config import get_settings
+from app.db import check_fk_cascades
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def alembic_cfg(monkeypatch):
+    def make(url: str) -> Config:
+        monkeypatch.setattr(get_settings(), "DATABASE_URL", url)
+        monkeypatch.setattr(get_settings(), "MIGRATION_DUTY", 1.0)
+        cfg = Config()  # sin alembic.ini: su fileConfig reconfiguraría el logging de pytest
+        cfg.set_main_option("script_location", os.path.join(BACKEND, "alembic"))
+        return cfg
+    return make
+
+
+def test_create_all_db_gets_cascade(legacy_engine, alembic_cfg):
+    with legacy_engine.begin() as c:
+        c.execute(text("INSERT INTO users (id, email, password_hash) VALUES (1, 'a@tests.mx', 'x')"))
+        c.execute(text("INSERT INTO vehicles (id, make, model, owner_id) VALUES (1, 'Nissan', 'Versa', 1)"))
+        c.execute(text("INSERT INTO service_records (id, vehicle_id, service_type) VALUES (1, 1, 'Aceite')"))
+    cfg = alembic_cfg(str(legacy_engine.url))
+    command.stamp(cfg, "7e61f3c9b2f1")
+    command.upgrade(cfg, "head")
+    command.check(cfg)
+
+    assert check_fk_cascades(legacy_engine) == []
+    assert not [t for t in inspect(legacy_engine).get_table_names() if t.startswith("_old_")]
+    with legacy_engine.begin() as c:
+        assert c.execute(text("SELECT service_type FROM service_records")).scalars().all() == ["Aceite"]
+        c.execute(text("DELETE FROM vehicles WHERE id = 1"))
+        assert c.execute(text("SELECT count(*) FROM service_records")).scalar() == 0
+
+
+def test_7e61_db_matches_models(tmp_path, alembic_cfg):
+    url = f"sqlite:///{tmp_path / 'm.db'}"
+    cfg = alembic_cfg(url)
+    command.upgrade(cfg, "7e61f3c9b2f1")
+    eng = create_engine(url)
+    with eng.begin() as c:
+        c.execute(text("INSERT INTO users (id, email, hashed_password, role, created_at) "
+                       "VALUES (1, 'a@tests.mx', 'h', 'user', '2024-01-01')"))
+        c.execute(text("INSERT INTO vehicles (id, user_id, marca, modelo, anio, odometro) VALUES (1, 1, 'Kia', 'Rio', 2020, 10.4)"))
+        c.execute(text("INSERT INTO alerts (id, vehicle_id, servicio, estado, created_at) "
+                       "VALUES (1, 1, :s, 'hecha', '2024-01-01')"), {"s": "x" * 80})
+    command.upgrade(cfg, "head")
+    command.check(cfg)
+
+    with eng.connect() as c:
+        assert c.execute(text("SELECT make, odometer_km, owner_id FROM vehicles")).one() == ("Kia", 10, 1)
+        assert c.execute(text("SELECT length(servicio) FROM alerts")).scalar() == 50
+        assert "_old_services" in inspect(c).get_table_names()
+    eng.dispose()
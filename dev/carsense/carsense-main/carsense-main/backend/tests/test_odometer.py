@@ -0,0 +1,40 @@
+# backend/tests/test_odometer.py
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def vehicle(client, auth):
+    """Vehículo sin odómetro inicial: el alta no registra lectura."""
+    r = client.post("/api/v1/vehicles", json={"make": "Kia", "model": "Rio", "year": 2021}, headers=auth)
+    assert r.status_code == 201, r.text
+    return r.json()
+
+
+def _post(client, auth, vid, readings):
+    body = [{"ts": ts.isoformat(), "km": km} for ts, km in readings]
+    return client.post(f"/api/v1/vehicles/{vid}/odometer", json=body, headers=auth)
+
+
+def test_usage_rate(client, auth, vehicle):
+    t0 = datetime(2024, 1, 1)
+    r = _post(client, auth, vehicle["id"], [(t0, 31000), (t0 + timedelta(days=2), 31100)])
+    assert r.status_code == 201, r.text
+    assert r.json()["km_per_day"] == 50.0
+    assert r.json()["odometer_km"] == 31100
+
+
+def test_close_readings_keep_their_km(client, auth, vehicle):
+    t0 = datetime(2024, 1, 1)
+    _post(client, auth, vehicle["id"], [(t0, 31000)])
+    _post(client, auth, vehicle["id"], [(t0 + timedelta(minutes=30), 31020)])  # < 1 h: no mueve la tasa
+    r = _post(client, auth, vehicle["id"], [(t0 + timedelta(days=1), 31100)]).json()
+    assert r["km_per_day"] == 100.0  # medido desde t0, no desde la lectura de los 30 min
+    assert r["odometer_km"] == 31100
+
+
+def test_odometer_cannot_go_down(client, auth, vehicle):
+    t0 = datetime(2024, 1, 1)
+    _post(client, auth, vehicle["id"], [(t0, 31000)])
+    assert _post(client, auth, vehicle["id"], [(t0 + timedelta(days=1), 30900)]).status_code == 400
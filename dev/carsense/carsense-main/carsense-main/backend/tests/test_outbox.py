@@ -0,0 +1,89 @@
+# backend/tests/test_outbox.py
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from app.core.clock import utcnow
+from app.core.config import get_settings
+from app.db.models import NotificationOutbox
+from app.db.session import SessionLocal, engine
+from app.services import outbox
+
+
+class FakeTransport:
+    def __init__(self, error=None):
+        self.error = error
+        self.sent = []
+
+    def send_batch(self, payloads):
+        self.sent.extend(payloads)
+        return [self.error] * len(payloads)
+
+
+def _enqueue(monkeypatch, client, auth, vehicle):
+    monkeypatch.setattr(get_settings(), "NOTIFY_CHANNELS", "webhook")
+    body = {"vehicle_id": vehicle["id"], "kind": "date", "due_date": "2020-01-01"}
+    rid = client.post("/api/v1/reminders", json=body, headers=auth).json()["id"]
+    reminder = {"id": rid, "kind": "date", "due_date": date(2020, 1, 1), "due_km": None, "notes": None}
+    car = {"id": vehicle["id"], "owner_id": 0, "make": "Nissan", "model": "Versa", "email": "x@tests.mx"}
+    fired_at = utcnow()
+    with SessionLocal() as db:
+        assert outbox.enqueue(db, [(reminder, car)], fired_at) == 1
+        assert outbox.enqueue(db, [(reminder, car)], fired_at) == 0  # mismo disparo: no se duplica
+        db.commit()
+    with engine.connect() as conn:
+        return conn.scalar(select(NotificationOutbox.id).where(NotificationOutbox.reminder_id == rid))
+
+
+def _row(oid):
+    with engine.connect() as conn:
+        return conn.execute(select(NotificationOutbox).where(NotificationOutbox.id == oid)).one()
+
+
+def _claimed(rows, oid):
+    return [r for r in rows if r.id == oid]
+
+
+def test_claim_lease_and_finish(monkeypatch, client, auth, vehicle):
+    oid = _enqueue(monkeypatch, client, auth, vehicle)
+    d = outbox.Dispatcher(engine, {"webhook": FakeTransport()}, lease_s=60)
+    now = utcnow()
+
+    [first] = _claimed(d.claim(now, "a"), oid)
+    assert first.attempts == 1
+    assert _claimed(d.claim(now, "b"), oid) == []  # con lease vigente nadie más lo ve
+    # el worker "a" murió: al vencer el lease otro lo reclama
+    [second] = _claimed(d.claim(now + timedelta(seconds=61), "c"), oid)
+    assert second.attempts == 2
+
+    d.finish("a", "webhook", [first], [None])  # reclamo viejo: no decide
+    assert (_row(oid).status, _row(oid).claimed_by) == (outbox.PENDING, "c")
+    d.finish("c", "webhook", [second], [None])
+    row = _row(oid)
+    assert (row.status, row.claimed_by) == (outbox.SENT, None) and row.sent_at is not None
+
+
+def test_failure_backs_off_then_dies(monkeypatch, client, auth, vehicle):
+    oid = _enqueue(monkeypatch, client, auth, vehicle)
+    d = outbox.Dispatcher(engine, {"webhook": FakeTransport("HTTP 500")}, max_attempts=2, backoff_s=30)
+    now = utcnow()
+
+    [r] = _claimed(d.claim(now, "a"), oid)
+    d.finish("a", "webhook", [r], ["HTTP 500"])
+    row = _row(oid)
+    assert (row.status, row.last_error) == (outbox.PENDING, "HTTP 500")
+    assert now + timedelta(seconds=14) <= row.available_at <= utcnow() + timedelta(seconds=30)
+    assert _claimed(d.claim(now, "b"), oid) == []  # todavía en backoff
+
+    [r] = _claimed(d.claim(row.available_at, "c"), oid)
+    d.finish("c", "webhook", [r], ["HTTP 500"])
+    assert _row(oid).status == outbox.DEAD  # sin más intentos
+
+
+def test_tick_sends_by_channel(monkeypatch, client, auth, vehicle):
+    oid = _enqueue(monkeypatch, client, auth, vehicle)
+    transport = FakeTransport()
+    d = outbox.Dispatcher(engine, {"webhook": transport})
+    assert d.tick() >= 1
+    assert _row(oid).status == outbox.SENT
+    assert any(p["vehicle"]["id"] == vehicle["id"] for p in transport.sent)
@@ -0,0 +1,96 @@
+# backend/tests/test_profiler.py
+import asyncio
+import os
+import threading
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import profiler
+
+
+def _spin(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _handler_work() -> None:
+    _spin(0.2)
+
+
+def _other_request_work(stop: threading.Event) -> None:
+    while not stop.is_set():
+        _spin(0.01)
+
+
+def test_profile_only_samples_request_threads(tmp_path, monkeypatch):
+    # los frames de este archivo cuentan como "código de la app"
+    monkeypatch.setattr(profiler, "APP_DIR", os.path.dirname(os.path.abspath(__file__)))
+    api = FastAPI()
+
+    @api.get("/slow")
+    def slow():
+        _handler_work()
+        return {}
+
+    ring = profiler.ProfileRing(str(tmp_path), 5)
+    stop = threading.Event()
+    other = threading.Thread(target=_other_request_work, args=(stop,), daemon=True)
+    other.start()
+    try:
+        with TestClient(profiler.ProfilerMiddleware(api, ring=ring, sample_rate=1, interval_ms=2)) as c:
+            r = c.get("/slow")
+    finally:
+        stop.set()
+        other.join()
+
+    name = r.headers["x-profile-id"]
+    with open(ring.path_of(name), encoding="utf-8") as fh:
+        folded = fh.read()
+    assert "_handler_work" in folded
+    assert "_other_request_work" not in folded
+
+
+async def _async_handler_work() -> None:
+    for _ in range(30):
+        _spin(0.01)
+        await asyncio.sleep(0)
+
+
+async def _other_async_work() -> None:
+    for _ in range(30):
+        _spin(0.01)
+        await asyncio.sleep(0)
+
+
+def test_profile_skips_concurrent_async_requests(tmp_path, monkeypatch):
+    # dos handlers async intercalados en el mismo hilo del loop: sólo cuenta el perfilado
+    monkeypatch.setattr(profiler, "APP_DIR", os.path.dirname(os.path.abspath(__file__)))
+    api = FastAPI()
+
+    @api.get("/slow")
+    async def slow():
+        await _async_handler_work()
+        return {}
+
+    @api.get("/other")
+    async def other():
+        await _other_async_work()
+        return {}
+
+    ring = profiler.ProfileRing(str(tmp_path), 5)
+    app = profiler.ProfilerMiddleware(api, ring=ring, admin_token="tok", interval_ms=1)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            return await asyncio.gather(c.get("/slow", headers={"X-CarSense-Profile": "tok"}), c.get("/other"))
+
+    profiled, _ = asyncio.run(run())
+    with open(ring.path_of(profiled.headers["x-profile-id"]), encoding="utf-8") as fh:
+        folded = fh.read()
+    assert "_async_handler_work" in folded
+    assert "_other_async_work" not in folded
@@ -0,0 +1,70 @@
+# backend/tests/test_push.py
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import text
+from starlette.websockets import WebSocketDisconnect
+
+from app.core import pubsub
+from app.db.session import SessionLocal
+from app.services import push
+
+
+def test_hub_fans_out_per_user():
+    async def run():
+        hub = pubsub.Hub(max_pending=2)
+        a1, a2, b = hub.subscribe(1), hub.subscribe(1), hub.subscribe(2)
+        assert hub.deliver(1, b"uno") == 2  # un evento, todas las conexiones del usuario
+        assert [await a1.get(0.01), await a2.get(0.01), await b.get(0.01)] == [b"uno", b"uno", None]
+
+        hub.publish(None, b"todos")  # BROADCAST
+        assert [await s.get(0.01) for s in (a1, a2, b)] == [b"todos"] * 3
+
+        for i in range(3):  # b no lee: al llenarse se descarta y se le pide resincronizar
+            hub.deliver(2, b"%d" % i)
+        assert [await b.get(0.01), await b.get(0.01)] == [pubsub.RESYNC, None]
+
+        hub.unsubscribe(a1)
+        assert hub.deliver(1, b"dos") == 1 and hub.connections == 2
+        hub.close()
+    asyncio.run(run())
+
+
+def test_publish_only_after_commit(monkeypatch):
+    async def run():
+        hub = pubsub.Hub()
+        monkeypatch.setattr(pubsub, "_hub", hub)
+        sub = hub.subscribe(7)
+        with SessionLocal() as db:
+            db.execute(text("SELECT 1"))
+            push.publish_after_commit(db, 7, push.ALERT_CREATED, {"id": 1})
+            db.rollback()  # sin aviso fantasma
+            assert await sub.get(0.01) is None
+            db.execute(text("SELECT 1"))
+            push.publish_after_commit(db, 7, push.ALERT_CREATED, {"id": 2})
+            db.commit()
+        assert b'"alert.created"' in await sub.get(0.01)
+        hub.close()
+    asyncio.run(run())
+
+
+def test_due_reminder_reaches_websocket(client, auth, vehicle):
+    token = auth["Authorization"].split()[1]
+    body = {"vehicle_id": vehicle["id"], "kind": "date", "due_date": "2020-01-01"}  # vencido
+    rid = client.post("/api/v1/reminders", json=body, headers=auth).json()["id"]
+    with client.websocket_connect(f"/api/v1/push/ws?token={token}") as ws:
+        hub = pubsub.get_hub()
+        deadline = time.monotonic() + 2
+        while hub.connections == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)  # el gateway se suscribe justo después del accept
+        with SessionLocal() as db:
+            assert push.fire_due_reminders(db) >= 1
+        msg = ws.receive_json()
+    assert msg["type"] == push.REMINDER_DUE and msg["data"]["id"] == rid
+
+
+def test_websocket_rejects_bad_token(client):
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/api/v1/push/ws?token=nope") as ws:
+            ws.receive_json()
@@ -0,0 +1,74 @@
+# backend/tests/test_ratelimit.py
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import ratelimit
+from app.core.security import create_access_token
+
+
+@pytest.fixture(params=["memory", "mmap"])
+def backend(request, tmp_path):
+    return ratelimit.make_backend(request.param, str(tmp_path / "rl"))
+
+
+def test_gcra_burst_then_refill(backend):
+    # 60/min (1 unidad por s), burst 5
+    interval, tau = 1.0, 5.0
+    now = 1000.0
+    assert all(backend.take("k", now, interval, tau)[0] for _ in range(5))
+    assert backend.take("k", now, interval, tau)[0] is False
+    assert backend.take("otra", now, interval, tau)[0] is True  # cada llave con su bucket
+    assert backend.take("k", now + 1, interval, tau)[0] is True  # se rellenó una unidad
+    assert backend.take("k", now + 1, interval, tau)[0] is False
+    # una petición que cuesta 3 espera a que quepan las 3
+    assert backend.take("k", now + 3, 3 * interval, tau)[0] is False
+    assert backend.take("k", now + 4, 3 * interval, tau)[0] is True
+
+
+def _app(**kw):
+    api = FastAPI()
+
+    @api.post("/api/v1/auth/login")
+    def login():
+        return {}
+
+    @api.get("/api/v1/vehicles")
+    def vehicles():
+        return []
+
+    @api.get("/health")
+    def health():
+        return {}
+
+    return TestClient(ratelimit.RateLimitMiddleware(api, per_min=60, burst=20, ip_per_min=60, ip_burst=20, **kw))
+
+
+def test_weighted_routes_and_headers():
+    c = _app()
+    # login cuesta 10: caben dos en un burst de 20
+    assert [c.post("/api/v1/auth/login").status_code for _ in range(3)] == [200, 200, 429]
+    r = c.post("/api/v1/auth/login")
+    assert r.status_code == 429 and int(r.headers["retry-after"]) >= 1
+    assert r.headers["ratelimit-limit"] == "20" and r.headers["ratelimit-remaining"] == "0"
+    assert c.get("/health").status_code == 200  # exenta
+    assert "ratelimit-limit" not in c.get("/health").headers
+
+
+def test_user_key_separate_from_ip():
+    c = _app()
+    for _ in range(2):
+        c.post("/api/v1/auth/login")
+    assert c.post("/api/v1/auth/login").status_code == 429  # la IP ya no tiene cupo
+    h = {"Authorization": f"Bearer {create_access_token(sub='rl@tests.mx')}"}
+    r = c.get("/api/v1/vehicles", headers=h)  # con token: su propio bucket
+    assert r.status_code == 200 and r.headers["ratelimit-remaining"] == "18"  # GET /vehicles cuesta 2
+    bad = {"Authorization": "Bearer no-es-un-jwt"}
+    assert c.get("/api/v1/vehicles", headers=bad).status_code == 429  # token inválido: cuenta como la IP
+
+
+def test_parse_weights_overrides():
+    w = ratelimit.parse_weights('{"post /auth/login": 50, "GET /health": 1}')
+    assert w[("POST", "/auth/login")] == 50 and w[("GET", "/health")] == 1
+    assert w[("GET", "/sync")] == ratelimit.DEFAULT_WEIGHTS[("GET", "/sync")]
+    assert ratelimit.parse_weights("no json") == ratelimit.DEFAULT_WEIGHTS
@@ -0,0 +1,45 @@
+# backend/tests/test_reminders.py
+
+
+def _create(client, auth, vehicle, **headers):
+    return client.post("/api/v1/reminders", json={"vehicle_id": vehicle["id"], "kind": "odometer", "due_km": 40000},
+                       headers={**auth, **headers})
+
+
+def test_create_and_list(client, auth, vehicle):
+    r = _create(client, auth, vehicle)
+    assert r.status_code == 201, r.text
+    listed = client.get("/api/v1/reminders", params={"vehicle_id": vehicle["id"]}, headers=auth).json()
+    assert [x["id"] for x in listed] == [r.json()["id"]]
+
+
+def test_toggle_done(client, auth, vehicle):
+    rid = _create(client, auth, vehicle).json()["id"]
+    r = client.patch(f"/api/v1/reminders/{rid}", headers=auth)
+    assert r.status_code == 200, r.text
+    assert r.json()["done"] is True and r.json()["id"] == rid
+    assert client.patch(f"/api/v1/reminders/{rid}", headers=auth).json()["done"] is False
+
+
+def test_toggle_other_users_reminder(client, auth, vehicle):
+    rid = _create(client, auth, vehicle).json()["id"]
+    other = client.post("/api/v1/auth/register", json={"email": f"otro{rid}@tests.mx", "password": "secret123"})
+    assert other.status_code == 201
+    tok = client.post("/api/v1/auth/login", json={"email": f"otro{rid}@tests.mx", "password": "secret123"})
+    h = {"Authorization": f"Bearer {tok.json()['access_token']}"}
+    assert client.patch(f"/api/v1/reminders/{rid}", headers=h).status_code == 404
+
+
+def test_idempotent_create(client, auth, vehicle):
+    a = _create(client, auth, vehicle, **{"Idempotency-Key": "rem-1"})
+    b = _create(client, auth, vehicle, **{"Idempotency-Key": "rem-1"})
+    assert a.status_code == b.status_code == 201
+    assert a.json() == b.json()
+    assert b.headers.get("Idempotent-Replayed") == "true"
+    assert len(client.get("/api/v1/reminders", params={"vehicle_id": vehicle["id"]}, headers=auth).json()) == 1
+
+
+def test_delete(client, auth, vehicle):
+    rid = _create(client, auth, vehicle).json()["id"]
+    assert client.delete(f"/api/v1/reminders/{rid}", headers=auth).status_code == 204
+    assert client.patch(f"/api/v1/reminders/{rid}", headers=auth).status_code == 404
@@ -0,0 +1,100 @@
+# backend/tests/test_replicas.py
+import os
+import time
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.core.clock import utcnow
+from app.core.config import get_settings
+from app.db import replicas
+from app.db.models import User, Vehicle
+from app.db.session import engine
+
+
+@pytest.fixture
+def pool(client, tmp_path, monkeypatch):
+    """Réplica local (copia de app.db al pedir el fixture) como la del scheduler, sin hilo de revisión."""
+    monkeypatch.setattr(get_settings(), "REPLICA_SNAPSHOT_S", 60.0)
+    monkeypatch.setattr(get_settings(), "REPLICA_SNAPSHOT_PATH", str(tmp_path / "replica.db"))
+    replicas.refresh_snapshot()
+    p = replicas.build()
+    p.check()
+    monkeypatch.setattr(replicas, "_pool", p)
+    yield p
+    p.stop()
+
+
+def _age(p, seconds: float) -> None:
+    """Frescura de la copia: hace `seconds` (negativo = en el futuro)."""
+    r = p.replicas[0]
+    t = time.time() - seconds
+    os.utime(r.path, (t, t))
+    p.check()
+
+
+def _session(user_id=None, last_write_at=None):
+    db = replicas.ReplicaSession(bind=engine)
+    replicas.mark_read(db)
+    if user_id is not None:
+        db.info[replicas.USER_KEY] = user_id
+        db.info[replicas.MARKER_KEY] = last_write_at
+    return db
+
+
+def test_fresh_replica_serves_reads(vehicle, pool):
+    replica = pool.replicas[0]
+    with _session() as db:
+        assert db.get_bind(clause=select(Vehicle)) is replica.engine
+        assert db.get(Vehicle, vehicle["id"]) is not None  # la copia ya lo tiene
+        # usuarios y similares siempre de la primaria
+        assert db.get_bind(clause=select(User)) is engine
+
+
+def test_read_your_writes(vehicle, pool):
+    replica = pool.replicas[0]
+    marker = utcnow()
+    _age(pool, 1)  # copia anterior a la escritura (dentro del SLACK)
+    with _session(1, marker) as db:
+        assert db.get_bind(clause=select(Vehicle)) is engine
+    _age(pool, -5)  # copia posterior a la marca + SLACK
+    with _session(1, marker) as db:
+        assert db.get_bind(clause=select(Vehicle)) is replica.engine
+
+
+def test_lagging_replica_falls_back(pool):
+    _age(pool, get_settings().REPLICA_MAX_LAG_S + 10)
+    assert not pool.any_up()
+    with _session() as db:
+        assert db.get_bind(clause=select(Vehicle)) is engine
+
+
+def test_write_sticks_to_primary_and_moves_marker(vehicle, pool):
+    with replicas.ReplicaSession(bind=engine) as db:
+        user = db.get(Vehicle, vehicle["id"]).owner
+        uid, before = user.id, user.last_write_at
+    assert before is None  # la marca sólo la mueven sesiones con usuario fijado
+    with _session(uid, before) as db:
+        assert db.get_bind(clause=select(Vehicle)) is pool.replicas[0].engine
+        v = db.get(Vehicle, vehicle["id"])
+        v.odometer_km += 100
+        db.flush()
+        assert db.get_bind(clause=select(Vehicle)) is engine  # ya escribió: se queda en la primaria
+        db.commit()
+        assert db.info[replicas.MARKER_KEY] is not None
+    with replicas.ReplicaSession(bind=engine) as db:
+        mark = db.get(User, uid).last_write_at
+    assert mark is not None and abs(utcnow() - mark) < timedelta(seconds=5)
+    # la copia aún no tiene esa escritura: el dueño lee de la primaria
+    with _session(uid, mark) as db:
+        assert db.get_bind(clause=select(Vehicle)) is engine
+        assert db.get(Vehicle, vehicle["id"]).odometer_km == vehicle["odometer_km"] + 100
+
+
+def test_disabled_never_marks_read(monkeypatch):
+    monkeypatch.setattr(get_settings(), "REPLICA_SNAPSHOT_S", 0.0)
+    db = replicas.ReplicaSession(bind=engine)
+    replicas.mark_read(db)
+    assert replicas.READ_KEY not in db.info
+    db.close()
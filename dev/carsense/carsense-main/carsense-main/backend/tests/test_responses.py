@@ -0,0 +1,33 @@
+# backend/tests/test_responses.py
+import gzip
+
+import pytest
+from starlette.requests import Request
+
+from app.core import responses
+from app.core.config import get_settings
+
+
+def _request(accept_encoding: str) -> Request:
+    return Request({"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]})
+
+
+@pytest.mark.parametrize("header, coding", [
+    ("gzip, deflate", "gzip"),
+    ("GZIP;q=0.5", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("*", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip; q=0.0, deflate", None),
+    ("*;q=0", None),
+    ("gzip;q=0, *", None),  # lo explícito manda sobre `*`
+    ("x-gzip", None),
+    ("", None),
+])
+def test_accept_encoding_q_values(header, coding, monkeypatch):
+    monkeypatch.setattr(responses, "brotli", None)
+    monkeypatch.setattr(get_settings(), "COMPRESS_MIN_BYTES", 10)
+    body = responses.dumps([{"n": i} for i in range(50)])
+    r = responses.json_bytes(_request(header), body)
+    assert r.headers.get("content-encoding") == coding
+    assert (gzip.decompress(r.body) if coding else r.body) == body
@@ -0,0 +1,51 @@
+# backend/tests/test_scheduler.py
+import time
+import uuid
+from datetime import timedelta
+
+from app.core import lease, scheduler
+from app.core.lease import Lease
+from app.db.session import engine
+
+
+def _name():
+    return f"test-{uuid.uuid4().hex[:8]}"
+
+
+def test_lease_single_holder(client):
+    name = _name()
+    a, b = Lease(engine, name, 60, holder="a"), Lease(engine, name, 60, holder="b")
+    assert a.acquire() and a.held
+    assert not b.acquire() and not b.held
+    assert a.acquire()  # renovar
+    a.release()
+    assert not a.held
+    assert b.acquire() and b.held
+    assert not a.acquire()
+
+
+def test_lease_expires_when_holder_dies(monkeypatch, client):
+    name = _name()
+    a, b = Lease(engine, name, 0.2, holder="a"), Lease(engine, name, 0.2, holder="b")
+    assert a.acquire()
+    assert not b.acquire()
+    time.sleep(0.3)  # "a" dejó de renovar
+    assert not a.held  # por su reloj local ya no se cree líder
+    later = lease.utcnow() + timedelta(seconds=1)  # la BD guarda segundos
+    monkeypatch.setattr(lease, "utcnow", lambda: later)
+    assert b.acquire()
+    assert not a.acquire()
+
+
+def test_run_job_requires_lease(monkeypatch, client):
+    calls = []
+    monkeypatch.setattr(scheduler, "job_table", lambda: {"prueba": (None, 0, lambda: calls.append(1))})
+    mine = Lease(engine, _name(), 60)
+    monkeypatch.setattr(scheduler, "_lease", mine)
+
+    scheduler.run_job("prueba")
+    assert calls == []  # sin lease: se omite
+    assert mine.acquire()
+    scheduler.run_job("prueba")
+    scheduler.run_job("desconocida")
+    assert calls == [1]
@@ -0,0 +1,41 @@
+# backend/tests/test_service_records.py
+
+
+def _create(client, auth, vehicle, **headers):
+    body = {"vehicle_id": vehicle["id"], "service_type": "Cambio de aceite", "date": "2024-05-01",
+            "km": 31000, "notes": "filtro nuevo"}
+    return client.post("/api/v1/service-records", json=body, headers={**auth, **headers})
+
+
+def test_create_get_list_delete(client, auth, vehicle):
+    r = _create(client, auth, vehicle)
+    assert r.status_code == 201, r.text
+    sid = r.json()["id"]
+    assert client.get(f"/api/v1/services/{sid}", headers=auth).json()["service_type"] == "Cambio de aceite"
+    listed = client.get("/api/v1/services", params={"vehicle_id": vehicle["id"]}, headers=auth).json()
+    assert [s["id"] for s in listed] == [sid]
+    assert client.delete(f"/api/v1/services/{sid}", headers=auth).status_code == 204
+    assert client.get(f"/api/v1/services/{sid}", headers=auth).status_code == 404
+
+
+def test_search(client, auth, vehicle):
+    _create(client, auth, vehicle)
+    hits = client.get("/api/v1/services/search", params={"q": "filtro"}, headers=auth).json()
+    assert len(hits) == 1
+
+
+def test_idempotent_create(client, auth, vehicle):
+    a = _create(client, auth, vehicle, **{"Idempotency-Key": "svc-1"})
+    b = _create(client, auth, vehicle, **{"Idempotency-Key": "svc-1"})
+    assert a.status_code == b.status_code == 201
+    assert a.json()["id"] == b.json()["id"]
+    assert b.headers.get("Idempotent-Replayed") == "true"
+
+
+def test_search_escapes_user_html(client, auth, vehicle):
+    body = {"vehicle_id": vehicle["id"], "service_type": "Frenos <b>", "date": "2024-05-01",
+            "notes": "balatas <img src=x onerror=alert(1)>"}
+    assert client.post("/api/v1/service-records", json=body, headers=auth).status_code == 201
+    [hit] = client.get("/api/v1/services/search", params={"q": "balatas"}, headers=auth).json()
+    assert hit["snippet"] == "<mark>balatas</mark> &lt;img src=x onerror=alert(1)&gt;"
+    assert hit["type_hl"] == "Frenos &lt;b&gt;"
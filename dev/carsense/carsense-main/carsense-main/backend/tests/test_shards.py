@@ -0,0 +1,131 @@
+# backend/tests/test_shards.py
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.db import shards
+from app.db.models import Alert, Reminder, ServiceRecord, User, Vehicle
+from app.db.session import SessionLocal, engine
+from app.jobs import rebalance_shards
+from app.services import alerts, push
+
+
+@pytest.fixture
+def sharded(monkeypatch, tmp_path):
+    """Dos shards en un directorio temporal; el directorio es la app.db de las pruebas."""
+    monkeypatch.setattr(get_settings(), "SHARD_COUNT", 2)
+    monkeypatch.setattr(get_settings(), "SHARD_DIR", str(tmp_path))
+    yield
+    shards.dispose()
+
+
+def _shadow(shard, user_id):
+    with shards.engine_for(shard).connect() as conn:
+        return conn.execute(select(User.email, User.shard).where(User.id == user_id)).first()
+
+
+def test_moving_owner_no_alerts(client, auth, vehicle):
+    body = {"vehicle_id": vehicle["id"], "service_type": "Cambio de aceite", "date": "2020-01-01", "km": 20000}
+    assert client.post("/api/v1/service-records", json=body, headers=auth).status_code == 201
+    with SessionLocal() as db:
+        owner = db.get(Vehicle, vehicle["id"]).owner_id
+        moving = update(User).where(User.id == owner)
+        db.execute(moving.values(shard_moving=True))
+        db.commit()
+        mine = select(Alert.servicio).where(Alert.vehicle_id == vehicle["id"])
+        alerts.generate(db)
+        assert db.scalars(mine).all() == []  # en mudanza: la genera (y la anuncia) el destino
+        db.execute(moving.values(shard_moving=False))
+        db.commit()
+        alerts.generate(db)
+        assert "aceite" in db.scalars(mine).all()
+
+
+def test_moving_owner_not_fired(client, auth, vehicle):
+    body = {"vehicle_id": vehicle["id"], "kind": "date", "due_date": "2020-01-01"}  # vencido
+    rid = client.post("/api/v1/reminders", json=body, headers=auth).json()["id"]
+    with SessionLocal() as db:
+        owner = db.get(Vehicle, vehicle["id"]).owner_id
+        moving = update(User).where(User.id == owner)
+        db.execute(moving.values(shard_moving=True))
+        db.commit()
+        push.fire_due_reminders(db)  # en mudanza: lo dispara el destino
+        assert db.get(Reminder, rid).fired_at is None
+        db.execute(moving.values(shard_moving=False))
+        db.commit()
+        push.fire_due_reminders(db)
+        db.expire_all()
+        assert db.get(Reminder, rid).fired_at is not None
+
+
+def test_assign_shadow_before_shard(sharded):
+    with Session(engine) as db:
+        user = User(email="alta-caida@tests.mx", password_hash="x")
+        db.add(user)
+        db.commit()
+        shard = shards.placement(user.id)
+
+        def crash():
+            raise RuntimeError("caída")
+        db.commit = crash
+        with pytest.raises(RuntimeError):
+            shards.assign(db, user)
+        db.rollback()
+        # sin shard anotado (sus datos siguen en el directorio), la sombra ya existe
+        assert db.get(User, user.id).shard is None
+        assert _shadow(shard, user.id) == ("alta-caida@tests.mx", shard)
+
+        del db.commit
+        shards.assign(db, user)  # reintento: idempotente
+        assert db.get(User, user.id).shard == shard
+        assert _shadow(shard, user.id) == ("alta-caida@tests.mx", shard)
+
+
+def test_routing_requires_shard(sharded, auth):
+    with shards.RoutingSession() as db:
+        assert db.scalar(select(User.id).limit(1)) is not None  # tabla global: directorio
+        with pytest.raises(shards.ShardNotSelected):
+            db.scalars(select(Vehicle.id)).all()
+        shards.route(db, 1)
+        assert db.get_bind(clause=select(Vehicle.id)) is shards.engine_for(1)
+        assert db.get_bind(clause=select(User.id)) is shards.directory()
+        shards.route(db, None)  # datos que siguen en el directorio
+        assert db.get_bind(clause=select(Vehicle.id)) is shards.directory()
+
+
+def test_copy_and_purge_round_trip(client, auth, vehicle, sharded):
+    body = {"vehicle_id": vehicle["id"], "service_type": "Cambio de aceite", "date": "2024-05-01", "km": 31000}
+    assert client.post("/api/v1/service-records", json=body, headers=auth).status_code == 201
+    body = {"vehicle_id": vehicle["id"], "kind": "odometer", "due_km": 40000}
+    assert client.post("/api/v1/reminders", json=body, headers=auth).status_code == 201
+    with engine.connect() as conn:
+        owner, email = conn.execute(select(User.id, User.email).join(Vehicle, Vehicle.owner_id == User.id)
+                                    .where(Vehicle.id == vehicle["id"])).one()
+    dest = shards.placement(owner)
+    shards.ensure_shadow(dest, owner, email)
+    with engine.connect() as src, shards.engine_for(dest).begin() as dst:
+        copied, vehicles = rebalance_shards.copy_user(src, dst, owner)
+    assert copied["vehicles"] == copied["service_records"] == copied["reminders"] == 1
+    new_vid = vehicles[vehicle["id"]]
+
+    with engine.begin() as conn:
+        rebalance_shards.purge(conn, owner, None)
+    with engine.connect() as conn:
+        assert conn.scalar(select(Vehicle.id).where(Vehicle.owner_id == owner)) is None
+        assert conn.scalar(select(ServiceRecord.id).where(ServiceRecord.vehicle_id == vehicle["id"])) is None
+    with shards.engine_for(dest).connect() as conn:
+        assert conn.execute(select(Vehicle.owner_id, Vehicle.odometer_km).where(Vehicle.id == new_vid)).one() \
+            == (owner, 30000)
+        assert conn.scalar(select(ServiceRecord.km).where(ServiceRecord.vehicle_id == new_vid)) == 31000
+        assert conn.scalar(select(Reminder.due_km).where(Reminder.vehicle_id == new_vid)) == 40000
+
+    # vuelta al directorio: purgar el shard también quita la sombra
+    with shards.engine_for(dest).connect() as src, engine.begin() as dst:
+        copied, _ = rebalance_shards.copy_user(src, dst, owner)
+    assert copied["vehicles"] == copied["service_records"] == copied["reminders"] == 1
+    with shards.engine_for(dest).begin() as conn:
+        rebalance_shards.purge(conn, owner, dest)
+    assert _shadow(dest, owner) is None
+    with shards.engine_for(dest).connect() as conn:
+        assert conn.scalar(select(Vehicle.id).where(Vehicle.owner_id == owner)) is None
@@ -0,0 +1,31 @@
+# backend/tests/test_slow_queries.py
+import pytest
+from sqlalchemy import create_engine
+
+from app.core import slow_queries
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    monkeypatch.setattr(slow_queries, "_top_n", 1)
+    slow_queries.reset()
+    engine = create_engine("sqlite://")
+    with engine.connect() as c:
+        yield c
+    slow_queries.reset()
+
+
+def test_plan_captured(conn):
+    slow_queries._record(conn, "SELECT 1 WHERE 1 = ?", (1,), False, 50.0)
+    [e] = slow_queries.top()
+    assert e["plan"] and not e["plan"][0].startswith("<explain failed")
+
+
+def test_not_admitted_not_explained(conn, monkeypatch):
+    slow_queries._record(conn, "SELECT 1", (), False, 50.0)
+    calls = []
+    monkeypatch.setattr(slow_queries, "_explain", lambda *a: calls.append(a))
+    slow_queries._record(conn, "SELECT 2 + 2", (), False, 10.0)  # menos costosa: no entra al top
+    slow_queries._record(conn, "SELECT 1", (), False, 50.0)      # ya tiene plan
+    assert calls == []
+    assert [e["count"] for e in slow_queries.top()] == [2]
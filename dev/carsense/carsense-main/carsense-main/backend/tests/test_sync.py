@@ -0,0 +1,75 @@
+# backend/tests/test_sync.py
+from app.db import shards
+from app.db.session import SessionLocal
+from app.services import changes
+
+
+def _sync(client, auth, since=None, **params):
+    r = client.get("/api/v1/sync", params={"since": since, **params} if since else params, headers=auth)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _reminder(client, auth, vehicle):
+    body = {"vehicle_id": vehicle["id"], "kind": "odometer", "due_km": 40000}
+    r = client.post("/api/v1/reminders", json=body, headers=auth)
+    assert r.status_code == 201, r.text
+    return r.json()["id"]
+
+
+def test_full_then_delta(client, auth, vehicle):
+    first = _sync(client, auth)
+    assert first["reset"] is True and not first["has_more"]
+    assert [v["id"] for v in first["vehicles"]["upserted"]] == [vehicle["id"]]
+
+    rid = _reminder(client, auth, vehicle)
+    client.patch(f"/api/v1/reminders/{rid}", headers=auth)  # dos cambios: va su última versión
+    gone = _reminder(client, auth, vehicle)
+    assert client.delete(f"/api/v1/reminders/{gone}", headers=auth).status_code == 204
+
+    d = _sync(client, auth, first["cursor"])
+    assert d["reset"] is False and d["cursor"] > first["cursor"]
+    assert [(r["id"], r["done"]) for r in d["reminders"]["upserted"]] == [(rid, True)]
+    assert d["reminders"]["deleted"] == [gone]
+    assert d["vehicles"] == {"upserted": [], "deleted": []}
+
+    # sin cambios: mismo cursor, nada que aplicar
+    again = _sync(client, auth, d["cursor"])
+    assert again["cursor"] == d["cursor"] and again["reminders"]["upserted"] == []
+
+
+def test_delta_pages_with_has_more(client, auth, vehicle):
+    cursor = _sync(client, auth)["cursor"]
+    ids = [_reminder(client, auth, vehicle) for _ in range(3)]
+    seen = []
+    while True:
+        d = _sync(client, auth, cursor, limit=1)
+        seen += [r["id"] for r in d["reminders"]["upserted"]]
+        cursor = d["cursor"]
+        if not d["has_more"]:
+            break
+    assert seen == ids
+
+
+def test_vehicle_delete_reports_cascaded_children(client, auth, vehicle):
+    cursor = _sync(client, auth)["cursor"]
+    rid = _reminder(client, auth, vehicle)
+    assert client.delete(f"/api/v1/vehicles/{vehicle['id']}", headers=auth).status_code == 204
+    d = _sync(client, auth, cursor)
+    assert d["vehicles"]["deleted"] == [vehicle["id"]]
+    assert d["reminders"]["deleted"] == [rid]  # anotado como alta, ya no existe
+
+
+def test_reset_for_purged_or_foreign_cursor(client, auth, vehicle):
+    cursor = _sync(client, auth)["cursor"]
+    _reminder(client, auth, vehicle)
+    _reminder(client, auth, vehicle)
+    with SessionLocal() as db:
+        changes.prune(db, older_than_days=-1)  # todo menos la última entrada
+        db.commit()
+    d = _sync(client, auth, cursor)
+    assert d["reset"] is True and len(d["reminders"]["upserted"]) == 2
+
+    other_db = (3 << shards.CURSOR_BITS) + d["cursor"]  # cursor de otro shard (el usuario se mudó)
+    assert _sync(client, auth, other_db)["reset"] is True
+    assert _sync(client, auth, d["cursor"])["reset"] is False
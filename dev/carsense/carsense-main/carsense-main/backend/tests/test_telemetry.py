@@ -0,0 +1,55 @@
+# backend/tests/test_telemetry.py
+import struct
+import time
+
+from app.services import telemetry
+
+OCTET = {"Content-Type": "application/octet-stream"}
+
+
+def _frame(t0: int, n: int = 10, pid: int = 12):
+    return [(t0 + i * 1000, pid, float(800 + i)) for i in range(n)]
+
+
+def _post(client, auth, vid, samples):
+    return client.post(f"/api/v1/vehicles/{vid}/telemetry", content=telemetry.encode_binary(samples),
+                       headers={**auth, **OCTET})
+
+
+def _rollups(client, auth, vid):
+    telemetry.get_writer().drain()
+    return client.get(f"/api/v1/vehicles/{vid}/telemetry", headers=auth).json()
+
+
+def test_ingest_and_rollup(client, auth, vehicle):
+    t0 = int(time.time() // 60 * 60 * 1000)
+    assert _post(client, auth, vehicle["id"], _frame(t0)).status_code == 202
+    [r] = _rollups(client, auth, vehicle["id"])
+    assert (r["n"], r["min"], r["max"]) == (10, 800.0, 809.0)
+
+
+def test_retried_frame_counts_once(client, auth, vehicle):
+    t0 = int(time.time() // 60 * 60 * 1000)
+    frame = _frame(t0)
+    _post(client, auth, vehicle["id"], frame)
+    telemetry.get_writer().drain()
+    _post(client, auth, vehicle["id"], frame)          # reintento del mismo frame
+    _post(client, auth, vehicle["id"], frame + frame)  # y repetido dentro del lote
+    [r] = _rollups(client, auth, vehicle["id"])
+    assert r["n"] == 10
+    assert r["avg"] == sum(v for _, _, v in frame) / 10
+
+
+def test_bad_vehicle_does_not_drop_others(client, auth, vehicle):
+    t0 = int(time.time() // 60 * 60 * 1000)
+    w = telemetry.get_writer()
+    w.drain()
+    written = w.flush([(999999, _frame(t0)), (vehicle["id"], _frame(t0, 5))])  # 999999: FK rota
+    assert written == 5
+    assert _rollups(client, auth, vehicle["id"])[0]["n"] == 5
+
+
+def test_pid_out_of_range(client, auth, vehicle):
+    body = struct.pack("<qHf", int(time.time() * 1000), 40000, 1.0)
+    r = client.post(f"/api/v1/vehicles/{vehicle['id']}/telemetry", content=body, headers={**auth, **OCTET})
+    assert r.status_code == 400
@@ -0,0 +1,54 @@
+# backend/tests/test_vehicles.py
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.db import check_fk_cascades, delete_children
+from app.db.models import Reminder, ServiceRecord, User, Vehicle
+
+
+def test_create_get_list_delete(client, auth, vehicle):
+    vid = vehicle["id"]
+    assert client.get(f"/api/v1/vehicles/{vid}", headers=auth).json()["model"] == "Versa"
+    assert vid in [v["id"] for v in client.get("/api/v1/vehicles", headers=auth).json()]
+    assert client.delete(f"/api/v1/vehicles/{vid}", headers=auth).status_code == 204
+    assert client.get(f"/api/v1/vehicles/{vid}", headers=auth).status_code == 404
+
+
+def test_requires_token(client):
+    assert client.get("/api/v1/vehicles").status_code == 401
+
+
+def test_idempotent_create(client, auth):
+    body = {"make": "Mazda", "model": "3", "year": 2020}
+    h = {**auth, "Idempotency-Key": "veh-1"}
+    a = client.post("/api/v1/vehicles", json=body, headers=h)
+    b = client.post("/api/v1/vehicles", json=body, headers=h)
+    assert a.status_code == b.status_code == 201
+    assert a.json()["id"] == b.json()["id"]
+    assert len(client.get("/api/v1/vehicles", headers=auth).json()) == 1
+    # misma llave, otro cuerpo
+    assert client.post("/api/v1/vehicles", json={**body, "year": 2021}, headers=h).status_code == 422
+
+
+def test_delete_children_without_db_cascade(legacy_engine):
+    assert check_fk_cascades(legacy_engine) == ["service_records.vehicle_id -> vehicles"]
+    with Session(legacy_engine) as db:
+        for n in (1, 2):
+            u = User(email=f"legacy{n}@tests.mx", password_hash="x")
+            v = Vehicle(make="Nissan", model="Versa", owner=u)
+            db.add_all([u, v, ServiceRecord(vehicle=v, service_type="Aceite"), ServiceRecord(vehicle=v, service_type="Frenos")])
+            db.flush()
+            db.add(Reminder(vehicle_id=v.id, kind="odometer", due_km=40000))
+        db.commit()
+        v1, v2 = db.execute(select(Vehicle.id).order_by(Vehicle.id)).scalars()
+
+        # un vehículo: sus servicios a mano, el recordatorio por la cascada de la BD
+        delete_children(db, Vehicle.__table__, Vehicle.id == v1)
+        db.execute(delete(Vehicle).where(Vehicle.id == v1))
+        # una cuenta: los servicios son nietos (users → vehicles en cascada → service_records sin ella)
+        u2 = db.execute(select(Vehicle.owner_id).where(Vehicle.id == v2)).scalar()
+        delete_children(db, User.__table__, User.id == u2)
+        db.execute(delete(User).where(User.id == u2))
+        db.commit()
+        for model in (Vehicle, ServiceRecord, Reminder):
+            assert db.execute(select(func.count()).select_from(model)).scalar() == 0
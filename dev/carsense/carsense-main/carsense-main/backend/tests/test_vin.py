@@ -0,0 +1,50 @@
+# backend/tests/test_vin.py
+from app.core.config import get_settings
+from app.services import vin
+
+
+def _vin(first8, rest8):
+    """VIN norteamericano con su dígito verificador correcto (posición 9)."""
+    draft = first8 + "0" + rest8
+    return first8 + vin.check_digit(draft) + rest8
+
+
+def test_decode_known_vin():
+    d = vin.decode(" 1hgcm82633a004352 ")  # se normaliza
+    assert d["valid"] and d["check_digit"] is True and d["vin"] == "1HGCM82633A004352"
+    assert (d["make"], d["model"], d["model_year"], d["country"]) == ("Honda", "Accord", 2003, "Estados Unidos")
+
+
+def test_year_picks_model_generation_and_plant():
+    # posición 7 letra: ciclo 2010-2039
+    d = vin.decode(_vin("3N1CN7AP", "KL123456"))
+    assert (d["manufacturer"], d["make"], d["model"], d["model_year"]) == ("Nissan Mexicana", "Nissan", "Versa", 2019)
+    assert d["plant"] == "Aguascalientes, Aguascalientes"
+    # WMI compartido: la marca sale del patrón VDS
+    d = vin.decode(_vin("1C4RJFAG", "FC123456"))
+    assert (d["manufacturer"], d["make"], d["model"], d["model_year"]) == ("FCA US", "Jeep", "Grand Cherokee", 2015)
+
+
+def test_invalid_vins():
+    good = _vin("3N1CN7AP", "KL123456")
+    bad_digit = good[:8] + ("1" if good[8] != "1" else "2") + good[9:]
+    d = vin.decode(bad_digit)
+    assert not d["valid"] and d["check_digit"] is False and d["model"] is None
+    assert vin.decode(good[:16])["error"] == "Debe tener 17 caracteres"
+    assert not vin.decode(good[:5] + "O" + good[6:])["valid"]  # O no se usa en VIN
+    assert vin.decode(None)["valid"] is False
+
+
+def test_outside_north_america_no_check_digit():
+    d = vin.decode("ZZZ12345678901234")
+    assert d["valid"] and d["check_digit"] is None
+    assert d["manufacturer"] is None and d["country"] == "Italia"  # WMI desconocido: región
+
+
+def test_batch_endpoint(client, auth, monkeypatch):
+    vins = [_vin("3N1CN7AP", "KL000001"), "corto", _vin("3N1CN7AP", "KL000002")]
+    r = client.post("/api/v1/vins/decode", json={"vins": vins}, headers=auth)
+    assert r.status_code == 200, r.text
+    assert [(x["vin"], x["valid"]) for x in r.json()] == [(vins[0], True), ("CORTO", False), (vins[2], True)]
+    monkeypatch.setattr(get_settings(), "VIN_BATCH_MAX", 2)
+    assert client.post("/api/v1/vins/decode", json={"vins": vins}, headers=auth).status_code == 413